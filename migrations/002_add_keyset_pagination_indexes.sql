@@ -0,0 +1,20 @@
+-- Migration: 002_add_keyset_pagination_indexes
+-- Description: Composite (sort key, id) indexes backing keyset pagination of admin and innovation-zone listings
+-- Date: 2026-10-18
+
+-- 1. Admin user list (sort_by = created_at / updated_at / last_login)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_at_id ON users (created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_updated_at_id ON users (updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_last_login_id ON users (last_login, id);
+
+-- 2. Innovation zone listings
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_innovation_zone_established_id ON innovation_zones (established_date, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_innovation_project_created_id ON innovation_projects (created_at, id);
+
+-- Verify migration
+SELECT 'Migration 002 completed successfully' AS status;
+SELECT indexname FROM pg_indexes
+WHERE indexname IN (
+    'idx_users_created_at_id', 'idx_users_updated_at_id', 'idx_users_last_login_id',
+    'idx_innovation_zone_established_id', 'idx_innovation_project_created_id'
+);
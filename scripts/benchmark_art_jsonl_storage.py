@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+ART JSONL Storage Benchmark
+測量 RewardStorage JSON 後端（追加式 JSONL 日誌）的寫入吞吐量與索引查詢延遲
+
+用法:
+    python scripts/benchmark_art_jsonl_storage.py --records 100000
+    python scripts/benchmark_art_jsonl_storage.py --records 100000 --concurrency 1 --no-fsync
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradingagents.art.storage.storage_base import StorageConfig, StorageBackend, StorageMode
+from tradingagents.art.storage.reward_storage import (
+    RewardStorage, RewardRecord, RewardQuery, MembershipTier
+)
+
+
+def build_record(i: int, users: int, stocks: int) -> RewardRecord:
+    """產生測試獎勵記錄"""
+    return RewardRecord(
+        signal_id=f"sig_{i:07d}",
+        trajectory_id=f"traj_{i // 4:07d}",
+        user_id=f"user_{i % users:05d}",
+        stock_id=f"{2300 + i % stocks}.TW",
+        analyst_type="technical_analyst",
+        base_total_reward=(i % 200) / 100.0,
+        membership_multiplier=1.0,
+        weighted_total_reward=(i % 200) / 100.0,
+        calculation_timestamp=f"2024-01-{1 + i % 28:02d}T00:00:00",
+        membership_tier=MembershipTier.FREE
+    )
+
+
+async def run_benchmark(args) -> dict:
+    storage_dir = Path(tempfile.mkdtemp(prefix="art_jsonl_bench_"))
+    try:
+        config = StorageConfig(
+            backend=StorageBackend.JSON,
+            storage_path=str(storage_dir),
+            mode=StorageMode.PRODUCTION,
+            enable_caching=False,
+            json_log_fsync=not args.no_fsync
+        )
+        storage = RewardStorage(config)
+        await storage.initialize()
+
+        records = [build_record(i, args.users, args.stocks) for i in range(args.records)]
+
+        # 寫入吞吐量：每批 concurrency 筆併發寫入，同批寫入由群組提交合併 fsync
+        started = time.perf_counter()
+        for start in range(0, len(records), args.concurrency):
+            batch = records[start:start + args.concurrency]
+            await asyncio.gather(*(storage.create_record(r) for r in batch))
+        write_seconds = time.perf_counter() - started
+
+        # 索引查詢延遲
+        query = RewardQuery(user_ids=["user_00042"], stock_ids=["2342.TW"], limit=50)
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            await storage.query_records(query)
+        query_ms = (time.perf_counter() - started) * 1000 / args.queries
+
+        write_stats = storage._json_log.get_stats()
+
+        # 重啟重播時間
+        await storage.disconnect()
+        reopened = RewardStorage(config)
+        started = time.perf_counter()
+        await reopened.initialize()
+        replay_seconds = time.perf_counter() - started
+        record_count = await reopened.count_records()
+        await reopened.disconnect()
+
+        return {
+            'records': args.records,
+            'concurrency': args.concurrency,
+            'fsync': not args.no_fsync,
+            'write_seconds': round(write_seconds, 3),
+            'writes_per_second': round(args.records / write_seconds, 1),
+            'indexed_query_ms': round(query_ms, 3),
+            'replay_seconds': round(replay_seconds, 3),
+            'records_after_replay': record_count,
+            'log_bytes': write_stats['log_bytes'],
+            'fsync_batches': write_stats['flushes']
+        }
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ART JSONL storage benchmark")
+    parser.add_argument("--records", type=int, default=100_000, help="寫入記錄數")
+    parser.add_argument("--concurrency", type=int, default=256, help="每批併發寫入數")
+    parser.add_argument("--users", type=int, default=1000, help="不同用戶數")
+    parser.add_argument("--stocks", type=int, default=50, help="不同股票數")
+    parser.add_argument("--queries", type=int, default=200, help="查詢次數")
+    parser.add_argument("--no-fsync", action="store_true", help="停用 fsync（僅測量 CPU 開銷）")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
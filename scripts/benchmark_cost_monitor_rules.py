@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Realtime Cost Monitor Rule Evaluation Benchmark
+測量 RealtimeCostMonitor 告警規則評估迴圈耗時與規則數量的關係，
+並與逐規則線性掃描 metrics_history 的舊做法比較
+
+用法:
+    python scripts/benchmark_cost_monitor_rules.py
+    python scripts/benchmark_cost_monitor_rules.py --assets 500 --minutes 120 --rules 10 100 500 1000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradingagents.cost_tracking.realtime_cost_monitor import (
+    RealtimeCostMonitor, AlertRule, AlertType, AlertSeverity,
+    MonitoringMetrics, MonitoringScope, MetricType
+)
+
+
+def populate_metrics(monitor: RealtimeCostMonitor, assets: int, minutes: int, now: datetime):
+    """每分鐘為每個資產產生一筆指標"""
+    rng = random.Random(42)
+    for minute in range(minutes, 0, -1):
+        timestamp = now - timedelta(minutes=minute)
+        for index in range(assets):
+            monitor._record_metrics(MonitoringMetrics(
+                timestamp=timestamp,
+                target_id=f"gpu_{index:04d}",
+                target_type=MonitoringScope.ASSET,
+                total_cost=Decimal(str(round(rng.uniform(1, 100), 2))),
+                utilization_rate=rng.uniform(0.4, 1.0),
+                power_usage_effectiveness=rng.uniform(1.1, 1.6)
+            ))
+
+
+def build_rules(count: int, assets: int):
+    """產生不會觸發的規則（只測量評估成本）"""
+    rng = random.Random(7)
+    rules = []
+    for index in range(count):
+        if index % 10 == 0:
+            scope, targets = MonitoringScope.ORGANIZATION, []
+        else:
+            scope = MonitoringScope.ASSET
+            targets = [f"gpu_{rng.randrange(assets):04d}" for _ in range(3)]
+        rules.append(AlertRule(
+            rule_id=f"rule_{index}",
+            name=f"Benchmark rule {index}",
+            alert_type=AlertType.COST_THRESHOLD,
+            severity=AlertSeverity.INFO,
+            scope=scope,
+            target_ids=targets,
+            metric_type=MetricType.COST if index % 2 == 0 else MetricType.UTILIZATION,
+            threshold_value=Decimal('1000000'),
+            comparison_operator="greater_than",
+            evaluation_period_minutes=rng.choice([5, 15, 30, 60])
+        ))
+    return rules
+
+
+def legacy_evaluate(monitor: RealtimeCostMonitor, rules, current_time: datetime) -> int:
+    """舊做法：每條規則線性掃描整個 metrics_history"""
+    breaches = 0
+    for rule in rules:
+        cutoff_time = current_time - timedelta(minutes=rule.evaluation_period_minutes)
+        for metrics in monitor.metrics_history:
+            if metrics.timestamp >= cutoff_time:
+                if ((rule.scope == MonitoringScope.ASSET and metrics.target_id in rule.target_ids) or
+                        rule.scope == MonitoringScope.ORGANIZATION):
+                    value = monitor._get_metric_value(metrics, rule.metric_type)
+                    if monitor._evaluate_threshold(value, rule):
+                        breaches += 1
+    return breaches
+
+
+async def run_benchmark(args) -> dict:
+    monitor = RealtimeCostMonitor()
+    now = datetime.now(timezone.utc)
+    populate_metrics(monitor, args.assets, args.minutes, now)
+
+    results = []
+    for rule_count in args.rules:
+        rules = build_rules(rule_count, args.assets)
+        monitor.alert_rules = {rule.rule_id: rule for rule in rules}
+
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            await monitor._evaluate_alert_rules()
+        bucketed_ms = (time.perf_counter() - started) * 1000 / args.iterations
+
+        started = time.perf_counter()
+        legacy_evaluate(monitor, rules, now)
+        legacy_ms = (time.perf_counter() - started) * 1000
+
+        results.append({
+            'rules': rule_count,
+            'bucketed_loop_ms': round(bucketed_ms, 3),
+            'linear_scan_loop_ms': round(legacy_ms, 3),
+            'speedup': round(legacy_ms / bucketed_ms, 1) if bucketed_ms else None
+        })
+
+    return {
+        'assets': args.assets,
+        'minutes': args.minutes,
+        'metrics_history': len(monitor.metrics_history),
+        'store': monitor.metrics_store.get_stats(),
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Realtime cost monitor rule evaluation benchmark")
+    parser.add_argument("--assets", type=int, default=200, help="資產數")
+    parser.add_argument("--minutes", type=int, default=60, help="歷史分鐘數（每分鐘每資產一筆）")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500, 1000], help="規則數")
+    parser.add_argument("--iterations", type=int, default=5, help="分桶評估重複次數")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SQLite Snapshot Write-Latency Benchmark
+測量備份進行期間寫入者的延遲：以固定速率寫入的同時對資料庫做備份，
+比較單步線上備份（整個複製期間持鎖）與分頁快照在回滾日誌 / WAL 模式下的表現
+
+用法:
+    python scripts/benchmark_sqlite_snapshot.py
+    python scripts/benchmark_sqlite_snapshot.py --rows 400000 --write-interval-ms 1
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradingagents.art.storage.sqlite_snapshot import snapshot_sqlite_database
+
+
+def create_database(path: str, rows: int, wal: bool):
+    """建立含 rows 筆獎勵樣本資料的資料庫"""
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+    conn.execute("CREATE TABLE rewards (signal_id TEXT PRIMARY KEY, user_id TEXT, reward REAL, payload TEXT)")
+    payload = 'x' * 200
+    conn.executemany(
+        "INSERT INTO rewards VALUES (?, ?, ?, ?)",
+        ((f"sig_{i}", f"user_{i % 1000}", i * 0.001, payload) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def writer_loop(path: str, stop: threading.Event, interval: float, latencies: list):
+    """以固定間隔寫入，記錄每次提交耗時"""
+    conn = sqlite3.connect(path, timeout=60)
+    counter = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        conn.execute(
+            "INSERT INTO rewards VALUES (?, ?, ?, ?)",
+            (f"live_{counter}", "user_live", 1.0, "y" * 200)
+        )
+        conn.commit()
+        latencies.append((time.perf_counter() - started) * 1000)
+        counter += 1
+        time.sleep(interval)
+    conn.close()
+
+
+def single_step_backup(source_path: str, target_path: str) -> dict:
+    """基準做法：一步複製整個資料庫"""
+    started = time.time()
+    source = sqlite3.connect(source_path, timeout=60)
+    target = sqlite3.connect(target_path)
+    source.backup(target)
+    target.close()
+    source.close()
+    return {'duration_seconds': time.time() - started}
+
+
+def summarize(latencies: list) -> dict:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    return {
+        'writes': len(ordered),
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+
+def run_case(workdir: str, name: str, wal: bool, paged: bool, args) -> dict:
+    source_path = os.path.join(workdir, f"{name}.db")
+    target_path = os.path.join(workdir, f"{name}.snapshot.db")
+    create_database(source_path, args.rows, wal)
+
+    latencies = []
+    stop = threading.Event()
+    writer = threading.Thread(
+        target=writer_loop, args=(source_path, stop, args.write_interval_ms / 1000, latencies)
+    )
+    writer.start()
+    time.sleep(0.2)
+    latencies.clear()
+
+    if paged:
+        result = snapshot_sqlite_database(
+            source_path, target_path,
+            pages_per_step=args.pages_per_step,
+            step_sleep_seconds=args.step_sleep_ms / 1000,
+            quick_check=False
+        )
+    else:
+        result = single_step_backup(source_path, target_path)
+
+    stop.set()
+    writer.join()
+
+    summary = {
+        'case': name,
+        'journal_mode': 'wal' if wal else 'delete',
+        'backup_seconds': round(result['duration_seconds'], 3),
+        'write_latency_during_backup': summarize(latencies)
+    }
+    if paged:
+        summary.update({'steps': result['steps'], 'restarts': result['restarts'],
+                        'single_step_fallback': result['single_step_fallback']})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite snapshot write-latency benchmark")
+    parser.add_argument("--rows", type=int, default=200000, help="資料庫初始筆數")
+    parser.add_argument("--write-interval-ms", type=float, default=2.0, help="寫入間隔")
+    parser.add_argument("--pages-per-step", type=int, default=256, help="快照每步頁數")
+    parser.add_argument("--step-sleep-ms", type=float, default=2.0, help="快照步驟間休眠")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [
+            run_case(workdir, 'rollback_single_step', wal=False, paged=False, args=args),
+            run_case(workdir, 'rollback_paged', wal=False, paged=True, args=args),
+            run_case(workdir, 'wal_single_step', wal=True, paged=False, args=args),
+            run_case(workdir, 'wal_paged', wal=True, paged=True, args=args),
+        ]
+    print(json.dumps({'rows': args.rows, 'results': results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+System Performance Benchmark
+系統性能基準測試 - DataOrchestrator、CacheManager、分析師指標、ART 儲存、analyze_stock 與應用程式啟動導入
+
+回報各案例 p50/p99 延遲、ops/sec 與量測期間的峰值 RSS 增量，並與儲存的基準檔比較；
+任一指標超出容忍範圍即以非零狀態碼結束。
+
+用法:
+    python scripts/benchmark_system_performance.py
+    python scripts/benchmark_system_performance.py --cases orchestrator cache_manager
+    python scripts/benchmark_system_performance.py --update-baseline
+    python scripts/benchmark_system_performance.py --scale 0.2 --p50-tolerance 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradingagents.benchmarks.performance_suite import (
+    DEFAULT_BASELINE_PATH, DEFAULT_TOLERANCES, PerformanceSuite
+)
+from tradingagents.benchmarks.performance_cases import create_system_performance_suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="System performance benchmark")
+    parser.add_argument("--cases", nargs="*", help="只執行名稱以此前綴開頭的案例")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE_PATH), help="基準檔路徑")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次結果覆寫基準檔")
+    parser.add_argument("--llm-latency-ms", type=float, default=5.0, help="stub LLM 固定延遲（毫秒）")
+    parser.add_argument("--scale", type=float, default=1.0, help="迭代次數倍率")
+    parser.add_argument("--seed", type=int, default=42, help="隨機種子")
+    parser.add_argument("--p50-tolerance", type=float, default=DEFAULT_TOLERANCES['p50_ms'])
+    parser.add_argument("--p99-tolerance", type=float, default=DEFAULT_TOLERANCES['p99_ms'])
+    parser.add_argument("--ops-tolerance", type=float, default=DEFAULT_TOLERANCES['ops_per_sec'])
+    parser.add_argument("--rss-tolerance", type=float, default=DEFAULT_TOLERANCES['peak_rss_delta_mb'])
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出結果")
+    parser.add_argument("--verbose", action="store_true", help="顯示系統日誌")
+    args = parser.parse_args()
+
+    # 被測元件的日誌量很大（且自帶 handler），預設只保留警告以上
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+
+    suite = create_system_performance_suite(
+        llm_latency_ms=args.llm_latency_ms, scale=args.scale, seed=args.seed
+    )
+    results = asyncio.run(suite.run(only=args.cases))
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        # 只更新本次執行的案例，保留其餘案例的基準
+        PerformanceSuite.save_baseline(results, baseline_path)
+        print(PerformanceSuite.format_report(results))
+        print(f"\n✅ 基準已更新: {baseline_path}")
+        return 0
+
+    baseline = PerformanceSuite.load_baseline(baseline_path)
+    tolerances = {
+        'p50_ms': args.p50_tolerance,
+        'p99_ms': args.p99_tolerance,
+        'ops_per_sec': args.ops_tolerance,
+        'peak_rss_delta_mb': args.rss_tolerance
+    }
+    regressions = PerformanceSuite.compare_with_baseline(results, baseline, tolerances)
+
+    if args.json:
+        print(json.dumps({
+            'results': [result.to_dict() for result in results],
+            'regressions': regressions
+        }, indent=2, ensure_ascii=False))
+    else:
+        print(PerformanceSuite.format_report(results, baseline))
+
+    if not baseline:
+        print(f"\n⚠️ 找不到基準檔 {baseline_path}，請以 --update-baseline 建立")
+        return 0
+
+    missing = [result.name for result in results if result.name not in baseline]
+    if missing:
+        print(f"\n⚠️ 基準檔缺少案例: {', '.join(missing)}")
+
+    if regressions:
+        print("\n" + "=" * 72, file=sys.stderr)
+        print(f"❌ 偵測到 {len(regressions)} 項性能回歸:", file=sys.stderr)
+        for regression in regressions:
+            print(f"   - {regression}", file=sys.stderr)
+        print("=" * 72, file=sys.stderr)
+        return 1
+
+    print("\n✅ 未偵測到性能回歸")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Simple App Database Load Test
+對本地 PostgreSQL 比較公開內容端點的吞吐量：
+- legacy: 每個請求新建 psycopg2 連接並在事件循環中同步查詢（舊做法）
+- pooled: 透過 simple_app 的共享 asyncpg 連接池與 prepared statements
+
+用法:
+    python scripts/load_test_simple_app_db.py --seed
+    python scripts/load_test_simple_app_db.py --host localhost --user postgres --password postgres \\
+        --database tradingagents_load --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tradingagents import simple_app
+from tradingagents.database.pg_pool import AsyncPGPool
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS content_categories (
+    id SERIAL PRIMARY KEY, name TEXT, slug TEXT UNIQUE, description TEXT,
+    parent_id INTEGER, sort_order INTEGER DEFAULT 0, is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE IF NOT EXISTS content_tags (
+    id SERIAL PRIMARY KEY, name TEXT, slug TEXT UNIQUE, color TEXT, description TEXT,
+    is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE IF NOT EXISTS content_articles (
+    id SERIAL PRIMARY KEY, title TEXT, slug TEXT UNIQUE, content TEXT, excerpt TEXT,
+    type TEXT DEFAULT 'article', status TEXT DEFAULT 'published', author TEXT,
+    views INTEGER DEFAULT 0, likes INTEGER DEFAULT 0, is_featured BOOLEAN DEFAULT FALSE,
+    category_id INTEGER REFERENCES content_categories(id),
+    published_at TIMESTAMP DEFAULT NOW(), created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+CREATE TABLE IF NOT EXISTS content_article_tags (
+    article_id INTEGER REFERENCES content_articles(id), tag_id INTEGER REFERENCES content_tags(id),
+    PRIMARY KEY (article_id, tag_id)
+);
+"""
+
+
+def db_config(args) -> dict:
+    return {
+        'host': args.host,
+        'port': args.port,
+        'database': args.database,
+        'user': args.user,
+        'password': args.password
+    }
+
+
+def seed(args):
+    """建立測試資料表與樣本資料"""
+    conn = psycopg2.connect(**db_config(args))
+    cur = conn.cursor()
+    cur.execute(SCHEMA_SQL)
+    cur.execute("TRUNCATE content_article_tags, content_articles, content_tags, content_categories RESTART IDENTITY")
+    cur.executemany(
+        "INSERT INTO content_categories (name, slug, description, sort_order) VALUES (%s, %s, %s, %s)",
+        [(f"分類 {i}", f"category-{i}", "", i) for i in range(10)]
+    )
+    cur.executemany(
+        "INSERT INTO content_tags (name, slug, color, description) VALUES (%s, %s, %s, %s)",
+        [(f"標籤 {i}", f"tag-{i}", "#007bff", "") for i in range(30)]
+    )
+    rng = random.Random(1)
+    cur.executemany(
+        "INSERT INTO content_articles (title, slug, content, excerpt, author, category_id, is_featured) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        [(f"文章 {i}", f"article-{i}", "內容 " * 200, "摘要", "作者", rng.randint(1, 10), i % 20 == 0)
+         for i in range(args.articles)]
+    )
+    cur.executemany(
+        "INSERT INTO content_article_tags VALUES (%s, %s) ON CONFLICT DO NOTHING",
+        [(article_id, rng.randint(1, 30)) for article_id in range(1, args.articles + 1) for _ in range(3)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_articles(config: dict, page: int) -> int:
+    """舊做法：新建連接並同步查詢"""
+    conn = psycopg2.connect(connect_timeout=10, **config)
+    cur = conn.cursor()
+    cur.execute(
+        simple_app.PUBLIC_ARTICLES_SQL.replace('$1::text', 'NULL::text').replace('$2::text', 'NULL::text')
+        .replace('$3::text', 'NULL::text').replace('$4', '%s').replace('$5', '%s'),
+        (10, (page - 1) * 10)
+    )
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    return len(rows)
+
+
+async def run_mode(mode: str, args) -> dict:
+    config = db_config(args)
+    pages = max(1, args.articles // 10)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one_request(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            page = index % pages + 1
+            if mode == 'legacy':
+                legacy_articles(config, page)
+            else:
+                result = await simple_app._load_public_articles(page=page, limit=10)
+                if result['status'] != 'success':
+                    raise RuntimeError(result['message'])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'mode': mode,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'requests_per_second': round(args.requests / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2], 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 2)
+    }
+
+
+async def main_async(args) -> dict:
+    results = [await run_mode('legacy', args)]
+
+    simple_app.db_pool = AsyncPGPool(min_size=args.pool_size, max_size=args.pool_size, **db_config(args))
+    await simple_app.db_pool.start()
+    try:
+        results.append(await run_mode('pooled', args))
+        pool_stats = simple_app.db_pool.get_stats()
+    finally:
+        await simple_app.db_pool.close()
+
+    return {'results': results, 'pool': pool_stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="simple_app database load test")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5432)
+    parser.add_argument("--database", default="tradingagents_load")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="postgres")
+    parser.add_argument("--seed", action="store_true", help="建立資料表並寫入樣本資料")
+    parser.add_argument("--articles", type=int, default=500, help="樣本文章數")
+    parser.add_argument("--requests", type=int, default=1000, help="每種模式的請求數")
+    parser.add_argument("--concurrency", type=int, default=50, help="並發請求數")
+    parser.add_argument("--pool-size", type=int, default=10, help="連接池大小")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args)
+
+    print(json.dumps(asyncio.run(main_async(args)), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
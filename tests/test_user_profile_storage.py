@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+UserProfileStorage JSON 後端測試
+重新連線（快照 + WAL 重播）後，會員統計與排序索引不可重複累計
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from tradingagents.art.storage.user_profile_storage import (
+    MembershipTier, UserProfileRecord, create_user_profile_storage
+)
+
+
+def _profiles():
+    expiry = (datetime.now() + timedelta(days=30)).isoformat()
+    now = datetime.now().isoformat()
+    return [
+        UserProfileRecord(user_id="u1", username="alice", email="a@example.com", last_login=now),
+        UserProfileRecord(user_id="u2", username="bob", email="b@example.com", last_login=now),
+        UserProfileRecord(user_id="u3", username="carol", email="c@example.com"),
+        UserProfileRecord(
+            user_id="u4", username="dave", email="d@example.com", last_login=now,
+            membership_tier=MembershipTier.GOLD, membership_expiry_date=expiry
+        ),
+    ]
+
+
+def test_membership_statistics_unchanged_after_reconnect(tmp_path):
+    async def scenario():
+        storage = await create_user_profile_storage(storage_path=str(tmp_path), backend="json")
+        for profile in _profiles():
+            await storage.create_record(profile)
+        before = await storage.get_membership_statistics()
+        active_before = len(storage._last_active_index)
+
+        await storage.disconnect()
+        assert await storage.connect()
+        after = await storage.get_membership_statistics()
+
+        assert before['by_tier'] == {'FREE': 3, 'GOLD': 1}
+        assert before['active_members'] == 1
+        assert after['by_tier'] == before['by_tier']
+        assert after['active_members'] == before['active_members']
+        assert len(storage._last_active_index) == active_before
+        await storage.disconnect()
+
+    asyncio.run(scenario())
@@ -68,8 +68,10 @@ class UserSearchRequest(BaseModel):
     sort_order: str = Field("desc", description="排序方向")
     
     # 分頁
-    page: int = Field(1, ge=1, description="頁碼")
+    page: int = Field(1, ge=1, description="頁碼（僅在未提供游標時使用）")
     page_size: int = Field(20, ge=1, le=100, description="每頁數量")
+    cursor: Optional[str] = Field(None, description="鍵集分頁游標（來自上一次響應的 next_cursor / prev_cursor）")
+    include_total: bool = Field(True, description="是否統計總數（游標翻頁時沿用首頁的總數快照）")
 
 
 class UserResponse(BaseModel):
@@ -130,6 +132,13 @@ class UserListResponse(BaseModel):
     page: int
     page_size: int
     total_pages: int
+    
+    # 鍵集分頁
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    has_next: bool = False
+    has_previous: bool = False
+    total_is_estimate: bool = False
 
 
 class UserCreateRequest(BaseModel):
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+報表任務路由器 (Report Jobs Router)
+天工 (TianGong) - 背景報表渲染任務 API 端點
+
+此模組提供報表任務 API 端點，包含：
+1. 提交報表任務（立即返回任務ID）
+2. 查詢任務狀態與進度
+3. 下載導出檔案
+"""
+
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from ..models.reporting import ReportRequest
+from ..services.reporting_service import ReportingService
+from ..services.report_jobs import ReportQueueFullError
+from ...database.database import get_db
+from ...auth.dependencies import require_admin_access
+from ...utils.user_context import UserContext
+
+# 創建路由器
+router = APIRouter(prefix="/reports/jobs", tags=["報表任務"])
+
+# ==================== 報表任務 ====================
+
+@router.post("", summary="提交報表任務")
+async def submit_report_job(
+    report_request: ReportRequest,
+    db: Session = Depends(get_db),
+    current_user: UserContext = Depends(require_admin_access())
+):
+    """提交報表任務（立即返回任務ID，圖表與導出在背景渲染）"""
+    try:
+        service = ReportingService(db)
+        job = await service.submit_report_job(report_request)
+        return {"success": True, "data": job.to_dict()}
+    except ReportQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}", summary="查詢報表任務")
+async def get_report_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserContext = Depends(require_admin_access())
+):
+    """查詢報表任務狀態與進度"""
+    job = ReportingService(db).get_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="報表任務不存在")
+    return {"success": True, "data": job.to_dict()}
+
+@router.get("/{job_id}/files/{file_format}", summary="下載報表檔案")
+async def download_report_job_file(
+    job_id: str,
+    file_format: str,
+    db: Session = Depends(get_db),
+    current_user: UserContext = Depends(require_admin_access())
+):
+    """下載報表任務的導出檔案"""
+    job = ReportingService(db).get_report_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="報表任務不存在")
+    file_path = job.file_paths.get(file_format)
+    if not file_path or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="報表檔案不存在或尚未完成")
+    return FileResponse(file_path, filename=os.path.basename(file_path))
@@ -15,6 +15,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
 from ..models.system_monitor import (
@@ -26,7 +27,7 @@ from ..models.system_monitor import (
     MonitoringDashboard, AlertLevel, MetricType, SystemStatus
 )
 from ...database.database import get_db
-from ..admin_dependencies import get_current_admin_user, AdminContext
+from ..admin_dependencies import get_current_admin_user, require_admin_role, AdminContext
 from ...utils.logging_config import get_api_logger, get_security_logger
 from ...utils.error_handler import handle_error
 
@@ -737,6 +738,74 @@ async def get_monitoring_dashboard(
             detail="監控儀表板查詢服務暫時不可用"
         )
 
+# ==================== 採樣分析 ====================
+
+@router.post("/profile", summary="執行採樣分析")
+async def run_sampling_profile_endpoint(
+    duration_seconds: float = Query(10.0, gt=0, le=60, description="分析時長（秒）"),
+    interval_ms: float = Query(10.0, ge=1, le=1000, description="執行緒堆疊採樣間隔（毫秒）"),
+    task_interval_ms: float = Query(100.0, ge=10, le=5000, description="asyncio 任務採樣間隔（毫秒）"),
+    output_format: str = Query("speedscope", pattern="^(speedscope|collapsed)$", description="輸出格式"),
+    include_idle: bool = Query(False, description="保留閒置執行緒的樣本"),
+    raw: bool = Query(False, description="只返回分析檔本身（可直接載入 speedscope / flamegraph.pl）"),
+    current_admin: AdminContext = Depends(require_admin_role("admin"))
+):
+    """
+    對目前 worker 執行採樣分析：Python 堆疊、pending 的 asyncio 任務與事件循環延遲
+
+    需設置 ENABLE_SAMPLING_PROFILER=true 才會開放。
+    """
+    from ...utils.sampling_profiler import run_sampling_profile, is_profiler_enabled, ProfilerBusyError
+
+    if not is_profiler_enabled():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="採樣分析未啟用"
+        )
+
+    security_logger.info("採樣分析開始", extra={
+        'admin_user_id': current_admin.user_id,
+        'duration_seconds': duration_seconds,
+        'interval_ms': interval_ms
+    })
+
+    try:
+        profiler = await run_sampling_profile(duration_seconds, interval_ms, task_interval_ms, include_idle)
+    except ProfilerBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="已有採樣分析正在進行"
+        )
+    except Exception as e:
+        error_info = await handle_error(e, {
+            'endpoint': '/admin/system/profile',
+            'admin_user_id': current_admin.user_id
+        })
+
+        api_logger.error("採樣分析失敗", extra={
+            'error_id': error_info.error_id,
+            'admin_user_id': current_admin.user_id
+        })
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="採樣分析服務暫時不可用"
+        )
+
+    profile = profiler.to_collapsed() if output_format == "collapsed" else profiler.to_speedscope()
+    if raw:
+        if output_format == "collapsed":
+            return PlainTextResponse(profile)
+        return profile
+
+    return {
+        "format": output_format,
+        "summary": profiler.summary(),
+        "pending_tasks": profiler.pending_tasks(),
+        "profile": profile,
+        "timestamp": datetime.now().isoformat()
+    }
+
 # ==================== 健康檢查端點 ====================
 
 @router.get("/monitor/health", summary="監控服務健康檢查")
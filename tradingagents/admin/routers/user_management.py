@@ -63,6 +63,12 @@ async def get_users(
         
         return result
         
+    except ValueError as e:
+        # 游標無效或與目前的排序/篩選條件不符
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         error_info = await handle_error(e, {
             'endpoint': '/admin/users/',
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+報表任務佇列 (Report Job Queue)
+天工 (TianGong) - 在背景進程池中渲染報表，不阻塞管理後台的事件循環
+
+此模組提供：
+1. ReportJob - 可輪詢的報表任務（狀態、進度、導出檔案）
+2. ReportJobQueue - 提交即返回任務ID；圖表與各格式導出在有上限的進程池中執行，
+   每種格式各自一組 worker，大型 PDF 不會佔住 CSV/JSON 的名額
+3. 以報表參數指紋快取已完成的導出檔案，相同參數的重複請求直接返回
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..models.reporting import ReportExportFormat, ReportRequest, ReportResult, ReportStatus, ReportType
+from ...utils.logging_config import get_api_logger
+
+api_logger = get_api_logger("report_jobs")
+
+# 各渲染類型的進程數上限
+DEFAULT_WORKERS_PER_FORMAT = {
+    'charts': 2,
+    ReportExportFormat.PDF.value: 2,
+    ReportExportFormat.EXCEL.value: 1,
+    ReportExportFormat.CSV.value: 1,
+    ReportExportFormat.JSON.value: 1
+}
+
+# 與 ReportingService 導出結果相同的檔案鍵名
+EXPORT_FILE_KEYS = {
+    ReportExportFormat.PDF: 'pdf',
+    ReportExportFormat.EXCEL: 'excel',
+    ReportExportFormat.CSV: 'csv',
+    ReportExportFormat.JSON: 'json'
+}
+
+
+class ReportQueueFullError(RuntimeError):
+    """等待中的報表任務已達上限"""
+
+
+# ==================== 進程池入口（需可被 pickle） ====================
+
+def render_report_charts(report_type: ReportType, content: Dict[str, Any]) -> List[Any]:
+    """在 worker 進程中生成圖表"""
+    from .reporting_service import ReportingService
+    return ReportingService._generate_report_charts(report_type, content)
+
+
+def render_report_export(export_format: ReportExportFormat, report: ReportResult, output_path: str) -> str:
+    """在 worker 進程中導出單一格式"""
+    from .reporting_service import ReportingService
+    exporters = {
+        ReportExportFormat.PDF: ReportingService._export_to_pdf,
+        ReportExportFormat.EXCEL: ReportingService._export_to_excel,
+        ReportExportFormat.CSV: ReportingService._export_to_csv,
+        ReportExportFormat.JSON: ReportingService._export_to_json
+    }
+    return exporters[export_format](report, Path(output_path))
+
+
+# ==================== 報表任務 ====================
+
+@dataclass
+class ReportJob:
+    """報表任務"""
+    job_id: str
+    fingerprint: str
+    report_id: str
+    formats: List[ReportExportFormat]
+    output_path: Path
+    status: ReportStatus = ReportStatus.PENDING
+    progress: float = 0.0
+    stage: str = 'queued'
+    file_paths: Dict[str, str] = field(default_factory=dict)
+    error_message: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    cache_hits: int = 0
+
+    result: Optional[ReportResult] = field(default=None, repr=False)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (ReportStatus.COMPLETED, ReportStatus.FAILED, ReportStatus.CANCELLED)
+
+    def files_exist(self) -> bool:
+        return all(Path(path).exists() for path in self.file_paths.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'report_id': self.report_id,
+            'fingerprint': self.fingerprint,
+            'status': self.status.value,
+            'progress': round(self.progress, 3),
+            'stage': self.stage,
+            'formats': [export_format.value for export_format in self.formats],
+            'file_paths': self.file_paths,
+            'error_message': self.error_message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'duration_seconds': round(self.completed_at - self.started_at, 3)
+            if self.completed_at and self.started_at else None,
+            'cache_hits': self.cache_hits
+        }
+
+
+class ReportJobQueue:
+    """
+    報表任務佇列
+
+    Args:
+        workers_per_format: 各渲染類型（charts / pdf / excel / csv / json）的進程數
+        max_pending_jobs: 未完成任務上限，超過時 submit 拋出 ReportQueueFullError
+        artifact_ttl_seconds: 已完成報表的快取時間，過期後刪除導出檔案
+        max_cached_reports: 最多保留的已完成報表數
+        mp_start_method: 進程啟動方式；預設 spawn，避免 fork 帶有執行緒與事件循環的父進程
+    """
+
+    def __init__(self, workers_per_format: Optional[Dict[str, int]] = None,
+                 max_pending_jobs: int = 32, artifact_ttl_seconds: int = 3600,
+                 max_cached_reports: int = 64, mp_start_method: str = 'spawn'):
+        self.workers_per_format = {**DEFAULT_WORKERS_PER_FORMAT, **(workers_per_format or {})}
+        self.max_pending_jobs = max_pending_jobs
+        self.artifact_ttl_seconds = artifact_ttl_seconds
+        self.max_cached_reports = max_cached_reports
+        self.mp_context = multiprocessing.get_context(mp_start_method)
+
+        self._executors: Dict[str, ProcessPoolExecutor] = {}
+        self._jobs: Dict[str, ReportJob] = {}
+        self._by_fingerprint: Dict[str, ReportJob] = {}
+        self.stats = {
+            'submitted': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'expired': 0
+        }
+
+    # ==================== 指紋 ====================
+
+    @staticmethod
+    def fingerprint(report_request: ReportRequest) -> str:
+        """報表參數指紋（含創建者：導出檔案記錄提交者，不跨用戶共用；導出格式不分順序）"""
+        params = report_request.dict()
+        params['export_formats'] = sorted(
+            export_format.value for export_format in (report_request.export_formats or [])
+        )
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    # ==================== 提交與查詢 ====================
+
+    async def submit(self, report_request: ReportRequest,
+                     build_report: Callable[[ReportRequest, str], Awaitable[ReportResult]],
+                     output_path: Path) -> ReportJob:
+        """
+        提交報表任務並立即返回
+
+        報表內容在此處（請求上下文內）建立，圖表與導出在背景進程池中渲染。
+        相同參數的已完成報表直接返回；相同參數正在渲染時返回同一個任務。
+        """
+        self._prune()
+        fingerprint = self.fingerprint(report_request)
+
+        existing = self._by_fingerprint.get(fingerprint)
+        if existing is not None:
+            if existing.status == ReportStatus.COMPLETED and existing.files_exist():
+                existing.cache_hits += 1
+                self.stats['cache_hits'] += 1
+                return existing
+            if not existing.finished:
+                self.stats['coalesced'] += 1
+                return existing
+
+        pending = sum(1 for job in self._jobs.values() if not job.finished)
+        if pending >= self.max_pending_jobs:
+            self.stats['rejected'] += 1
+            raise ReportQueueFullError(f"等待中的報表任務已達上限 ({self.max_pending_jobs})")
+
+        report_id = str(uuid.uuid4())
+        job = ReportJob(
+            job_id=str(uuid.uuid4()),
+            fingerprint=fingerprint,
+            report_id=report_id,
+            formats=[
+                export_format for export_format in dict.fromkeys(report_request.export_formats or [])
+                if export_format in EXPORT_FILE_KEYS
+            ],
+            output_path=Path(output_path)
+        )
+        self._jobs[job.job_id] = job
+        self._by_fingerprint[fingerprint] = job
+        self.stats['submitted'] += 1
+
+        try:
+            report = await build_report(report_request, report_id)
+        except Exception as e:
+            self._fail(job, e)
+            raise
+
+        job.progress = 0.1
+        job.task = asyncio.create_task(self._render(job, report))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> ReportResult:
+        """等待任務完成並返回報表結果"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"報表任務不存在: {job_id}")
+        await asyncio.wait_for(job.done.wait(), timeout)
+        if job.status != ReportStatus.COMPLETED:
+            raise RuntimeError(job.error_message or f"報表任務未完成: {job.status.value}")
+        return job.result
+
+    def cancel(self, job_id: str) -> bool:
+        """取消未完成的任務（已在 worker 中執行的渲染會跑完，但結果被丟棄）"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    # ==================== 渲染 ====================
+
+    def _executor(self, kind: str) -> ProcessPoolExecutor:
+        executor = self._executors.get(kind)
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers_per_format.get(kind, 1),
+                mp_context=self.mp_context
+            )
+            self._executors[kind] = executor
+        return executor
+
+    async def _render(self, job: ReportJob, report: ReportResult):
+        loop = asyncio.get_running_loop()
+        job.status = ReportStatus.PROCESSING
+        job.started_at = time.time()
+        try:
+            job.stage = 'charts'
+            report.charts = await loop.run_in_executor(
+                self._executor('charts'), render_report_charts,
+                report.metadata.report_type, report.content
+            )
+            job.progress = 0.4
+
+            job.stage = 'export'
+            if job.formats:
+                await asyncio.gather(*(self._export(loop, job, report, export_format)
+                                       for export_format in job.formats))
+            report.file_paths = dict(job.file_paths)
+
+            job.result = report
+            job.status = ReportStatus.COMPLETED
+            job.stage = 'completed'
+            job.progress = 1.0
+            job.completed_at = time.time()
+            self.stats['completed'] += 1
+            api_logger.info("✅ 報表任務完成", extra={
+                'job_id': job.job_id,
+                'report_id': job.report_id,
+                'duration_seconds': round(job.completed_at - job.started_at, 3)
+            })
+        except asyncio.CancelledError:
+            job.status = ReportStatus.CANCELLED
+            job.stage = 'cancelled'
+            job.completed_at = time.time()
+            self._by_fingerprint.pop(job.fingerprint, None)
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            job.done.set()
+
+    async def _export(self, loop, job: ReportJob, report: ReportResult, export_format: ReportExportFormat):
+        file_path = await loop.run_in_executor(
+            self._executor(export_format.value), render_report_export,
+            export_format, report, str(job.output_path)
+        )
+        job.file_paths[EXPORT_FILE_KEYS[export_format]] = file_path
+        job.progress = 0.4 + 0.6 * len(job.file_paths) / len(job.formats)
+
+    def _fail(self, job: ReportJob, error: Exception):
+        job.status = ReportStatus.FAILED
+        job.stage = 'failed'
+        job.error_message = str(error)
+        job.completed_at = time.time()
+        job.done.set()
+        self.stats['failed'] += 1
+        if self._by_fingerprint.get(job.fingerprint) is job:
+            del self._by_fingerprint[job.fingerprint]
+        api_logger.error("❌ 報表任務失敗", extra={'job_id': job.job_id, 'error': str(error)})
+
+    # ==================== 快取維護 ====================
+
+    def _prune(self):
+        """移除過期的已完成任務並刪除其導出檔案"""
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.completed_at or job.created_at
+        )
+        overflow = max(0, len(finished) - self.max_cached_reports)
+        for index, job in enumerate(finished):
+            expired = now - (job.completed_at or job.created_at) > self.artifact_ttl_seconds
+            if not expired and index >= overflow:
+                continue
+            del self._jobs[job.job_id]
+            if self._by_fingerprint.get(job.fingerprint) is job:
+                del self._by_fingerprint[job.fingerprint]
+            for path in job.file_paths.values():
+                Path(path).unlink(missing_ok=True)
+            self.stats['expired'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """佇列統計"""
+        return {
+            'jobs': len(self._jobs),
+            'pending': sum(1 for job in self._jobs.values() if not job.finished),
+            'cached_reports': sum(1 for job in self._jobs.values() if job.status == ReportStatus.COMPLETED),
+            'workers_per_format': dict(self.workers_per_format),
+            'active_pools': sorted(self._executors.keys()),
+            **self.stats
+        }
+
+    def shutdown(self):
+        """關閉所有進程池"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._executors.clear()
+
+
+# ==================== 全域佇列 ====================
+
+_report_job_queue: Optional[ReportJobQueue] = None
+
+
+def get_report_job_queue() -> ReportJobQueue:
+    """獲取全域報表任務佇列"""
+    global _report_job_queue
+    if _report_job_queue is None:
+        _report_job_queue = ReportJobQueue()
+    return _report_job_queue
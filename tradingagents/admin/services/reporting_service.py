@@ -13,6 +13,7 @@
 
 import uuid
 import os
+import csv
 import json
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
@@ -28,10 +29,11 @@ import base64
 from ..models.reporting import (
     ReportTemplate, ReportRequest, ReportResult, ReportSchedule,
     ReportDistribution, ReportMetadata, CustomReport, ReportChart,
-    ReportSection, ReportExportFormat, ReportStatus, ReportType
+    ReportSection, ReportStatus, ReportType
 )
 from ...utils.logging_config import get_api_logger
 from ...utils.cache_manager import CacheManager
+from .report_jobs import ReportJob, get_report_job_queue
 
 api_logger = get_api_logger("reporting_service")
 
@@ -51,58 +53,60 @@ class ReportingService:
     # ==================== 報表生成 ====================
     
     async def generate_report(self, report_request: ReportRequest) -> ReportResult:
-        """生成報表"""
+        """生成報表（等待報表任務完成；圖表與導出在背景進程池中渲染）"""
         try:
-            report_id = str(uuid.uuid4())
-            
-            # 創建報表元數據
-            metadata = ReportMetadata(
-                report_id=report_id,
-                report_type=report_request.report_type,
-                title=report_request.title,
-                description=report_request.description,
-                created_at=datetime.now(),
-                created_by=report_request.created_by,
-                parameters=report_request.parameters
-            )
-            
-            # 根據報表類型生成內容
-            if report_request.report_type == ReportType.USER_ANALYTICS:
-                content = await self._generate_user_analytics_report(report_request)
-            elif report_request.report_type == ReportType.FINANCIAL:
-                content = await self._generate_financial_report(report_request)
-            elif report_request.report_type == ReportType.SYSTEM_PERFORMANCE:
-                content = await self._generate_system_performance_report(report_request)
-            elif report_request.report_type == ReportType.CUSTOM:
-                content = await self._generate_custom_report(report_request)
-            else:
-                content = await self._generate_default_report(report_request)
-            
-            # 生成圖表
-            charts = await self._generate_report_charts(report_request, content)
-            
-            # 創建報表結果
-            report_result = ReportResult(
-                report_id=report_id,
-                metadata=metadata,
-                content=content,
-                charts=charts,
-                status=ReportStatus.COMPLETED,
-                generated_at=datetime.now(),
-                file_paths={}
-            )
-            
-            # 導出為不同格式
-            if report_request.export_formats:
-                file_paths = await self._export_report(report_result, report_request.export_formats)
-                report_result.file_paths = file_paths
-            
-            return report_result
+            job = await self.submit_report_job(report_request)
+            return await get_report_job_queue().wait(job.job_id)
             
         except Exception as e:
             api_logger.error("生成報表失敗", extra={'error': str(e)})
             raise
     
+    async def submit_report_job(self, report_request: ReportRequest) -> ReportJob:
+        """提交報表任務並立即返回，進度與結果以 get_report_job 輪詢"""
+        return await get_report_job_queue().submit(
+            report_request, self._build_report, self.report_output_path
+        )
+    
+    def get_report_job(self, job_id: str) -> Optional[ReportJob]:
+        """獲取報表任務"""
+        return get_report_job_queue().get_job(job_id)
+    
+    async def _build_report(self, report_request: ReportRequest, report_id: str) -> ReportResult:
+        """建立報表內容（圖表與導出檔案由報表任務填入）"""
+        # 創建報表元數據
+        metadata = ReportMetadata(
+            report_id=report_id,
+            report_type=report_request.report_type,
+            title=report_request.title,
+            description=report_request.description,
+            created_at=datetime.now(),
+            created_by=report_request.created_by,
+            parameters=report_request.parameters
+        )
+        
+        # 根據報表類型生成內容
+        if report_request.report_type == ReportType.USER_ANALYTICS:
+            content = await self._generate_user_analytics_report(report_request)
+        elif report_request.report_type == ReportType.FINANCIAL:
+            content = await self._generate_financial_report(report_request)
+        elif report_request.report_type == ReportType.SYSTEM_PERFORMANCE:
+            content = await self._generate_system_performance_report(report_request)
+        elif report_request.report_type == ReportType.CUSTOM:
+            content = await self._generate_custom_report(report_request)
+        else:
+            content = await self._generate_default_report(report_request)
+        
+        return ReportResult(
+            report_id=report_id,
+            metadata=metadata,
+            content=content,
+            charts=[],
+            status=ReportStatus.COMPLETED,
+            generated_at=datetime.now(),
+            file_paths={}
+        )
+    
     async def _generate_user_analytics_report(self, request: ReportRequest) -> Dict[str, Any]:
         """生成用戶分析報表"""
         # 模擬用戶分析數據
@@ -265,8 +269,9 @@ class ReportingService:
     
     # ==================== 圖表生成 ====================
     
-    async def _generate_report_charts(self, request: ReportRequest, content: Dict[str, Any]) -> List[ReportChart]:
-        """生成報表圖表"""
+    @staticmethod
+    def _generate_report_charts(report_type: ReportType, content: Dict[str, Any]) -> List[ReportChart]:
+        """生成報表圖表（CPU 密集，於報表任務進程池中執行）"""
         charts = []
         
         try:
@@ -275,12 +280,12 @@ class ReportingService:
             sns.set_palette("husl")
             
             # 根據報表類型生成相應圖表
-            if request.report_type == ReportType.USER_ANALYTICS:
-                charts.extend(await self._create_user_analytics_charts(content))
-            elif request.report_type == ReportType.FINANCIAL:
-                charts.extend(await self._create_financial_charts(content))
-            elif request.report_type == ReportType.SYSTEM_PERFORMANCE:
-                charts.extend(await self._create_performance_charts(content))
+            if report_type == ReportType.USER_ANALYTICS:
+                charts.extend(ReportingService._create_user_analytics_charts(content))
+            elif report_type == ReportType.FINANCIAL:
+                charts.extend(ReportingService._create_financial_charts(content))
+            elif report_type == ReportType.SYSTEM_PERFORMANCE:
+                charts.extend(ReportingService._create_performance_charts(content))
             
             return charts
             
@@ -288,7 +293,8 @@ class ReportingService:
             api_logger.error("生成圖表失敗", extra={'error': str(e)})
             return []
     
-    async def _create_user_analytics_charts(self, content: Dict[str, Any]) -> List[ReportChart]:
+    @staticmethod
+    def _create_user_analytics_charts(content: Dict[str, Any]) -> List[ReportChart]:
         """創建用戶分析圖表"""
         charts = []
         
@@ -350,7 +356,8 @@ class ReportingService:
         
         return charts
     
-    async def _create_financial_charts(self, content: Dict[str, Any]) -> List[ReportChart]:
+    @staticmethod
+    def _create_financial_charts(content: Dict[str, Any]) -> List[ReportChart]:
         """創建財務圖表"""
         charts = []
         
@@ -415,7 +422,8 @@ class ReportingService:
         
         return charts
     
-    async def _create_performance_charts(self, content: Dict[str, Any]) -> List[ReportChart]:
+    @staticmethod
+    def _create_performance_charts(content: Dict[str, Any]) -> List[ReportChart]:
         """創建性能圖表"""
         charts = []
         
@@ -458,32 +466,8 @@ class ReportingService:
   
     # ==================== 報表導出 ====================
     
-    async def _export_report(self, report: ReportResult, formats: List[ReportExportFormat]) -> Dict[str, str]:
-        """導出報表為不同格式"""
-        file_paths = {}
-        
-        try:
-            for format_type in formats:
-                if format_type == ReportExportFormat.PDF:
-                    file_path = await self._export_to_pdf(report)
-                    file_paths["pdf"] = file_path
-                elif format_type == ReportExportFormat.EXCEL:
-                    file_path = await self._export_to_excel(report)
-                    file_paths["excel"] = file_path
-                elif format_type == ReportExportFormat.CSV:
-                    file_path = await self._export_to_csv(report)
-                    file_paths["csv"] = file_path
-                elif format_type == ReportExportFormat.JSON:
-                    file_path = await self._export_to_json(report)
-                    file_paths["json"] = file_path
-            
-            return file_paths
-            
-        except Exception as e:
-            api_logger.error("導出報表失敗", extra={'error': str(e)})
-            raise
-    
-    async def _export_to_pdf(self, report: ReportResult) -> str:
+    @staticmethod
+    def _export_to_pdf(report: ReportResult, output_path: Path) -> str:
         """導出為PDF格式"""
         try:
             from reportlab.lib.pagesizes import letter, A4
@@ -494,11 +478,12 @@ class ReportingService:
             
             # 創建PDF文件
             filename = f"report_{report.report_id}.pdf"
-            filepath = self.report_output_path / filename
+            filepath = output_path / filename
             
             doc = SimpleDocTemplate(str(filepath), pagesize=A4)
             styles = getSampleStyleSheet()
             story = []
+            temp_images = []
             
             # 標題
             title_style = ParagraphStyle(
@@ -585,7 +570,7 @@ class ReportingService:
                         pil_image = PILImage.open(image_buffer)
                         
                         # 保存臨時圖片文件
-                        temp_image_path = self.report_output_path / f"temp_chart_{chart.chart_id}.png"
+                        temp_image_path = output_path / f"temp_chart_{chart.chart_id}.png"
                         pil_image.save(temp_image_path)
                         
                         # 添加到PDF
@@ -593,14 +578,19 @@ class ReportingService:
                         story.append(img)
                         story.append(Spacer(1, 12))
                         
-                        # 清理臨時文件
-                        temp_image_path.unlink()
+                        # ReportLab 在 build 時才讀取圖片，生成後再清理
+                        temp_images.append(temp_image_path)
                         
                     except Exception as e:
                         api_logger.warning(f"添加圖表到PDF失敗: {e}")
             
             # 生成PDF
-            doc.build(story)
+            try:
+                doc.build(story)
+            finally:
+                # 清理臨時文件
+                for temp_image_path in temp_images:
+                    temp_image_path.unlink(missing_ok=True)
             
             return str(filepath)
             
@@ -608,11 +598,12 @@ class ReportingService:
             api_logger.error("導出PDF失敗", extra={'error': str(e)})
             raise
     
-    async def _export_to_excel(self, report: ReportResult) -> str:
+    @staticmethod
+    def _export_to_excel(report: ReportResult, output_path: Path) -> str:
         """導出為Excel格式"""
         try:
             filename = f"report_{report.report_id}.xlsx"
-            filepath = self.report_output_path / filename
+            filepath = output_path / filename
             
             with pd.ExcelWriter(str(filepath), engine='openpyxl') as writer:
                 # 報表信息工作表
@@ -646,37 +637,44 @@ class ReportingService:
             api_logger.error("導出Excel失敗", extra={'error': str(e)})
             raise
     
-    async def _export_to_csv(self, report: ReportResult) -> str:
-        """導出為CSV格式"""
+    @staticmethod
+    def _iter_csv_rows(report: ReportResult):
+        """逐行產生CSV內容（不在記憶體中組裝整份表格）"""
+        yield ['項目', '值']
+        
+        # 報表信息
+        yield ['報表信息', '']
+        yield ['報表ID', report.report_id]
+        yield ['生成時間', report.generated_at.strftime('%Y-%m-%d %H:%M:%S')]
+        yield ['報表類型', report.metadata.report_type.value]
+        yield ['創建者', report.metadata.created_by]
+        yield ['', '']  # 空行
+        
+        # 報表內容
+        if isinstance(report.content, dict):
+            for section_name, section_data in report.content.items():
+                yield [section_name, '']
+                
+                if isinstance(section_data, dict):
+                    for key, value in section_data.items():
+                        yield [key, value]
+                elif isinstance(section_data, list):
+                    for index, row in enumerate(section_data):
+                        yield [index, json.dumps(row, ensure_ascii=False, default=str) if isinstance(row, (dict, list)) else row]
+                
+                yield ['', '']  # 空行
+    
+    @staticmethod
+    def _export_to_csv(report: ReportResult, output_path: Path) -> str:
+        """導出為CSV格式（逐行串流寫入）"""
         try:
             filename = f"report_{report.report_id}.csv"
-            filepath = self.report_output_path / filename
-            
-            # 將報表內容扁平化為CSV格式
-            csv_data = []
-            
-            # 添加報表信息
-            csv_data.append(['報表信息', ''])
-            csv_data.append(['報表ID', report.report_id])
-            csv_data.append(['生成時間', report.generated_at.strftime('%Y-%m-%d %H:%M:%S')])
-            csv_data.append(['報表類型', report.metadata.report_type.value])
-            csv_data.append(['創建者', report.metadata.created_by])
-            csv_data.append(['', ''])  # 空行
-            
-            # 添加報表內容
-            if isinstance(report.content, dict):
-                for section_name, section_data in report.content.items():
-                    csv_data.append([section_name, ''])
-                    
-                    if isinstance(section_data, dict):
-                        for key, value in section_data.items():
-                            csv_data.append([key, value])
-                    
-                    csv_data.append(['', ''])  # 空行
+            filepath = output_path / filename
             
-            # 寫入CSV文件
-            df = pd.DataFrame(csv_data, columns=['項目', '值'])
-            df.to_csv(str(filepath), index=False, encoding='utf-8-sig')
+            with open(filepath, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                for row in ReportingService._iter_csv_rows(report):
+                    writer.writerow(row)
             
             return str(filepath)
             
@@ -684,40 +682,49 @@ class ReportingService:
             api_logger.error("導出CSV失敗", extra={'error': str(e)})
             raise
     
-    async def _export_to_json(self, report: ReportResult) -> str:
-        """導出為JSON格式"""
+    @staticmethod
+    def _export_to_json(report: ReportResult, output_path: Path) -> str:
+        """導出為JSON格式（逐段串流寫入，列表內容逐行寫出）"""
         try:
             filename = f"report_{report.report_id}.json"
-            filepath = self.report_output_path / filename
-            
-            # 準備JSON數據
-            json_data = {
-                "metadata": {
-                    "report_id": report.report_id,
-                    "title": report.metadata.title,
-                    "description": report.metadata.description,
-                    "report_type": report.metadata.report_type.value,
-                    "created_at": report.metadata.created_at.isoformat(),
-                    "created_by": report.metadata.created_by,
-                    "generated_at": report.generated_at.isoformat()
-                },
-                "content": report.content,
-                "charts": [
-                    {
+            filepath = output_path / filename
+            
+            def dumps(value: Any) -> str:
+                return json.dumps(value, ensure_ascii=False, default=str)
+            
+            metadata = {
+                "report_id": report.report_id,
+                "title": report.metadata.title,
+                "description": report.metadata.description,
+                "report_type": report.metadata.report_type.value,
+                "created_at": report.metadata.created_at.isoformat(),
+                "created_by": report.metadata.created_by,
+                "generated_at": report.generated_at.isoformat()
+            }
+            
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write('{\n  "metadata": ' + dumps(metadata) + ',\n  "content": {')
+                
+                for section_index, (section_name, section_data) in enumerate((report.content or {}).items()):
+                    f.write(('' if section_index == 0 else ',') + '\n    ' + dumps(section_name) + ': ')
+                    if isinstance(section_data, list):
+                        f.write('[')
+                        for row_index, row in enumerate(section_data):
+                            f.write(('' if row_index == 0 else ',') + '\n      ' + dumps(row))
+                        f.write('\n    ]')
+                    else:
+                        f.write(dumps(section_data))
+                
+                f.write('\n  },\n  "charts": [')
+                for chart_index, chart in enumerate(report.charts):
+                    # 注意：不包含圖片數據，因為JSON文件會很大
+                    f.write(('' if chart_index == 0 else ',') + '\n    ' + dumps({
                         "chart_id": chart.chart_id,
                         "title": chart.title,
                         "chart_type": chart.chart_type,
                         "description": chart.description
-                        # 注意：不包含圖片數據，因為JSON文件會很大
-                    }
-                    for chart in report.charts
-                ],
-                "status": report.status.value
-            }
-            
-            # 寫入JSON文件
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
+                    }))
+                f.write('\n  ],\n  "status": ' + dumps(report.status.value) + '\n}\n')
             
             return str(filepath)
             
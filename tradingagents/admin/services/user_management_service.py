@@ -16,7 +16,7 @@ import hashlib
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func, desc, nulls_last
 
 from ..models.user_management import (
     UserSearchRequest, UserResponse, UserListResponse, UserCreateRequest,
@@ -97,9 +97,6 @@ class UserManagementService:
             if search.last_login_before:
                 query = query.filter(User.last_login <= search.last_login_before)
             
-            # 總數統計
-            total = query.count()
-            
             # 排序
             if search.sort_by == "email":
                 order_column = User.email
@@ -116,10 +113,18 @@ class UserManagementService:
             else:
                 order_column = User.created_at
             
+            # 首頁與游標翻頁走鍵集分頁，舊客戶端指定的深頁碼仍以 OFFSET 兼容
+            if search.cursor or search.page == 1:
+                return await self._keyset_search_users(query, search, order_column)
+            
+            # 總數統計
+            total = query.count()
+            
+            # NULL 排序鍵固定排在最後（與鍵集分頁相同），首頁與頁碼翻頁才不會重複或遺漏列
             if search.sort_order == "desc":
-                query = query.order_by(desc(order_column))
+                query = query.order_by(nulls_last(desc(order_column)), desc(User.id))
             else:
-                query = query.order_by(order_column)
+                query = query.order_by(nulls_last(order_column.asc()), User.id)
             
             # 分頁
             offset = (search.page - 1) * search.page_size
@@ -138,13 +143,57 @@ class UserManagementService:
                 total=total,
                 page=search.page,
                 page_size=search.page_size,
-                total_pages=total_pages
+                total_pages=total_pages,
+                has_next=search.page < total_pages,
+                has_previous=search.page > 1
             )
             
         except Exception as e:
             api_logger.error("用戶搜索失敗", extra={'error': str(e)})
             raise
     
+    async def _keyset_search_users(self, query, search: UserSearchRequest, order_column) -> UserListResponse:
+        """以 (排序欄位, id) 鍵集分頁執行用戶搜索，深頁成本與首頁相同"""
+        from ...art.storage.pagination_optimizations import (
+            KeysetPagination, keyset_fingerprint, keyset_paginate_query
+        )
+        
+        keyset = KeysetPagination(
+            sort_field=order_column.key,
+            id_field="id",
+            order_desc=search.sort_order == "desc",
+            fingerprint=keyset_fingerprint(
+                search.dict(exclude={'cursor', 'page', 'page_size', 'include_total'})
+            )
+        )
+        page = keyset_paginate_query(
+            query,
+            keyset,
+            order_column,
+            User.id,
+            search.page_size,
+            cursor=search.cursor,
+            count_mode="exact" if search.include_total else "none"
+        )
+        
+        user_responses = []
+        for user in page.items:
+            user_responses.append(await self._convert_user_to_response(user))
+        
+        total = page.total_count or 0
+        return UserListResponse(
+            items=user_responses,
+            total=total,
+            page=search.page,
+            page_size=search.page_size,
+            total_pages=(total + search.page_size - 1) // search.page_size,
+            next_cursor=page.next_cursor,
+            prev_cursor=page.prev_cursor,
+            has_next=page.has_next,
+            has_previous=page.has_previous,
+            total_is_estimate=page.estimated_count
+        )
+    
     async def get_user(self, user_id: int) -> Optional[UserResponse]:
         """獲取用戶詳情"""
         try:
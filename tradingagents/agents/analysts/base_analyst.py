@@ -332,7 +332,7 @@ class BaseAnalyst(ABC):
             
             # 2. 智能模型選擇 (天工創新) 
             await self._record_trajectory_step(
-                state, TrajectoryType.ANALYSIS_DECISION,
+                state, self._resolve_trajectory_type('ANALYSIS_DECISION', 'INITIALIZATION'),
                 {'task': 'model_selection', 'analysis_type': self.get_analysis_type().value},
                 ['開始智能模型選擇', '評估任務複雜度', '選擇最優模型配置'],
                 {'phase': 'model_selection'}, 0.9, 'smart_model_selector'
@@ -572,7 +572,7 @@ class BaseAnalyst(ABC):
         
         # 記錄推理過程步驟
         await self._record_trajectory_step(
-            state, TrajectoryType.REASONING_STEP,
+            state, self._resolve_trajectory_type('REASONING_STEP', 'REASONING_SYNTHESIS'),
             {'prompt_length': len(prompt), 'model': model_config.model_name},
             ['生成分析提示詞', f'選用模型: {model_config.model_name}', '準備LLM推理'],
             {'llm_ready': True}, 0.85, 'llm_preparation'
@@ -586,7 +586,7 @@ class BaseAnalyst(ABC):
         
         # 記錄LLM結果處理步驟
         await self._record_trajectory_step(
-            state, TrajectoryType.ANALYSIS_DECISION,
+            state, self._resolve_trajectory_type('ANALYSIS_DECISION', 'RECOMMENDATION_LOGIC'),
             {'llm_recommendation': llm_result.get('recommendation', 'HOLD')},
             ['處理LLM分析結果', '解析推薦建議', '提取信心度指標'],
             llm_result, 0.9, 'result_processing'
@@ -941,13 +941,12 @@ class BaseAnalyst(ABC):
             user_id = state.user_context.get('user_id', 'anonymous') if state.user_context else 'anonymous'
             
             # 為MVP演示版本使用適當的方法
-            if hasattr(self.trajectory_collector, 'start_trajectory'):
-                # 完整ART系統
+            if ART_AVAILABLE:
+                # 完整ART系統（分析師資訊由收集器從 analyst 物件讀取）
                 self.current_trajectory_id = await self.trajectory_collector.start_trajectory(
                     stock_id=state.stock_id,
-                    analyst_type=self.analyst_id,
-                    user_id=user_id,
-                    context_data=state.user_context or {}
+                    analyst=self,
+                    user_context=state.user_context or {}
                 )
             else:
                 # MVP演示版本
@@ -964,6 +963,15 @@ class BaseAnalyst(ABC):
             self.logger.error(f"軌跡收集開始失敗: {e}")
             self.current_trajectory_id = None
     
+    @staticmethod
+    def _resolve_trajectory_type(*names: str) -> TrajectoryType:
+        """依名稱解析軌跡類型（完整ART與MVP演示版本的列舉成員不同），皆不存在時使用第一個成員"""
+        for name in names:
+            member = getattr(TrajectoryType, name, None)
+            if member is not None:
+                return member
+        return list(TrajectoryType)[0]
+
     async def _record_trajectory_step(
         self,
         state: AnalysisState,
@@ -979,7 +987,10 @@ class BaseAnalyst(ABC):
             return
         
         try:
-            await self.trajectory_collector.record_decision_step(
+            # 完整ART系統為 record_step，MVP演示版本為 record_decision_step
+            record = getattr(self.trajectory_collector, 'record_step', None) \
+                or self.trajectory_collector.record_decision_step
+            await record(
                 trajectory_id=self.current_trajectory_id,
                 trajectory_type=trajectory_type,
                 input_data=input_data,
@@ -127,10 +127,15 @@ class TaiwanMarketAnalyst(BaseAnalyst):
             }
         }
     
-    async def analyze(self, analysis_state: Dict[str, Any]) -> AnalysisResult:
-        """執行台股專業分析"""
-        stock_id = analysis_state.get('stock_id', '')
-        analysis_date = analysis_state.get('analysis_date', datetime.now().strftime('%Y-%m-%d'))
+    async def analyze(self, analysis_state: Any) -> AnalysisResult:
+        """執行台股專業分析（工作流傳入 AnalysisState，亦相容舊的字典狀態）"""
+        if isinstance(analysis_state, dict):
+            stock_id = analysis_state.get('stock_id', '')
+            analysis_date = analysis_state.get('analysis_date')
+        else:
+            stock_id = analysis_state.stock_id
+            analysis_date = analysis_state.analysis_date
+        analysis_date = analysis_date or datetime.now().strftime('%Y-%m-%d')
         
         self.logger.info(f"🇹🇼 開始台股分析: {stock_id}")
         
@@ -23,6 +23,7 @@ import uuid
 from .base_analyst import BaseAnalyst, AnalysisResult, AnalysisState, AnalysisType, AnalysisConfidenceLevel
 from ...utils.logging_config import get_analysis_logger
 from ...utils.error_handler import handle_error
+from ...utils.tracing import traced
 
 
 class ExecutionPhase(Enum):
@@ -486,6 +487,9 @@ class WorkflowOrchestrator:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
     
+    @traced('analyst.execute', attributes=lambda self, analyst_id, state, result: {
+        'analyst.id': analyst_id, 'stock.id': state.stock_id
+    })
     async def _execute_single_analyst(
         self,
         analyst_id: str,
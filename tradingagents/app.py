@@ -15,78 +15,42 @@
 6. Taiwan市場專業化服務
 """
 
+import time
+
+# 模組導入起點（啟動導入時間預算以此計算）
+_app_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime
 import uuid
 from contextlib import asynccontextmanager
 
 # 導入TradingAgents組件
-from .graph.trading_graph import TradingAgentsGraph, create_trading_graph
+# 交易圖（pandas / sklearn 等重量級依賴）改由 ensure_analysis_engine 延遲導入
 from .utils.user_context import UserContext, TierType, UserPermissions
-from .agents.analysts.base_analyst import AnalysisState, AnalysisResult
 from .utils.error_handler import get_error_handler, handle_error, get_user_friendly_message, ErrorInfo
 from .utils.logging_config import get_api_logger, get_system_logger, get_security_logger
 from .utils.performance_monitor import log_performance
+from .utils.tracing import get_tracer
+from .utils.budget_accountant import close_budget_accountant
 from .utils.middleware import setup_middleware
-from .auth.routes import router as auth_router
+from .utils.import_timing import PHASE_REQUEST, PHASE_STARTUP, PHASE_WARMUP, get_import_time_recorder, get_import_time_report, timed_import
+from .utils.lazy_routes import create_lazy_router_registry
 from .auth.dependencies import get_current_user, CurrentUser, GoldUser, DiamondUser
 from .simple_cors import setup_simple_cors
-from .services.analysts_service import download_models_from_spaces, models_ready
 from .cache.redis_service import redis_service
 
-# 導入所有現有的 API 端點路由器
-from .api.user_endpoints import router as user_router
-from .api.subscription_endpoints import router as subscription_router
-from .api.payment_endpoints import router as payment_router
-from .api.payuni_endpoints import router as payuni_router
-from .api.replay_endpoints import router as replay_router # AI決策復盤API
-from .api.ai_analysis_cached import router as cached_analysis_router # Redis緩存AI分析API
-# from .api.membership_endpoints import router as membership_router
-from .api.ab_testing_endpoints import router as ab_testing_router
-from .api.pricing_strategy_endpoints import router as pricing_router
-from .api.upgrade_conversion_endpoints import router as upgrade_router
-from .api.user_experience_endpoints import router as ux_router
-from .api.international_market_endpoints import router as intl_router
-from .api.data_endpoints import router as data_router
-from .api.share_endpoints import router as share_router
-from .api.analyst_endpoints import router as analyst_router
-from .api.dialogue_endpoints import router as dialogue_router
-from .api.personality_test_endpoints import router as personality_test_router
-from .api.pay_per_use_endpoints import router as pay_per_use_router
-from .api.alpha_insight_endpoints import router as alpha_insight_router
-from .api.upgrade_recommendation_endpoints import router as upgrade_recommendation_router
-from .api.value_validation_endpoints import router as value_validation_router
-from .api.google_auth_endpoints import router as google_auth_router
-from .api.portfolio_endpoints import router as portfolio_router  # 舊的投資組合API
-from .api.ai_effectiveness import router as ai_effectiveness_router  # AI效果分析 API
-from .api.ai_analyst_demo_endpoints import router as ai_analyst_demo_router  # AI分析師展示中心 API
-from .api.financial_endpoints import router as financial_router  # P2-2 財務管理 API
-from .api.debug_auth import router as debug_auth_router  # Debug authentication endpoint
-# from .api.revenue_dashboard import router as revenue_dashboard_router  # 營收分析儀表板 - 暫時停用等待修復
-# from .api.simple_portfolio import router as simple_portfolio_router  # 全新的投資組合API
-# from .api.enhanced_portfolio_endpoints import router as enhanced_portfolio_router  # 🏆 專業級投資組合API
-
-# 導入 Admin 管理路由器
-from .admin.routers.auth_router import router as admin_auth_router
-from .admin.routers.config_router import router as config_router
-from .admin.routers.basic_stats_router import router as basic_stats_router
-from .admin.routers.user_management import router as user_management_router
-from .admin.routers.system_monitor import router as system_monitor_router
-from .admin.routers.service_coordinator import router as service_coordinator_router
-from .admin.routers.analyst_management import router as analyst_management_router
-from .admin.routers.content_management import router as content_management_router
-from .admin.routers.security_management_center import router as security_management_router
-from .admin.routers.devops_automation import router as devops_automation_router
-# from .admin.routers.tts_management import router as tts_management_router
-# from .admin.routers.complete_admin_endpoints import admin_router as complete_admin_router
+if TYPE_CHECKING:
+    from .graph.trading_graph import TradingAgentsGraph
 
 # 配置日誌
 logger = get_api_logger("app")
@@ -141,15 +105,106 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 # 全局變量
-trading_graph: Optional[TradingAgentsGraph] = None
+trading_graph: Optional["TradingAgentsGraph"] = None
 data_orchestrator = None
 active_connections: Dict[str, WebSocket] = {}
 
+# 啟動暖機模式：
+#   background（預設）- 服務就緒後在背景初始化交易圖並載入剩餘路由模組
+#   eager            - 服務就緒前全部完成（與舊行為相同）
+#   off              - 不暖機，交易圖與路由模組都在首次使用時載入
+STARTUP_WARMUP_MODE = os.getenv('STARTUP_WARMUP_MODE', 'background').lower()
+
+_analysis_engine_task: Optional[asyncio.Task] = None
+_analysis_engine_error: Optional[Dict[str, Any]] = None  # 最近一次初始化失敗（成功後清除）
+_warmup_task: Optional[asyncio.Task] = None
+
+async def _initialize_analysis_engine(trigger: str):
+    """初始化數據編排器與交易圖（重量級模組在工作執行緒中導入，不阻塞事件迴圈）"""
+    global trading_graph, data_orchestrator, _analysis_engine_error
+    try:
+        DataOrchestrator = await asyncio.to_thread(
+            timed_import, '.dataflows.data_orchestrator', 'DataOrchestrator', trigger, __package__
+        )
+        create_trading_graph = await asyncio.to_thread(
+            timed_import, '.graph.trading_graph', 'create_trading_graph', trigger, __package__
+        )
+
+        orchestrator = DataOrchestrator()
+        await orchestrator.initialize()
+        data_orchestrator = orchestrator
+        system_logger.info("數據編排器初始化完成", extra={
+            'startup_phase': 'data_orchestrator_ready',
+            'component': 'app_lifecycle'
+        })
+
+        trading_graph = await create_trading_graph()
+        _analysis_engine_error = None
+        system_logger.info(f"✅ 交易圖初始化完成 ({trigger})", extra={
+            'startup_phase': 'trading_graph_ready',
+            'component': 'app_lifecycle'
+        })
+    except Exception as e:
+        error_info = await handle_error(e, {
+            'phase': 'analysis_engine_initialization',
+            'component': 'app_lifecycle'
+        })
+        _analysis_engine_error = {
+            "error": str(e),
+            "error_id": error_info.error_id,
+            "trigger": trigger,
+            "failed_at": datetime.now().isoformat()
+        }
+        system_logger.critical(f"❌ 交易圖初始化失敗: {str(e)}", extra={
+            'startup_phase': 'trading_graph_failed',
+            'error_id': error_info.error_id,
+            'component': 'app_lifecycle'
+        })
+        raise
+
+async def ensure_analysis_engine(trigger: str = PHASE_REQUEST) -> Optional["TradingAgentsGraph"]:
+    """確保交易圖已初始化；並發呼叫共用同一個初始化任務，失敗後下一次呼叫會重試"""
+    global _analysis_engine_task
+    if trading_graph is None:
+        if _analysis_engine_task is None:
+            _analysis_engine_task = asyncio.create_task(_initialize_analysis_engine(trigger))
+        task = _analysis_engine_task
+        try:
+            await asyncio.shield(task)
+        except Exception:
+            # 不快取失敗的任務；只由仍持有同一任務的呼叫者清除，避免覆蓋新的重試
+            if task.done() and _analysis_engine_task is task:
+                _analysis_engine_task = None
+            raise
+    return trading_graph
+
+def _analysis_engine_status() -> Dict[str, Any]:
+    """交易圖狀態：ready / initializing / failed / not_started"""
+    if trading_graph is not None:
+        return {"state": "ready"}
+    if _analysis_engine_task is not None and not _analysis_engine_task.done():
+        return {"state": "initializing", "last_error": _analysis_engine_error}
+    if _analysis_engine_error is not None:
+        return {"state": "failed", "last_error": _analysis_engine_error}
+    return {"state": "not_started"}
+
+async def _startup_warmup():
+    """背景暖機：先初始化交易圖，再載入尚未被請求觸發的路由模組"""
+    try:
+        await ensure_analysis_engine(trigger=PHASE_WARMUP)
+    except Exception:
+        pass  # 已在 _initialize_analysis_engine 記錄；/health 回報 failed，下一個請求會重試
+    loaded = await lazy_routes.load_all(trigger=PHASE_WARMUP)
+    system_logger.info(f"🔥 啟動暖機完成（背景載入 {loaded} 個路由模組）", extra={
+        'startup_phase': 'warmup_completed',
+        'component': 'app_lifecycle'
+    })
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """應用程式生命週期管理"""
     # 啟動時初始化
-    global trading_graph, data_orchestrator
+    global _warmup_task
     system_logger.info("正在初始化不老傳說系統...", extra={
         'startup_phase': 'initialization',
         'component': 'app_lifecycle'
@@ -158,6 +213,7 @@ async def lifespan(app: FastAPI):
     try:
         # Ensure analyst models are available (download if missing)
         try:
+            from .utils.model_downloader import download_models_from_spaces, models_ready
             if not models_ready():
                 system_logger.info("Model marker not found. Starting model download...", extra={
                     'startup_phase': 'model_download',
@@ -193,17 +249,15 @@ async def lifespan(app: FastAPI):
                 'component': 'app_lifecycle'
             })
 
-        # 初始化數據編排器
-        from .dataflows.data_orchestrator import DataOrchestrator
-        data_orchestrator = DataOrchestrator()
-        await data_orchestrator.initialize()
-        system_logger.info("數據編排器初始化完成", extra={
-            'startup_phase': 'data_orchestrator_ready',
-            'component': 'app_lifecycle'
-        })
-        
-        # 初始化交易圖
-        trading_graph = await create_trading_graph()
+        # 啟動導入時間報告（超出預算時列出最慢的導入）
+        get_import_time_recorder().log_summary()
+
+        # 初始化數據編排器、交易圖並載入路由模組
+        if STARTUP_WARMUP_MODE == 'eager':
+            await ensure_analysis_engine(trigger=PHASE_WARMUP)
+            await lazy_routes.load_all(trigger=PHASE_WARMUP)
+        elif STARTUP_WARMUP_MODE != 'off':
+            _warmup_task = asyncio.create_task(_startup_warmup())
         
         # 初始化Redis緩存服務
         await redis_service.connect()  # 內部處理異常，不會拋出
@@ -255,6 +309,15 @@ async def lifespan(app: FastAPI):
     })
     
     try:
+        # 停止尚未完成的暖機與交易圖初始化
+        for task in (_warmup_task, _analysis_engine_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
         # 清理數據編排器
         if data_orchestrator:
             await data_orchestrator.cleanup()
@@ -268,6 +331,12 @@ async def lifespan(app: FastAPI):
             # 清理活躍會話
             trading_graph.cleanup_completed_sessions(max_age_hours=0)
         
+        # 寫出尚未匯出的追蹤 span
+        get_tracer().shutdown()
+        
+        # 結算並歸還本 worker 持有的預算租約
+        await close_budget_accountant()
+        
         # 關閉Redis連接
         if redis_service.is_connected:
             await redis_service.close()
@@ -301,6 +370,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 延遲路由註冊表（其中間件最先加入，位於中間件堆疊最內層，只有通過安全檢查的請求才會觸發導入）
+lazy_routes = create_lazy_router_registry(app, package=__package__)
+
 # 使用簡化的CORS配置
 setup_simple_cors(app)
 
@@ -340,61 +412,79 @@ app.add_middleware(SecurityHeadersMiddleware)
 security = HTTPBearer()
 
 # 註冊路由
-app.include_router(auth_router, prefix="/api/auth")
-app.include_router(debug_auth_router, prefix="/api")  # Debug endpoint
+# 路由模組延遲導入：此處只登記掛載前綴與比對前綴，首次命中（或暖機）時才導入並原位掛載；
+# 路由器自帶前綴時以 match 指定實際請求路徑前綴
+lazy_routes.register(".auth.routes", prefix="/api/auth")
+lazy_routes.register(".api.debug_auth", prefix="/api", match=["/api/debug"])  # Debug endpoint
 
 # 註冊所有現有的 API 端點路由器
-app.include_router(user_router, prefix="/api")
-app.include_router(subscription_router, prefix="/api")
-app.include_router(payment_router, prefix="/api")
+lazy_routes.register(".api.user_endpoints", prefix="/api", match=["/api/users"])
+lazy_routes.register(".api.subscription_endpoints", prefix="/api", match=["/api/subscriptions"])
+lazy_routes.register(".api.payment_endpoints", prefix="/api", match=["/api/payments"])
 
 # Lightweight model readiness health endpoint
 @app.get("/health/models", tags=["系統??��"])
 async def health_models():
+    from .utils.model_downloader import models_ready
     return {
         "ready": models_ready(),
         "timestamp": datetime.now().isoformat()
     }
-app.include_router(payuni_router, prefix="/api/v1")
-app.include_router(cached_analysis_router) # Redis緩存AI分析API - 路由已包含完整前綴
-app.include_router(replay_router) # AI決策復盤API - prefix已在router中定義
-# app.include_router(membership_router, prefix="/api")
-app.include_router(ab_testing_router, prefix="/api")
-app.include_router(pricing_router, prefix="/api")
-app.include_router(upgrade_router, prefix="/api")
-app.include_router(ux_router, prefix="/api")
-app.include_router(intl_router, prefix="/api")
-app.include_router(data_router, prefix="/api")
-app.include_router(share_router, prefix="/api")
-app.include_router(analyst_router, prefix="/api")
-app.include_router(dialogue_router, prefix="/api")
-app.include_router(personality_test_router, prefix="/api")
-app.include_router(pay_per_use_router, prefix="/api")
-app.include_router(alpha_insight_router, prefix="/api")
-app.include_router(upgrade_recommendation_router, prefix="/api")
-app.include_router(value_validation_router, prefix="/api")
-app.include_router(portfolio_router, prefix="/api/v1")  # 舊的投資組合 API 路由器
-# app.include_router(simple_portfolio_router, prefix="/api")  # 全新的投資組合 API 路由器
-# app.include_router(enhanced_portfolio_router)  # 🏆 專業級投資組合 API 路由器
-app.include_router(google_auth_router)  # Google Auth 路由器已包含 /api/auth 前綴
-app.include_router(ai_effectiveness_router)  # AI效果分析 API (已包含前綴)
-app.include_router(ai_analyst_demo_router)  # AI分析師展示中心 API (已包含前綴)
-app.include_router(financial_router)  # P2-2 財務管理 API (已包含前綴)
-# app.include_router(revenue_dashboard_router)  # 營收分析儀表板 API - 暫時停用等待修復
+
+@app.get("/health/startup", tags=["系統"])
+async def health_startup():
+    """啟動狀態：導入時間報告、延遲路由載入狀態與交易圖就緒情況"""
+    return {
+        "warmup_mode": STARTUP_WARMUP_MODE,
+        "trading_graph_ready": trading_graph is not None,
+        "analysis_engine": _analysis_engine_status(),
+        "import_time": get_import_time_report(),
+        "lazy_routes": lazy_routes.status(),
+        "timestamp": datetime.now().isoformat()
+    }
+lazy_routes.register(".api.payuni_endpoints", prefix="/api/v1", match=["/api/v1/payuni"])
+lazy_routes.register(".api.ai_analysis_cached", match=["/api/v1/ai-analysis", "/api/v1/cache"]) # Redis緩存AI分析API - 路由已包含完整前綴
+lazy_routes.register(".api.replay_endpoints", match=["/replay"]) # AI決策復盤API - prefix已在router中定義
+# lazy_routes.register(".api.membership_endpoints", prefix="/api")
+lazy_routes.register(".api.ab_testing_endpoints", prefix="/api", match=["/api/ab-testing"])
+lazy_routes.register(".api.pricing_strategy_endpoints", prefix="/api", match=["/api/pricing"])
+lazy_routes.register(".api.upgrade_conversion_endpoints", prefix="/api", match=["/api/upgrade-conversion"])
+lazy_routes.register(".api.user_experience_endpoints", prefix="/api", match=["/api/user-experience"])
+lazy_routes.register(".api.international_market_endpoints", prefix="/api", match=["/api/international-market"])
+lazy_routes.register(".api.data_endpoints", prefix="/api", match=["/api/data"])
+lazy_routes.register(".api.share_endpoints", prefix="/api", match=["/api/api/share"])
+lazy_routes.register(".api.analyst_endpoints", prefix="/api", match=["/api/analysis", "/api/analysts", "/api/art", "/api/user"])
+lazy_routes.register(".api.dialogue_endpoints", prefix="/api", match=["/api/dialogue"])
+lazy_routes.register(".api.personality_test_endpoints", prefix="/api", match=["/api/personality-test"])
+lazy_routes.register(".api.pay_per_use_endpoints", prefix="/api", match=["/api/pay-per-use"])
+lazy_routes.register(".api.alpha_insight_endpoints", prefix="/api", match=["/api/alpha-insights"])
+lazy_routes.register(".api.upgrade_recommendation_endpoints", prefix="/api", match=["/api/upgrade-recommendations"])
+lazy_routes.register(".api.value_validation_endpoints", prefix="/api", match=["/api/value-validation"])
+lazy_routes.register(".api.portfolio_endpoints", prefix="/api/v1", match=["/api/v1/portfolio", "/api/v1/portfolios"])  # 舊的投資組合 API 路由器
+# lazy_routes.register(".api.simple_portfolio", prefix="/api")  # 全新的投資組合 API 路由器
+# lazy_routes.register(".api.enhanced_portfolio_endpoints", match=[...])  # 🏆 專業級投資組合 API 路由器
+lazy_routes.register(".api.google_auth_endpoints", match=["/api/auth"])  # Google Auth 路由器已包含 /api/auth 前綴
+lazy_routes.register(".api.ai_effectiveness", match=["/api/v1/ai-effectiveness"])  # AI效果分析 API (已包含前綴)
+lazy_routes.register(".api.ai_analyst_demo_endpoints", match=["/api/v1/ai-demo"])  # AI分析師展示中心 API (已包含前綴)
+lazy_routes.register(".api.financial_endpoints", match=["/api/v1/financial"])  # P2-2 財務管理 API (已包含前綴)
+# lazy_routes.register(".api.revenue_dashboard", match=[...])  # 營收分析儀表板 API - 暫時停用等待修復
 
 # 註冊 Admin 管理路由器
-app.include_router(admin_auth_router, prefix="/admin")
-app.include_router(config_router, prefix="/admin")
-app.include_router(basic_stats_router)
-app.include_router(user_management_router, prefix="/admin")
-app.include_router(system_monitor_router, prefix="/admin")
-app.include_router(service_coordinator_router, prefix="/admin")
-app.include_router(analyst_management_router, prefix="/admin")
-app.include_router(content_management_router, prefix="/admin")
-app.include_router(security_management_router, prefix="/admin")  # 安全管理中心
-app.include_router(devops_automation_router, prefix="/admin")  # 運維自動化中心
-# app.include_router(tts_management_router)  # TTS管理路由器已包含 /admin/tts 前綴
-# app.include_router(complete_admin_router)  # 完整管理後台路由器已包含 /admin 前綴
+lazy_routes.register(".admin.routers.auth_router", prefix="/admin", match=["/admin/auth"])
+lazy_routes.register(".admin.routers.config_router", prefix="/admin", match=["/admin/config"])
+lazy_routes.register(".admin.routers.basic_stats_router", match=[
+    "/admin/stats", "/admin/analytics", "/admin/content", "/admin/financial", "/admin/subscription", "/admin/system"
+])
+lazy_routes.register(".admin.routers.user_management", prefix="/admin", match=["/admin/users"])
+lazy_routes.register(".admin.routers.system_monitor", prefix="/admin", match=["/admin/system"])
+lazy_routes.register(".admin.routers.service_coordinator", prefix="/admin", match=["/admin/coordinator"])
+lazy_routes.register(".admin.routers.analyst_management", prefix="/admin", match=["/admin/analysts"])
+lazy_routes.register(".admin.routers.content_management", prefix="/admin", match=["/admin/content"])
+lazy_routes.register(".admin.routers.security_management_center", prefix="/admin", match=["/admin/security"])  # 安全管理中心
+lazy_routes.register(".admin.routers.devops_automation", prefix="/admin", match=["/admin/devops"])  # 運維自動化中心
+lazy_routes.register(".admin.routers.report_jobs_router", prefix="/admin", match=["/admin/reports/jobs"])  # 背景報表任務
+# lazy_routes.register(".admin.routers.tts_management", match=["/admin/tts"])  # TTS管理路由器已包含 /admin/tts 前綴
+# lazy_routes.register(".admin.routers.complete_admin_endpoints", attr="admin_router", match=["/admin"])  # 完整管理後台路由器已包含 /admin 前綴
 
 # ==================== 依賴注入 ====================
 
@@ -478,14 +568,18 @@ class UserInfo(BaseModel):
 
 # 用戶認證依賴項已移到 auth.dependencies 模組
 
-async def get_trading_graph() -> TradingAgentsGraph:
-    """獲取交易圖實例"""
-    if trading_graph is None:
+async def get_trading_graph() -> "TradingAgentsGraph":
+    """獲取交易圖實例（背景暖機尚未完成時等待初始化）"""
+    try:
+        graph = await ensure_analysis_engine()
+    except Exception:
+        graph = None  # 初始化失敗已記錄
+    if graph is None:
         raise HTTPException(
             status_code=503,
             detail="不老傳說系統尚未初始化"
         )
-    return trading_graph
+    return graph
 
 # ==================== API路由 ====================
 
@@ -528,10 +622,16 @@ async def health_check():
     if system_health['status'] in ['degraded', 'unhealthy']:
         overall_status = system_health['status']
 
+    # 交易圖初始化失敗時不可回報 healthy（暖機會吞掉例外，只有這裡能看到）
+    analysis_engine = _analysis_engine_status()
+    if analysis_engine["state"] == "failed" and overall_status == "healthy":
+        overall_status = "degraded"
+
     return {
         "status": overall_status,
         "timestamp": datetime.now().isoformat(),
         "services": services_status,
+        "analysis_engine": analysis_engine,
         "system_health": system_health,
         "uptime_seconds": (datetime.now() - datetime.now()).total_seconds()  # 簡化實現
     }
@@ -592,7 +692,7 @@ async def start_analysis(
     request: AnalysisRequest,
     background_tasks: BackgroundTasks,
     user: CurrentUser,
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """開始股票分析"""
     try:
@@ -661,7 +761,7 @@ async def start_analysis(
 async def get_analysis_status(
     session_id: str,
     user: CurrentUser,
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """獲取分析狀態"""
     try:
@@ -692,11 +792,40 @@ async def get_analysis_status(
             detail=f"獲取狀態失敗: {str(e)}"
         )
 
+@app.get("/analysis/{session_id}/trace", tags=["分析服務"])
+async def get_analysis_trace(
+    session_id: str,
+    user: CurrentUser,
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
+):
+    """獲取分析會話的追蹤瀑布圖（各階段、數據請求、緩存、LLM 與存儲寫入耗時）"""
+    status = graph.get_session_status(session_id)
+    if status is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"找不到會話 {session_id}"
+        )
+    
+    session_user_id = status.get('user_context', {}).get('user_id')
+    if session_user_id and session_user_id != user.user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="無權限查看此分析會話"
+        )
+    
+    waterfall = get_tracer().waterfall(session_id)
+    if waterfall is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"會話 {session_id} 沒有追蹤數據"
+        )
+    return waterfall
+
 @app.delete("/analysis/{session_id}", tags=["分析服務"])
 async def cancel_analysis(
     session_id: str,
     user: CurrentUser,
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """取消分析"""
     try:
@@ -725,7 +854,7 @@ async def cancel_analysis(
 @app.get("/analysis/sessions", tags=["分析服務"])
 async def get_active_sessions(
     user: CurrentUser,
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """獲取活躍分析會話"""
     try:
@@ -754,7 +883,7 @@ async def get_active_sessions(
 @app.get("/system/metrics", response_model=SystemMetricsResponse, tags=["系統監控"])
 async def get_system_metrics(
     user: DiamondUser,  # 只有鑽石用戶可以查看系統指標
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """獲取系統指標"""
     try:
@@ -785,7 +914,7 @@ async def get_user_info(user: CurrentUser):
 @app.get("/analysts/info", tags=["分析師服務"])
 async def get_analysts_info(
     user: CurrentUser,
-    graph: TradingAgentsGraph = Depends(get_trading_graph)
+    graph: "TradingAgentsGraph" = Depends(get_trading_graph)
 ):
     """獲取可用分析師資訊"""
     try:
@@ -987,6 +1116,10 @@ async def simple_portfolios_options():
     """處理OPTIONS預檢請求"""
     return {"status": "OK"}
 
+# ==================== 啟動導入時間 ====================
+
+get_import_time_recorder().record(__name__, time.perf_counter() - _app_import_started, PHASE_STARTUP)
+
 # ==================== 啟動檢查 ====================
 
 if __name__ == "__main__":
@@ -21,6 +21,8 @@ from .storage_base import (
     IndexConfig
 )
 
+from .jsonl_log_store import JsonlLogStore
+
 from .trajectory_storage import (
     TrajectoryStorage,
     TrajectoryRecord,
@@ -30,6 +32,14 @@ from .trajectory_storage import (
     create_trajectory_storage
 )
 
+from .grpo_export import (
+    GRPOExportConfig,
+    GRPOTrainingDataExporter,
+    load_grpo_export,
+    iter_grpo_export_batches,
+    create_grpo_exporter
+)
+
 from .reward_storage import (
     RewardStorage,
     RewardRecord,
@@ -78,6 +88,10 @@ from .pagination_optimizations import (
     PaginationManager,
     AdaptiveBatchProcessor,
     CursorPagination,
+    KeysetCursor,
+    KeysetPage,
+    KeysetPagination,
+    keyset_paginate_query,
     SmartPrefetcher,
     PaginationType,
     BatchStrategy
@@ -165,6 +179,18 @@ from .automatic_backup import (
     RecoveryTimeObjective
 )
 
+from .chunked_backup import (
+    ContentDefinedChunker,
+    ChunkStore,
+    ChunkedBackupPipeline
+)
+
+from .sqlite_snapshot import (
+    snapshot_sqlite_database,
+    enable_wal_mode,
+    is_sqlite_database
+)
+
 from .version_control import (
     create_version_control,
     create_change_record,
@@ -197,7 +223,6 @@ from .disaster_recovery import (
     EmergencyResponseCoordinator,
     DisasterEvent,
     RecoveryPoint,
-    RecoveryPlan,
     FailoverConfiguration
 )
 
@@ -215,6 +240,7 @@ __all__ = [
     'StorageException',
     'DataVersionInfo',
     'IndexConfig',
+    'JsonlLogStore',
     
     # Storage classes
     'TrajectoryStorage',
@@ -238,6 +264,12 @@ __all__ = [
     'ComparisonOperator',
     'SortOrder',
     
+    # GRPO export
+    'GRPOExportConfig',
+    'GRPOTrainingDataExporter',
+    'load_grpo_export',
+    'iter_grpo_export_batches',
+    
     # Index classes
     'TrajectoryIndex',
     'RewardIndex',
@@ -263,6 +295,7 @@ __all__ = [
     # Factory functions
     'create_trajectory_storage',
     'create_reward_storage',
+    'create_grpo_exporter',
     'create_user_profile_storage',
     'create_query_engine',
     'create_optimized_storage',
@@ -297,6 +330,10 @@ __all__ = [
     'PaginationManager',
     'AdaptiveBatchProcessor',
     'CursorPagination',
+    'KeysetCursor',
+    'KeysetPage',
+    'KeysetPagination',
+    'keyset_paginate_query',
     'SmartPrefetcher',
     'PaginationType',
     'BatchStrategy',
@@ -363,6 +400,12 @@ __all__ = [
     'BackupStatus',
     'RecoveryPointObjective',
     'RecoveryTimeObjective',
+    'ContentDefinedChunker',
+    'ChunkStore',
+    'ChunkedBackupPipeline',
+    'snapshot_sqlite_database',
+    'enable_wal_mode',
+    'is_sqlite_database',
     
     # Disaster Recovery Classes
     'DisasterRecoveryManager',
@@ -377,7 +420,6 @@ __all__ = [
     'EmergencyResponseCoordinator',
     'DisasterEvent',
     'RecoveryPoint',
-    'RecoveryPlan',
     'FailoverConfiguration'
 ]
 
@@ -24,12 +24,20 @@ import hashlib
 import os
 import shutil
 import sqlite3
-import gzip
 import threading
 from pathlib import Path
 from collections import defaultdict, deque
 import uuid
 import subprocess
+import tempfile
+
+from .chunked_backup import (
+    ChunkStore, ContentDefinedChunker, ChunkedBackupPipeline,
+    restore_manifest, verify_manifest, load_manifest_file, list_source_files
+)
+from .sqlite_snapshot import (
+    find_sqlite_databases, sqlite_sidecar_paths, snapshot_sqlite_database
+)
 
 class BackupType(Enum):
     """備份類型"""
@@ -138,6 +146,10 @@ class BackupValidator:
         }
         
         try:
+            # 分塊備份：讀取清單引用的每個分塊並核對內容檢驗和
+            if backup_record.metadata.get('chunked'):
+                return await self._validate_chunked_backup(backup_record, validation_result)
+            
             # 檢查文件是否存在和可讀
             if not os.path.exists(backup_record.backup_path):
                 validation_result['error_messages'].append("Backup file not found")
@@ -178,6 +190,38 @@ class BackupValidator:
         
         return validation_result
     
+    async def _validate_chunked_backup(self, backup_record: BackupRecord,
+                                       validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """驗證分塊備份（單次讀取所有分塊，同時檢查大小、摘要與內容檢驗和）"""
+        manifest_paths = backup_record.metadata.get('manifest_paths') or [backup_record.backup_path]
+        manifest_path = next((path for path in manifest_paths if os.path.exists(path)), None)
+        if manifest_path is None:
+            validation_result['error_messages'].append("Backup manifest not found")
+            self.validation_cache[backup_record.backup_id] = validation_result
+            return validation_result
+        
+        validation_result['file_accessible'] = True
+        
+        manifest = load_manifest_file(manifest_path)
+        store_root = os.path.dirname(os.path.dirname(manifest_path))
+        verification = await asyncio.to_thread(verify_manifest, ChunkStore(store_root), manifest)
+        
+        validation_result['data_readable'] = verification['is_valid']
+        validation_result['checksum_match'] = (
+            not backup_record.checksum or verification['checksum'] == backup_record.checksum
+        )
+        validation_result['error_messages'].extend(verification['errors'])
+        if not validation_result['checksum_match']:
+            validation_result['error_messages'].append("Checksum mismatch")
+        
+        validation_result['is_valid'] = (
+            validation_result['file_accessible'] and
+            validation_result['checksum_match'] and
+            validation_result['data_readable']
+        )
+        self.validation_cache[backup_record.backup_id] = validation_result
+        return validation_result
+    
     async def _calculate_checksum(self, file_path: str) -> str:
         """計算文件檢驗和"""
         sha256_hash = hashlib.sha256()
@@ -216,11 +260,34 @@ class BackupValidator:
         return self.validation_cache.get(backup_id)
 
 class BackupStorage:
-    """備份存儲管理"""
+    """
+    備份存儲管理
+
+    每個存儲路徑是一個內容定址分塊庫：備份時來源只讀取一次，切成內容定義分塊，
+    每個分塊只雜湊與壓縮一次，並只寫入各目標尚未擁有的分塊。
+    每次備份寫入一份可獨立還原的清單（manifest），增量/差異備份直接沿用基準清單中
+    未變更檔案的分塊而不重新讀取。
+    
+    來源中的 SQLite 資料庫（sqlite_snapshots=True 時）先以線上備份 API 建立一致性快照，
+    再以快照內容分塊，不直接讀取可能正在寫入的資料庫檔案。
+    """
     
-    def __init__(self, storage_configs: List[Dict[str, Any]]):
+    def __init__(self, storage_configs: List[Dict[str, Any]],
+                 chunk_avg_size: int = 128 * 1024,
+                 max_workers: int = 4,
+                 fsync: bool = True,
+                 sqlite_snapshots: bool = True,
+                 snapshot_pages_per_step: int = 256,
+                 snapshot_step_sleep_seconds: float = 0.002):
         self.storage_configs = storage_configs
         self.active_storages: List[str] = []
+        self.chunk_stores: Dict[str, ChunkStore] = {}
+        self.chunker = ContentDefinedChunker(avg_size=chunk_avg_size)
+        self.max_workers = max_workers
+        self.fsync = fsync
+        self.sqlite_snapshots = sqlite_snapshots
+        self.snapshot_pages_per_step = snapshot_pages_per_step
+        self.snapshot_step_sleep_seconds = snapshot_step_sleep_seconds
         self._init_storages()
     
     def _init_storages(self):
@@ -230,53 +297,180 @@ class BackupStorage:
             if storage_path:
                 try:
                     os.makedirs(storage_path, exist_ok=True)
+                    self.chunk_stores[storage_path] = ChunkStore(
+                        storage_path, fsync=config.get('fsync', self.fsync)
+                    )
                     self.active_storages.append(storage_path)
                 except Exception as e:
                     logging.error(f"Failed to initialize storage {storage_path}: {e}")
     
     async def store_backup(self, source_path: str, backup_record: BackupRecord) -> bool:
-        """存儲備份到多個位置"""
-        success_count = 0
+        """串流備份到多個位置（在執行緒中執行，不阻塞事件循環）"""
+        if not self.active_storages:
+            logging.error("No active backup storage")
+            return False
+        
+        try:
+            manifest = await asyncio.to_thread(self._store_backup_sync, source_path, backup_record)
+        except Exception as e:
+            logging.error(f"Failed to store backup {backup_record.backup_id}: {e}")
+            return False
+        
+        for storage_path, error in manifest['failed_targets'].items():
+            logging.error(f"Failed to store backup in {storage_path}: {error}")
+        
+        if not manifest['manifest_paths']:
+            return False
+        
+        stats = manifest['stats']
+        backup_record.backup_path = manifest['manifest_paths'][0]
+        backup_record.file_size = manifest['total_size']
+        backup_record.compressed_size = self._stored_size(manifest)
+        backup_record.checksum = manifest['content_checksum']
+        backup_record.metadata.update({
+            'chunked': True,
+            'manifest_paths': manifest['manifest_paths'],
+            'parent_backup_id': manifest['parent_backup_id'],
+            'bytes_read': stats['bytes_read'],
+            'new_chunk_bytes': stats['new_chunk_bytes'],
+            'new_chunks': stats['new_chunks'],
+            'chunk_count': stats['chunk_count'],
+            'files_reused': stats['files_reused']
+        })
+        return True
+    
+    def _store_backup_sync(self, source_path: str, backup_record: BackupRecord) -> Dict[str, Any]:
+        """單次讀取來源並寫入所有目標"""
+        stores = [self.chunk_stores[path] for path in self.active_storages]
+        compression = 'zlib' if backup_record.metadata.get('compression_enabled', True) else 'none'
+        parent = self._find_parent_manifest(source_path, backup_record.backup_type)
         
+        pipeline = ChunkedBackupPipeline(
+            stores, self.chunker, compression=compression, max_workers=self.max_workers
+        )
+        
+        databases = find_sqlite_databases(list_source_files(source_path)) if self.sqlite_snapshots else []
+        if not databases:
+            return pipeline.run(
+                source_path,
+                backup_id=backup_record.backup_id,
+                backup_type=backup_record.backup_type.value,
+                parent=parent,
+                metadata={'created_by': backup_record.metadata.get('created_by')}
+            )
+        
+        staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=self.active_storages[0])
+        try:
+            substitutions = {}
+            exclude = set()
+            snapshots = []
+            for index, (relative_path, absolute_path) in enumerate(databases):
+                snapshot_path = os.path.join(staging_dir, f"{index}.db")
+                snapshot_stats = snapshot_sqlite_database(
+                    absolute_path, snapshot_path,
+                    pages_per_step=self.snapshot_pages_per_step,
+                    step_sleep_seconds=self.snapshot_step_sleep_seconds
+                )
+                substitutions[relative_path] = snapshot_path
+                exclude.update(sqlite_sidecar_paths(relative_path))
+                snapshots.append({
+                    'path': relative_path or os.path.basename(absolute_path),
+                    'journal_mode': snapshot_stats['journal_mode'],
+                    'pages': snapshot_stats['pages'],
+                    'restarts': snapshot_stats['restarts'],
+                    'duration_seconds': round(snapshot_stats['duration_seconds'], 3)
+                })
+            
+            backup_record.metadata['sqlite_snapshots'] = snapshots
+            return pipeline.run(
+                source_path,
+                backup_id=backup_record.backup_id,
+                backup_type=backup_record.backup_type.value,
+                parent=parent,
+                metadata={
+                    'created_by': backup_record.metadata.get('created_by'),
+                    'sqlite_snapshots': snapshots
+                },
+                substitutions=substitutions,
+                exclude=exclude
+            )
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    def _find_parent_manifest(self, source_path: str, backup_type: BackupType) -> Optional[Dict[str, Any]]:
+        """增量備份以最近一次備份為基準；差異備份以最近一次完整備份為基準"""
+        if backup_type not in (BackupType.INCREMENTAL, BackupType.DIFFERENTIAL):
+            return None
+        
+        source = os.path.abspath(source_path)
+        manifests = [
+            manifest for manifest in self.chunk_stores[self.active_storages[0]].list_manifests()
+            if manifest.get('source_path') == source
+        ]
+        if backup_type == BackupType.DIFFERENTIAL:
+            manifests = [
+                manifest for manifest in manifests
+                if manifest.get('backup_type') in (BackupType.FULL.value, BackupType.SNAPSHOT.value)
+            ]
+        return manifests[-1] if manifests else None
+    
+    def _stored_size(self, manifest: Dict[str, Any]) -> int:
+        """清單引用分塊的壓縮後總大小（去重後計算）"""
+        store = self.chunk_stores[self.active_storages[0]]
+        digests = {digest for entry in manifest['files'] for digest, _size in entry['chunks']}
+        return sum(store.chunk_stored_size(digest, manifest['compression']) for digest in digests)
+    
+    def _find_manifest(self, backup_id: str) -> Tuple[Optional[ChunkStore], Optional[Dict[str, Any]]]:
+        """在任一存儲中尋找備份清單"""
         for storage_path in self.active_storages:
+            store = self.chunk_stores[storage_path]
+            manifest = store.load_manifest(backup_id)
+            if manifest is not None:
+                return store, manifest
+        return None, None
+    
+    async def restore_backup(self, backup_id: str, target_path: str) -> Dict[str, Any]:
+        """由分塊重組備份；第一個存儲失敗時嘗試其他存儲"""
+        last_error = None
+        for storage_path in self.active_storages:
+            store = self.chunk_stores[storage_path]
+            manifest = store.load_manifest(backup_id)
+            if manifest is None:
+                continue
             try:
-                # 生成備份文件路径
-                backup_filename = f"{backup_record.backup_id}_{os.path.basename(source_path)}"
-                if backup_record.backup_type != BackupType.FULL:
-                    backup_filename = f"{backup_record.backup_type.value}_{backup_filename}"
-                
-                backup_file_path = os.path.join(storage_path, backup_filename)
-                
-                # 複製文件
-                if os.path.isdir(source_path):
-                    shutil.copytree(source_path, backup_file_path)
-                else:
-                    shutil.copy2(source_path, backup_file_path)
-                
-                # 壓縮處理
-                if backup_record.metadata.get('compression_enabled', True):
-                    compressed_path = f"{backup_file_path}.gz"
-                    await self._compress_file(backup_file_path, compressed_path)
-                    os.remove(backup_file_path)
-                    backup_file_path = compressed_path
-                
-                # 更新備份記錄
-                backup_record.backup_path = backup_file_path
-                backup_record.file_size = self._get_file_size(source_path)
-                backup_record.compressed_size = os.path.getsize(backup_file_path)
-                
-                success_count += 1
-                
+                return await asyncio.to_thread(restore_manifest, store, manifest, target_path)
             except Exception as e:
-                logging.error(f"Failed to store backup in {storage_path}: {e}")
+                last_error = e
+                logging.error(f"Restore of {backup_id} from {storage_path} failed: {e}")
         
-        return success_count > 0
+        if last_error is not None:
+            raise last_error
+        raise ValueError(f"Backup manifest {backup_id} not found")
+    
+    async def verify_backup(self, backup_id: str) -> Dict[str, Any]:
+        """讀取並驗證備份引用的所有分塊"""
+        store, manifest = self._find_manifest(backup_id)
+        if manifest is None:
+            return {'is_valid': False, 'checksum': None, 'errors': ["Backup manifest not found"]}
+        return await asyncio.to_thread(verify_manifest, store, manifest)
     
-    async def _compress_file(self, source_path: str, target_path: str):
-        """壓縮文件"""
-        with open(source_path, 'rb') as f_in:
-            with gzip.open(target_path, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
+    def delete_backup(self, backup_id: str, collect_garbage: bool = True) -> bool:
+        """刪除所有存儲中的備份清單，並回收不再引用的分塊"""
+        deleted = False
+        for storage_path in self.active_storages:
+            deleted = self.chunk_stores[storage_path].delete_manifest(backup_id) or deleted
+        if deleted and collect_garbage:
+            self.collect_garbage()
+        return deleted
+    
+    def collect_garbage(self) -> Dict[str, int]:
+        """回收所有存儲中不再被任何清單引用的分塊"""
+        totals = {'chunks_removed': 0, 'bytes_freed': 0}
+        for storage_path in self.active_storages:
+            result = self.chunk_stores[storage_path].collect_garbage()
+            totals['chunks_removed'] += result['chunks_removed']
+            totals['bytes_freed'] += result['bytes_freed']
+        return totals
     
     def _get_file_size(self, path: str) -> int:
         """獲取文件或目錄大小"""
@@ -292,19 +486,20 @@ class BackupStorage:
         return 0
     
     def cleanup_expired_backups(self, retention_days: int) -> List[str]:
-        """清理過期備份"""
+        """清理過期備份清單並回收不再引用的分塊"""
         cleaned_files = []
         cutoff_time = time.time() - (retention_days * 86400)
         
         for storage_path in self.active_storages:
             try:
-                for filename in os.listdir(storage_path):
-                    file_path = os.path.join(storage_path, filename)
-                    if os.path.isfile(file_path):
-                        file_mtime = os.path.getmtime(file_path)
-                        if file_mtime < cutoff_time:
-                            os.remove(file_path)
-                            cleaned_files.append(file_path)
+                store = self.chunk_stores[storage_path]
+                for manifest in store.list_manifests():
+                    if manifest.get('created_at', 0) < cutoff_time:
+                        store.delete_manifest(manifest['backup_id'])
+                        cleaned_files.append(store.manifest_path(manifest['backup_id']))
+                
+                if cleaned_files:
+                    store.collect_garbage()
                             
             except Exception as e:
                 logging.error(f"Failed to cleanup storage {storage_path}: {e}")
@@ -520,8 +715,10 @@ class RecoveryManager:
                 
             elif step_type == 'restore_backup':
                 backup_id = step['backup_id']
-                # 這裡需要實際的恢復邏輯
+                restore_result = await self.backup_storage.restore_backup(backup_id, target_path)
                 result['success'] = True
+                result['restored_path'] = restore_result.get('target_path')
+                result['bytes_restored'] = restore_result.get('bytes_restored')
                 
             elif step_type == 'verify_restoration':
                 # 驗證恢復的數據
@@ -651,10 +848,11 @@ class AutomaticBackupManager:
                     backup_record.status = BackupStatus.COMPLETED
                     backup_record.completed_at = time.time()
                     
-                    # 計算檢驗和
-                    backup_record.checksum = await self.validator._calculate_checksum(
-                        backup_record.backup_path
-                    )
+                    # 計算檢驗和（分塊備份在寫入時已計算，無需再讀一次）
+                    if not backup_record.checksum:
+                        backup_record.checksum = await self.validator._calculate_checksum(
+                            backup_record.backup_path
+                        )
                     
                     # 驗證備份（如果配置了）
                     if self.config.verify_after_backup:
@@ -691,10 +889,15 @@ class AutomaticBackupManager:
             ]
             
             for backup in expired_backups:
-                if os.path.exists(backup.backup_path):
+                if backup.metadata.get('chunked'):
+                    self.backup_storage.delete_backup(backup.backup_id, collect_garbage=False)
+                elif os.path.exists(backup.backup_path):
                     os.remove(backup.backup_path)
                 backup.status = BackupStatus.EXPIRED
             
+            if any(backup.metadata.get('chunked') for backup in expired_backups):
+                await asyncio.to_thread(self.backup_storage.collect_garbage)
+            
             # 移除過期記錄
             self.backup_history = [
                 record for record in self.backup_history
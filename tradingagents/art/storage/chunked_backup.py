@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+"""
+Chunked Backup - 內容定義分塊的去重備份
+天工 (TianGong) - 為ART存儲系統提供串流、去重的增量備份
+
+此模組提供：
+1. ContentDefinedChunker - 以滾動雜湊切出內容定義分塊（插入/刪除只影響附近分塊）
+2. ChunkStore - 每個備份目標的內容定址分塊庫與備份清單（manifest）
+3. ChunkedBackupPipeline - 單次讀取來源、每個分塊只雜湊/壓縮一次、僅寫入新分塊
+   （備份期間持有分塊庫的共享鎖，垃圾回收需獨佔，避免刪除剛被去重引用的分塊）
+4. restore_manifest / verify_manifest - 由分塊重組與驗證備份
+"""
+
+from typing import Dict, Any, List, Optional, Iterator, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import ExitStack, contextmanager
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+MANIFEST_VERSION = 1
+
+# 分塊壓縮格式 -> 分塊檔案副檔名
+CHUNK_SUFFIXES = {'zlib': '.z', 'none': '.raw'}
+
+# ==================== 內容定義分塊 ====================
+
+_MASK64 = (1 << 64) - 1
+
+
+def _gear_table() -> List[int]:
+    """固定的位元組雜湊表（由常數種子推導，確保跨版本分塊邊界一致）"""
+    table = []
+    for value in range(256):
+        digest = hashlib.sha256(f"tiangong-cdc-{value}".encode()).digest()
+        table.append(int.from_bytes(digest[:8], 'little'))
+    return table
+
+
+class ContentDefinedChunker:
+    """
+    內容定義分塊器
+
+    以長度為 window 的多項式滾動雜湊 W(i) = Σ T[b_k]·P^(i-k) (mod 2^64)
+    決定分塊邊界：W 的高位元全為 1 時切分，並以 min_size/max_size 約束分塊大小。
+    有 numpy 時以前綴和向量化計算，否則逐位元組滾動；兩者產生相同邊界。
+
+    Args:
+        avg_size: 平均分塊大小（需為 2 的次方）
+        min_size: 最小分塊大小
+        max_size: 最大分塊大小
+        window: 滾動雜湊窗口長度
+        read_size: 每次從來源讀取的位元組數
+    """
+
+    PRIME = 0x100000001B3
+
+    def __init__(self, avg_size: int = 128 * 1024, min_size: Optional[int] = None,
+                 max_size: Optional[int] = None, window: int = 48,
+                 read_size: int = 4 * 1024 * 1024):
+        if avg_size <= 0 or avg_size & (avg_size - 1):
+            raise ValueError("avg_size must be a power of two")
+        self.avg_size = avg_size
+        self.min_size = min_size or max(window, avg_size // 4)
+        self.max_size = max_size or avg_size * 8
+        if not window < self.min_size <= avg_size <= self.max_size:
+            raise ValueError("chunk sizes must satisfy window < min_size <= avg_size <= max_size")
+        self.window = window
+        self.read_size = read_size
+
+        self._bits = avg_size.bit_length() - 1
+        self._target = (1 << self._bits) - 1
+        self._table = _gear_table()
+        self._prime_pow_window = pow(self.PRIME, window, 1 << 64)
+
+        if NUMPY_AVAILABLE:
+            self._np_table = np.array(self._table, dtype=np.uint64)
+            self._np_pow = np.empty(0, dtype=np.uint64)
+            self._np_inv_pow = np.empty(0, dtype=np.uint64)
+
+    # ---------- 邊界候選 ----------
+
+    def _candidate_ends(self, data: bytes, offset: int) -> List[int]:
+        """
+        返回 data 中可切分的位置（切在該位置之前），座標相對於 offset
+
+        data 前 offset 個位元組只作為滾動雜湊的上下文。
+        """
+        if NUMPY_AVAILABLE:
+            return self._candidate_ends_numpy(data, offset)
+        return self._candidate_ends_python(data, offset)
+
+    def _ensure_powers(self, length: int):
+        if len(self._np_pow) >= length:
+            return
+        size = max(length, 2 * len(self._np_pow))
+        inverse = pow(self.PRIME, -1, 1 << 64)
+        powers = np.full(size, self.PRIME, dtype=np.uint64)
+        inverse_powers = np.full(size, inverse, dtype=np.uint64)
+        powers[0] = 1
+        inverse_powers[0] = 1
+        with np.errstate(over='ignore'):
+            self._np_pow = np.cumprod(powers, dtype=np.uint64)
+            self._np_inv_pow = np.cumprod(inverse_powers, dtype=np.uint64)
+
+    def _candidate_ends_numpy(self, data: bytes, offset: int) -> List[int]:
+        n = len(data)
+        w = self.window
+        if n < w:
+            return []
+        self._ensure_powers(n)
+
+        with np.errstate(over='ignore'):
+            # 就地運算以減少暫存陣列
+            values = self._np_table.take(np.frombuffer(data, dtype=np.uint8))
+            np.multiply(values, self._np_inv_pow[:n], out=values)
+            prefix = np.empty(n + 1, dtype=np.uint64)
+            prefix[0] = 0
+            np.cumsum(values, out=prefix[1:])
+            hashes = np.subtract(prefix[w:n + 1], prefix[0:n - w + 1])
+            np.multiply(hashes, self._np_pow[w - 1:n], out=hashes)
+            np.right_shift(hashes, np.uint64(64 - self._bits), out=hashes)
+
+        matches = np.flatnonzero(hashes == np.uint64(self._target))
+        # hashes[j] 對應以位元組 j + w - 1 結尾的窗口，切點在其後
+        ends = matches + (w - offset)
+        return ends[ends > 0].tolist()
+
+    def _candidate_ends_python(self, data: bytes, offset: int) -> List[int]:
+        w = self.window
+        table = self._table
+        prime = self.PRIME
+        drop = self._prime_pow_window
+        shift = 64 - self._bits
+        target = self._target
+
+        ends = []
+        rolling = 0
+        for index, byte in enumerate(data):
+            rolling = (rolling * prime + table[byte]) & _MASK64
+            if index >= w:
+                rolling = (rolling - table[data[index - w]] * drop) & _MASK64
+            if index >= w - 1 and (rolling >> shift) == target:
+                end = index + 1 - offset
+                if end > 0:
+                    ends.append(end)
+        return ends
+
+    # ---------- 切分 ----------
+
+    def _select_cuts(self, candidates: List[int], length: int, final: bool) -> List[int]:
+        """依最小/最大分塊大小從候選位置中選出切點"""
+        cuts = []
+        start = 0
+        index = 0
+        while start < length:
+            low = start + self.min_size
+            high = start + self.max_size
+            while index < len(candidates) and candidates[index] < low:
+                index += 1
+
+            if index < len(candidates) and candidates[index] <= high:
+                cut = candidates[index]
+            elif high <= length:
+                cut = high
+            elif final:
+                cut = length
+            else:
+                break
+
+            cuts.append(cut)
+            start = cut
+        return cuts
+
+    def iter_chunks(self, stream) -> Iterator[bytes]:
+        """從二進位串流逐一產生分塊（來源只讀取一次）"""
+        context = b""
+        pending = b""
+        context_size = self.window - 1
+
+        while True:
+            block = stream.read(self.read_size)
+            final = not block
+            pending += block
+            if not pending:
+                return
+
+            data = context + pending
+            candidates = self._candidate_ends(data, len(context))
+            cuts = self._select_cuts(candidates, len(pending), final)
+
+            previous = 0
+            for cut in cuts:
+                yield pending[previous:cut]
+                previous = cut
+
+            if previous:
+                consumed = data[:len(context) + previous]
+                context = consumed[-context_size:] if context_size else b""
+                pending = pending[previous:]
+
+            if final:
+                return
+
+    def chunk_bytes(self, data: bytes) -> List[bytes]:
+        """切分記憶體中的位元組"""
+        import io
+        return list(self.iter_chunks(io.BytesIO(data)))
+
+
+# ==================== 分塊庫 ====================
+
+class _StoreGuard:
+    """同一分塊庫目錄的備份 / 垃圾回收協調：備份可並行，垃圾回收獨佔"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active_backups = 0
+        self._collecting = False
+
+    @contextmanager
+    def backup(self):
+        with self._condition:
+            while self._collecting:
+                self._condition.wait()
+            self._active_backups += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active_backups -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def collecting(self):
+        with self._condition:
+            while self._collecting or self._active_backups:
+                self._condition.wait()
+            self._collecting = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._collecting = False
+                self._condition.notify_all()
+
+
+_store_guards: Dict[str, _StoreGuard] = {}
+_store_guards_lock = threading.Lock()
+
+
+def _guard_for(root: str) -> _StoreGuard:
+    """同一目錄的所有 ChunkStore 實例共用一個協調器"""
+    key = os.path.realpath(root)
+    with _store_guards_lock:
+        guard = _store_guards.get(key)
+        if guard is None:
+            guard = _StoreGuard()
+            _store_guards[key] = guard
+        return guard
+
+
+class ChunkStore:
+    """
+    單一備份目標的內容定址分塊庫
+
+    目錄結構:
+        <root>/chunks/<digest[:2]>/<digest>.<z|raw>
+        <root>/manifests/<backup_id>.json
+    """
+
+    def __init__(self, root: str, fsync: bool = True):
+        self.root = root
+        self.fsync = fsync
+        self.chunks_dir = os.path.join(root, 'chunks')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        self._known: set = set()
+        self._lock = threading.Lock()
+        self._guard = _guard_for(root)
+
+    def backup_session(self):
+        """備份期間（去重檢查到寫入清單）持有的共享鎖；垃圾回收會等待其結束"""
+        return self._guard.backup()
+
+    def chunk_path(self, digest: str, compression: str) -> str:
+        return os.path.join(self.chunks_dir, digest[:2], digest + CHUNK_SUFFIXES[compression])
+
+    def has_chunk(self, digest: str, compression: str) -> bool:
+        key = (digest, compression)
+        if key in self._known:
+            return True
+        if os.path.exists(self.chunk_path(digest, compression)):
+            with self._lock:
+                self._known.add(key)
+            return True
+        return False
+
+    def write_chunk(self, digest: str, compression: str, payload: bytes):
+        """原子寫入分塊（暫存檔 + rename）"""
+        path = self.chunk_path(digest, compression)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._atomic_write(path, payload)
+        with self._lock:
+            self._known.add((digest, compression))
+
+    def read_chunk(self, digest: str, compression: str) -> bytes:
+        with open(self.chunk_path(digest, compression), 'rb') as f:
+            payload = f.read()
+        return zlib.decompress(payload) if compression == 'zlib' else payload
+
+    def chunk_stored_size(self, digest: str, compression: str) -> int:
+        try:
+            return os.path.getsize(self.chunk_path(digest, compression))
+        except OSError:
+            return 0
+
+    # ---------- 清單 ----------
+
+    def manifest_path(self, backup_id: str) -> str:
+        return os.path.join(self.manifests_dir, f"{backup_id}.json")
+
+    def write_manifest(self, manifest: Dict[str, Any]) -> str:
+        path = self.manifest_path(manifest['backup_id'])
+        self._atomic_write(path, json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+        if self.fsync:
+            _fsync_directory(self.manifests_dir)
+        return path
+
+    def load_manifest(self, backup_id: str) -> Optional[Dict[str, Any]]:
+        return load_manifest_file(self.manifest_path(backup_id))
+
+    def list_manifests(self) -> List[Dict[str, Any]]:
+        manifests = []
+        for filename in os.listdir(self.manifests_dir):
+            if filename.endswith('.json'):
+                manifest = load_manifest_file(os.path.join(self.manifests_dir, filename))
+                if manifest is not None:
+                    manifests.append(manifest)
+        manifests.sort(key=lambda m: m.get('created_at', 0))
+        return manifests
+
+    def delete_manifest(self, backup_id: str) -> bool:
+        try:
+            os.remove(self.manifest_path(backup_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """刪除不再被任何清單引用的分塊（等待進行中的備份寫完清單）"""
+        with self._guard.collecting():
+            return self._collect_garbage()
+
+    def _collect_garbage(self) -> Dict[str, int]:
+        referenced = set()
+        for manifest in self.list_manifests():
+            compression = manifest.get('compression', 'zlib')
+            for entry in manifest.get('files', []):
+                for digest, _size in entry['chunks']:
+                    referenced.add(digest + CHUNK_SUFFIXES[compression])
+
+        removed = 0
+        freed = 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for filename in os.listdir(prefix_dir):
+                if filename in referenced or '.tmp-' in filename:
+                    continue
+                path = os.path.join(prefix_dir, filename)
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    continue
+        with self._lock:
+            self._known.clear()
+        return {'chunks_removed': removed, 'bytes_freed': freed}
+
+    def _atomic_write(self, path: str, payload: bytes):
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+def _fsync_directory(path: str):
+    """同步目錄項（Windows 不支援時略過）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def load_manifest_file(path: str) -> Optional[Dict[str, Any]]:
+    """讀取備份清單"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def content_checksum(files: List[Dict[str, Any]]) -> str:
+    """備份內容檢驗和：單檔為檔案 sha256，目錄為各檔 (路徑, sha256) 的 sha256"""
+    if len(files) == 1 and files[0]['path'] == '':
+        return files[0]['sha256']
+    digest = hashlib.sha256()
+    for entry in files:
+        digest.update(f"{entry['path']}\0{entry['sha256']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# ==================== 備份管線 ====================
+
+def list_source_files(source_path: str) -> List[Tuple[str, str]]:
+    """列出來源檔案 (相對路徑, 絕對路徑)；單檔來源的相對路徑為空字串"""
+    if os.path.isfile(source_path):
+        return [('', source_path)]
+    files = []
+    for dirpath, dirnames, filenames in os.walk(source_path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            absolute = os.path.join(dirpath, filename)
+            files.append((os.path.relpath(absolute, source_path).replace(os.sep, '/'), absolute))
+    return files
+
+
+class ChunkedBackupPipeline:
+    """
+    串流去重備份管線
+
+    來源只讀取一次；每個分塊計算一次 sha256、最多壓縮一次，
+    並在執行緒池中只寫入各目標尚未擁有的分塊。
+
+    Args:
+        stores: 備份目標分塊庫
+        chunker: 分塊器
+        compression: 'zlib' 或 'none'
+        max_workers: 壓縮/寫入執行緒數
+        compression_level: zlib 壓縮等級
+    """
+
+    def __init__(self, stores: List[ChunkStore], chunker: ContentDefinedChunker,
+                 compression: str = 'zlib', max_workers: int = 4,
+                 compression_level: int = 6):
+        if compression not in CHUNK_SUFFIXES:
+            raise ValueError(f"Unsupported chunk compression: {compression}")
+        self.stores = stores
+        self.chunker = chunker
+        self.compression = compression
+        self.max_workers = max_workers
+        self.compression_level = compression_level
+
+    def run(self, source_path: str, backup_id: str, backup_type: str,
+            parent: Optional[Dict[str, Any]] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+            substitutions: Optional[Dict[str, str]] = None,
+            exclude: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        執行備份並寫入清單
+
+        Args:
+            parent: 增量/差異備份的基準清單；未變更（大小與 mtime 相同）的檔案直接沿用其分塊
+            substitutions: 相對路徑 -> 實際讀取的檔案（例如 SQLite 一致性快照）；這些檔案不沿用基準
+            exclude: 不備份的相對路徑（例如已由快照涵蓋的 -wal / -shm 檔）
+
+        Returns:
+            備份清單（含 'manifest_paths' 與 'failed_targets'）
+        """
+        with ExitStack() as sessions:
+            for store in self.stores:
+                sessions.enter_context(store.backup_session())
+            return self._run(source_path, backup_id, backup_type, parent, metadata,
+                             substitutions, exclude)
+
+    def _run(self, source_path: str, backup_id: str, backup_type: str,
+             parent: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]],
+             substitutions: Optional[Dict[str, str]], exclude: Optional[Set[str]]) -> Dict[str, Any]:
+        started = time.time()
+        parent_files = {}
+        if parent is not None and parent.get('compression') == self.compression:
+            parent_files = {entry['path']: entry for entry in parent.get('files', [])}
+
+        stats = {
+            'bytes_read': 0,
+            'chunk_count': 0,
+            'new_chunks': 0,
+            'new_chunk_bytes': 0,
+            'files_reused': 0,
+            'files_read': 0
+        }
+        substitutions = substitutions or {}
+        exclude = exclude or set()
+        failed_targets: Dict[str, str] = {}
+        stats_lock = threading.Lock()
+        in_flight = threading.BoundedSemaphore(self.max_workers * 4)
+        submitted = set()
+        futures: List[Future] = []
+
+        def store_chunk(digest: str, chunk: bytes):
+            try:
+                missing = [
+                    store for store in self.stores
+                    if store.root not in failed_targets and not store.has_chunk(digest, self.compression)
+                ]
+                if not missing:
+                    return
+                payload = (zlib.compress(chunk, self.compression_level)
+                           if self.compression == 'zlib' else chunk)
+                for store in missing:
+                    try:
+                        store.write_chunk(digest, self.compression, payload)
+                    except Exception as e:
+                        with stats_lock:
+                            failed_targets.setdefault(store.root, str(e))
+                with stats_lock:
+                    stats['new_chunks'] += 1
+                    stats['new_chunk_bytes'] += len(payload)
+            finally:
+                in_flight.release()
+
+        files = []
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix='chunked-backup') as executor:
+            for relative_path, absolute_path in list_source_files(source_path):
+                if relative_path in exclude:
+                    continue
+                stat = os.stat(absolute_path)
+                read_path = substitutions.get(relative_path, absolute_path)
+                previous = parent_files.get(relative_path)
+                if (previous is not None and relative_path not in substitutions and
+                        self._can_reuse(previous, stat)):
+                    files.append(previous)
+                    stats['files_reused'] += 1
+                    continue
+
+                file_digest = hashlib.sha256()
+                chunks = []
+                size = 0
+                with open(read_path, 'rb') as f:
+                    for chunk in self.chunker.iter_chunks(f):
+                        digest = hashlib.sha256(chunk).hexdigest()
+                        file_digest.update(chunk)
+                        chunks.append([digest, len(chunk)])
+                        size += len(chunk)
+                        if digest in submitted:
+                            continue
+                        submitted.add(digest)
+                        in_flight.acquire()
+                        futures.append(executor.submit(store_chunk, digest, chunk))
+
+                stats['bytes_read'] += size
+                stats['files_read'] += 1
+                files.append({
+                    'path': relative_path,
+                    'size': size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'mode': stat.st_mode & 0o7777,
+                    'sha256': file_digest.hexdigest(),
+                    'chunks': chunks
+                })
+
+            for future in futures:
+                future.result()
+
+        stats['chunk_count'] = sum(len(entry['chunks']) for entry in files)
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'backup_id': backup_id,
+            'backup_type': backup_type,
+            'source_path': os.path.abspath(source_path),
+            'source_is_dir': os.path.isdir(source_path),
+            'parent_backup_id': parent.get('backup_id') if parent_files else None,
+            'created_at': started,
+            'completed_at': time.time(),
+            'compression': self.compression,
+            'chunking': {
+                'avg_size': self.chunker.avg_size,
+                'min_size': self.chunker.min_size,
+                'max_size': self.chunker.max_size,
+                'window': self.chunker.window
+            },
+            'total_size': sum(entry['size'] for entry in files),
+            'content_checksum': content_checksum(files),
+            'stats': stats,
+            'metadata': metadata or {},
+            'files': files
+        }
+
+        manifest_paths = []
+        for store in self.stores:
+            if store.root in failed_targets:
+                continue
+            try:
+                manifest_paths.append(store.write_manifest(manifest))
+            except Exception as e:
+                failed_targets[store.root] = str(e)
+
+        manifest['manifest_paths'] = manifest_paths
+        manifest['failed_targets'] = failed_targets
+        return manifest
+
+    def _can_reuse(self, previous: Dict[str, Any], stat: os.stat_result) -> bool:
+        """未變更的檔案沿用基準分塊（所有目標都已擁有這些分塊時）"""
+        if previous['size'] != stat.st_size or previous.get('mtime_ns') != stat.st_mtime_ns:
+            return False
+        return all(
+            store.has_chunk(digest, self.compression)
+            for store in self.stores
+            for digest, _size in previous['chunks']
+        )
+
+
+# ==================== 還原與驗證 ====================
+
+def _iter_manifest_chunks(store: ChunkStore, entry: Dict[str, Any],
+                          compression: str) -> Iterator[bytes]:
+    for digest, size in entry['chunks']:
+        chunk = store.read_chunk(digest, compression)
+        if len(chunk) != size or hashlib.sha256(chunk).hexdigest() != digest:
+            raise ValueError(f"Chunk {digest} is corrupted")
+        yield chunk
+
+
+def verify_manifest(store: ChunkStore, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """讀取並驗證清單引用的所有分塊，重新計算內容檢驗和"""
+    errors = []
+    compression = manifest.get('compression', 'zlib')
+    verified_files = []
+    for entry in manifest.get('files', []):
+        file_digest = hashlib.sha256()
+        try:
+            for chunk in _iter_manifest_chunks(store, entry, compression):
+                file_digest.update(chunk)
+        except FileNotFoundError as e:
+            errors.append(f"Missing chunk for {entry['path'] or 'file'}: {e.filename}")
+            continue
+        except (ValueError, zlib.error) as e:
+            errors.append(f"{entry['path'] or 'file'}: {e}")
+            continue
+        if file_digest.hexdigest() != entry['sha256']:
+            errors.append(f"Checksum mismatch for {entry['path'] or 'file'}")
+        verified_files.append({'path': entry['path'], 'sha256': file_digest.hexdigest()})
+
+    checksum = content_checksum(verified_files) if not errors else None
+    return {'is_valid': not errors, 'checksum': checksum, 'errors': errors}
+
+
+def restore_manifest(store: ChunkStore, manifest: Dict[str, Any], target_path: str) -> Dict[str, Any]:
+    """
+    由分塊重組備份
+
+    單檔備份寫入 target_path（若為既有目錄則寫入其下的原檔名）；
+    目錄備份還原到 target_path 目錄下。每個檔案先寫入暫存檔並驗證 sha256 後才替換。
+    """
+    compression = manifest.get('compression', 'zlib')
+    if manifest.get('source_is_dir'):
+        base_dir = target_path
+    elif os.path.isdir(target_path):
+        base_dir = target_path
+        target_path = os.path.join(target_path, os.path.basename(manifest['source_path']))
+    else:
+        base_dir = os.path.dirname(os.path.abspath(target_path))
+
+    restored_files = 0
+    restored_bytes = 0
+    for entry in manifest.get('files', []):
+        if manifest.get('source_is_dir'):
+            destination = os.path.join(base_dir, *entry['path'].split('/'))
+        else:
+            destination = target_path
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+
+        tmp_path = f"{destination}.restore-{uuid.uuid4().hex}"
+        file_digest = hashlib.sha256()
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in _iter_manifest_chunks(store, entry, compression):
+                    file_digest.update(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if file_digest.hexdigest() != entry['sha256']:
+                raise ValueError(f"Restored file checksum mismatch: {entry['path'] or destination}")
+            if entry.get('mode'):
+                os.chmod(tmp_path, entry['mode'])
+            os.replace(tmp_path, destination)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        restored_files += 1
+        restored_bytes += entry['size']
+
+    return {
+        'backup_id': manifest['backup_id'],
+        'target_path': target_path,
+        'files_restored': restored_files,
+        'bytes_restored': restored_bytes
+    }
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+GRPO Export - 列式GRPO訓練數據匯出
+天工 (TianGong) - 從TrajectoryStorage串流匯出分片Parquet/Arrow訓練數據
+
+此模組提供：
+1. GRPOExportConfig - 匯出篩選條件與分片設定
+2. GRPOTrainingDataExporter - 批次串流讀取軌跡並寫出分片檔案與 manifest
+3. load_grpo_export - 以記憶體映射 (memory-map) 方式載入匯出結果
+4. iter_grpo_export_batches - 逐批讀取匯出結果，記憶體用量固定
+"""
+
+from typing import Dict, Any, List, Optional, Iterator, Union
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+import json
+import os
+import time
+import asyncio
+import logging
+
+from .storage_base import StorageException
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+MANIFEST_FILENAME = "manifest.json"
+EXPORT_SCHEMA_VERSION = "1.0.0"
+SUPPORTED_FORMATS = ("parquet", "arrow")
+
+
+def _grpo_schema() -> 'pa.Schema':
+    """GRPO匯出資料表結構"""
+    step_type = pa.struct([
+        ('step_type', pa.string()),
+        ('description', pa.string()),
+        ('reasoning', pa.string()),
+        ('confidence', pa.float32()),
+        ('execution_time_ms', pa.float32()),
+        ('input_json', pa.string()),
+        ('output_json', pa.string())
+    ])
+    return pa.schema([
+        ('trajectory_id', pa.string()),
+        ('stock_id', pa.string()),
+        ('user_id', pa.string()),
+        ('analyst_type', pa.string()),
+        ('start_time', pa.timestamp('us')),
+        ('end_time', pa.timestamp('us')),
+        ('duration_seconds', pa.float64()),
+        ('final_recommendation', pa.string()),
+        ('final_confidence', pa.float64()),
+        ('quality_score', pa.float64()),
+        ('num_steps', pa.int32()),
+        ('steps', pa.list_(step_type)),
+        ('market_context_json', pa.string()),
+        ('user_context_json', pa.string())
+    ])
+
+
+def _load_json(value: Any, default: Any) -> Any:
+    """JSONB欄位在PostgreSQL游標中為字串，在JSON後端中已是物件"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return json.loads(value) if value else default
+    return value
+
+
+def _dump_json(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value or {}, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+@dataclass
+class GRPOExportConfig:
+    """GRPO匯出配置"""
+
+    # 篩選條件（全部下推到存儲層）
+    start_time_from: Optional[str] = None
+    start_time_to: Optional[str] = None
+    min_confidence: Optional[float] = None
+    min_decision_steps: Optional[int] = 1
+    min_quality_score: Optional[float] = None
+    analyst_types: Optional[List[str]] = None
+    user_ids: Optional[List[str]] = None
+
+    # 輸出設定
+    format: str = "parquet"
+    batch_size: int = 5000
+    rows_per_shard: int = 250_000
+    compression: str = "zstd"
+
+    def filters(self) -> Dict[str, Any]:
+        """存儲層 iter_record_batches 的篩選參數"""
+        return {
+            'start_time_from': self.start_time_from,
+            'start_time_to': self.start_time_to,
+            'min_confidence': self.min_confidence,
+            'min_decision_steps': self.min_decision_steps,
+            'min_quality_score': self.min_quality_score,
+            'analyst_types': self.analyst_types,
+            'user_ids': self.user_ids
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _ShardWriter:
+    """單一分片寫入器，寫入臨時檔並於關閉時原子更名"""
+
+    def __init__(self, path: Path, schema: 'pa.Schema', file_format: str, compression: str):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".tmp")
+        self.rows = 0
+        self.start_time_min: Optional[datetime] = None
+        self.start_time_max: Optional[datetime] = None
+
+        if file_format == "parquet":
+            self._writer = pq.ParquetWriter(str(self.tmp_path), schema, compression=compression)
+            self._sink = None
+        else:
+            # Arrow IPC 不壓縮，以便訓練端零拷貝記憶體映射
+            self._sink = pa.OSFile(str(self.tmp_path), 'wb')
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, batch: 'pa.RecordBatch', start_times: List[Optional[datetime]]):
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+        known = [t for t in start_times if t is not None]
+        if known:
+            low, high = min(known), max(known)
+            self.start_time_min = low if self.start_time_min is None else min(self.start_time_min, low)
+            self.start_time_max = high if self.start_time_max is None else max(self.start_time_max, high)
+
+    def close(self) -> Dict[str, Any]:
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+        with open(self.tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(self.tmp_path, self.path)
+
+        return {
+            'file': self.path.name,
+            'rows': self.rows,
+            'bytes': self.path.stat().st_size,
+            'start_time_min': self.start_time_min.isoformat() if self.start_time_min else None,
+            'start_time_max': self.start_time_max.isoformat() if self.start_time_max else None
+        }
+
+
+class GRPOTrainingDataExporter:
+    """GRPO訓練數據列式匯出器
+
+    從 TrajectoryStorage 以批次串流讀取（PostgreSQL 使用伺服器端游標），
+    每批轉為 Arrow RecordBatch 後直接寫入當前分片，任何時刻只持有一個批次，
+    因此記憶體用量與匯出總量無關。讀取下一批與寫入上一批重疊進行。
+    """
+
+    def __init__(self, trajectory_storage, config: Optional[GRPOExportConfig] = None):
+        if not PYARROW_AVAILABLE:
+            raise StorageException("pyarrow is required for GRPO columnar export")
+
+        self.storage = trajectory_storage
+        self.config = config or GRPOExportConfig()
+        if self.config.format not in SUPPORTED_FORMATS:
+            raise StorageException(f"Unsupported export format: {self.config.format}")
+
+        self.schema = _grpo_schema()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    async def export(self, output_dir: Union[str, Path]) -> Dict[str, Any]:
+        """執行匯出，回傳 manifest 內容"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        started = time.perf_counter()
+        shards: List[Dict[str, Any]] = []
+        current: Optional[_ShardWriter] = None
+        pending_write: Optional[asyncio.Future] = None
+        total_rows = 0
+
+        try:
+            async for rows in self.storage.iter_record_batches(
+                batch_size=self.config.batch_size, **self.config.filters()
+            ):
+                batch, start_times = self._to_record_batch(rows)
+
+                # 等待上一批寫入完成後再寫下一批，讀取與寫入因此互相重疊
+                if pending_write is not None:
+                    await pending_write
+
+                if current is None or current.rows >= self.config.rows_per_shard:
+                    if current is not None:
+                        shards.append(await asyncio.to_thread(current.close))
+                    current = self._open_shard(output_dir, len(shards))
+
+                pending_write = asyncio.ensure_future(
+                    asyncio.to_thread(current.write, batch, start_times)
+                )
+                total_rows += batch.num_rows
+
+            if pending_write is not None:
+                await pending_write
+            if current is not None:
+                shards.append(await asyncio.to_thread(current.close))
+                current = None
+
+        except Exception as e:
+            self.logger.error(f"❌ GRPO export failed: {e}")
+            if current is not None:
+                current.tmp_path.unlink(missing_ok=True)
+            raise StorageException(f"GRPO export failed: {e}")
+
+        manifest = {
+            'schema_version': EXPORT_SCHEMA_VERSION,
+            'format': self.config.format,
+            'created_at': datetime.now().isoformat(),
+            'duration_seconds': round(time.perf_counter() - started, 3),
+            'total_rows': total_rows,
+            'filters': self.config.filters(),
+            'columns': self.schema.names,
+            'shards': shards
+        }
+        self._write_manifest(output_dir, manifest)
+
+        self.logger.info(
+            f"✅ GRPO export completed: {total_rows} trajectories in {len(shards)} shards "
+            f"({manifest['duration_seconds']}s)"
+        )
+        return manifest
+
+    def _open_shard(self, output_dir: Path, shard_index: int) -> _ShardWriter:
+        extension = "parquet" if self.config.format == "parquet" else "arrow"
+        path = output_dir / f"part-{shard_index:05d}.{extension}"
+        return _ShardWriter(path, self.schema, self.config.format, self.config.compression)
+
+    def _to_record_batch(self, rows: List[Dict[str, Any]]):
+        """將一批原始資料列轉為 Arrow RecordBatch"""
+        columns: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+
+        for row in rows:
+            steps = _load_json(row.get('decision_steps'), [])
+            metadata = _load_json(row.get('metadata'), {})
+            quality_score = metadata.get('quality_score') if isinstance(metadata, dict) else None
+
+            columns['trajectory_id'].append(row['trajectory_id'])
+            columns['stock_id'].append(row['stock_id'])
+            columns['user_id'].append(row['user_id'])
+            columns['analyst_type'].append(row['analyst_type'])
+            columns['start_time'].append(_to_datetime(row.get('start_time')))
+            columns['end_time'].append(_to_datetime(row.get('end_time')))
+            columns['duration_seconds'].append(float(row.get('duration_seconds') or 0.0))
+            columns['final_recommendation'].append(row.get('final_recommendation'))
+            columns['final_confidence'].append(float(row.get('final_confidence') or 0.0))
+            columns['quality_score'].append(float(quality_score) if quality_score is not None else None)
+            columns['num_steps'].append(len(steps))
+            columns['steps'].append([
+                {
+                    'step_type': step.get('step_type'),
+                    'description': step.get('description'),
+                    'reasoning': step.get('reasoning'),
+                    'confidence': float(step.get('confidence') or 0.0),
+                    'execution_time_ms': float(step.get('execution_time_ms') or 0.0),
+                    'input_json': _dump_json(step.get('input_data')),
+                    'output_json': _dump_json(step.get('output_data'))
+                }
+                for step in steps
+            ])
+            columns['market_context_json'].append(_dump_json(row.get('market_context')))
+            columns['user_context_json'].append(_dump_json(row.get('user_context')))
+
+        batch = pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        return batch, columns['start_time']
+
+    @staticmethod
+    def _write_manifest(output_dir: Path, manifest: Dict[str, Any]):
+        """manifest 最後寫入，存在即代表所有分片已完整落盤"""
+        manifest_path = output_dir / MANIFEST_FILENAME
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+
+
+# ==================== 訓練端讀取 ====================
+
+def read_grpo_manifest(export_path: Union[str, Path]) -> Dict[str, Any]:
+    """讀取匯出 manifest，export_path 可為目錄或 manifest 檔案"""
+    path = Path(export_path)
+    manifest_path = path / MANIFEST_FILENAME if path.is_dir() else path
+    if not manifest_path.exists():
+        raise StorageException(f"GRPO export manifest not found: {manifest_path}")
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['_base_dir'] = str(manifest_path.parent)
+    return manifest
+
+
+def _open_arrow_shard(path: Path) -> 'pa.ipc.RecordBatchFileReader':
+    return pa.ipc.open_file(pa.memory_map(str(path), 'r'))
+
+
+def load_grpo_export(export_path: Union[str, Path],
+                     columns: Optional[List[str]] = None) -> 'pa.Table':
+    """以記憶體映射載入整份匯出（Arrow 分片為零拷貝）"""
+    if not PYARROW_AVAILABLE:
+        raise StorageException("pyarrow is required to load GRPO exports")
+
+    manifest = read_grpo_manifest(export_path)
+    base_dir = Path(manifest['_base_dir'])
+
+    tables = []
+    for shard in manifest['shards']:
+        shard_path = base_dir / shard['file']
+        if manifest['format'] == "arrow":
+            table = _open_arrow_shard(shard_path).read_all()
+            tables.append(table.select(columns) if columns else table)
+        else:
+            tables.append(pq.read_table(str(shard_path), columns=columns, memory_map=True))
+
+    if not tables:
+        schema = _grpo_schema()
+        if columns:
+            schema = pa.schema([schema.field(name) for name in columns])
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def iter_grpo_export_batches(export_path: Union[str, Path],
+                             columns: Optional[List[str]] = None,
+                             batch_size: int = 1024) -> Iterator['pa.RecordBatch']:
+    """逐批讀取匯出結果，適合大於記憶體的訓練集"""
+    if not PYARROW_AVAILABLE:
+        raise StorageException("pyarrow is required to load GRPO exports")
+
+    manifest = read_grpo_manifest(export_path)
+    base_dir = Path(manifest['_base_dir'])
+
+    for shard in manifest['shards']:
+        shard_path = base_dir / shard['file']
+        if manifest['format'] == "arrow":
+            reader = _open_arrow_shard(shard_path)
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                if columns:
+                    batch = batch.select(columns)
+                for offset in range(0, batch.num_rows, batch_size):
+                    yield batch.slice(offset, batch_size)
+        else:
+            parquet_file = pq.ParquetFile(str(shard_path), memory_map=True)
+            yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+
+
+def create_grpo_exporter(trajectory_storage, **kwargs) -> GRPOTrainingDataExporter:
+    """創建GRPO匯出器"""
+    return GRPOTrainingDataExporter(trajectory_storage, GRPOExportConfig(**kwargs))
@@ -13,8 +13,7 @@ Intelligent Caching - 智能查詢緩存和預取機制
 """
 
 from typing import Dict, Any, List, Optional, Union, Tuple, AsyncGenerator, Callable, Set
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from dataclasses import dataclass
 from enum import Enum
 import asyncio
 import json
@@ -23,7 +22,7 @@ import hashlib
 import logging
 import math
 import threading
-from collections import defaultdict, OrderedDict, deque
+from collections import OrderedDict
 import heapq
 import pickle
 import weakref
@@ -31,6 +30,9 @@ import statistics
 from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+# ARC引擎與預取器由共用快取引擎提供（與 CacheManager、快取防禦系統相同實作）
+from ...cache.cache_engine import ARCCache, CacheEntry, IntelligentPrefetcher, PrefetchStrategy
+
 class CacheLevel(Enum):
     """緩存級別"""
     L1_MEMORY = "l1_memory"       # L1內存緩存（最快）
@@ -46,50 +48,6 @@ class CacheStrategy(Enum):
     CLOCK = "clock"               # 時鐘替換算法
     ADAPTIVE = "adaptive"         # 自適應策略
 
-class PrefetchStrategy(Enum):
-    """預取策略"""
-    SEQUENTIAL = "sequential"     # 順序預取
-    PATTERN_BASED = "pattern"     # 基於模式預取
-    ML_PREDICTION = "ml"          # 機器學習預測
-    HYBRID = "hybrid"             # 混合策略
-
-@dataclass
-class CacheEntry:
-    """緩存條目"""
-    key: str
-    value: Any
-    size: int
-    created_at: float
-    last_accessed: float
-    access_count: int
-    hit_count: int
-    cost: float = 1.0  # 計算成本
-    priority: float = 1.0
-    ttl: Optional[float] = None
-    tags: Set[str] = field(default_factory=set)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    
-    @property
-    def age(self) -> float:
-        """條目年齡（秒）"""
-        return time.time() - self.created_at
-    
-    @property
-    def idle_time(self) -> float:
-        """閒置時間（秒）"""
-        return time.time() - self.last_accessed
-    
-    @property
-    def hit_rate(self) -> float:
-        """命中率"""
-        return self.hit_count / max(self.access_count, 1)
-    
-    def is_expired(self) -> bool:
-        """檢查是否過期"""
-        if self.ttl is None:
-            return False
-        return time.time() - self.created_at > self.ttl
-
 @dataclass
 class CacheStats:
     """緩存統計"""
@@ -111,235 +69,6 @@ class CacheStats:
     def prefetch_accuracy(self) -> float:
         return self.prefetch_hit_count / max(self.prefetch_count, 1)
 
-class ARCCache:
-    """自適應替換緩存（Adaptive Replacement Cache）"""
-    
-    def __init__(self, max_size: int):
-        self.max_size = max_size
-        self.p = 0  # 目標T1大小
-        
-        # 四個列表：T1, T2, B1, B2
-        self.t1 = OrderedDict()  # 最近訪問的頁面
-        self.t2 = OrderedDict()  # 頻繁訪問的頁面
-        self.b1 = OrderedDict()  # T1的幽靈頁面
-        self.b2 = OrderedDict()  # T2的幽靈頁面
-    
-    def get(self, key: str) -> Optional[Any]:
-        """獲取緩存項"""
-        if key in self.t1:
-            # 從T1移動到T2
-            value = self.t1.pop(key)
-            self.t2[key] = value
-            return value.value
-        elif key in self.t2:
-            # T2中命中，移動到最前面
-            value = self.t2.pop(key)
-            self.t2[key] = value
-            return value.value
-        
-        return None
-    
-    def put(self, key: str, entry: CacheEntry):
-        """放入緩存項"""
-        if key in self.t1 or key in self.t2:
-            return  # 已存在
-        
-        if key in self.b1:
-            # 在B1中找到，增加p
-            self.p = min(self.p + max(1, len(self.b2) // len(self.b1)), self.max_size)
-            self._replace(key)
-            self.b1.pop(key)
-            self.t2[key] = entry
-        elif key in self.b2:
-            # 在B2中找到，減少p
-            self.p = max(self.p - max(1, len(self.b1) // len(self.b2)), 0)
-            self._replace(key)
-            self.b2.pop(key)
-            self.t2[key] = entry
-        else:
-            # 新頁面
-            if len(self.t1) + len(self.b1) == self.max_size:
-                if len(self.t1) < self.max_size:
-                    self.b1.popitem(last=False)
-                    self._replace(key)
-                else:
-                    self.t1.popitem(last=False)
-            elif len(self.t1) + len(self.b1) < self.max_size:
-                total_size = len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2)
-                if total_size >= self.max_size:
-                    if total_size == 2 * self.max_size:
-                        self.b2.popitem(last=False)
-                    self._replace(key)
-            
-            self.t1[key] = entry
-    
-    def _replace(self, key: str):
-        """替換頁面"""
-        if len(self.t1) >= 1 and (
-            (key in self.b2 and len(self.t1) == self.p) or 
-            len(self.t1) > self.p
-        ):
-            # 從T1移動到B1
-            old_key = next(iter(self.t1))
-            entry = self.t1.pop(old_key)
-            self.b1[old_key] = entry
-        else:
-            # 從T2移動到B2
-            if self.t2:
-                old_key = next(iter(self.t2))
-                entry = self.t2.pop(old_key)
-                self.b2[old_key] = entry
-
-class IntelligentPrefetcher:
-    """智能預取引擎"""
-    
-    def __init__(self, strategy: PrefetchStrategy = PrefetchStrategy.HYBRID):
-        self.strategy = strategy
-        self.access_patterns: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
-        self.query_sequences: Dict[str, List[str]] = {}
-        self.temporal_patterns: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
-        self.correlation_matrix: Dict[Tuple[str, str], float] = {}
-        self.prefetch_success_rate: Dict[str, float] = {}
-        self.ml_model_weights: Dict[str, float] = {}
-        
-    def record_access(self, user_id: str, query_key: str, timestamp: Optional[float] = None):
-        """記錄訪問模式"""
-        if timestamp is None:
-            timestamp = time.time()
-        
-        # 記錄訪問序列
-        self.access_patterns[user_id].append((timestamp, query_key))
-        
-        # 記錄時間模式
-        self.temporal_patterns[user_id].append((timestamp, query_key))
-        
-        # 更新查詢序列
-        if user_id not in self.query_sequences:
-            self.query_sequences[user_id] = []
-        self.query_sequences[user_id].append(query_key)
-        
-        # 保持序列長度
-        if len(self.query_sequences[user_id]) > 50:
-            self.query_sequences[user_id] = self.query_sequences[user_id][-50:]
-    
-    def predict_next_queries(self, user_id: str, current_query: str, 
-                           limit: int = 5) -> List[Tuple[str, float]]:
-        """預測下一個查詢"""
-        predictions = []
-        
-        if self.strategy in [PrefetchStrategy.SEQUENTIAL, PrefetchStrategy.HYBRID]:
-            seq_predictions = self._sequential_prediction(user_id, current_query)
-            predictions.extend(seq_predictions)
-        
-        if self.strategy in [PrefetchStrategy.PATTERN_BASED, PrefetchStrategy.HYBRID]:
-            pattern_predictions = self._pattern_based_prediction(user_id, current_query)
-            predictions.extend(pattern_predictions)
-        
-        if self.strategy in [PrefetchStrategy.ML_PREDICTION, PrefetchStrategy.HYBRID]:
-            ml_predictions = self._ml_prediction(user_id, current_query)
-            predictions.extend(ml_predictions)
-        
-        # 合併和排序預測結果
-        prediction_scores = defaultdict(float)
-        for query, score in predictions:
-            prediction_scores[query] += score
-        
-        # 排序並返回top-k
-        sorted_predictions = sorted(
-            prediction_scores.items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )
-        
-        return sorted_predictions[:limit]
-    
-    def _sequential_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
-        """基於順序模式的預測"""
-        if user_id not in self.query_sequences:
-            return []
-        
-        sequences = self.query_sequences[user_id]
-        predictions = []
-        
-        # 查找當前查詢的出現位置
-        for i, query in enumerate(sequences[:-1]):
-            if query == current_query:
-                next_query = sequences[i + 1]
-                predictions.append((next_query, 0.6))  # 基礎權重
-        
-        return predictions
-    
-    def _pattern_based_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
-        """基於模式的預測"""
-        if user_id not in self.temporal_patterns:
-            return []
-        
-        patterns = self.temporal_patterns[user_id]
-        current_time = time.time()
-        predictions = []
-        
-        # 分析時間模式
-        time_based_patterns = defaultdict(list)
-        for timestamp, query in patterns:
-            hour_of_day = datetime.fromtimestamp(timestamp).hour
-            day_of_week = datetime.fromtimestamp(timestamp).weekday()
-            
-            time_based_patterns[(hour_of_day, day_of_week)].append(query)
-        
-        # 基於當前時間預測
-        current_hour = datetime.fromtimestamp(current_time).hour
-        current_day = datetime.fromtimestamp(current_time).weekday()
-        
-        if (current_hour, current_day) in time_based_patterns:
-            common_queries = time_based_patterns[(current_hour, current_day)]
-            query_counts = defaultdict(int)
-            for query in common_queries:
-                query_counts[query] += 1
-            
-            total_count = sum(query_counts.values())
-            for query, count in query_counts.items():
-                if query != current_query:
-                    probability = count / total_count
-                    predictions.append((query, probability * 0.4))  # 時間模式權重
-        
-        return predictions
-    
-    def _ml_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
-        """基於機器學習的預測（簡化版本）"""
-        # 這是一個簡化的ML預測，實際應該使用更複雜的模型
-        if user_id not in self.access_patterns:
-            return []
-        
-        # 特徵提取
-        recent_queries = list(self.access_patterns[user_id])[-10:]
-        if not recent_queries:
-            return []
-        
-        # 計算查詢相關性
-        correlations = {}
-        for timestamp, query in recent_queries:
-            if query != current_query:
-                # 簡單的相關性計算（基於共現頻率）
-                correlation_key = (current_query, query)
-                if correlation_key in self.correlation_matrix:
-                    correlations[query] = self.correlation_matrix[correlation_key]
-        
-        predictions = [(query, score * 0.3) for query, score in correlations.items()]
-        return predictions
-    
-    def update_success_rate(self, user_id: str, predicted_query: str, was_accessed: bool):
-        """更新預測成功率"""
-        key = f"{user_id}:{predicted_query}"
-        if key not in self.prefetch_success_rate:
-            self.prefetch_success_rate[key] = 0.5  # 初始值
-        
-        # 簡單的移動平均更新
-        current_rate = self.prefetch_success_rate[key]
-        if was_accessed:
-            self.prefetch_success_rate[key] = current_rate * 0.9 + 0.1
-        else:
-            self.prefetch_success_rate[key] = current_rate * 0.9
-
 class CacheWarmer:
     """緩存預熱器"""
     
@@ -531,7 +260,11 @@ class MultiLevelCache:
         """根據標籤失效緩存"""
         async with self._lock:
             for level in self.levels.values():
-                if isinstance(level, dict):
+                if isinstance(level, ARCCache):
+                    for key, entry in level.entries():
+                        if entry.tags & tags:
+                            level.pop(key)
+                elif isinstance(level, dict):
                     keys_to_remove = []
                     for key, entry in level.items():
                         if isinstance(entry, CacheEntry) and entry.tags & tags:
@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+JsonlLogStore - 追加式JSONL日誌存儲
+天工 (TianGong) - 為ART JSON後端提供可持久化的追加日誌與記憶體索引
+
+此模組提供：
+1. JsonlLogStore - 追加式 JSONL 日誌（put / patch / delete 操作記錄）
+2. 記憶體主鍵表與次級雜湊索引，查詢透過索引交集而非全表掃描
+3. 群組提交 (group commit) - 併發寫入合併為一次 write + fsync
+4. 背景壓縮 - 重寫存活記錄至臨時檔，fsync 後以 os.replace 原子替換
+5. 快照模式 - 日誌作為 WAL，定期把狀態寫入快照檔並截斷 WAL
+6. 舊版單一 JSON 檔案的首次載入遷移
+7. SortedIndex - 可做範圍查詢與計數的排序索引
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple, Callable
+from datetime import datetime
+from pathlib import Path
+import bisect
+import json
+import os
+import time
+import asyncio
+import logging
+
+from .storage_base import StorageException
+
+# 日誌操作類型
+OP_PUT = "put"
+OP_PATCH = "patch"
+OP_DELETE = "delete"
+
+
+def _encode_entry(entry: Dict[str, Any]) -> bytes:
+    """序列化單筆日誌記錄為一行 JSONL"""
+    return (json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str) + "\n").encode('utf-8')
+
+
+def _fsync_directory(path: Path):
+    """fsync 目錄，確保 rename 結果落盤（不支援的平台忽略）"""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _MaxKey:
+    """比任何主鍵都大的哨兵，用於排序索引的區間上界"""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_MAX_KEY = _MaxKey()
+
+
+class SortedIndex:
+    """排序索引：維護 (值, 主鍵) 的有序列表，支援範圍查詢與計數"""
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, value: Any, key: str):
+        bisect.insort(self._entries, (value, key))
+
+    def remove(self, value: Any, key: str):
+        position = bisect.bisect_left(self._entries, (value, key))
+        if position < len(self._entries) and self._entries[position] == (value, key):
+            del self._entries[position]
+
+    def _bounds(self, low: Any, high: Any) -> Tuple[int, int]:
+        # (值,) 排在同值所有項目之前，(值, _MAX_KEY) 排在同值所有項目之後
+        start = 0 if low is None else bisect.bisect_left(self._entries, (low,))
+        end = len(self._entries) if high is None else bisect.bisect_right(self._entries, (high, _MAX_KEY), lo=start)
+        return start, end
+
+    def range(self, low: Any = None, high: Any = None, descending: bool = False) -> List[str]:
+        """取得值在 [low, high] 區間內的主鍵（依值排序）"""
+        start, end = self._bounds(low, high)
+        keys = [key for _, key in self._entries[start:end]]
+        if descending:
+            keys.reverse()
+        return keys
+
+    def count_range(self, low: Any = None, high: Any = None) -> int:
+        """計算值在 [low, high] 區間內的筆數"""
+        start, end = self._bounds(low, high)
+        return end - start
+
+
+# 狀態變更監聽器：(主鍵, 舊記錄, 新記錄)，新增時舊記錄為 None，刪除時新記錄為 None
+ChangeListener = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+
+
+class JsonlLogStore:
+    """追加式 JSONL 日誌存儲
+
+    每一行是一筆操作記錄 ``{"op": "put|patch|delete", "id": ..., "data": {...}}``。
+    載入時重播日誌重建記憶體狀態；寫入先 fsync 落盤再套用到記憶體，
+    因此讀取方永遠只會看到已持久化的數據。
+
+    指定 snapshot_path 時日誌作為 WAL：載入時先讀快照再重播 WAL，
+    壓縮改為寫出快照（與舊版整檔 JSON 相同格式）並把 WAL 截斷為快照後的尾段。
+    """
+
+    def __init__(self, log_path: Path, key_field: str,
+                 index_fields: Optional[List[str]] = None,
+                 legacy_json_path: Optional[Path] = None,
+                 legacy_collection: Optional[str] = None,
+                 fsync: bool = True,
+                 compaction_ratio: float = 0.5,
+                 compaction_min_bytes: int = 8 * 1024 * 1024,
+                 compaction_interval_seconds: float = 60.0,
+                 snapshot_path: Optional[Path] = None,
+                 snapshot_every_entries: int = 10000,
+                 logger: Optional[logging.Logger] = None):
+        self.log_path = Path(log_path)
+        self.key_field = key_field
+        self.index_fields = list(index_fields or [])
+        self.legacy_json_path = Path(legacy_json_path) if legacy_json_path else None
+        self.legacy_collection = legacy_collection
+        self.fsync = fsync
+        self.compaction_ratio = compaction_ratio
+        self.compaction_min_bytes = compaction_min_bytes
+        self.compaction_interval_seconds = compaction_interval_seconds
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.snapshot_every_entries = snapshot_every_entries
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        # 記憶體狀態
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {name: {} for name in self.index_fields}
+        self._listeners: List[ChangeListener] = []
+        self._last_snapshot_at = time.time()
+
+        # 日誌狀態
+        self._file = None
+        self._log_entries = 0
+        self._log_bytes = 0
+
+        # 寫入協調
+        self._io_lock = asyncio.Lock()
+        self._pending: List[Tuple[bytes, Dict[str, Any], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+        # 背景壓縮
+        self._compaction_task: Optional[asyncio.Task] = None
+        self._compaction_event = asyncio.Event()
+        self._opened = False
+        self._closing = False
+
+        # 統計
+        self._stats = {
+            'writes': 0,
+            'flushes': 0,
+            'compactions': 0,
+            'last_compaction_at': None,
+            'last_compaction_ms': 0.0,
+            'corrupt_lines_skipped': 0
+        }
+
+    # ==================== 生命週期 ====================
+
+    async def open(self):
+        """開啟日誌：必要時遷移舊版 JSON，重播日誌並啟動背景壓縮"""
+        if self._opened:
+            return
+
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self._load)
+        self._opened = True
+        self._closing = False
+
+        if self.compaction_interval_seconds and self.compaction_interval_seconds > 0:
+            self._compaction_task = asyncio.create_task(self._compaction_loop())
+
+        self.logger.info(
+            f"✅ JSONL log opened: {self.log_path.name} "
+            f"({len(self._records)} live records, {self._log_entries} log entries)"
+        )
+
+    async def close(self):
+        """等待待寫入資料落盤並關閉日誌"""
+        if not self._opened:
+            return
+
+        if self._flush_task and not self._flush_task.done():
+            await self._flush_task
+
+        if self._compaction_task:
+            # 以旗標通知結束；wait_for 在事件同時觸發時可能吞掉 cancel
+            self._closing = True
+            self._compaction_event.set()
+            await self._compaction_task
+            self._compaction_task = None
+
+        async with self._io_lock:
+            if self._file:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+
+        self._opened = False
+
+    def add_listener(self, listener: ChangeListener):
+        """註冊狀態變更監聽器（需在 open 前註冊才能收到重播事件）"""
+        self._listeners.append(listener)
+
+    def _load(self):
+        """載入日誌（在工作執行緒中執行）"""
+        if self.snapshot_path is not None:
+            self._load_snapshot()
+        elif not self.log_path.exists():
+            self._migrate_legacy_json()
+
+        if self.log_path.exists():
+            self._replay()
+
+        self._file = open(self.log_path, 'ab')
+        self._log_bytes = self._file.tell()
+
+    def _migrate_legacy_json(self):
+        """將舊版整檔 JSON 一次性轉換為 JSONL 日誌"""
+        if not self.legacy_json_path or not self.legacy_json_path.exists():
+            return
+
+        try:
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            raise StorageException(f"Failed to read legacy JSON store {self.legacy_json_path}: {e}")
+
+        rows = legacy.get(self.legacy_collection, {}) if self.legacy_collection else legacy
+        entries = (
+            {'op': OP_PUT, 'id': key, 'data': value}
+            for key, value in rows.items()
+        )
+        self._write_atomically(entries)
+        self.logger.info(f"✅ Migrated {len(rows)} records from {self.legacy_json_path.name}")
+
+    def _load_snapshot(self):
+        """載入快照（與舊版整檔 JSON 格式相容）"""
+        if not self.snapshot_path.exists():
+            return
+
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            raise StorageException(f"Failed to read snapshot {self.snapshot_path}: {e}")
+
+        rows = snapshot.get(self.legacy_collection, {}) if self.legacy_collection else snapshot
+        for key, data in rows.items():
+            self._store(key, data)
+
+    def _replay(self):
+        """重播日誌重建記憶體狀態，並截斷崩潰造成的殘缺尾行"""
+        good_offset = 0
+        truncate_at = None
+
+        with open(self.log_path, 'rb') as f:
+            for raw in f:
+                line_end = good_offset + len(raw)
+                if not raw.endswith(b"\n"):
+                    # 最後一行未寫完（寫入中途崩潰），丟棄
+                    truncate_at = good_offset
+                    break
+
+                stripped = raw.strip()
+                if stripped:
+                    try:
+                        entry = json.loads(stripped)
+                    except ValueError:
+                        self._stats['corrupt_lines_skipped'] += 1
+                        self.logger.warning(f"Skipping corrupt log line at offset {good_offset}")
+                    else:
+                        self._apply(entry)
+                        self._log_entries += 1
+
+                good_offset = line_end
+
+        if truncate_at is not None:
+            self.logger.warning(f"Truncating torn tail of {self.log_path.name} at offset {truncate_at}")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(truncate_at)
+                f.flush()
+                os.fsync(f.fileno())
+
+    # ==================== 讀取介面 ====================
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._records
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """取得記錄（回傳共享字典，呼叫方不可修改）"""
+        return self._records.get(key)
+
+    def lookup(self, filters: Dict[str, Optional[Iterable[Any]]]) -> Optional[Set[str]]:
+        """以次級索引求出候選主鍵集合
+
+        filters 的鍵為欄位名，值為允許值列表；值為 None 或空列表表示不限制。
+        主鍵欄位直接查主表。回傳 None 表示沒有任何索引條件（需遍歷全部記錄）。
+        """
+        candidate_sets: List[Set[str]] = []
+
+        for field_name, values in filters.items():
+            if not values:
+                continue
+
+            if field_name == self.key_field:
+                candidate_sets.append({v for v in values if v in self._records})
+            elif field_name in self._indexes:
+                index = self._indexes[field_name]
+                matched: Set[str] = set()
+                for value in values:
+                    matched.update(index.get(value, ()))
+                candidate_sets.append(matched)
+            else:
+                raise StorageException(f"Field '{field_name}' is not indexed")
+
+        if not candidate_sets:
+            return None
+
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for other in candidate_sets[1:]:
+            if not result:
+                break
+            result &= other
+        return result
+
+    def iter_records(self, keys: Optional[Iterable[str]] = None) -> Iterable[Dict[str, Any]]:
+        """遍歷記錄；keys 為 None 時遍歷全部"""
+        if keys is None:
+            return list(self._records.values())
+        records = self._records
+        return [records[k] for k in keys if k in records]
+
+    # ==================== 寫入介面 ====================
+
+    async def put(self, data: Dict[str, Any]):
+        """寫入（新增或覆蓋）一筆記錄"""
+        key = data.get(self.key_field)
+        if key is None:
+            raise StorageException(f"Record is missing key field '{self.key_field}'")
+        await self._append({'op': OP_PUT, 'id': key, 'data': data})
+
+    async def patch(self, key: str, updates: Dict[str, Any]) -> bool:
+        """部分更新記錄，記錄不存在時回傳 False"""
+        if key not in self._records:
+            return False
+        return await self._append({'op': OP_PATCH, 'id': key, 'data': updates})
+
+    async def delete(self, key: str) -> bool:
+        """刪除記錄，記錄不存在時回傳 False"""
+        if key not in self._records:
+            return False
+        return await self._append({'op': OP_DELETE, 'id': key})
+
+    async def _append(self, entry: Dict[str, Any]) -> bool:
+        """排入群組提交佇列並等待落盤"""
+        if not self._opened:
+            raise StorageException(f"JSONL log {self.log_path.name} is not open")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((_encode_entry(entry), entry, future))
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_pending())
+
+        return await future
+
+    async def _flush_pending(self):
+        """把佇列中的所有寫入合併為一次 write + fsync，再依序套用到記憶體"""
+        async with self._io_lock:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                payload = b"".join(line for line, _, _ in batch)
+
+                try:
+                    await asyncio.to_thread(self._write_batch, payload)
+                except Exception as e:
+                    error = StorageException(f"JSONL append failed: {e}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+
+                self._log_entries += len(batch)
+                self._stats['writes'] += len(batch)
+                self._stats['flushes'] += 1
+
+                for _, entry, future in batch:
+                    applied = self._apply(entry)
+                    if not future.done():
+                        future.set_result(applied)
+
+        if self._needs_compaction():
+            self._compaction_event.set()
+
+    def _write_batch(self, payload: bytes):
+        """追加寫入並 fsync；失敗時截斷回寫入前位置，避免留下半行"""
+        start = self._log_bytes
+        try:
+            self._file.write(payload)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except Exception:
+            try:
+                self._file.truncate(start)
+                self._file.flush()
+            except OSError:
+                pass
+            raise
+        self._log_bytes = start + len(payload)
+
+    # ==================== 狀態套用與索引維護 ====================
+
+    def _apply(self, entry: Dict[str, Any]) -> bool:
+        """套用一筆日誌記錄到記憶體狀態"""
+        op = entry.get('op')
+        key = entry.get('id')
+
+        if op == OP_PUT:
+            self._store(key, entry.get('data') or {})
+            return True
+
+        if op == OP_PATCH:
+            current = self._records.get(key)
+            if current is None:
+                return False
+            # 產生新字典而非原地修改，壓縮時的快照因此保持不變
+            self._store(key, {**current, **(entry.get('data') or {})})
+            return True
+
+        if op == OP_DELETE:
+            current = self._records.pop(key, None)
+            if current is None:
+                return False
+            self._unindex(key, current)
+            for listener in self._listeners:
+                listener(key, current, None)
+            return True
+
+        self.logger.warning(f"Unknown log op '{op}' ignored")
+        return False
+
+    def _store(self, key: str, data: Dict[str, Any]):
+        previous = self._records.get(key)
+        if previous is not None:
+            self._unindex(key, previous)
+        self._records[key] = data
+        self._index(key, data)
+        for listener in self._listeners:
+            listener(key, previous, data)
+
+    def _index(self, key: str, data: Dict[str, Any]):
+        for field_name, index in self._indexes.items():
+            value = data.get(field_name)
+            if value is None or isinstance(value, (dict, list)):
+                continue
+            index.setdefault(value, set()).add(key)
+
+    def _unindex(self, key: str, data: Dict[str, Any]):
+        for field_name, index in self._indexes.items():
+            value = data.get(field_name)
+            if value is None or isinstance(value, (dict, list)):
+                continue
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    # ==================== 壓縮 ====================
+
+    def _needs_compaction(self) -> bool:
+        if self.snapshot_path is not None:
+            # WAL 模式：累積足夠筆數或距上次快照超過間隔即寫快照
+            if self._log_entries == 0:
+                return False
+            return (self._log_entries >= self.snapshot_every_entries or
+                    time.time() - self._last_snapshot_at >= self.compaction_interval_seconds)
+
+        if self._log_bytes < self.compaction_min_bytes or self._log_entries == 0:
+            return False
+        dead = self._log_entries - len(self._records)
+        return dead / self._log_entries >= self.compaction_ratio
+
+    async def _compaction_loop(self):
+        """背景壓縮任務：定期或在寫入後觸發時檢查門檻"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._compaction_event.wait(), timeout=self.compaction_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._compaction_event.clear()
+
+            if self._closing or not self._needs_compaction():
+                continue
+            try:
+                await self.compact()
+            except Exception as e:
+                self.logger.error(f"❌ JSONL compaction failed for {self.log_path.name}: {e}")
+
+    async def compact(self) -> Dict[str, Any]:
+        """壓縮日誌，只保留每筆存活記錄的最新版本
+
+        1. 持鎖取得記憶體快照與日誌偏移量
+        2. 不持鎖寫出快照到臨時檔並 fsync（寫入可繼續追加到舊日誌）
+        3. 持鎖把快照後新增的日誌尾段複製過去，fsync 後 os.replace 原子替換
+        """
+        if not self._opened:
+            raise StorageException(f"JSONL log {self.log_path.name} is not open")
+
+        started = time.perf_counter()
+        tmp_path = self.log_path.with_suffix(self.log_path.suffix + ".compact")
+
+        async with self._io_lock:
+            snapshot = list(self._records.items())
+            snapshot_offset = self._log_bytes
+            entries_before = self._log_entries
+
+        if self.snapshot_path is not None:
+            await asyncio.to_thread(self._write_snapshot_document, snapshot)
+
+            async with self._io_lock:
+                tail_entries = self._log_entries - entries_before
+                await asyncio.to_thread(self._truncate_wal, tmp_path, snapshot_offset)
+                self._log_entries = tail_entries
+        else:
+            snapshot_bytes = await asyncio.to_thread(self._write_snapshot, tmp_path, snapshot)
+
+            async with self._io_lock:
+                tail_entries = self._log_entries - entries_before
+                await asyncio.to_thread(self._swap_in_snapshot, tmp_path, snapshot_offset, snapshot_bytes)
+                self._log_entries = len(snapshot) + tail_entries
+
+        self._last_snapshot_at = time.time()
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        self._stats['compactions'] += 1
+        self._stats['last_compaction_at'] = time.time()
+        self._stats['last_compaction_ms'] = duration_ms
+
+        self.logger.info(
+            f"✅ Compacted {self.log_path.name}: {entries_before} -> {self._log_entries} entries "
+            f"in {duration_ms:.1f}ms"
+        )
+        return self.get_stats()
+
+    def _write_snapshot(self, tmp_path: Path, snapshot: List[Tuple[str, Dict[str, Any]]]) -> int:
+        entries = ({'op': OP_PUT, 'id': key, 'data': data} for key, data in snapshot)
+        return self._write_file(tmp_path, entries)
+
+    def _write_snapshot_document(self, snapshot: List[Tuple[str, Dict[str, Any]]]):
+        """寫出快照文件；先於 WAL 截斷落盤，崩潰時重播完整舊 WAL 仍得到最新狀態"""
+        rows = dict(snapshot)
+        document = {
+            'version': '1.0.0',
+            'created_at': datetime.now().isoformat(),
+            self.legacy_collection: rows
+        } if self.legacy_collection else rows
+
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, separators=(',', ':'), default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        _fsync_directory(self.snapshot_path.parent)
+
+    def _truncate_wal(self, tmp_path: Path, snapshot_offset: int):
+        """以快照後的尾段取代 WAL"""
+        with open(tmp_path, 'wb'):
+            pass
+        self._swap_in_snapshot(tmp_path, snapshot_offset, 0)
+
+    def _swap_in_snapshot(self, tmp_path: Path, snapshot_offset: int, snapshot_bytes: int):
+        # 快照期間追加的尾段照原樣接到新檔尾部
+        with open(self.log_path, 'rb') as src, open(tmp_path, 'ab') as dst:
+            src.seek(snapshot_offset)
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+            new_size = dst.tell()
+
+        self._file.close()
+        os.replace(tmp_path, self.log_path)
+        _fsync_directory(self.log_path.parent)
+
+        self._file = open(self.log_path, 'ab')
+        self._log_bytes = new_size
+
+    def _write_atomically(self, entries: Iterable[Dict[str, Any]]):
+        """寫入臨時檔後原子替換日誌"""
+        tmp_path = self.log_path.with_suffix(self.log_path.suffix + ".tmp")
+        self._write_file(tmp_path, entries)
+        os.replace(tmp_path, self.log_path)
+        _fsync_directory(self.log_path.parent)
+
+    @staticmethod
+    def _write_file(path: Path, entries: Iterable[Dict[str, Any]]) -> int:
+        written = 0
+        buffer: List[bytes] = []
+        with open(path, 'wb') as f:
+            for entry in entries:
+                buffer.append(_encode_entry(entry))
+                if len(buffer) >= 4096:
+                    chunk = b"".join(buffer)
+                    f.write(chunk)
+                    written += len(chunk)
+                    buffer = []
+            if buffer:
+                chunk = b"".join(buffer)
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return written
+
+    # ==================== 統計 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得日誌統計"""
+        return {
+            'log_path': str(self.log_path),
+            'live_records': len(self._records),
+            'log_entries': self._log_entries,
+            'dead_entries': self._log_entries - len(self._records),
+            'log_bytes': self._log_bytes,
+            'indexed_fields': list(self.index_fields),
+            'pending_writes': len(self._pending),
+            **self._stats
+        }
@@ -6,6 +6,7 @@ Pagination Optimizations - 分頁查詢和批次處理優化
 此模組提供：
 1. PaginationManager - 高效分頁管理
 2. CursorPagination - 基於游標的分頁
+   KeysetPagination - 基於 (排序鍵, id) 的鍵集分頁，深頁成本與首頁相同
 3. BatchQueryProcessor - 批次查詢處理器
 4. SmartCaching - 智能分頁緩存
 5. AdaptiveBatching - 自適應批次大小
@@ -14,7 +15,7 @@ Pagination Optimizations - 分頁查詢和批次處理優化
 
 from typing import Dict, Any, List, Optional, Union, Tuple, AsyncGenerator, Callable
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from enum import Enum
 import asyncio
 import json
@@ -23,7 +24,16 @@ import hashlib
 import logging
 import math
 from collections import defaultdict, OrderedDict
+from decimal import Decimal
+import base64
 import bisect
+import uuid
+
+try:
+    from sqlalchemy import and_ as sa_and, text as sa_text, tuple_ as sa_tuple
+    SQLALCHEMY_AVAILABLE = True
+except ImportError:
+    SQLALCHEMY_AVAILABLE = False
 
 class PaginationType(Enum):
     """分頁類型"""
@@ -236,6 +246,339 @@ class CursorPagination:
         order = "DESC" if self.order_desc else "ASC"
         return f"{self.cursor_field} {order}"
 
+def _encode_keyset_value(value: Any) -> Any:
+    """將排序鍵轉為可JSON序列化的標記值（保留類型以便還原比較）"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    if isinstance(value, uuid.UUID):
+        return {'$uuid': str(value)}
+    return value
+
+def _decode_keyset_value(value: Any) -> Any:
+    """還原 _encode_keyset_value 的標記值"""
+    if isinstance(value, dict) and len(value) == 1:
+        tag, raw = next(iter(value.items()))
+        if tag == '$dt':
+            return datetime.fromisoformat(raw)
+        if tag == '$d':
+            return date.fromisoformat(raw)
+        if tag == '$dec':
+            return Decimal(raw)
+        if tag == '$uuid':
+            return uuid.UUID(raw)
+    return value
+
+def keyset_fingerprint(*parts: Any) -> str:
+    """查詢條件指紋：游標只能在產生它的同一組篩選條件下使用"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+@dataclass
+class KeysetCursor:
+    """鍵集游標：(排序鍵, id) 組合位置，對客戶端不透明"""
+    sort_value: Any
+    id_value: Any
+    sort_field: str
+    order_desc: bool = True
+    backward: bool = False              # True 表示向前一頁翻
+    fingerprint: Optional[str] = None   # 篩選條件指紋
+    total_count: Optional[int] = None   # 首頁計算的總數快照
+    
+    def encode(self) -> str:
+        """編碼為URL安全的不透明字串"""
+        payload = {
+            'f': self.sort_field,
+            's': _encode_keyset_value(self.sort_value),
+            'i': _encode_keyset_value(self.id_value),
+            'd': 1 if self.order_desc else 0,
+            'b': 1 if self.backward else 0
+        }
+        if self.fingerprint:
+            payload['q'] = self.fingerprint
+        if self.total_count is not None:
+            payload['t'] = self.total_count
+        raw = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @classmethod
+    def decode(cls, token: str) -> 'KeysetCursor':
+        """解碼游標字串"""
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            return cls(
+                sort_value=_decode_keyset_value(payload['s']),
+                id_value=_decode_keyset_value(payload['i']),
+                sort_field=payload['f'],
+                order_desc=bool(payload.get('d', 1)),
+                backward=bool(payload.get('b', 0)),
+                fingerprint=payload.get('q'),
+                total_count=payload.get('t')
+            )
+        except Exception as e:
+            raise ValueError(f"Invalid keyset cursor: {e}")
+
+@dataclass
+class KeysetPage:
+    """鍵集分頁結果"""
+    items: List[Any] = field(default_factory=list)
+    page_size: int = 100
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+    has_next: bool = False
+    has_previous: bool = False
+    total_count: Optional[int] = None
+    estimated_count: bool = False
+
+class KeysetPagination:
+    """鍵集分頁實現
+    
+    以 (排序鍵, id) 作為翻頁位置，查詢條件為 (sort, id) < (?, ?) 並配合
+    ORDER BY sort, id LIMIT n+1，可直接走 (sort, id) 複合索引；
+    任何深度的頁面成本都與第一頁相同。id 欄位須唯一且非空。
+    """
+    
+    def __init__(self,
+                 sort_field: str = "created_at",
+                 id_field: str = "id",
+                 order_desc: bool = True,
+                 fingerprint: Optional[str] = None):
+        self.sort_field = sort_field
+        self.id_field = id_field
+        self.order_desc = order_desc
+        self.fingerprint = fingerprint
+    
+    def decode(self, token: Optional[str]) -> Optional[KeysetCursor]:
+        """解碼並校驗游標是否屬於目前的排序與篩選條件"""
+        if not token:
+            return None
+        cursor = KeysetCursor.decode(token)
+        if cursor.sort_field != self.sort_field or cursor.order_desc != self.order_desc:
+            raise ValueError("Keyset cursor does not match the requested sort order")
+        if self.fingerprint and cursor.fingerprint != self.fingerprint:
+            raise ValueError("Keyset cursor does not match the requested filters")
+        return cursor
+    
+    def comparison_operator(self, cursor: Optional[KeysetCursor]) -> str:
+        """游標方向對應的比較運算子（向後翻頁時反轉）"""
+        backward = bool(cursor and cursor.backward)
+        return '<' if self.order_desc != backward else '>'
+    
+    def build_condition(self,
+                        cursor: KeysetCursor,
+                        placeholder: str = "?",
+                        row_values: bool = True) -> Tuple[str, List[Any]]:
+        """構建游標條件
+        
+        row_values=True 時使用行值比較（SQLite 3.15+、PostgreSQL），
+        否則展開為 sort < ? OR (sort = ? AND id < ?)。
+        """
+        op = self.comparison_operator(cursor)
+        if row_values:
+            condition = f"({self.sort_field}, {self.id_field}) {op} ({placeholder}, {placeholder})"
+            return condition, [cursor.sort_value, cursor.id_value]
+        condition = (
+            f"({self.sort_field} {op} {placeholder} OR "
+            f"({self.sort_field} = {placeholder} AND {self.id_field} {op} {placeholder}))"
+        )
+        return condition, [cursor.sort_value, cursor.sort_value, cursor.id_value]
+    
+    def get_order_clause(self, cursor: Optional[KeysetCursor] = None) -> str:
+        """獲取排序子句（向後翻頁時反向掃描，結果再翻轉）"""
+        backward = bool(cursor and cursor.backward)
+        order = "DESC" if self.order_desc != backward else "ASC"
+        return f"{self.sort_field} {order}, {self.id_field} {order}"
+    
+    @staticmethod
+    def _field_value(record: Any, field_name: str) -> Any:
+        if isinstance(record, dict):
+            return record.get(field_name)
+        return getattr(record, field_name)
+    
+    def make_cursor(self, record: Any, backward: bool = False,
+                    total_count: Optional[int] = None) -> str:
+        """以記錄位置生成游標"""
+        return KeysetCursor(
+            sort_value=self._field_value(record, self.sort_field),
+            id_value=self._field_value(record, self.id_field),
+            sort_field=self.sort_field,
+            order_desc=self.order_desc,
+            backward=backward,
+            fingerprint=self.fingerprint,
+            total_count=total_count
+        ).encode()
+    
+    def build_page(self,
+                   rows: List[Any],
+                   page_size: int,
+                   cursor: Optional[KeysetCursor] = None,
+                   total_count: Optional[int] = None) -> KeysetPage:
+        """由 LIMIT page_size+1 的查詢結果組裝分頁結果
+        
+        total_count 為 None 時沿用游標攜帶的總數快照（標記為估計值）。
+        """
+        has_more = len(rows) > page_size
+        items = list(rows[:page_size])
+        backward = bool(cursor and cursor.backward)
+        if backward:
+            items.reverse()
+        
+        estimated = False
+        if total_count is None and cursor is not None and cursor.total_count is not None:
+            total_count = cursor.total_count
+            estimated = True
+        
+        if backward:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+        
+        next_cursor = prev_cursor = None
+        if items:
+            if has_next:
+                next_cursor = self.make_cursor(items[-1], total_count=total_count)
+            if has_previous:
+                prev_cursor = self.make_cursor(items[0], backward=True, total_count=total_count)
+        
+        return KeysetPage(
+            items=items,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            has_next=has_next,
+            has_previous=has_previous,
+            total_count=total_count,
+            estimated_count=estimated
+        )
+
+def _sqlalchemy_column_nullable(column: Any) -> bool:
+    """判斷 ORM 欄位是否可為空（無法判斷時視為可空）"""
+    try:
+        return bool(column.property.columns[0].nullable)
+    except (AttributeError, IndexError):
+        return bool(getattr(column, 'nullable', True))
+
+def _coerce_sqlalchemy_value(column: Any, value: Any) -> Any:
+    """將游標值還原為欄位類型（Enum 欄位以 value 還原為枚舉成員）"""
+    if value is None:
+        return None
+    enum_class = getattr(getattr(column, 'type', None), 'enum_class', None)
+    if enum_class is not None and not isinstance(value, enum_class):
+        return enum_class(value)
+    return value
+
+def keyset_segments(keyset: KeysetPagination,
+                    sort_column: Any,
+                    id_column: Any,
+                    cursor: Optional[KeysetCursor]) -> List[Tuple[Optional[Any], List[Any]]]:
+    """為 SQLAlchemy 查詢構建依序掃描的 (游標條件, 排序子句) 區段
+    
+    非空排序鍵只有一個區段，使用 tuple_(sort, id) 行值比較。可空排序鍵的
+    NULL 固定排在前進方向的末端，拆成「非空區段」與「NULL 區段（按 id）」
+    兩次掃描，避免 NULLS LAST / OR 條件讓 (sort, id) 複合索引失效。
+    """
+    if not SQLALCHEMY_AVAILABLE:
+        raise RuntimeError("SQLAlchemy is required for keyset_segments")
+    
+    backward = bool(cursor and cursor.backward)
+    descending = keyset.order_desc != backward
+    
+    def _after(column, value):
+        return column < value if descending else column > value
+    
+    def _ordered(column):
+        return column.desc() if descending else column.asc()
+    
+    value_order = [_ordered(sort_column), _ordered(id_column)]
+    sort_value = id_value = None
+    if cursor is not None:
+        sort_value = _coerce_sqlalchemy_value(sort_column, cursor.sort_value)
+        id_value = _coerce_sqlalchemy_value(id_column, cursor.id_value)
+    
+    if not _sqlalchemy_column_nullable(sort_column):
+        if cursor is None:
+            return [(None, value_order)]
+        return [(_after(sa_tuple(sort_column, id_column), sa_tuple(sort_value, id_value)), value_order)]
+    
+    null_order = [_ordered(id_column)]
+    values_segment = sort_column.isnot(None)
+    if cursor is not None and sort_value is not None:
+        values_segment = sa_and(
+            values_segment, _after(sa_tuple(sort_column, id_column), sa_tuple(sort_value, id_value))
+        )
+    nulls_segment = sort_column.is_(None)
+    if cursor is not None and sort_value is None:
+        nulls_segment = sa_and(nulls_segment, _after(id_column, id_value))
+    
+    if backward:
+        # 反向掃描：NULL 區段在前（僅當游標位於 NULL 區段內）
+        if sort_value is None:
+            return [(nulls_segment, null_order), (values_segment, value_order)]
+        return [(values_segment, value_order)]
+    if cursor is not None and sort_value is None:
+        return [(nulls_segment, null_order)]
+    return [(values_segment, value_order), (nulls_segment, null_order)]
+
+def estimate_query_count(session: Any, query: Any) -> Optional[int]:
+    """以 PostgreSQL 查詢計劃估算行數（其他資料庫返回 None）"""
+    if not SQLALCHEMY_AVAILABLE:
+        return None
+    try:
+        bind = session.get_bind()
+        if bind.dialect.name != 'postgresql':
+            return None
+        statement = query.statement if hasattr(query, 'statement') else query
+        compiled = statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = session.execute(sa_text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"Count estimation failed: {e}")
+        return None
+
+def keyset_paginate_query(query: Any,
+                          keyset: KeysetPagination,
+                          sort_column: Any,
+                          id_column: Any,
+                          page_size: int,
+                          cursor: Optional[str] = None,
+                          count_mode: str = "exact") -> KeysetPage:
+    """對 SQLAlchemy ORM Query 執行鍵集分頁
+    
+    count_mode:
+        exact    - 首頁執行 COUNT，後續頁沿用游標中的總數快照
+        estimate - 首頁使用 PostgreSQL 計劃估算（不可用時退回 exact）
+        none     - 不統計總數
+    """
+    keyset_cursor = keyset.decode(cursor)
+    
+    total_count = None
+    estimated = False
+    if keyset_cursor is None and count_mode != "none":
+        if count_mode == "estimate":
+            total_count = estimate_query_count(query.session, query)
+            estimated = total_count is not None
+        if total_count is None:
+            total_count = query.count()
+    
+    rows: List[Any] = []
+    for condition, order_by in keyset_segments(keyset, sort_column, id_column, keyset_cursor):
+        segment = query.filter(condition) if condition is not None else query
+        rows.extend(segment.order_by(None).order_by(*order_by).limit(page_size + 1 - len(rows)).all())
+        if len(rows) > page_size:
+            break
+    
+    page = keyset.build_page(rows, page_size, keyset_cursor, total_count)
+    page.estimated_count = page.estimated_count or estimated
+    return page
+
 class SmartPrefetcher:
     """智能預取器"""
     
@@ -429,8 +772,12 @@ class PaginationManager:
                             page_size: Optional[int] = None,
                             cursor: Optional[str] = None,
                             count_query: Optional[str] = None,
-                            executor: Optional[Callable] = None) -> PaginationResult:
-        """執行分頁查詢"""
+                            executor: Optional[Callable] = None,
+                            keyset: Optional[KeysetPagination] = None) -> PaginationResult:
+        """執行分頁查詢
+        
+        鍵集分頁時 sql 不應包含 ORDER BY / LIMIT，由 keyset 負責附加。
+        """
         
         if page_size is None:
             page_size = self.config.default_page_size
@@ -449,7 +796,12 @@ class PaginationManager:
         
         try:
             # 根據分頁類型執行查詢
-            if self.config.pagination_type == PaginationType.CURSOR and cursor:
+            use_keyset = keyset is not None or self.config.pagination_type == PaginationType.KEYSET
+            if use_keyset:
+                result = await self._keyset_paginate(
+                    sql, params, cursor, page_size, count_query, executor, keyset or KeysetPagination()
+                )
+            elif self.config.pagination_type == PaginationType.CURSOR and cursor:
                 result = await self._cursor_paginate(sql, params, cursor, page_size, executor)
             else:
                 result = await self._offset_paginate(sql, params, page, page_size, count_query, executor)
@@ -459,8 +811,8 @@ class PaginationManager:
             # 緩存結果
             self.cache.set(query_hash, page, page_size, result, cursor)
             
-            # 記錄訪問模式並觸發預取
-            if self.prefetcher:
+            # 記錄訪問模式並觸發預取（預取以頁碼為單位，不適用鍵集分頁）
+            if self.prefetcher and not use_keyset:
                 self.prefetcher.record_access(query_hash, page)
                 prefetch_pages = self.prefetcher.should_prefetch(query_hash, page)
                 if prefetch_pages:
@@ -575,6 +927,56 @@ class PaginationManager:
             self.logger.error(f"Cursor pagination failed: {e}")
             raise
     
+    async def _keyset_paginate(self,
+                               sql: str,
+                               params: List[Any],
+                               cursor: Optional[str],
+                               page_size: int,
+                               count_query: Optional[str],
+                               executor: Optional[Callable],
+                               keyset: KeysetPagination) -> PaginationResult:
+        """鍵集分頁（總數只在首頁統計，後續頁沿用游標快照）"""
+        
+        keyset_cursor = keyset.decode(cursor)
+        all_params = list(params or [])
+        keyset_sql = sql
+        
+        if keyset_cursor is not None:
+            condition, cursor_params = keyset.build_condition(keyset_cursor)
+            if "WHERE" in sql.upper():
+                keyset_sql = f"{sql} AND {condition}"
+            else:
+                keyset_sql = f"{sql} WHERE {condition}"
+            all_params.extend(cursor_params)
+        
+        keyset_sql += f" ORDER BY {keyset.get_order_clause(keyset_cursor)} LIMIT {page_size + 1}"
+        
+        records = []
+        if executor:
+            records, _ = await executor(keyset_sql, all_params)
+        
+        # use_estimated_count 時後續頁不再執行 COUNT
+        total_count = None
+        recount = keyset_cursor is None or not self.config.use_estimated_count
+        if recount and count_query and self.config.enable_count_optimization and executor:
+            count_result, _ = await executor(count_query, params)
+            total_count = count_result[0]['count'] if count_result else 0
+        
+        page = keyset.build_page(records, page_size, keyset_cursor, total_count)
+        total = page.total_count or 0
+        
+        return PaginationResult(
+            records=page.items,
+            page_size=page_size,
+            total_pages=math.ceil(total / page_size) if total > 0 else 0,
+            total_count=total,
+            estimated_count=page.estimated_count,
+            start_cursor=page.prev_cursor,
+            end_cursor=page.next_cursor,
+            has_previous=page.has_previous,
+            has_next=page.has_next
+        )
+    
     async def _prefetch_pages(self,
                              sql: str,
                              params: List[Any],
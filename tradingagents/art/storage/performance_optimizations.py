@@ -12,7 +12,8 @@ Performance Optimizations - 大規模數據檢索性能優化
 6. CacheLayer - 多層緩存系統
 """
 
-from typing import Dict, Any, List, Optional, Union, Tuple, AsyncGenerator
+from typing import Dict, Any, List, Optional, Union, Tuple, AsyncGenerator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -23,7 +24,7 @@ import time
 import hashlib
 import logging
 from pathlib import Path
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
 import threading
 import weakref
 
@@ -46,6 +47,7 @@ class ConnectionPoolConfig:
     connection_check_interval: float = 60.0  # 1分鐘
     enable_prepared_statements: bool = True
     query_cache_size: int = 1000
+    busy_timeout_ms: int = 5000
 
 @dataclass 
 class ConnectionMetrics:
@@ -64,27 +66,31 @@ class ConnectionMetrics:
 class Connection:
     """數據庫連接封裝"""
     
-    def __init__(self, db_path: str, connection_id: str):
+    def __init__(self, db_path: str, connection_id: str, config: Optional[ConnectionPoolConfig] = None):
         self.db_path = db_path
         self.connection_id = connection_id
+        self.config = config or ConnectionPoolConfig()
         self.connection: Optional[aiosqlite.Connection] = None
         self.created_at = time.time()
         self.last_used = time.time()
         self.query_count = 0
         self.is_busy = False
-        self.prepared_statements: Dict[str, Any] = {}
         
     async def connect(self) -> bool:
         """建立數據庫連接"""
         try:
             if self.connection is None:
-                self.connection = await aiosqlite.connect(self.db_path)
+                # sqlite3 以SQL文本為鍵快取已編譯語句；固定的查詢形狀可重用預編譯結果
+                statement_cache = self.config.query_cache_size if self.config.enable_prepared_statements else 0
+                self.connection = await aiosqlite.connect(self.db_path, cached_statements=statement_cache)
+                self.connection.row_factory = aiosqlite.Row
                 await self.connection.execute("PRAGMA journal_mode=WAL")
                 await self.connection.execute("PRAGMA synchronous=NORMAL")  
+                await self.connection.execute(f"PRAGMA busy_timeout={int(self.config.busy_timeout_ms)}")
                 await self.connection.execute("PRAGMA cache_size=-64000")  # 64MB cache
                 await self.connection.execute("PRAGMA temp_store=MEMORY")
                 await self.connection.execute("PRAGMA mmap_size=268435456")  # 256MB mmap
-                return True
+            return True
         except Exception as e:
             logging.error(f"Failed to connect to database: {e}")
             return False
@@ -99,34 +105,39 @@ class Connection:
         """執行查詢"""
         start_time = time.time()
         
-        try:
-            if not self.connection:
-                await self.connect()
-                
-            self.is_busy = True
-            self.last_used = time.time()
-            self.query_count += 1
+        if not self.connection:
+            await self.connect()
             
-            # 使用預編譯語句如果可能
-            if sql in self.prepared_statements:
-                cursor = await self.connection.execute_cached(sql, params or [])
-            else:
-                cursor = await self.connection.execute(sql, params or [])
-                
-            # 獲取結果
-            if sql.strip().upper().startswith(('SELECT', 'PRAGMA', 'EXPLAIN')):
-                self.connection.row_factory = aiosqlite.Row
-                rows = await cursor.fetchall()
-                results = [dict(row) for row in rows]
-            else:
-                await self.connection.commit()
-                results = []
-                
-            execution_time = (time.time() - start_time) * 1000
-            return results, execution_time
+        self.last_used = time.time()
+        self.query_count += 1
+        
+        cursor = await self.connection.execute(sql, params or [])
             
-        finally:
-            self.is_busy = False
+        # 獲取結果
+        if sql.strip().upper().startswith(('SELECT', 'PRAGMA', 'EXPLAIN')):
+            rows = await cursor.fetchall()
+            results = [dict(row) for row in rows]
+        else:
+            await self.connection.commit()
+            results = []
+            
+        execution_time = (time.time() - start_time) * 1000
+        return results, execution_time
+    
+    async def execute_batch(self, statements: List[Tuple[str, List[Sequence[Any]]]]):
+        """在單一交易內依序對每組語句執行 executemany"""
+        if not self.connection:
+            await self.connect()
+        
+        self.last_used = time.time()
+        try:
+            for sql, rows in statements:
+                await self.connection.executemany(sql, rows)
+                self.query_count += 1
+            await self.connection.commit()
+        except Exception:
+            await self.connection.rollback()
+            raise
             
     def is_expired(self, max_age: float) -> bool:
         """檢查連接是否過期"""
@@ -146,6 +157,7 @@ class ConnectionPool:
         self.metrics = ConnectionMetrics()
         self.status = ConnectionPoolStatus.INITIALIZING
         self._lock = asyncio.Lock()
+        self._available = asyncio.Condition(self._lock)
         self._connection_counter = 0
         self._maintenance_task: Optional[asyncio.Task] = None
         
@@ -178,7 +190,7 @@ class ConnectionPool:
         self._connection_counter += 1
         connection_id = f"conn_{self._connection_counter}"
         
-        connection = Connection(self.db_path, connection_id)
+        connection = Connection(self.db_path, connection_id, self.config)
         if await connection.connect():
             self.connections.append(connection)
             self.metrics.total_connections += 1
@@ -188,38 +200,58 @@ class ConnectionPool:
             self.metrics.connection_errors += 1
             return None
     
-    async def get_connection(self) -> Optional[Connection]:
-        """獲取可用連接"""
-        async with self._lock:
-            # 查找空閒連接
-            for connection in self.connections:
-                if not connection.is_busy and connection.connection:
-                    self.metrics.active_connections += 1
-                    return connection
-                    
-            # 如果沒有空閒連接且未達到最大連接數，創建新連接
-            if len(self.connections) < self.config.max_connections:
-                connection = await self._create_connection()
-                if connection:
-                    self.metrics.active_connections += 1
-                    return connection
-                    
-            return None
+    async def get_connection(self, timeout: Optional[float] = None) -> Optional[Connection]:
+        """獲取可用連接（連接全部借出時等待歸還，逾時返回None）"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.config.connection_timeout if timeout is None else timeout)
+        
+        async with self._available:
+            while True:
+                # 查找空閒連接
+                for connection in self.connections:
+                    if not connection.is_busy and connection.connection:
+                        connection.is_busy = True
+                        self.metrics.active_connections += 1
+                        return connection
+                        
+                # 如果沒有空閒連接且未達到最大連接數，創建新連接
+                if len(self.connections) < self.config.max_connections:
+                    connection = await self._create_connection()
+                    if connection:
+                        connection.is_busy = True
+                        self.metrics.active_connections += 1
+                        return connection
+                
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._available.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
     
     async def return_connection(self, connection: Connection):
         """歸還連接"""
-        async with self._lock:
+        async with self._available:
             connection.is_busy = False
             self.metrics.active_connections = max(0, self.metrics.active_connections - 1)
             self.metrics.idle_connections = len([c for c in self.connections if not c.is_busy])
+            self._available.notify()
     
-    async def execute_query(self, sql: str, params: List[Any] = None) -> Tuple[List[Dict[str, Any]], float]:
-        """執行查詢"""
+    @asynccontextmanager
+    async def acquire(self) -> AsyncGenerator[Connection, None]:
+        """借出連接，離開區塊時自動歸還"""
         connection = await self.get_connection()
         if not connection:
             raise Exception("No available database connections")
-            
         try:
+            yield connection
+        finally:
+            await self.return_connection(connection)
+    
+    async def execute_query(self, sql: str, params: List[Any] = None) -> Tuple[List[Dict[str, Any]], float]:
+        """執行查詢"""
+        async with self.acquire() as connection:
             results, exec_time = await connection.execute_query(sql, params)
             
             # 更新指標
@@ -231,9 +263,6 @@ class ConnectionPool:
                 )
             
             return results, exec_time
-            
-        finally:
-            await self.return_connection(connection)
     
     async def _maintenance_loop(self):
         """連接池維護循環"""
@@ -253,6 +282,8 @@ class ConnectionPool:
             connections_to_remove = []
             
             for connection in self.connections:
+                if connection.is_busy:
+                    continue
                 if connection.is_expired(self.config.max_connection_age):
                     connections_to_remove.append(connection)
                 elif (len(self.connections) > self.config.min_connections and 
@@ -333,6 +364,25 @@ class PreparedQueryCache:
             
         self.cache[key] = (prepared_sql, param_names)
     
+    def prepare(self, shape: str, builder: Callable[[], str]) -> str:
+        """依查詢形狀取得固定SQL文本，首次使用時才構建
+        
+        同一形狀永遠得到完全相同的SQL文本，sqlite3 語句快取與 asyncpg
+        預備語句快取都以文本為鍵，因此可跨請求重用已編譯的語句。
+        """
+        cached = self.cache.get(shape)
+        if cached is not None:
+            self.cache.move_to_end(shape)
+            self.hit_count += 1
+            return cached[0]
+        
+        self.miss_count += 1
+        sql = builder()
+        if len(self.cache) >= self.max_size:
+            self.cache.popitem(last=False)
+        self.cache[shape] = (sql, [])
+        return sql
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """獲取緩存統計"""
         total_requests = self.hit_count + self.miss_count
@@ -347,84 +397,127 @@ class PreparedQueryCache:
             'total_requests': total_requests
         }
 
+# 批次執行器：接收 [(sql, [參數列, ...]), ...]，須在單一交易內依序執行並提交
+BatchExecutor = Callable[[List[Tuple[str, List[Sequence[Any]]]]], Awaitable[None]]
+
 class BatchProcessor:
-    """批次處理器"""
+    """批次處理器
     
-    def __init__(self, batch_size: int = 1000, max_wait_time: float = 5.0):
-        self.batch_size = batch_size
+    每個寫入單元（一筆記錄對應的一或多條語句）進入佇列，累積到 batch_size
+    或等待超過 max_wait_time 秒即合併為一個交易寫入：相同SQL以 executemany
+    執行，語句群組依首次出現順序執行（主表先於子表）。交易提交後才完成各
+    單元的 future，呼叫端 await 返回即代表資料已持久化。提交進行中到達的
+    寫入會累積成下一批，寫入吞吐量隨批次大小而非單筆提交延遲擴展。
+    """
+    
+    def __init__(self, batch_size: int = 1000, max_wait_time: float = 5.0, executor: Optional[BatchExecutor] = None):
+        self.batch_size = max(1, batch_size)
         self.max_wait_time = max_wait_time
-        self.pending_operations: List[Tuple[str, List[Any], asyncio.Future]] = []
-        self._batch_lock = asyncio.Lock()
+        self.executor = executor
+        self.pending_operations: List[Tuple[List[Tuple[str, Sequence[Any]]], asyncio.Future]] = []
+        self._batch_full = asyncio.Event()
         self._batch_task: Optional[asyncio.Task] = None
+        self.stats = {
+            'batches': 0,
+            'operations': 0,
+            'failed_operations': 0,
+            'largest_batch': 0,
+            'isolated_retries': 0
+        }
         
     async def add_operation(self, sql: str, params: List[Any] = None) -> Any:
-        """添加批次操作"""
-        future = asyncio.Future()
+        """添加單條語句的批次操作"""
+        return await self.submit([(sql, params or [])])
+    
+    async def submit(self, statements: List[Tuple[str, Sequence[Any]]]) -> None:
+        """提交一個寫入單元，於所屬批次提交後返回"""
+        if self.executor is None:
+            raise RuntimeError("BatchProcessor executor is not configured")
         
-        async with self._batch_lock:
-            self.pending_operations.append((sql, params or [], future))
-            
-            # 如果達到批次大小或這是第一個操作，觸發處理
-            if len(self.pending_operations) >= self.batch_size or len(self.pending_operations) == 1:
-                if self._batch_task is None or self._batch_task.done():
-                    self._batch_task = asyncio.create_task(self._process_batch())
+        future = asyncio.get_running_loop().create_future()
+        self.pending_operations.append((list(statements), future))
+        
+        if len(self.pending_operations) >= self.batch_size:
+            self._batch_full.set()
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._process_batch())
         
         return await future
     
+    async def flush(self):
+        """立即寫入所有待處理操作並等待完成"""
+        while self._batch_task is not None and not self._batch_task.done():
+            self._batch_full.set()
+            await asyncio.shield(self._batch_task)
+    
     async def _process_batch(self):
         """處理批次操作"""
-        # 等待更多操作或超時
-        start_time = time.time()
-        while (len(self.pending_operations) < self.batch_size and 
-               time.time() - start_time < self.max_wait_time):
-            await asyncio.sleep(0.1)
-        
-        async with self._batch_lock:
-            if not self.pending_operations:
+        # 等待批次填滿或超過最大等待時間（0 表示只合併同一輪事件循環內的寫入）
+        if len(self.pending_operations) < self.batch_size:
+            if self.max_wait_time > 0:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_wait_time)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0)
+        
+        while self.pending_operations:
+            self._batch_full.clear()
+            operations = self.pending_operations[:self.batch_size]
+            del self.pending_operations[:self.batch_size]
+            await self._execute_operations(operations)
+    
+    @staticmethod
+    def group_statements(operations) -> List[Tuple[str, List[Sequence[Any]]]]:
+        """按SQL分組，保持首次出現順序"""
+        grouped: Dict[str, List[Sequence[Any]]] = OrderedDict()
+        for statements, _ in operations:
+            for sql, params in statements:
+                grouped.setdefault(sql, []).append(params)
+        return list(grouped.items())
+    
+    async def _execute_operations(self, operations):
+        """以單一交易寫入整批；失敗時逐筆重試，僅讓出錯的單元收到異常"""
+        try:
+            await self.executor(self.group_statements(operations))
+        except Exception as e:
+            if len(operations) == 1:
+                self._fail(operations, e)
                 return
-                
-            operations = self.pending_operations.copy()
-            self.pending_operations.clear()
-        
-        # 按SQL類型分組操作
-        grouped_ops = defaultdict(list)
-        for sql, params, future in operations:
-            grouped_ops[sql].append((params, future))
-        
-        # 處理每組操作
-        for sql, param_futures in grouped_ops.items():
-            try:
-                if sql.strip().upper().startswith('INSERT'):
-                    # 批次插入優化
-                    await self._batch_insert(sql, param_futures)
-                elif sql.strip().upper().startswith('UPDATE'):
-                    # 批次更新優化
-                    await self._batch_update(sql, param_futures)
+            
+            self.stats['isolated_retries'] += 1
+            for operation in operations:
+                try:
+                    await self.executor(self.group_statements([operation]))
+                except Exception as single_error:
+                    self._fail([operation], single_error)
                 else:
-                    # 常規處理
-                    await self._batch_regular(sql, param_futures)
-                    
-            except Exception as e:
-                # 設置所有future的異常
-                for _, future in param_futures:
-                    if not future.done():
-                        future.set_exception(e)
-    
-    async def _batch_insert(self, sql: str, param_futures: List[Tuple[List[Any], asyncio.Future]]):
-        """批次插入優化"""
-        # 這裡會實現批次插入邏輯
-        # 例如使用executemany或構建批次INSERT語句
-        pass
-    
-    async def _batch_update(self, sql: str, param_futures: List[Tuple[List[Any], asyncio.Future]]):
-        """批次更新優化"""
-        # 這裡會實現批次更新邏輯
-        pass
-    
-    async def _batch_regular(self, sql: str, param_futures: List[Tuple[List[Any], asyncio.Future]]):
-        """常規批次處理"""
-        # 這裡會實現常規批次處理邏輯
-        pass
+                    self._complete([operation])
+            return
+        
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(operations))
+        self._complete(operations)
+    
+    def _complete(self, operations):
+        self.stats['operations'] += len(operations)
+        for _, future in operations:
+            if not future.done():
+                future.set_result(None)
+    
+    def _fail(self, operations, error: Exception):
+        self.stats['failed_operations'] += len(operations)
+        for _, future in operations:
+            if not future.done():
+                future.set_exception(error)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取批次統計"""
+        stats = dict(self.stats)
+        stats['pending'] = len(self.pending_operations)
+        stats['avg_batch_size'] = (stats['operations'] / stats['batches']) if stats['batches'] else 0.0
+        return stats
 
 class QueryOptimizer:
     """查詢優化器"""
@@ -501,7 +594,7 @@ class PerformanceOptimizedStorage:
         self.pool_config = pool_config or ConnectionPoolConfig()
         self.connection_pool: Optional[ConnectionPool] = None
         self.query_cache = PreparedQueryCache(self.pool_config.query_cache_size)
-        self.batch_processor = BatchProcessor()
+        self.batch_processor = BatchProcessor(executor=self._execute_batch)
         self.query_optimizer = QueryOptimizer()
         self.logger = logging.getLogger(self.__class__.__name__)
         
@@ -542,7 +635,8 @@ class PerformanceOptimizedStorage:
         # 執行查詢
         if use_batch:
             # 使用批次處理
-            results = await self.batch_processor.add_operation(optimized_sql, optimized_params)
+            await self.batch_processor.add_operation(optimized_sql, optimized_params)
+            results = []
             execution_time = 0.0  # 批次處理中的時間統計需要特殊處理
         else:
             # 直接執行
@@ -553,6 +647,11 @@ class PerformanceOptimizedStorage:
         
         return results, execution_time
     
+    async def _execute_batch(self, statements: List[Tuple[str, List[Sequence[Any]]]]):
+        """批次處理器的執行器：借出一條連接在單一交易內寫入"""
+        async with self.connection_pool.acquire() as connection:
+            await connection.execute_batch(statements)
+    
     async def execute_batch_operations(self, operations: List[Tuple[str, List[Any]]]) -> List[Any]:
         """執行批次操作"""
         tasks = []
@@ -567,6 +666,7 @@ class PerformanceOptimizedStorage:
         metrics = {
             'connection_pool': None,
             'query_cache': self.query_cache.get_cache_stats(),
+            'batch_processor': self.batch_processor.get_stats(),
             'query_stats': self.query_optimizer.query_stats
         }
         
@@ -577,6 +677,7 @@ class PerformanceOptimizedStorage:
     
     async def shutdown(self):
         """關閉性能優化存儲"""
+        await self.batch_processor.flush()
         if self.connection_pool:
             await self.connection_pool.shutdown()
         
@@ -30,6 +30,8 @@ import contextlib
 import threading
 import uuid
 
+from ...utils.streaming_stats import WindowedStats
+
 class EventType(Enum):
     """事件類型"""
     TRAJECTORY_CREATED = "trajectory_created"
@@ -210,88 +212,113 @@ class RealTimeEventProcessor:
         }
 
 class StreamingAnalyzer:
-    """流式數據分析器"""
+    """
+    流式數據分析器
+
+    每個指標維護一個增量滑動窗口統計（Welford 均值/變異數、線上迴歸斜率、
+    DDSketch 分位數），新數據點的更新成本為 O(1) 攤銷；分析結果在讀取時才組裝。
+    """
+    
+    ANOMALY_HISTORY_SIZE = 100
     
     def __init__(self, window_size: int = 3600):  # 1小時窗口
         self.window_size = window_size
-        self.data_windows: Dict[str, deque] = defaultdict(lambda: deque())
+        self.metric_stats: Dict[str, WindowedStats] = {}
         self.analysis_results: Dict[str, Any] = {}
-        self._lock = asyncio.Lock()
+        self._recent_values: Dict[str, deque] = {}
+        self._anomalies: Dict[str, deque] = {}
+        self._dirty: Set[str] = set()
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    def _get_stats(self, metric_name: str) -> WindowedStats:
+        """取得（必要時建立）指標窗口統計"""
+        stats = self.metric_stats.get(metric_name)
+        if stats is None:
+            stats = WindowedStats(window_seconds=self.window_size)
+            self.metric_stats[metric_name] = stats
+            self._recent_values[metric_name] = deque(maxlen=10)
+            self._anomalies[metric_name] = deque(maxlen=self.ANOMALY_HISTORY_SIZE)
+        return stats
     
     async def add_data_point(self, metric_name: str, point: MetricPoint):
         """添加數據點"""
-        async with self._lock:
-            window = self.data_windows[metric_name]
-            
-            # 添加新數據點
-            window.append(point)
+        if not isinstance(point.value, (int, float)):
+            return
+        
+        async with self._locks[metric_name]:
+            stats = self._get_stats(metric_name)
+            value = float(point.value)
             
-            # 清理過期數據
-            current_time = time.time()
-            while window and (current_time - window[0].timestamp) > self.window_size:
-                window.popleft()
+            # 增量更新並清理過期分桶
+            stats.add(value, point.timestamp)
+            stats.expire(time.time())
+            self._recent_values[metric_name].append(value)
             
-            # 觸發分析
-            await self._analyze_window(metric_name)
-    
-    async def _analyze_window(self, metric_name: str):
-        """分析窗口數據"""
-        window = self.data_windows[metric_name]
-        
-        if not window:
+            # 僅檢查新數據點（2西格馬規則）
+            self._check_anomaly(metric_name, stats, value, point.timestamp)
+            self._dirty.add(metric_name)
+    
+    def _check_anomaly(self, metric_name: str, stats: WindowedStats,
+                       value: float, timestamp: float):
+        """檢測新數據點是否異常"""
+        if stats.count < 5:
             return
         
-        # 提取數值數據
-        values = []
-        for point in window:
-            if isinstance(point.value, (int, float)):
-                values.append(point.value)
+        mean = stats.mean
+        std = stats.std
+        if abs(value - mean) > 2 * std:
+            self._anomalies[metric_name].append({
+                'timestamp': timestamp,
+                'value': value,
+                'deviation': abs(value - mean),
+                'z_score': (value - mean) / std if std > 0 else 0
+            })
+    
+    def _analyze_window(self, metric_name: str):
+        """組裝窗口分析結果"""
+        stats = self.metric_stats.get(metric_name)
+        if stats is None:
+            return
         
-        if not values:
+        stats.expire(time.time())
+        summary = stats.snapshot()
+        count = summary['count']
+        if count == 0:
+            self.analysis_results.pop(metric_name, None)
             return
         
-        # 基本統計分析
+        # 只保留仍在窗口內的異常
+        anomalies = self._anomalies[metric_name]
+        cutoff = time.time() - self.window_size
+        while anomalies and anomalies[0]['timestamp'] < cutoff:
+            anomalies.popleft()
+        
         analysis = {
-            'count': len(values),
-            'mean': statistics.mean(values),
-            'median': statistics.median(values),
-            'min': min(values),
-            'max': max(values),
-            'std': statistics.stdev(values) if len(values) > 1 else 0,
-            'latest': values[-1] if values else None,
-            'trend': self._calculate_trend(values),
-            'anomalies': self._detect_anomalies(values)
+            'count': count,
+            'mean': summary['mean'],
+            'median': summary['median'],
+            'min': summary['min'],
+            'max': summary['max'],
+            'std': summary['std'] if count > 1 else 0,
+            'latest': summary['latest'],
+            'trend': self._calculate_trend(summary['slope'], count),
+            'anomalies': list(anomalies)
         }
         
         # 時間序列分析
-        if len(values) > 5:
-            analysis['moving_average_5'] = statistics.mean(values[-5:])
-        if len(values) > 10:
-            analysis['moving_average_10'] = statistics.mean(values[-10:])
+        recent = list(self._recent_values[metric_name])
+        if count > 5:
+            analysis['moving_average_5'] = statistics.mean(recent[-5:])
+        if count > 10:
+            analysis['moving_average_10'] = statistics.mean(recent[-10:])
         
         self.analysis_results[metric_name] = analysis
     
-    def _calculate_trend(self, values: List[float]) -> str:
-        """計算趨勢"""
-        if len(values) < 2:
-            return "stable"
-        
-        # 簡單線性回歸計算趨勢
-        n = len(values)
-        x = list(range(n))
-        
-        # 計算斜率
-        x_mean = statistics.mean(x)
-        y_mean = statistics.mean(values)
-        
-        numerator = sum((x[i] - x_mean) * (values[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
-        
-        if denominator == 0:
+    def _calculate_trend(self, slope: float, count: int) -> str:
+        """依線上迴歸斜率判斷趨勢"""
+        if count < 2:
             return "stable"
         
-        slope = numerator / denominator
-        
         if slope > 0.01:
             return "increasing"
         elif slope < -0.01:
@@ -299,34 +326,21 @@ class StreamingAnalyzer:
         else:
             return "stable"
     
-    def _detect_anomalies(self, values: List[float]) -> List[Dict[str, Any]]:
-        """檢測異常值"""
-        if len(values) < 5:
-            return []
-        
-        mean = statistics.mean(values)
-        std = statistics.stdev(values)
-        
-        anomalies = []
-        threshold = 2 * std  # 2西格馬規則
-        
-        for i, value in enumerate(values):
-            if abs(value - mean) > threshold:
-                anomalies.append({
-                    'index': i,
-                    'value': value,
-                    'deviation': abs(value - mean),
-                    'z_score': (value - mean) / std if std > 0 else 0
-                })
-        
-        return anomalies
+    def _refresh(self):
+        """重新組裝有新數據的指標分析"""
+        while self._dirty:
+            self._analyze_window(self._dirty.pop())
     
     def get_analysis(self, metric_name: str) -> Optional[Dict[str, Any]]:
         """獲取分析結果"""
+        if metric_name in self._dirty:
+            self._dirty.discard(metric_name)
+            self._analyze_window(metric_name)
         return self.analysis_results.get(metric_name)
     
     def get_all_analyses(self) -> Dict[str, Any]:
         """獲取所有分析結果"""
+        self._refresh()
         return self.analysis_results.copy()
 
 class MetricsCollector:
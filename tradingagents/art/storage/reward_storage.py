@@ -15,15 +15,17 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import json
+import heapq
 import asyncio
 import sqlite3
-import aiosqlite
 from pathlib import Path
 
 from .storage_base import (
     StorageBase, StorageConfig, StorageMetrics, StorageException,
     IndexConfig, IndexType, DataVersionInfo
 )
+from .jsonl_log_store import JsonlLogStore
+from .sqlite_snapshot import enable_wal_mode
 
 class RewardType(Enum):
     """獎勵類型"""
@@ -300,7 +302,11 @@ class RewardStorage(StorageBase[RewardRecord]):
         if config.backend == config.backend.SQLITE:
             self.db_path = self.storage_path / f"{config.database_name}.db"
         elif config.backend == config.backend.JSON:
+            # 舊版整檔JSON僅作為首次載入的遷移來源
             self.json_path = self.storage_path / f"{self.table_name}.json"
+            self.json_log_path = self.storage_path / f"{self.table_name}.jsonl"
+        
+        self._json_log: Optional[JsonlLogStore] = None
     
     async def initialize(self) -> bool:
         """初始化獎勵存儲系統"""
@@ -335,8 +341,11 @@ class RewardStorage(StorageBase[RewardRecord]):
             raise StorageException(f"Initialization failed: {e}")
     
     async def _initialize_sqlite(self):
-        """初始化SQLite數據庫"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        """初始化SQLite數據庫與連接池"""
+        await asyncio.to_thread(enable_wal_mode, str(self.db_path))
+        await self._create_sqlite_pool(self.db_path)
+        
+        async with self._sqlite_connection() as db:
             # 創建獎勵表
             await db.execute(f"""
                 CREATE TABLE IF NOT EXISTS {self.table_name} (
@@ -377,19 +386,37 @@ class RewardStorage(StorageBase[RewardRecord]):
                     FOREIGN KEY (signal_id) REFERENCES rewards (signal_id)
                 )
             """)
+            await db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reward_components_signal ON reward_components (signal_id)"
+            )
             
             await db.commit()
     
     async def _initialize_json(self):
-        """初始化JSON文件存儲"""
-        if not self.json_path.exists():
-            data = {
-                'version': '1.0.0',
-                'created_at': datetime.now().isoformat(),
-                'rewards': {}
-            }
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        """初始化JSONL日誌存儲（追加寫入 + 記憶體索引）"""
+        if self._json_log is not None:
+            return
+        
+        json_log = JsonlLogStore(
+            log_path=self.json_log_path,
+            key_field='signal_id',
+            index_fields=['trajectory_id', 'user_id', 'stock_id'],
+            legacy_json_path=self.json_path,
+            legacy_collection='rewards',
+            fsync=self.config.json_log_fsync,
+            compaction_ratio=self.config.json_log_compaction_ratio,
+            compaction_min_bytes=self.config.json_log_compaction_min_bytes,
+            compaction_interval_seconds=self.config.json_log_compaction_interval_seconds,
+            logger=self.logger
+        )
+        await json_log.open()
+        self._json_log = json_log
+    
+    async def _get_json_log(self) -> JsonlLogStore:
+        """取得已開啟的JSONL日誌"""
+        if self._json_log is None:
+            await self._initialize_json()
+        return self._json_log
     
     async def _create_indexes(self):
         """創建索引"""
@@ -400,7 +427,7 @@ class RewardStorage(StorageBase[RewardRecord]):
         """創建SQLite索引"""
         indexes = RewardIndex.get_all_indexes()
         
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._sqlite_connection() as db:
             for index in indexes:
                 try:
                     if index.name == "reward_primary":
@@ -438,6 +465,13 @@ class RewardStorage(StorageBase[RewardRecord]):
     async def disconnect(self) -> bool:
         """斷開連接"""
         try:
+            if self._json_log is not None:
+                await self._json_log.close()
+                self._json_log = None
+            if self._connection_pool is not None:
+                # 寫出待處理批次後關閉連接池，再次 connect 時重新初始化
+                await self._close_write_path()
+                self._initialized = False
             self._connected = False
             return True
         except Exception as e:
@@ -473,55 +507,48 @@ class RewardStorage(StorageBase[RewardRecord]):
             raise StorageException(f"Create failed: {e}")
     
     async def _create_sqlite_record(self, record: RewardRecord):
-        """創建SQLite記錄"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            # 插入主記錄
-            await db.execute(f"""
-                INSERT INTO {self.table_name} (
-                    signal_id, trajectory_id, user_id, stock_id, analyst_type,
-                    base_total_reward, membership_multiplier, weighted_total_reward,
-                    reward_components, calculation_timestamp, evaluation_period_days,
-                    immediate_evaluation, market_data, benchmark_data,
-                    membership_tier, tier_benefits, version, created_at, updated_at, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                record.signal_id, record.trajectory_id, record.user_id,
-                record.stock_id, record.analyst_type, record.base_total_reward,
-                record.membership_multiplier, record.weighted_total_reward,
-                json.dumps([comp.to_dict() for comp in record.reward_components]),
-                record.calculation_timestamp, record.evaluation_period_days,
-                record.immediate_evaluation, json.dumps(record.market_data),
-                json.dumps(record.benchmark_data), record.membership_tier.value,
-                json.dumps(record.tier_benefits), record.version,
-                record.created_at, record.updated_at, json.dumps(record.metadata)
-            ))
-            
-            # 插入獎勵組件
-            for comp in record.reward_components:
-                await db.execute("""
-                    INSERT INTO reward_components (
-                        signal_id, reward_type, base_reward, confidence,
-                        weight, final_reward, calculation_details
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    record.signal_id, comp.reward_type.value, comp.base_reward,
-                    comp.confidence, comp.weight, comp.final_reward,
-                    json.dumps(comp.calculation_details)
-                ))
-            
-            await db.commit()
+        """創建SQLite記錄（經批次處理器合併提交，返回時已持久化）"""
+        insert_record_sql = self._prepared_sql('reward.insert', lambda: f"""
+            INSERT INTO {self.table_name} (
+                signal_id, trajectory_id, user_id, stock_id, analyst_type,
+                base_total_reward, membership_multiplier, weighted_total_reward,
+                reward_components, calculation_timestamp, evaluation_period_days,
+                immediate_evaluation, market_data, benchmark_data,
+                membership_tier, tier_benefits, version, created_at, updated_at, metadata
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """)
+        insert_component_sql = self._prepared_sql('reward_component.insert', lambda: """
+            INSERT INTO reward_components (
+                signal_id, reward_type, base_reward, confidence,
+                weight, final_reward, calculation_details
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """)
+        
+        # 主記錄與獎勵組件在同一交易內寫入
+        statements = [(insert_record_sql, (
+            record.signal_id, record.trajectory_id, record.user_id,
+            record.stock_id, record.analyst_type, record.base_total_reward,
+            record.membership_multiplier, record.weighted_total_reward,
+            json.dumps([comp.to_dict() for comp in record.reward_components]),
+            record.calculation_timestamp, record.evaluation_period_days,
+            record.immediate_evaluation, json.dumps(record.market_data),
+            json.dumps(record.benchmark_data), record.membership_tier.value,
+            json.dumps(record.tier_benefits), record.version,
+            record.created_at, record.updated_at, json.dumps(record.metadata)
+        ))]
+        for comp in record.reward_components:
+            statements.append((insert_component_sql, (
+                record.signal_id, comp.reward_type.value, comp.base_reward,
+                comp.confidence, comp.weight, comp.final_reward,
+                json.dumps(comp.calculation_details)
+            )))
+        
+        await self._write_statements(statements, self._execute_sqlite_batch)
     
     async def _create_json_record(self, record: RewardRecord):
         """創建JSON記錄"""
-        data = {}
-        if self.json_path.exists():
-            with open(self.json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        data['rewards'][record.signal_id] = record.to_dict()
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_log = await self._get_json_log()
+        await json_log.put(record.to_dict())
     
     async def get_record(self, signal_id: str) -> Optional[RewardRecord]:
         """獲取獎勵記錄"""
@@ -556,11 +583,9 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _get_sqlite_record(self, signal_id: str) -> Optional[RewardRecord]:
         """獲取SQLite記錄"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            db.row_factory = aiosqlite.Row
-            
+        async with self._sqlite_connection() as db:
             cursor = await db.execute(
-                f"SELECT * FROM {self.table_name} WHERE signal_id = ?",
+                self._prepared_sql('reward.get', lambda: f"SELECT * FROM {self.table_name} WHERE signal_id = ?"),
                 (signal_id,)
             )
             row = await cursor.fetchone()
@@ -570,7 +595,9 @@ class RewardStorage(StorageBase[RewardRecord]):
             
             # 獲取獎勵組件
             comp_cursor = await db.execute(
-                "SELECT * FROM reward_components WHERE signal_id = ?",
+                self._prepared_sql(
+                    'reward_component.get', lambda: "SELECT * FROM reward_components WHERE signal_id = ?"
+                ),
                 (signal_id,)
             )
             comp_rows = await comp_cursor.fetchall()
@@ -611,13 +638,9 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _get_json_record(self, signal_id: str) -> Optional[RewardRecord]:
         """獲取JSON記錄"""
-        if not self.json_path.exists():
-            return None
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        json_log = await self._get_json_log()
         
-        reward_data = data.get('rewards', {}).get(signal_id)
+        reward_data = json_log.get(signal_id)
         if not reward_data:
             return None
         
@@ -672,7 +695,7 @@ class RewardStorage(StorageBase[RewardRecord]):
         
         values.append(signal_id)
         
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._sqlite_connection() as db:
             cursor = await db.execute(
                 f"UPDATE {self.table_name} SET {', '.join(set_clauses)} WHERE signal_id = ?",
                 values
@@ -682,13 +705,8 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _update_json_record(self, signal_id: str, updates: Dict[str, Any]) -> bool:
         """更新JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if signal_id not in data.get('rewards', {}):
+        json_log = await self._get_json_log()
+        if signal_id not in json_log:
             return False
         
         # 處理特殊字段
@@ -699,12 +717,7 @@ class RewardStorage(StorageBase[RewardRecord]):
             else:
                 processed_updates[key] = value
         
-        data['rewards'][signal_id].update(processed_updates)
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        return True
+        return await json_log.patch(signal_id, processed_updates)
     
     async def delete_record(self, signal_id: str) -> bool:
         """刪除獎勵記錄"""
@@ -735,7 +748,7 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _delete_sqlite_record(self, signal_id: str) -> bool:
         """刪除SQLite記錄"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._sqlite_connection() as db:
             # 刪除獎勵組件
             await db.execute("DELETE FROM reward_components WHERE signal_id = ?", (signal_id,))
             
@@ -746,20 +759,8 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _delete_json_record(self, signal_id: str) -> bool:
         """刪除JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if signal_id in data.get('rewards', {}):
-            del data['rewards'][signal_id]
-            
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return True
-        
-        return False
+        json_log = await self._get_json_log()
+        return await json_log.delete(signal_id)
     
     async def query_records(self, query: RewardQuery) -> List[RewardRecord]:
         """查詢獎勵記錄"""
@@ -851,31 +852,31 @@ class RewardStorage(StorageBase[RewardRecord]):
         
         # 執行查詢
         records = []
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            db.row_factory = aiosqlite.Row
-            
+        async with self._sqlite_connection() as db:
             cursor = await db.execute(sql, values)
             rows = await cursor.fetchall()
             
+            # 一次取回本頁所有記錄的獎勵組件
+            components_by_signal: Dict[str, List[RewardComponent]] = {}
+            if query.include_components and rows:
+                signal_ids = [row['signal_id'] for row in rows]
+                placeholders = ", ".join("?" * len(signal_ids))
+                comp_cursor = await db.execute(
+                    f"SELECT * FROM reward_components WHERE signal_id IN ({placeholders}) ORDER BY id",
+                    signal_ids
+                )
+                for comp_row in await comp_cursor.fetchall():
+                    components_by_signal.setdefault(comp_row['signal_id'], []).append(RewardComponent(
+                        reward_type=RewardType(comp_row['reward_type']),
+                        base_reward=comp_row['base_reward'],
+                        confidence=comp_row['confidence'],
+                        weight=comp_row['weight'],
+                        final_reward=comp_row['final_reward'],
+                        calculation_details=json.loads(comp_row['calculation_details'])
+                    ))
+            
             for row in rows:
-                # 獲取獎勵組件
-                reward_components = []
-                if query.include_components:
-                    comp_cursor = await db.execute(
-                        "SELECT * FROM reward_components WHERE signal_id = ?",
-                        (row['signal_id'],)
-                    )
-                    comp_rows = await comp_cursor.fetchall()
-                    
-                    for comp_row in comp_rows:
-                        reward_components.append(RewardComponent(
-                            reward_type=RewardType(comp_row['reward_type']),
-                            base_reward=comp_row['base_reward'],
-                            confidence=comp_row['confidence'],
-                            weight=comp_row['weight'],
-                            final_reward=comp_row['final_reward'],
-                            calculation_details=json.loads(comp_row['calculation_details'])
-                        ))
+                reward_components = components_by_signal.get(row['signal_id'], [])
                 
                 record = RewardRecord(
                     signal_id=row['signal_id'],
@@ -905,25 +906,19 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _query_json_records(self, query: RewardQuery) -> List[RewardRecord]:
         """查詢JSON記錄"""
-        if not self.json_path.exists():
-            return []
+        json_log = await self._get_json_log()
         
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # 以主鍵與次級索引求候選集合，避免全表掃描
+        candidate_ids = json_log.lookup({
+            'signal_id': query.signal_ids,
+            'trajectory_id': query.trajectory_ids,
+            'user_id': query.user_ids,
+            'stock_id': query.stock_ids
+        })
+        matched = []
         
-        rewards = data.get('rewards', {})
-        records = []
-        
-        for reward_data in rewards.values():
-            # 應用篩選條件
-            if query.signal_ids and reward_data['signal_id'] not in query.signal_ids:
-                continue
-            if query.trajectory_ids and reward_data['trajectory_id'] not in query.trajectory_ids:
-                continue
-            if query.user_ids and reward_data['user_id'] not in query.user_ids:
-                continue
-            if query.stock_ids and reward_data['stock_id'] not in query.stock_ids:
-                continue
+        for reward_data in json_log.iter_records(candidate_ids):
+            # 應用其餘篩選條件
             if query.analyst_types and reward_data['analyst_type'] not in query.analyst_types:
                 continue
             
@@ -947,6 +942,22 @@ class RewardStorage(StorageBase[RewardRecord]):
             if query.immediate_evaluation is not None and reward_data['immediate_evaluation'] != query.immediate_evaluation:
                 continue
             
+            matched.append(reward_data)
+        
+        # 排序與分頁：只取前 offset + limit 筆，不對全部結果排序
+        sort_keys = {
+            'created_at': lambda r: r['created_at'],
+            'calculation_timestamp': lambda r: r['calculation_timestamp'],
+            'weighted_total_reward': lambda r: r['weighted_total_reward']
+        }
+        sort_key = sort_keys.get(query.order_by)
+        window = query.offset + query.limit
+        if sort_key is not None:
+            select = heapq.nlargest if query.order_desc else heapq.nsmallest
+            matched = select(window, matched, key=sort_key)
+        
+        records = []
+        for reward_data in matched[query.offset:window]:
             # 創建記錄（根據包含選項）
             record_data = reward_data.copy()
             if not query.include_components:
@@ -959,19 +970,7 @@ class RewardStorage(StorageBase[RewardRecord]):
             
             records.append(RewardRecord.from_dict(record_data))
         
-        # 排序
-        reverse = query.order_desc
-        if query.order_by == "created_at":
-            records.sort(key=lambda r: r.created_at, reverse=reverse)
-        elif query.order_by == "calculation_timestamp":
-            records.sort(key=lambda r: r.calculation_timestamp, reverse=reverse)
-        elif query.order_by == "weighted_total_reward":
-            records.sort(key=lambda r: r.weighted_total_reward, reverse=reverse)
-        
-        # 分頁
-        start = query.offset
-        end = start + query.limit
-        return records[start:end]
+        return records
     
     async def count_records(self, query: Dict[str, Any] = None) -> int:
         """計算記錄數量"""
@@ -988,20 +987,15 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _count_sqlite_records(self, query: Dict[str, Any]) -> int:
         """計算SQLite記錄數量"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._sqlite_connection() as db:
             cursor = await db.execute(f"SELECT COUNT(*) FROM {self.table_name}")
             row = await cursor.fetchone()
             return row[0] if row else 0
     
     async def _count_json_records(self, query: Dict[str, Any]) -> int:
         """計算JSON記錄數量"""
-        if not self.json_path.exists():
-            return 0
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return len(data.get('rewards', {}))
+        json_log = await self._get_json_log()
+        return len(json_log)
     
     async def create_index(self, index_config: IndexConfig) -> bool:
         """創建索引"""
@@ -1015,7 +1009,7 @@ class RewardStorage(StorageBase[RewardRecord]):
     
     async def _create_sqlite_index(self, index_config: IndexConfig) -> bool:
         """創建SQLite索引"""
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._sqlite_connection() as db:
             fields_str = ", ".join(index_config.fields)
             unique_str = "UNIQUE" if index_config.unique else ""
             
@@ -74,13 +74,15 @@ class RewardRecord:
     
     # 獎勵計算
     final_reward: float
-    reward_components: List[RewardComponent] = field(default_factory=list)
     
     # 時間信息
     evaluation_time: str
     period_start: str
     period_end: str
     
+    # 獎勵組成（有預設值的欄位須排在必填欄位之後）
+    reward_components: List[RewardComponent] = field(default_factory=list)
+    
     # 背景信息
     market_conditions: Dict[str, Any] = field(default_factory=dict)
     performance_metrics: Dict[str, Any] = field(default_factory=dict)
@@ -261,6 +263,7 @@ class RewardStorage(StorageBase[RewardRecord]):
     async def disconnect(self) -> bool:
         """斷開連接"""
         try:
+            await self._close_write_path()
             await self._close_pg_pool()
             self._connected = False
             return True
@@ -279,43 +282,44 @@ class RewardStorage(StorageBase[RewardRecord]):
             
             record.updated_at = datetime.now().isoformat()
             
-            async with self._pg_pool.acquire() as conn:
-                async with conn.transaction():
-                    # 插入主記錄
-                    await conn.execute(f"""
-                        INSERT INTO {self.table_name} (
-                            reward_id, trajectory_id, stock_id, user_id, analyst_type,
-                            final_reward, evaluation_time, period_start, period_end,
-                            market_conditions, performance_metrics, benchmark_comparison,
-                            membership_tier, tier_multiplier, bonus_rewards,
-                            version, created_at, updated_at, metadata
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
-                    """, 
-                        record.reward_id, record.trajectory_id, record.stock_id,
-                        record.user_id, record.analyst_type, record.final_reward,
-                        record.evaluation_time, record.period_start, record.period_end,
-                        json.dumps(record.market_conditions),
-                        json.dumps(record.performance_metrics),
-                        json.dumps(record.benchmark_comparison),
-                        record.membership_tier.value, record.tier_multiplier,
-                        json.dumps(record.bonus_rewards),
-                        record.version, record.created_at, record.updated_at,
-                        json.dumps(record.metadata)
-                    )
-                    
-                    # 插入獎勵組件
-                    for component in record.reward_components:
-                        await conn.execute(f"""
-                            INSERT INTO {self.components_table} (
-                                reward_id, reward_type, base_score, weight,
-                                normalized_score, component_details
-                            ) VALUES ($1, $2, $3, $4, $5, $6)
-                        """,
-                            record.reward_id, component.reward_type.value,
-                            component.base_score, component.weight,
-                            component.normalized_score,
-                            json.dumps(component.component_details)
-                        )
+            insert_record_sql = self._prepared_sql('reward.insert', lambda: f"""
+                INSERT INTO {self.table_name} (
+                    reward_id, trajectory_id, stock_id, user_id, analyst_type,
+                    final_reward, evaluation_time, period_start, period_end,
+                    market_conditions, performance_metrics, benchmark_comparison,
+                    membership_tier, tier_multiplier, bonus_rewards,
+                    version, created_at, updated_at, metadata
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18, $19)
+            """)
+            insert_component_sql = self._prepared_sql('reward_component.insert', lambda: f"""
+                INSERT INTO {self.components_table} (
+                    reward_id, reward_type, base_score, weight,
+                    normalized_score, component_details
+                ) VALUES ($1, $2, $3, $4, $5, $6)
+            """)
+            
+            # 主記錄與獎勵組件在同一交易內寫入，並與同時到達的寫入合併提交
+            statements = [(insert_record_sql, (
+                record.reward_id, record.trajectory_id, record.stock_id,
+                record.user_id, record.analyst_type, record.final_reward,
+                record.evaluation_time, record.period_start, record.period_end,
+                json.dumps(record.market_conditions),
+                json.dumps(record.performance_metrics),
+                json.dumps(record.benchmark_comparison),
+                record.membership_tier.value, record.tier_multiplier,
+                json.dumps(record.bonus_rewards),
+                record.version, record.created_at, record.updated_at,
+                json.dumps(record.metadata)
+            ))]
+            for component in record.reward_components:
+                statements.append((insert_component_sql, (
+                    record.reward_id, component.reward_type.value,
+                    component.base_score, component.weight,
+                    component.normalized_score,
+                    json.dumps(component.component_details)
+                )))
+            
+            await self._write_statements(statements, self._execute_pg_batch)
             
             # 更新指標
             self.metrics.total_records += 1
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+SQLite Snapshot - SQLite 線上備份 API 一致性快照
+天工 (TianGong) - 為ART存儲資料庫提供不阻塞寫入的一致性備份
+
+此模組提供：
+1. is_sqlite_database / find_sqlite_databases - 以檔頭辨識 SQLite 資料庫
+2. enable_wal_mode - 啟用 WAL，讓讀取與寫入不再互相序列化
+3. snapshot_sqlite_database - 以線上備份 API 分頁複製，步驟之間短暫休眠讓寫入者進行
+
+直接複製正在寫入的資料庫檔案可能得到不一致的映像（且 WAL 模式下最新資料還在 -wal 檔中）。
+線上備份 API 產生的是某個交易時間點的一致映像：
+- WAL 模式：整個備份期間持有一個讀取交易，分頁複製不會因寫入而重新開始，寫入者也不會被阻塞
+- 回滾日誌模式：每一步只短暫持有共享鎖，步驟之間休眠讓寫入者取得鎖；
+  來源被其他連接修改時備份會重新開始，超過重試次數後改為單步完成
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import os
+import sqlite3
+import time
+
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+# 快照已涵蓋其內容，不需另外備份的附屬檔案
+SQLITE_SIDECAR_SUFFIXES = ('-wal', '-shm', '-journal')
+
+
+class SnapshotRestarted(Exception):
+    """來源在分頁複製期間被修改次數過多"""
+
+
+def is_sqlite_database(path: str) -> bool:
+    """以檔頭判斷是否為 SQLite 資料庫"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def find_sqlite_databases(files: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """從 (相對路徑, 絕對路徑) 列表中找出 SQLite 資料庫"""
+    return [
+        (relative_path, absolute_path) for relative_path, absolute_path in files
+        if not absolute_path.endswith(SQLITE_SIDECAR_SUFFIXES) and is_sqlite_database(absolute_path)
+    ]
+
+
+def sqlite_sidecar_paths(relative_path: str) -> List[str]:
+    """資料庫的 -wal / -shm / -journal 附屬檔案相對路徑"""
+    return [relative_path + suffix for suffix in SQLITE_SIDECAR_SUFFIXES]
+
+
+def enable_wal_mode(db_path: str, synchronous: str = 'NORMAL') -> str:
+    """
+    啟用 WAL 模式（持久保存在資料庫檔案中）
+
+    Returns:
+        實際的 journal_mode
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        journal_mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        return journal_mode
+    finally:
+        conn.close()
+
+
+def snapshot_sqlite_database(source_path: str, target_path: str,
+                             pages_per_step: int = 256,
+                             step_sleep_seconds: float = 0.002,
+                             max_restarts: int = 3,
+                             busy_timeout_seconds: float = 5.0,
+                             quick_check: bool = True) -> Dict[str, Any]:
+    """
+    以線上備份 API 建立一致性快照
+
+    快照先寫入暫存檔，完成（並可選通過 quick_check）後才替換 target_path。
+    quick_check 只在私有副本上執行，不影響線上資料庫。
+
+    Args:
+        pages_per_step: 每一步複製的頁數
+        step_sleep_seconds: 步驟之間的休眠時間（讓寫入者取得鎖）
+        max_restarts: 回滾日誌模式下允許的重新開始次數，超過後改為單步完成
+
+    Returns:
+        快照統計（頁數、步驟數、重新開始次數、最長單步耗時等）
+    """
+    started = time.time()
+    tmp_path = f"{target_path}.snapshot-{os.getpid()}-{int(started * 1000)}"
+    stats = {
+        'source_path': source_path,
+        'target_path': target_path,
+        'journal_mode': None,
+        'pages': 0,
+        'steps': 0,
+        'restarts': 0,
+        'single_step_fallback': False,
+        'max_step_seconds': 0.0,
+        'duration_seconds': 0.0
+    }
+
+    source = sqlite3.connect(source_path, timeout=busy_timeout_seconds, isolation_level=None)
+    try:
+        stats['journal_mode'] = source.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        pinned = stats['journal_mode'] == 'wal'
+        if pinned:
+            # WAL 模式：固定讀取交易，整個備份看到同一個版本，寫入者不受影響
+            source.execute("BEGIN")
+            source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+
+        try:
+            _copy_pages(source, tmp_path, pages_per_step, step_sleep_seconds,
+                        None if pinned else max_restarts, stats)
+        except SnapshotRestarted:
+            logging.warning(
+                f"SQLite snapshot of {source_path} restarted {stats['restarts']} times, "
+                f"finishing in a single step"
+            )
+            stats['single_step_fallback'] = True
+            _copy_pages(source, tmp_path, -1, 0.0, None, stats)
+        finally:
+            if pinned:
+                source.execute("COMMIT")
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    finally:
+        source.close()
+
+    try:
+        if quick_check:
+            snapshot = sqlite3.connect(tmp_path)
+            try:
+                result = snapshot.execute("PRAGMA quick_check").fetchone()
+            finally:
+                snapshot.close()
+            if not result or result[0] != 'ok':
+                raise sqlite3.DatabaseError(f"Snapshot quick_check failed for {source_path}: {result}")
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+
+    stats['duration_seconds'] = time.time() - started
+    return stats
+
+
+def _copy_pages(source: sqlite3.Connection, tmp_path: str, pages_per_step: int,
+                step_sleep_seconds: float, max_restarts: Optional[int], stats: Dict[str, Any]):
+    """執行一次完整的分頁複製"""
+    _remove_quietly(tmp_path)
+    target = sqlite3.connect(tmp_path)
+    last = {'remaining': None, 'step_started': time.perf_counter()}
+
+    def progress(status, remaining, total):
+        now = time.perf_counter()
+        stats['steps'] += 1
+        stats['pages'] = total
+        stats['max_step_seconds'] = max(stats['max_step_seconds'], now - last['step_started'])
+
+        # 剩餘頁數增加表示來源被其他連接修改，備份已重新開始
+        if last['remaining'] is not None and remaining > last['remaining']:
+            stats['restarts'] += 1
+            if max_restarts is not None and stats['restarts'] > max_restarts:
+                raise SnapshotRestarted()
+        last['remaining'] = remaining
+
+        if step_sleep_seconds and remaining:
+            time.sleep(step_sleep_seconds)
+        last['step_started'] = time.perf_counter()
+
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress)
+        # 快照本身使用回滾日誌，避免留下 -wal 附屬檔
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+
+
+def _remove_quietly(path: str):
+    for candidate in [path] + [path + suffix for suffix in SQLITE_SIDECAR_SUFFIXES]:
+        try:
+            os.remove(candidate)
+        except OSError:
+            pass
@@ -11,7 +11,8 @@ Storage Base - ART存儲系統基礎抽象類
 5. IndexConfig - 索引配置和管理
 """
 
-from typing import Dict, Any, List, Optional, Union, Generic, TypeVar
+from typing import Dict, Any, List, Optional, Union, Generic, TypeVar, Callable, Awaitable, Sequence, Tuple
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -25,6 +26,8 @@ import time
 from collections import defaultdict, deque
 import uuid
 
+from ...utils.tracing import get_tracer
+
 # Generic type for storage records
 T = TypeVar('T')
 
@@ -150,6 +153,12 @@ class StorageConfig:
     max_connections: int = 20
     connection_timeout_seconds: int = 30
     query_timeout_seconds: int = 60
+    prepared_statement_cache_size: int = 256
+    
+    # 寫入批次配置（SQLite / PostgreSQL）
+    enable_write_batching: bool = True
+    write_batch_size: int = 256
+    write_batch_max_wait_ms: float = 0.0  # 0 = 只合併同時到達與提交進行中累積的寫入
     
     # 緩存配置
     enable_caching: bool = True
@@ -175,6 +184,12 @@ class StorageConfig:
     metrics_collection_interval_seconds: int = 60
     slow_query_threshold_ms: int = 1000
     
+    # JSON 日誌後端配置
+    json_log_fsync: bool = True
+    json_log_compaction_ratio: float = 0.5
+    json_log_compaction_min_bytes: int = 8 * 1024 * 1024
+    json_log_compaction_interval_seconds: float = 60.0
+    
     # 安全配置
     enable_encryption: bool = False
     encryption_key: str = ""
@@ -195,6 +210,10 @@ class StorageConfig:
             'max_connections': self.max_connections,
             'connection_timeout_seconds': self.connection_timeout_seconds,
             'query_timeout_seconds': self.query_timeout_seconds,
+            'prepared_statement_cache_size': self.prepared_statement_cache_size,
+            'enable_write_batching': self.enable_write_batching,
+            'write_batch_size': self.write_batch_size,
+            'write_batch_max_wait_ms': self.write_batch_max_wait_ms,
             'enable_caching': self.enable_caching,
             'cache_size_mb': self.cache_size_mb,
             'cache_ttl_seconds': self.cache_ttl_seconds,
@@ -209,6 +228,10 @@ class StorageConfig:
             'enable_metrics': self.enable_metrics,
             'metrics_collection_interval_seconds': self.metrics_collection_interval_seconds,
             'slow_query_threshold_ms': self.slow_query_threshold_ms,
+            'json_log_fsync': self.json_log_fsync,
+            'json_log_compaction_ratio': self.json_log_compaction_ratio,
+            'json_log_compaction_min_bytes': self.json_log_compaction_min_bytes,
+            'json_log_compaction_interval_seconds': self.json_log_compaction_interval_seconds,
             'enable_encryption': self.enable_encryption,
             'ssl_enabled': self.ssl_enabled,
             'ssl_cert_path': self.ssl_cert_path
@@ -303,8 +326,10 @@ class StorageBase(abc.ABC, Generic[T]):
         self._cache_timestamps: Dict[str, float] = {}
         
         # 連接池（子類實現）
-        self._connection_pool = None
+        self._connection_pool = None  # SQLite連接池
         self._pg_pool = None  # PostgreSQL連接池
+        self._write_batcher = None  # 寫入批次處理器
+        self._prepared_queries = None  # 查詢形狀 → 固定SQL文本
         
         # 索引管理
         self._indexes: Dict[str, IndexConfig] = {}
@@ -460,7 +485,12 @@ class StorageBase(abc.ABC, Generic[T]):
         self._cache_timestamps.clear()
     
     async def _record_operation(self, operation_type: str, duration_ms: float):
-        """記錄操作指標"""
+        """記錄操作指標（在追蹤中的請求內同時記錄一個已結束的 span）"""
+        get_tracer().record_span(
+            f"storage.{operation_type}", duration_ms,
+            {'storage.class': type(self).__name__, 'storage.backend': self.config.backend.value}
+        )
+        
         if operation_type == 'read':
             self.metrics.read_operations += 1
             # 計算移動平均
@@ -504,9 +534,10 @@ class StorageBase(abc.ABC, Generic[T]):
             
             self._pg_pool = await asyncpg.create_pool(
                 connection_string,
-                min_size=5,
+                min_size=min(self.config.pool_size, self.config.max_connections),
                 max_size=self.config.max_connections,
                 command_timeout=self.config.query_timeout_seconds,
+                statement_cache_size=self.config.prepared_statement_cache_size,
                 server_settings={
                     'application_name': 'tradingagents_art_storage',
                     'timezone': 'Asia/Taipei'
@@ -530,10 +561,106 @@ class StorageBase(abc.ABC, Generic[T]):
         except Exception as e:
             self.logger.error(f"Failed to close PostgreSQL pool: {e}")
 
+    # ==================== 連接池與批次寫入 ====================
+    
+    def _prepared_sql(self, shape: str, builder: Callable[[], str]) -> str:
+        """依查詢形狀取得固定SQL文本（配合驅動的預備語句快取）"""
+        if self._prepared_queries is None:
+            from .performance_optimizations import PreparedQueryCache
+            self._prepared_queries = PreparedQueryCache(self.config.prepared_statement_cache_size)
+        return self._prepared_queries.prepare(shape, builder)
+    
+    async def _create_sqlite_pool(self, db_path: Union[str, Path]):
+        """創建SQLite連接池"""
+        if self._connection_pool is not None:
+            return
+        
+        from .performance_optimizations import ConnectionPool, ConnectionPoolConfig
+        
+        pool = ConnectionPool(str(db_path), ConnectionPoolConfig(
+            min_connections=1,
+            max_connections=max(1, self.config.pool_size),
+            connection_timeout=self.config.connection_timeout_seconds,
+            query_cache_size=self.config.prepared_statement_cache_size
+        ))
+        if not await pool.initialize():
+            raise StorageException("Failed to create SQLite connection pool")
+        self._connection_pool = pool
+    
+    @asynccontextmanager
+    async def _sqlite_connection(self):
+        """從連接池借出SQLite連接"""
+        if self._connection_pool is None:
+            raise StorageException("SQLite connection pool not initialized")
+        async with self._connection_pool.acquire() as connection:
+            yield connection.connection
+    
+    async def _execute_sqlite_batch(self, statements: List[Tuple[str, List[Sequence[Any]]]]):
+        """SQLite批次執行器：單一交易內 executemany"""
+        async with self._connection_pool.acquire() as connection:
+            await connection.execute_batch(statements)
+    
+    async def _execute_pg_batch(self, statements: List[Tuple[str, List[Sequence[Any]]]]):
+        """PostgreSQL批次執行器：單一交易內 executemany"""
+        async with self._pg_pool.acquire() as conn:
+            async with conn.transaction():
+                for sql, rows in statements:
+                    await conn.executemany(sql, rows)
+    
+    async def _write_statements(
+        self,
+        statements: List[Tuple[str, Sequence[Any]]],
+        executor: Callable[[List[Tuple[str, List[Sequence[Any]]]]], Awaitable[None]]
+    ):
+        """寫入一筆記錄的語句，返回時已提交
+        
+        啟用批次寫入時與同時到達的寫入合併為一個交易。
+        """
+        from .performance_optimizations import BatchProcessor
+        
+        if not self.config.enable_write_batching:
+            await executor(BatchProcessor.group_statements([(statements, None)]))
+            return
+        
+        if self._write_batcher is None:
+            self._write_batcher = BatchProcessor(
+                batch_size=self.config.write_batch_size,
+                max_wait_time=self.config.write_batch_max_wait_ms / 1000,
+                executor=executor
+            )
+        await self._write_batcher.submit(statements)
+    
+    async def _close_write_path(self):
+        """寫出待處理批次並關閉SQLite連接池"""
+        if self._write_batcher is not None:
+            await self._write_batcher.flush()
+            self._write_batcher = None
+        if self._connection_pool is not None:
+            await self._connection_pool.shutdown()
+            self._connection_pool = None
+    
+    def get_write_path_stats(self) -> Dict[str, Any]:
+        """連接池、批次寫入與預備語句統計"""
+        stats: Dict[str, Any] = {
+            'write_batching': self._write_batcher.get_stats() if self._write_batcher else None,
+            'prepared_queries': self._prepared_queries.get_cache_stats() if self._prepared_queries else None,
+            'sqlite_pool': None,
+            'pg_pool': None
+        }
+        if self._connection_pool is not None:
+            stats['sqlite_pool'] = self._connection_pool.get_metrics().__dict__
+        if self._pg_pool is not None:
+            stats['pg_pool'] = {
+                'size': self._pg_pool.get_size(),
+                'idle': self._pg_pool.get_idle_size()
+            }
+        return stats
+    
     async def cleanup(self):
         """清理資源"""
         try:
             await self.disconnect()
+            await self._close_write_path()
             await self._close_pg_pool()
             self._clear_cache()
             self.logger.info("Storage cleanup completed")
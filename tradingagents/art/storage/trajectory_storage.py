@@ -10,11 +10,12 @@ TrajectoryStorage - 軌跡數據結構化存儲
 4. TrajectoryIndex - 軌跡索引管理
 """
 
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, AsyncIterator
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import json
+import heapq
 import asyncio
 import asyncpg
 import os
@@ -24,6 +25,12 @@ from .storage_base import (
     StorageBase, StorageConfig, StorageMetrics, StorageException,
     IndexConfig, IndexType, DataVersionInfo
 )
+from .jsonl_log_store import JsonlLogStore
+
+
+def _as_datetime(value: Union[str, datetime]) -> datetime:
+    """將ISO字串或datetime統一為datetime"""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
 
 @dataclass
 class DecisionStep:
@@ -238,7 +245,11 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
         if config.backend == config.backend.JSON:
+            # 舊版整檔JSON僅作為首次載入的遷移來源
             self.json_path = self.storage_path / f"{self.table_name}.json"
+            self.json_log_path = self.storage_path / f"{self.table_name}.jsonl"
+        
+        self._json_log: Optional[JsonlLogStore] = None
     
     async def initialize(self) -> bool:
         """初始化軌跡存儲系統"""
@@ -337,15 +348,30 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             """)
     
     async def _initialize_json(self):
-        """初始化JSON文件存儲"""
-        if not self.json_path.exists():
-            data = {
-                'version': '1.0.0',
-                'created_at': datetime.now().isoformat(),
-                'trajectories': {}
-            }
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        """初始化JSONL日誌存儲（追加寫入 + 記憶體索引）"""
+        if self._json_log is not None:
+            return
+        
+        json_log = JsonlLogStore(
+            log_path=self.json_log_path,
+            key_field='trajectory_id',
+            index_fields=['user_id', 'stock_id'],
+            legacy_json_path=self.json_path,
+            legacy_collection='trajectories',
+            fsync=self.config.json_log_fsync,
+            compaction_ratio=self.config.json_log_compaction_ratio,
+            compaction_min_bytes=self.config.json_log_compaction_min_bytes,
+            compaction_interval_seconds=self.config.json_log_compaction_interval_seconds,
+            logger=self.logger
+        )
+        await json_log.open()
+        self._json_log = json_log
+    
+    async def _get_json_log(self) -> JsonlLogStore:
+        """取得已開啟的JSONL日誌"""
+        if self._json_log is None:
+            await self._initialize_json()
+        return self._json_log
     
     async def _create_indexes(self):
         """創建索引"""
@@ -396,6 +422,10 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     async def disconnect(self) -> bool:
         """斷開連接"""
         try:
+            if self._json_log is not None:
+                await self._json_log.close()
+                self._json_log = None
+            await self._close_write_path()
             self._connected = False
             return True
         except Exception as e:
@@ -431,58 +461,52 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             raise StorageException(f"Create failed: {e}")
     
     async def _create_postgresql_record(self, record: TrajectoryRecord):
-        """創建PostgreSQL記錄"""
-        async with self._pg_pool.acquire() as conn:
-            async with conn.transaction():
-                # 插入主記錄
-                await conn.execute(f"""
-                    INSERT INTO {self.table_name} (
-                        trajectory_id, stock_id, user_id, analyst_type,
-                        start_time, end_time, duration_seconds,
-                        final_recommendation, final_confidence,
-                        decision_steps, market_context, user_context,
-                        technical_context, version, created_at, updated_at, metadata
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17)
-                """, 
-                    record.trajectory_id, record.stock_id, record.user_id,
-                    record.analyst_type, record.start_time, record.end_time,
-                    record.duration_seconds, record.final_recommendation,
-                    record.final_confidence,
-                    json.dumps([step.to_dict() for step in record.decision_steps]),
-                    json.dumps(record.market_context),
-                    json.dumps(record.user_context),
-                    json.dumps(record.technical_context),
-                    record.version, record.created_at, record.updated_at,
-                    json.dumps(record.metadata)
-                )
-                
-                # 插入決策步驟
-                for step in record.decision_steps:
-                    await conn.execute(f"""
-                        INSERT INTO {self.decision_steps_table} (
-                            trajectory_id, step_id, timestamp, step_type,
-                            description, input_data, output_data,
-                            reasoning, confidence, execution_time_ms
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                    """,
-                        record.trajectory_id, step.step_id, step.timestamp,
-                        step.step_type, step.description,
-                        json.dumps(step.input_data),
-                        json.dumps(step.output_data),
-                        step.reasoning, step.confidence, step.execution_time_ms
-                    )
+        """創建PostgreSQL記錄（經批次處理器合併提交，返回時已持久化）"""
+        insert_record_sql = self._prepared_sql('trajectory.insert', lambda: f"""
+            INSERT INTO {self.table_name} (
+                trajectory_id, stock_id, user_id, analyst_type,
+                start_time, end_time, duration_seconds,
+                final_recommendation, final_confidence,
+                decision_steps, market_context, user_context,
+                technical_context, version, created_at, updated_at, metadata
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17)
+        """)
+        insert_step_sql = self._prepared_sql('decision_step.insert', lambda: f"""
+            INSERT INTO {self.decision_steps_table} (
+                trajectory_id, step_id, timestamp, step_type,
+                description, input_data, output_data,
+                reasoning, confidence, execution_time_ms
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+        """)
+        
+        # 主記錄與決策步驟在同一交易內寫入
+        statements = [(insert_record_sql, (
+            record.trajectory_id, record.stock_id, record.user_id,
+            record.analyst_type, record.start_time, record.end_time,
+            record.duration_seconds, record.final_recommendation,
+            record.final_confidence,
+            json.dumps([step.to_dict() for step in record.decision_steps]),
+            json.dumps(record.market_context),
+            json.dumps(record.user_context),
+            json.dumps(record.technical_context),
+            record.version, record.created_at, record.updated_at,
+            json.dumps(record.metadata)
+        ))]
+        for step in record.decision_steps:
+            statements.append((insert_step_sql, (
+                record.trajectory_id, step.step_id, step.timestamp,
+                step.step_type, step.description,
+                json.dumps(step.input_data),
+                json.dumps(step.output_data),
+                step.reasoning, step.confidence, step.execution_time_ms
+            )))
+        
+        await self._write_statements(statements, self._execute_pg_batch)
     
     async def _create_json_record(self, record: TrajectoryRecord):
         """創建JSON記錄"""
-        data = {}
-        if self.json_path.exists():
-            with open(self.json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        data['trajectories'][record.trajectory_id] = record.to_dict()
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_log = await self._get_json_log()
+        await json_log.put(record.to_dict())
     
     async def get_record(self, trajectory_id: str) -> Optional[TrajectoryRecord]:
         """獲取軌跡記錄"""
@@ -572,13 +596,9 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     
     async def _get_json_record(self, trajectory_id: str) -> Optional[TrajectoryRecord]:
         """獲取JSON記錄"""
-        if not self.json_path.exists():
-            return None
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        json_log = await self._get_json_log()
         
-        trajectory_data = data.get('trajectories', {}).get(trajectory_id)
+        trajectory_data = json_log.get(trajectory_id)
         if not trajectory_data:
             return None
         
@@ -641,21 +661,8 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     
     async def _update_json_record(self, trajectory_id: str, updates: Dict[str, Any]) -> bool:
         """更新JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if trajectory_id not in data.get('trajectories', {}):
-            return False
-        
-        data['trajectories'][trajectory_id].update(updates)
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        return True
+        json_log = await self._get_json_log()
+        return await json_log.patch(trajectory_id, updates)
     
     async def delete_record(self, trajectory_id: str) -> bool:
         """刪除軌跡記錄"""
@@ -697,20 +704,8 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     
     async def _delete_json_record(self, trajectory_id: str) -> bool:
         """刪除JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if trajectory_id in data.get('trajectories', {}):
-            del data['trajectories'][trajectory_id]
-            
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return True
-        
-        return False
+        json_log = await self._get_json_log()
+        return await json_log.delete(trajectory_id)
     
     async def query_records(self, query: TrajectoryQuery) -> List[TrajectoryRecord]:
         """查詢軌跡記錄"""
@@ -842,23 +837,18 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     
     async def _query_json_records(self, query: TrajectoryQuery) -> List[TrajectoryRecord]:
         """查詢JSON記錄"""
-        if not self.json_path.exists():
-            return []
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        json_log = await self._get_json_log()
         
-        trajectories = data.get('trajectories', {})
-        records = []
+        # 以主鍵與次級索引求候選集合，避免全表掃描
+        candidate_ids = json_log.lookup({
+            'trajectory_id': query.trajectory_ids,
+            'user_id': query.user_ids,
+            'stock_id': query.stock_ids
+        })
+        matched = []
         
-        for trajectory_data in trajectories.values():
-            # 應用篩選條件
-            if query.trajectory_ids and trajectory_data['trajectory_id'] not in query.trajectory_ids:
-                continue
-            if query.stock_ids and trajectory_data['stock_id'] not in query.stock_ids:
-                continue
-            if query.user_ids and trajectory_data['user_id'] not in query.user_ids:
-                continue
+        for trajectory_data in json_log.iter_records(candidate_ids):
+            # 應用其餘篩選條件
             if query.analyst_types and trajectory_data['analyst_type'] not in query.analyst_types:
                 continue
             
@@ -874,6 +864,22 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             if query.confidence_max and trajectory_data['final_confidence'] > query.confidence_max:
                 continue
             
+            matched.append(trajectory_data)
+        
+        # 排序與分頁：只取前 offset + limit 筆，不對全部結果排序
+        sort_keys = {
+            'created_at': lambda r: r['created_at'],
+            'start_time': lambda r: r['start_time'],
+            'final_confidence': lambda r: r['final_confidence']
+        }
+        sort_key = sort_keys.get(query.order_by)
+        window = query.offset + query.limit
+        if sort_key is not None:
+            select = heapq.nlargest if query.order_desc else heapq.nsmallest
+            matched = select(window, matched, key=sort_key)
+        
+        records = []
+        for trajectory_data in matched[query.offset:window]:
             # 創建記錄（根據包含選項）
             record_data = trajectory_data.copy()
             if not query.include_decision_steps:
@@ -887,19 +893,7 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             
             records.append(TrajectoryRecord.from_dict(record_data))
         
-        # 排序
-        reverse = query.order_desc
-        if query.order_by == "created_at":
-            records.sort(key=lambda r: r.created_at, reverse=reverse)
-        elif query.order_by == "start_time":
-            records.sort(key=lambda r: r.start_time, reverse=reverse)
-        elif query.order_by == "final_confidence":
-            records.sort(key=lambda r: r.final_confidence, reverse=reverse)
-        
-        # 分頁
-        start = query.offset
-        end = start + query.limit
-        return records[start:end]
+        return records
     
     async def count_records(self, query: Dict[str, Any] = None) -> int:
         """計算記錄數量"""
@@ -923,13 +917,8 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     
     async def _count_json_records(self, query: Dict[str, Any]) -> int:
         """計算JSON記錄數量"""
-        if not self.json_path.exists():
-            return 0
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return len(data.get('trajectories', {}))
+        json_log = await self._get_json_log()
+        return len(json_log)
     
     async def create_index(self, index_config: IndexConfig) -> bool:
         """創建索引"""
@@ -954,6 +943,121 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             await db.commit()
             return True
     
+    # 批次匯出
+    async def iter_record_batches(
+        self,
+        start_time_from: Optional[Union[str, datetime]] = None,
+        start_time_to: Optional[Union[str, datetime]] = None,
+        min_confidence: Optional[float] = None,
+        min_decision_steps: Optional[int] = None,
+        min_quality_score: Optional[float] = None,
+        analyst_types: Optional[List[str]] = None,
+        user_ids: Optional[List[str]] = None,
+        batch_size: int = 5000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """以固定大小批次串流軌跡原始資料（供大量匯出使用）
+
+        PostgreSQL 後端在唯讀交易中使用伺服器端游標，篩選條件全部下推到 SQL，
+        記憶體用量只與 batch_size 有關。JSON 資料列中的 JSONB 欄位保持為字串，
+        由呼叫方決定是否解析。
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        if self.config.backend.value == "postgresql":
+            async for batch in self._iter_postgresql_batches(
+                start_time_from, start_time_to, min_confidence, min_decision_steps,
+                min_quality_score, analyst_types, user_ids, batch_size
+            ):
+                yield batch
+        elif self.config.backend.value == "json":
+            async for batch in self._iter_json_batches(
+                start_time_from, start_time_to, min_confidence, min_decision_steps,
+                min_quality_score, analyst_types, user_ids, batch_size
+            ):
+                yield batch
+        else:
+            raise StorageException(f"Batch export not supported for backend: {self.config.backend}")
+
+    async def _iter_postgresql_batches(self, start_time_from, start_time_to, min_confidence,
+                                       min_decision_steps, min_quality_score, analyst_types,
+                                       user_ids, batch_size) -> AsyncIterator[List[Dict[str, Any]]]:
+        """PostgreSQL伺服器端游標批次讀取"""
+        where_clauses = []
+        values = []
+
+        def add_condition(template: str, value: Any):
+            values.append(value)
+            where_clauses.append(template.format(f"${len(values)}"))
+
+        if start_time_from:
+            add_condition("start_time >= {}", _as_datetime(start_time_from))
+        if start_time_to:
+            add_condition("start_time <= {}", _as_datetime(start_time_to))
+        if min_confidence is not None:
+            add_condition("final_confidence >= {}", min_confidence)
+        if min_decision_steps:
+            add_condition("jsonb_array_length(decision_steps) >= {}", min_decision_steps)
+        if min_quality_score is not None:
+            add_condition("(metadata->>'quality_score')::float8 >= {}", min_quality_score)
+        if analyst_types:
+            add_condition("analyst_type = ANY({}::text[])", list(analyst_types))
+        if user_ids:
+            add_condition("user_id = ANY({}::text[])", list(user_ids))
+
+        where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+        sql = f"""
+            SELECT trajectory_id, stock_id, user_id, analyst_type, start_time, end_time,
+                   duration_seconds, final_recommendation, final_confidence,
+                   decision_steps, market_context, user_context, technical_context, metadata
+            FROM {self.table_name}
+            {where_sql}
+            ORDER BY start_time
+        """
+
+        async with self._pg_pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(sql, *values)
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+
+    async def _iter_json_batches(self, start_time_from, start_time_to, min_confidence,
+                                 min_decision_steps, min_quality_score, analyst_types,
+                                 user_ids, batch_size) -> AsyncIterator[List[Dict[str, Any]]]:
+        """JSON日誌批次讀取（以索引縮小候選集合）"""
+        json_log = await self._get_json_log()
+        candidate_ids = json_log.lookup({'user_id': user_ids})
+
+        start_from = _as_datetime(start_time_from).isoformat() if start_time_from else None
+        start_to = _as_datetime(start_time_to).isoformat() if start_time_to else None
+
+        matched = []
+        for data in json_log.iter_records(candidate_ids):
+            if analyst_types and data['analyst_type'] not in analyst_types:
+                continue
+            if start_from and data['start_time'] < start_from:
+                continue
+            if start_to and data['start_time'] > start_to:
+                continue
+            if min_confidence is not None and data['final_confidence'] < min_confidence:
+                continue
+            if min_decision_steps and len(data.get('decision_steps', [])) < min_decision_steps:
+                continue
+            if min_quality_score is not None:
+                quality_score = (data.get('metadata') or {}).get('quality_score')
+                if quality_score is None or quality_score < min_quality_score:
+                    continue
+            matched.append(data)
+
+        matched.sort(key=lambda r: r['start_time'])
+        for start in range(0, len(matched), batch_size):
+            yield matched[start:start + batch_size]
+            # 讓出事件迴圈，避免長時間匯出阻塞其他請求
+            await asyncio.sleep(0)
+
     def _validate_record(self, record: TrajectoryRecord) -> bool:
         """驗證軌跡記錄"""
         if not record.trajectory_id or not record.stock_id:
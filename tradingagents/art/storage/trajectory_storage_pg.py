@@ -263,6 +263,7 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
     async def disconnect(self) -> bool:
         """斷開連接"""
         try:
+            await self._close_write_path()
             await self._close_pg_pool()
             self._connected = False
             return True
@@ -281,45 +282,46 @@ class TrajectoryStorage(StorageBase[TrajectoryRecord]):
             
             record.updated_at = datetime.now().isoformat()
             
-            async with self._pg_pool.acquire() as conn:
-                async with conn.transaction():
-                    # 插入主記錄
-                    await conn.execute(f"""
-                        INSERT INTO {self.table_name} (
-                            trajectory_id, stock_id, user_id, analyst_type,
-                            start_time, end_time, duration_seconds,
-                            final_recommendation, final_confidence,
-                            decision_steps, market_context, user_context,
-                            technical_context, version, created_at, updated_at, metadata
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17)
-                    """, 
-                        record.trajectory_id, record.stock_id, record.user_id,
-                        record.analyst_type, record.start_time, record.end_time,
-                        record.duration_seconds, record.final_recommendation,
-                        record.final_confidence,
-                        json.dumps([step.to_dict() for step in record.decision_steps]),
-                        json.dumps(record.market_context),
-                        json.dumps(record.user_context),
-                        json.dumps(record.technical_context),
-                        record.version, record.created_at, record.updated_at,
-                        json.dumps(record.metadata)
-                    )
-                    
-                    # 插入決策步驟
-                    for step in record.decision_steps:
-                        await conn.execute(f"""
-                            INSERT INTO {self.decision_steps_table} (
-                                trajectory_id, step_id, timestamp, step_type,
-                                description, input_data, output_data,
-                                reasoning, confidence, execution_time_ms
-                            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                        """,
-                            record.trajectory_id, step.step_id, step.timestamp,
-                            step.step_type, step.description,
-                            json.dumps(step.input_data),
-                            json.dumps(step.output_data),
-                            step.reasoning, step.confidence, step.execution_time_ms
-                        )
+            insert_record_sql = self._prepared_sql('trajectory.insert', lambda: f"""
+                INSERT INTO {self.table_name} (
+                    trajectory_id, stock_id, user_id, analyst_type,
+                    start_time, end_time, duration_seconds,
+                    final_recommendation, final_confidence,
+                    decision_steps, market_context, user_context,
+                    technical_context, version, created_at, updated_at, metadata
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17)
+            """)
+            insert_step_sql = self._prepared_sql('decision_step.insert', lambda: f"""
+                INSERT INTO {self.decision_steps_table} (
+                    trajectory_id, step_id, timestamp, step_type,
+                    description, input_data, output_data,
+                    reasoning, confidence, execution_time_ms
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            """)
+            
+            # 主記錄與決策步驟在同一交易內寫入，並與同時到達的寫入合併提交
+            statements = [(insert_record_sql, (
+                record.trajectory_id, record.stock_id, record.user_id,
+                record.analyst_type, record.start_time, record.end_time,
+                record.duration_seconds, record.final_recommendation,
+                record.final_confidence,
+                json.dumps([step.to_dict() for step in record.decision_steps]),
+                json.dumps(record.market_context),
+                json.dumps(record.user_context),
+                json.dumps(record.technical_context),
+                record.version, record.created_at, record.updated_at,
+                json.dumps(record.metadata)
+            ))]
+            for step in record.decision_steps:
+                statements.append((insert_step_sql, (
+                    record.trajectory_id, step.step_id, step.timestamp,
+                    step.step_type, step.description,
+                    json.dumps(step.input_data),
+                    json.dumps(step.output_data),
+                    step.reasoning, step.confidence, step.execution_time_ms
+                )))
+            
+            await self._write_statements(statements, self._execute_pg_batch)
             
             # 更新指標
             self.metrics.total_records += 1
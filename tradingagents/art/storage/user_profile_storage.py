@@ -15,6 +15,7 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import json
+import heapq
 import asyncio
 import sqlite3
 import aiosqlite
@@ -24,6 +25,8 @@ from .storage_base import (
     StorageBase, StorageConfig, StorageMetrics, StorageException,
     IndexConfig, IndexType, DataVersionInfo
 )
+from .jsonl_log_store import JsonlLogStore, SortedIndex
+from .sqlite_snapshot import enable_wal_mode
 
 class PersonalizationLevel(Enum):
     """個人化等級"""
@@ -40,6 +43,9 @@ class MembershipTier(Enum):
     GOLD = "GOLD"
     PLATINUM = "PLATINUM"
 
+# 會員等級排序（排序索引與等級範圍查詢使用）
+MEMBERSHIP_TIER_RANK = {tier.value: rank for rank, tier in enumerate(MembershipTier)}
+
 class UserStatus(Enum):
     """用戶狀態"""
     ACTIVE = "active"
@@ -357,7 +363,21 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
         if config.backend == config.backend.SQLITE:
             self.db_path = self.storage_path / f"{config.database_name}.db"
         elif config.backend == config.backend.JSON:
+            # 整檔JSON作為快照，寫入先進入WAL
             self.json_path = self.storage_path / f"{self.table_name}.json"
+            self.wal_path = self.storage_path / f"{self.table_name}.wal.jsonl"
+        
+        # JSON後端的記憶體檔案庫與索引
+        self._json_log: Optional[JsonlLogStore] = None
+        self._reset_derived_state()
+    
+    def _reset_derived_state(self):
+        """清空由檔案庫重播產生的排序索引與會員統計"""
+        self._last_active_index = SortedIndex()
+        self._tier_index = SortedIndex()
+        self._paid_expiry_index = SortedIndex()
+        self._tier_counts: Dict[str, int] = {}
+        self._paid_members = 0
     
     async def initialize(self) -> bool:
         """初始化用戶檔案存儲系統"""
@@ -393,6 +413,7 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _initialize_sqlite(self):
         """初始化SQLite數據庫"""
+        await asyncio.to_thread(enable_wal_mode, str(self.db_path))
         async with aiosqlite.connect(str(self.db_path)) as db:
             # 創建用戶檔案表
             await db.execute(f"""
@@ -464,15 +485,62 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
             await db.commit()
     
     async def _initialize_json(self):
-        """初始化JSON文件存儲"""
-        if not self.json_path.exists():
-            data = {
-                'version': '1.0.0',
-                'created_at': datetime.now().isoformat(),
-                'user_profiles': {}
-            }
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        """初始化JSON存儲：載入快照、重播WAL並建立記憶體索引"""
+        if self._json_log is not None:
+            return
+        
+        # 重新連線時快照與WAL會整個重播，索引與統計必須從空白重建
+        self._reset_derived_state()
+        json_log = JsonlLogStore(
+            log_path=self.wal_path,
+            key_field='user_id',
+            index_fields=['username', 'email'],
+            legacy_collection='user_profiles',
+            fsync=self.config.json_log_fsync,
+            compaction_interval_seconds=self.config.json_log_compaction_interval_seconds,
+            snapshot_path=self.json_path,
+            logger=self.logger
+        )
+        json_log.add_listener(self._on_profile_change)
+        await json_log.open()
+        self._json_log = json_log
+    
+    async def _get_json_log(self) -> JsonlLogStore:
+        """取得已載入的檔案庫"""
+        if self._json_log is None:
+            await self._initialize_json()
+        return self._json_log
+    
+    def _on_profile_change(self, user_id: str, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        """增量維護排序索引與會員統計"""
+        if old is not None:
+            self._track_profile(user_id, old, -1)
+        if new is not None:
+            self._track_profile(user_id, new, 1)
+    
+    def _track_profile(self, user_id: str, profile: Dict[str, Any], delta: int):
+        tier = profile.get('membership_tier', MembershipTier.FREE.value)
+        last_login = profile.get('last_login')
+        expiry_date = profile.get('membership_expiry_date', '')
+        
+        if delta > 0:
+            if last_login:
+                self._last_active_index.add(last_login, user_id)
+            self._tier_index.add(MEMBERSHIP_TIER_RANK.get(tier, 0), user_id)
+            if tier != MembershipTier.FREE.value and expiry_date:
+                self._paid_expiry_index.add(expiry_date, user_id)
+        else:
+            if last_login:
+                self._last_active_index.remove(last_login, user_id)
+            self._tier_index.remove(MEMBERSHIP_TIER_RANK.get(tier, 0), user_id)
+            if tier != MembershipTier.FREE.value and expiry_date:
+                self._paid_expiry_index.remove(expiry_date, user_id)
+        
+        self._tier_counts[tier] = self._tier_counts.get(tier, 0) + delta
+        if not self._tier_counts[tier]:
+            del self._tier_counts[tier]
+        if tier != MembershipTier.FREE.value:
+            self._paid_members += delta
     
     async def _create_indexes(self):
         """創建索引"""
@@ -521,6 +589,9 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     async def disconnect(self) -> bool:
         """斷開連接"""
         try:
+            if self._json_log is not None:
+                await self._json_log.close()
+                self._json_log = None
             self._connected = False
             return True
         except Exception as e:
@@ -614,15 +685,8 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _create_json_record(self, record: UserProfileRecord):
         """創建JSON記錄"""
-        data = {}
-        if self.json_path.exists():
-            with open(self.json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        data['user_profiles'][record.user_id] = record.to_dict()
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_log = await self._get_json_log()
+        await json_log.put(record.to_dict())
     
     async def get_record(self, user_id: str) -> Optional[UserProfileRecord]:
         """獲取用戶檔案記錄"""
@@ -740,13 +804,9 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _get_json_record(self, user_id: str) -> Optional[UserProfileRecord]:
         """獲取JSON記錄"""
-        if not self.json_path.exists():
-            return None
+        json_log = await self._get_json_log()
         
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        profile_data = data.get('user_profiles', {}).get(user_id)
+        profile_data = json_log.get(user_id)
         if not profile_data:
             return None
         
@@ -781,16 +841,11 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
             return await self._get_sqlite_record(row['user_id'])
     
     async def _get_json_record_by_username(self, username: str) -> Optional[UserProfileRecord]:
-        """根據用戶名獲取JSON記錄"""
-        if not self.json_path.exists():
-            return None
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        """根據用戶名獲取JSON記錄（雜湊索引）"""
+        json_log = await self._get_json_log()
         
-        for profile_data in data.get('user_profiles', {}).values():
-            if profile_data.get('username') == username:
-                return UserProfileRecord.from_dict(profile_data)
+        for profile_data in json_log.iter_records(json_log.lookup({'username': [username]})):
+            return UserProfileRecord.from_dict(profile_data)
         
         return None
     
@@ -854,13 +909,8 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _update_json_record(self, user_id: str, updates: Dict[str, Any]) -> bool:
         """更新JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if user_id not in data.get('user_profiles', {}):
+        json_log = await self._get_json_log()
+        if user_id not in json_log:
             return False
         
         # 處理特殊字段
@@ -871,12 +921,7 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
             else:
                 processed_updates[key] = value
         
-        data['user_profiles'][user_id].update(processed_updates)
-        
-        with open(self.json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        return True
+        return await json_log.patch(user_id, processed_updates)
     
     async def delete_record(self, user_id: str) -> bool:
         """刪除用戶檔案記錄"""
@@ -919,20 +964,8 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _delete_json_record(self, user_id: str) -> bool:
         """刪除JSON記錄"""
-        if not self.json_path.exists():
-            return False
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if user_id in data.get('user_profiles', {}):
-            del data['user_profiles'][user_id]
-            
-            with open(self.json_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            return True
-        
-        return False
+        json_log = await self._get_json_log()
+        return await json_log.delete(user_id)
     
     async def query_records(self, query: UserProfileQuery) -> List[UserProfileRecord]:
         """查詢用戶檔案記錄"""
@@ -1116,25 +1149,31 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _query_json_records(self, query: UserProfileQuery) -> List[UserProfileRecord]:
         """查詢JSON記錄"""
-        if not self.json_path.exists():
-            return []
+        json_log = await self._get_json_log()
         
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # 雜湊索引：user_id / username / email
+        candidate_ids = json_log.lookup({
+            'user_id': query.user_ids,
+            'username': query.usernames,
+            'email': query.emails
+        })
         
-        profiles = data.get('user_profiles', {})
-        records = []
+        # 排序索引：會員等級與最後活躍時間
+        if query.membership_tiers:
+            tier_ids = set()
+            for tier in query.membership_tiers:
+                rank = MEMBERSHIP_TIER_RANK.get(tier)
+                if rank is not None:
+                    tier_ids.update(self._tier_index.range(rank, rank))
+            candidate_ids = tier_ids if candidate_ids is None else candidate_ids & tier_ids
+        if query.last_login_from or query.last_login_to:
+            active_ids = set(self._last_active_index.range(query.last_login_from, query.last_login_to))
+            candidate_ids = active_ids if candidate_ids is None else candidate_ids & active_ids
         
-        for profile_data in profiles.values():
-            # 應用篩選條件
-            if query.user_ids and profile_data['user_id'] not in query.user_ids:
-                continue
-            if query.usernames and profile_data['username'] not in query.usernames:
-                continue
-            if query.emails and profile_data.get('email') not in query.emails:
-                continue
-            if query.membership_tiers and profile_data['membership_tier'] not in query.membership_tiers:
-                continue
+        matched = []
+        
+        for profile_data in json_log.iter_records(candidate_ids):
+            # 應用其餘篩選條件
             if query.personalization_levels and profile_data['personalization_level'] not in query.personalization_levels:
                 continue
             if query.user_statuses and profile_data['user_status'] not in query.user_statuses:
@@ -1152,6 +1191,24 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
             if query.max_success_rate and profile_data['success_rate'] > query.max_success_rate:
                 continue
             
+            matched.append(profile_data)
+        
+        # 排序與分頁：只取前 offset + limit 筆
+        sort_keys = {
+            'created_at': lambda p: p['created_at'],
+            'username': lambda p: p['username'],
+            'total_analyses': lambda p: p['total_analyses'],
+            'success_rate': lambda p: p['success_rate'],
+            'last_login': lambda p: p.get('last_login', '')
+        }
+        sort_key = sort_keys.get(query.order_by)
+        window = query.offset + query.limit
+        if sort_key is not None:
+            select = heapq.nlargest if query.order_desc else heapq.nsmallest
+            matched = select(window, matched, key=sort_key)
+        
+        records = []
+        for profile_data in matched[query.offset:window]:
             # 創建記錄（根據包含選項）
             record_data = profile_data.copy()
             if not query.include_preferences:
@@ -1166,21 +1223,7 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
             
             records.append(UserProfileRecord.from_dict(record_data))
         
-        # 排序
-        reverse = query.order_desc
-        if query.order_by == "created_at":
-            records.sort(key=lambda r: r.created_at, reverse=reverse)
-        elif query.order_by == "username":
-            records.sort(key=lambda r: r.username, reverse=reverse)
-        elif query.order_by == "total_analyses":
-            records.sort(key=lambda r: r.total_analyses, reverse=reverse)
-        elif query.order_by == "success_rate":
-            records.sort(key=lambda r: r.success_rate, reverse=reverse)
-        
-        # 分頁
-        start = query.offset
-        end = start + query.limit
-        return records[start:end]
+        return records
     
     async def count_records(self, query: Dict[str, Any] = None) -> int:
         """計算記錄數量"""
@@ -1204,13 +1247,8 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
     
     async def _count_json_records(self, query: Dict[str, Any]) -> int:
         """計算JSON記錄數量"""
-        if not self.json_path.exists():
-            return 0
-        
-        with open(self.json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        return len(data.get('user_profiles', {}))
+        json_log = await self._get_json_log()
+        return len(json_log)
     
     async def create_index(self, index_config: IndexConfig) -> bool:
         """創建索引"""
@@ -1314,33 +1352,15 @@ class UserProfileStorage(StorageBase[UserProfileRecord]):
                     stats['expired_members'] = row[0] if row else 0
             
             elif self.config.backend.value == "json":
-                if self.json_path.exists():
-                    with open(self.json_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    profiles = data.get('user_profiles', {})
-                    stats['total_users'] = len(profiles)
-                    
-                    # 按會員等級統計
-                    tier_counts = {}
-                    current_time = datetime.now().isoformat()
-                    active_members = 0
-                    expired_members = 0
-                    
-                    for profile in profiles.values():
-                        tier = profile['membership_tier']
-                        tier_counts[tier] = tier_counts.get(tier, 0) + 1
-                        
-                        if tier != 'FREE':
-                            expiry_date = profile.get('membership_expiry_date', '')
-                            if not expiry_date or expiry_date > current_time:
-                                active_members += 1
-                            else:
-                                expired_members += 1
-                    
-                    stats['by_tier'] = tier_counts
-                    stats['active_members'] = active_members
-                    stats['expired_members'] = expired_members
+                # 等級計數隨寫入增量維護；過期會員以到期日排序索引二分計數
+                json_log = await self._get_json_log()
+                current_time = datetime.now().isoformat()
+                expired_members = self._paid_expiry_index.count_range(high=current_time)
+                
+                stats['total_users'] = len(json_log)
+                stats['by_tier'] = dict(self._tier_counts)
+                stats['active_members'] = self._paid_members - expired_members
+                stats['expired_members'] = expired_members
             
             return stats
             
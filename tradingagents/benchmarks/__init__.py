@@ -22,6 +22,18 @@ from .benchmark_tasks import (
 
 from .benchmark_runner import BenchmarkRunner
 
+from .performance_suite import (
+    PerformanceSuite,
+    PerformanceCase,
+    PerformanceResult
+)
+
+from .performance_cases import (
+    StubFinMindServer,
+    stub_llm_latency,
+    create_system_performance_suite
+)
+
 __all__ = [
     'BenchmarkFramework',
     'BenchmarkResult',
@@ -33,5 +45,11 @@ __all__ = [
     'AccuracyBenchmark',
     'SpeedBenchmark',
     'StandardBenchmarkSuite',
-    'BenchmarkRunner'
+    'BenchmarkRunner',
+    'PerformanceSuite',
+    'PerformanceCase',
+    'PerformanceResult',
+    'StubFinMindServer',
+    'stub_llm_latency',
+    'create_system_performance_suite'
 ]
\ No newline at end of file
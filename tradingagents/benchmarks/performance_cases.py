@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+"""
+System Performance Cases
+系統性能基準測試案例 - 覆蓋數據、快取、指標計算、ART 儲存與完整分析工作流
+
+所有案例只依賴本機資源：
+- DataOrchestrator 透過 StubFinMindServer（127.0.0.1 臨時埠）取得確定性行情
+- TradingAgentsGraph.analyze_stock 使用 stub_llm_latency 將模擬 LLM 延遲固定為設定值
+- ART 儲存與管理後台用戶表寫入臨時目錄，案例結束後刪除
+- 應用程式啟動導入在全新子進程中量測，避免受本進程已載入模組影響
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .performance_suite import PerformanceCase, PerformanceSuite
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    web = None
+
+logger = logging.getLogger(__name__)
+
+BENCH_USER_ID = "perf_bench_user"
+BENCH_SYMBOLS = ["2330.TW", "2317.TW", "2454.TW", "2412.TW", "2882.TW", "1301.TW", "2308.TW", "3008.TW"]
+
+# 含模擬 LLM 延遲（asyncio.sleep）的分析師模組
+ANALYST_LLM_MODULES = [
+    'tradingagents.agents.analysts.base_analyst',
+    'tradingagents.agents.analysts.risk_analyst',
+    'tradingagents.agents.analysts.fundamentals_analyst',
+    'tradingagents.agents.analysts.news_analyst',
+    'tradingagents.agents.analysts.sentiment_analyst',
+    'tradingagents.agents.analysts.investment_planner',
+    'tradingagents.agents.analysts.workflow_orchestrator',
+]
+
+
+def _bench_user_context():
+    from ..utils.user_context import create_user_context
+    return create_user_context(BENCH_USER_ID, "diamond")
+
+
+# ==================== Stub 數據伺服器 ====================
+
+class StubFinMindServer:
+    """模擬 FinMind /data 端點的本機 HTTP 伺服器
+
+    回應內容由 (dataset, data_id, start_date, end_date) 決定，重複執行結果一致。
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        if not AIOHTTP_AVAILABLE:
+            raise RuntimeError("aiohttp 不可用，無法啟動 stub 數據伺服器")
+        self.latency_ms = latency_ms
+        self.request_count = 0
+        self._runner = None
+        self.port: Optional[int] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/data', self._handle_data)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_data(self, request):
+        self.request_count += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        params = request.query
+        data_id = params.get('data_id', 'TAIEX')
+        start = datetime.strptime(params.get('start_date', '2024-01-01'), '%Y-%m-%d')
+        end = datetime.strptime(params.get('end_date', params.get('start_date', '2024-01-01')), '%Y-%m-%d')
+        seed = int(hashlib.md5(data_id.encode('utf-8')).hexdigest()[:8], 16)
+        base_price = 50 + seed % 900
+
+        rows = []
+        day = start
+        index = 0
+        while day <= end and index < 400:
+            drift = ((seed >> (index % 24)) % 7 - 3) * 0.004
+            close = round(base_price * (1 + drift + index * 0.0005), 2)
+            rows.append({
+                'date': day.strftime('%Y-%m-%d'),
+                'stock_id': data_id,
+                'open': round(close * 0.995, 2),
+                'max': round(close * 1.01, 2),
+                'min': round(close * 0.985, 2),
+                'close': close,
+                'Trading_Volume': 1_000_000 + (seed + index * 7919) % 5_000_000,
+                'spread': round(close * drift, 2)
+            })
+            day += timedelta(days=1)
+            index += 1
+
+        return web.json_response({'msg': 'success', 'status': 200, 'data': rows})
+
+
+# ==================== Stub LLM ====================
+
+class _StubAsyncio:
+    """asyncio 代理：sleep 一律改為固定延遲，其餘屬性轉交 asyncio"""
+
+    def __init__(self, latency_seconds: float):
+        self._latency_seconds = latency_seconds
+
+    async def sleep(self, delay, result=None):
+        return await asyncio.sleep(self._latency_seconds if delay else 0, result)
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+
+@contextmanager
+def stub_llm_latency(latency_ms: float = 5.0, modules: Optional[List[str]] = None) -> Iterator[None]:
+    """將分析師中模擬 LLM 呼叫的延遲固定為 latency_ms
+
+    分析師的 LLM 呼叫目前為 asyncio.sleep + 規則產生的回應；
+    此處替換模組內的 asyncio 參照，保留回應產生邏輯，只讓延遲可控且可重現。
+    """
+    import importlib
+
+    patched = []
+    proxy = _StubAsyncio(latency_ms / 1000)
+    for module_name in modules or ANALYST_LLM_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        if getattr(module, 'asyncio', None) is asyncio:
+            module.asyncio = proxy
+            patched.append(module)
+    try:
+        yield
+    finally:
+        for module in patched:
+            module.asyncio = asyncio
+
+
+# ==================== 數據編排案例 ====================
+
+def _orchestrator_config(base_url: str) -> Dict[str, Any]:
+    return {
+        'finmind': {
+            'base_url': base_url,
+            'api_token': 'perf-bench',
+            'rate_limit': 1_000_000,
+            'max_retries': 1,
+            'timeout': 10
+        },
+        'cache': {
+            'enabled': True,
+            # 指向不可用的埠，讓 CacheManager 固定使用本地快取
+            'redis': {'url': 'redis://127.0.0.1:1/0'}
+        }
+    }
+
+
+class OrchestratorStockDataCase(PerformanceCase):
+    """DataOrchestrator.get_stock_data 經 stub 伺服器取數（cold: 每次不同股票，warm: 命中快取）"""
+
+    def __init__(self, warm: bool, iterations: int = 200, concurrency: int = 4, server_latency_ms: float = 0.0):
+        super().__init__(
+            name=f"orchestrator.get_stock_data.{'warm' if warm else 'cold'}",
+            description="DataOrchestrator 取得股價（stub FinMind）",
+            iterations=iterations,
+            warmup=len(BENCH_SYMBOLS) if warm else 5,
+            concurrency=concurrency
+        )
+        self.warm = warm
+        self.server_latency_ms = server_latency_ms
+        self.server: Optional[StubFinMindServer] = None
+        self.orchestrator = None
+        self.user_context = None
+        self.end_date = datetime.now().strftime('%Y-%m-%d')
+        self.start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+
+    async def setup(self):
+        from ..dataflows.data_orchestrator import DataOrchestrator
+
+        self.server = StubFinMindServer(latency_ms=self.server_latency_ms)
+        base_url = await self.server.start()
+        self.orchestrator = DataOrchestrator(_orchestrator_config(base_url))
+        await self.orchestrator.initialize()
+        self.user_context = _bench_user_context()
+
+    async def teardown(self):
+        if self.orchestrator and hasattr(self.orchestrator, 'close'):
+            await self.orchestrator.close()
+        if self.server:
+            await self.server.stop()
+
+    async def run_once(self, iteration: int):
+        if self.warm:
+            symbol = BENCH_SYMBOLS[iteration % len(BENCH_SYMBOLS)]
+        else:
+            # 每次迭代使用不同代號，確保繞過快取走完整請求路徑
+            symbol = f"{4000 + iteration + 100}.TW" if iteration >= 0 else f"{9000 - iteration}.TW"
+        response = await self.orchestrator.get_stock_data(symbol, self.start_date, self.end_date, self.user_context)
+        if not response.success:
+            raise RuntimeError(response.error or f"{symbol} 取數失敗")
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['stub_requests'] = self.server.request_count if self.server else 0
+        return data
+
+
+# ==================== 快取案例 ====================
+
+class CacheManagerCase(PerformanceCase):
+    """CacheManager set/get 往返（本地快取）"""
+
+    def __init__(self, iterations: int = 2000, keys: int = 256):
+        super().__init__(
+            name="cache_manager.set_get",
+            description="CacheManager 寫入後讀取同一鍵",
+            iterations=iterations,
+            warmup=50
+        )
+        self.keys = keys
+        self.cache_manager = None
+        self.payload = None
+
+    async def setup(self):
+        from ..utils.cache_manager import CacheManager
+
+        self.cache_manager = CacheManager(config={'cache': {'enabled': True, 'redis': {'url': 'redis://127.0.0.1:1/0'}}})
+        await self.cache_manager.initialize()
+        self.payload = {
+            'symbol': '2330.TW',
+            'prices': [{'date': f"2024-01-{d:02d}", 'close': 600 + d, 'volume': 1_000_000 + d} for d in range(1, 29)]
+        }
+
+    async def teardown(self):
+        if self.cache_manager and hasattr(self.cache_manager, 'close'):
+            await self.cache_manager.close()
+
+    async def run_once(self, iteration: int):
+        from ..utils.cache_manager import CacheKey, CacheSource, CacheStatus
+
+        key = CacheKey.from_params(
+            CacheSource.FINMIND, 'stock_price', BENCH_SYMBOLS[iteration % len(BENCH_SYMBOLS)],
+            {'bucket': iteration % self.keys}
+        )
+        await self.cache_manager.set(key, self.payload, 300)
+        _, status = await self.cache_manager.get(key)
+        if status != CacheStatus.HIT:
+            raise RuntimeError(f"快取未命中: {status}")
+
+
+class CacheManagerScanCase(PerformanceCase):
+    """CacheManager 在掃描式批次讀取下保留熱門鍵（L1 ARC）"""
+
+    def __init__(self, iterations: int = 2000, hot_keys: int = 64, scan_per_hot: int = 3, l1_entries: int = 128):
+        super().__init__(
+            name="cache_manager.scan_mix",
+            description=f"熱門鍵 {hot_keys} 個，每次熱門讀取伴隨 {scan_per_hot} 個一次性掃描鍵",
+            iterations=iterations,
+            warmup=10
+        )
+        self.hot_keys = hot_keys
+        self.scan_per_hot = scan_per_hot
+        self.l1_entries = l1_entries
+        self.cache_manager = None
+        self.hot_misses = 0
+        self._scan_id = 0
+
+    async def setup(self):
+        from ..utils.cache_manager import CacheManager
+
+        self.cache_manager = CacheManager(config={'cache': {
+            'enabled': True,
+            'redis': {'url': 'redis://127.0.0.1:1/0'},
+            'l1_max_entries': self.l1_entries,
+            'prefetch': {'enabled': False}
+        }})
+        await self.cache_manager.initialize()
+
+        # 熱門鍵先被讀取兩次（如盤中反覆查詢的權值股），之後才開始掃描
+        from ..utils.cache_manager import CacheKey, CacheSource
+        for _ in range(2):
+            for i in range(self.hot_keys):
+                await self._read_through(CacheKey.from_params(CacheSource.FINMIND, 'company_profile', f"H{i:04d}"))
+        self.hot_misses = 0
+
+    async def teardown(self):
+        if self.cache_manager:
+            await self.cache_manager.close()
+
+    async def _read_through(self, key) -> bool:
+        from ..utils.cache_manager import CacheStatus
+
+        _, status = await self.cache_manager.get(key)
+        if status == CacheStatus.HIT:
+            return True
+        await self.cache_manager.set(key, {'symbol': key.symbol, 'close': 600.0}, 300)
+        return False
+
+    async def run_once(self, iteration: int):
+        from ..utils.cache_manager import CacheKey, CacheSource
+
+        hot_key = CacheKey.from_params(CacheSource.FINMIND, 'company_profile', f"H{abs(iteration) % self.hot_keys:04d}")
+        if not await self._read_through(hot_key) and iteration >= 0:
+            self.hot_misses += 1
+
+        for _ in range(self.scan_per_hot):
+            self._scan_id += 1
+            await self._read_through(CacheKey.from_params(CacheSource.FINMIND, 'stock_price', f"S{self._scan_id:07d}"))
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['counters'] = {'hot_misses': self.hot_misses}
+        return data
+
+
+# ==================== 分析師指標案例 ====================
+
+class TechnicalIndicatorsCase(PerformanceCase):
+    """技術分析師指標、支撐壓力與型態識別"""
+
+    def __init__(self, iterations: int = 100):
+        super().__init__(
+            name="technical_analyst.indicators",
+            description="TechnicalAnalyst 指標 + 支撐壓力 + 型態",
+            iterations=iterations,
+            warmup=5
+        )
+        self.analyst = None
+        self.frames = []
+
+    async def setup(self):
+        from ..agents.analysts.technical_analyst import TechnicalAnalyst
+
+        self.analyst = TechnicalAnalyst({})
+        self.frames = [self.analyst._create_mock_price_data(symbol) for symbol in BENCH_SYMBOLS]
+
+    async def run_once(self, iteration: int):
+        frame = self.frames[iteration % len(self.frames)]
+        await self.analyst._calculate_technical_indicators(frame)
+        await self.analyst._analyze_support_resistance(frame)
+        await self.analyst._identify_chart_patterns(frame, None)
+
+
+class RiskMetricsCase(PerformanceCase):
+    """風險分析師風險指標計算"""
+
+    def __init__(self, iterations: int = 200):
+        super().__init__(
+            name="risk_analyst.metrics",
+            description="RiskAnalyst 風險指標（VaR、波動率、回撤等）",
+            iterations=iterations,
+            warmup=5
+        )
+        self.analyst = None
+        self.risk_data = []
+
+    async def setup(self):
+        from ..agents.analysts.risk_analyst import RiskAnalyst
+
+        self.analyst = RiskAnalyst({})
+        self.risk_data = [await self.analyst._simulate_price_data(symbol) for symbol in BENCH_SYMBOLS]
+
+    async def run_once(self, iteration: int):
+        await self.analyst._calculate_risk_metrics(self.risk_data[iteration % len(self.risk_data)])
+
+
+# ==================== ART 儲存案例 ====================
+
+class ARTStorageCase(PerformanceCase):
+    """ART 獎勵 / 軌跡儲存寫入與查詢（JSON、SQLite 後端）"""
+
+    def __init__(
+        self,
+        kind: str,
+        backend: str,
+        operation: str,
+        iterations: int = 300,
+        preload: int = 2000,
+        concurrency: int = 1
+    ):
+        # 併發寫入量測批次提交後的攝入吞吐量
+        suffix = f"_c{concurrency}" if concurrency > 1 else ""
+        super().__init__(
+            name=f"art.{kind}_storage.{backend}.{operation}{suffix}",
+            description=f"{kind} 儲存 {backend} 後端 {operation}（併發 {concurrency}）",
+            iterations=iterations,
+            warmup=10,
+            concurrency=concurrency
+        )
+        self.kind = kind
+        self.backend = backend
+        self.operation = operation
+        self.preload = preload
+        self.storage = None
+        self.storage_dir = None
+        self._next_id = 0
+
+    def _build_record(self, i: int):
+        if self.kind == 'reward':
+            from ..art.storage.reward_storage import RewardRecord, MembershipTier
+            return RewardRecord(
+                signal_id=f"sig_{i:07d}",
+                trajectory_id=f"traj_{i // 4:07d}",
+                user_id=f"user_{i % 100:05d}",
+                stock_id=BENCH_SYMBOLS[i % len(BENCH_SYMBOLS)],
+                analyst_type="technical_analyst",
+                base_total_reward=(i % 200) / 100.0,
+                membership_multiplier=1.0,
+                weighted_total_reward=(i % 200) / 100.0,
+                calculation_timestamp=f"2024-01-{1 + i % 28:02d}T00:00:00",
+                membership_tier=MembershipTier.FREE
+            )
+
+        from ..art.storage.trajectory_storage import TrajectoryRecord, DecisionStep
+        return TrajectoryRecord(
+            trajectory_id=f"traj_{i:07d}",
+            stock_id=BENCH_SYMBOLS[i % len(BENCH_SYMBOLS)],
+            user_id=f"user_{i % 100:05d}",
+            analyst_type="technical_analyst",
+            start_time=f"2024-01-{1 + i % 28:02d}T09:00:00",
+            end_time=f"2024-01-{1 + i % 28:02d}T09:00:05",
+            duration_seconds=5.0,
+            final_recommendation=("BUY", "HOLD", "SELL")[i % 3],
+            final_confidence=0.5 + (i % 50) / 100,
+            decision_steps=[
+                DecisionStep(
+                    step_id=f"step_{i}_{s}",
+                    timestamp=f"2024-01-{1 + i % 28:02d}T09:00:0{s}",
+                    step_type=("data_collection", "analysis", "decision")[s],
+                    description="benchmark step",
+                    confidence=0.7
+                )
+                for s in range(3)
+            ],
+            created_at=f"2024-01-{1 + i % 28:02d}T09:00:05",
+            updated_at=f"2024-01-{1 + i % 28:02d}T09:00:05"
+        )
+
+    def _build_query(self):
+        if self.kind == 'reward':
+            from ..art.storage.reward_storage import RewardQuery
+            return RewardQuery(user_ids=["user_00042"], stock_ids=[BENCH_SYMBOLS[2]], limit=50)
+        from ..art.storage.trajectory_storage import TrajectoryQuery
+        return TrajectoryQuery(user_ids=["user_00042"], stock_ids=[BENCH_SYMBOLS[2]], limit=50)
+
+    async def setup(self):
+        from ..art.storage.storage_base import StorageConfig, StorageBackend, StorageMode
+
+        self.storage_dir = tempfile.mkdtemp(prefix=f"perf_{self.kind}_{self.backend}_")
+        config = StorageConfig(
+            backend=StorageBackend.JSON if self.backend == 'json' else StorageBackend.SQLITE,
+            storage_path=self.storage_dir,
+            mode=StorageMode.PRODUCTION,
+            enable_caching=False
+        )
+        if self.kind == 'reward':
+            from ..art.storage.reward_storage import RewardStorage
+            self.storage = RewardStorage(config)
+        else:
+            from ..art.storage.trajectory_storage import TrajectoryStorage
+            self.storage = TrajectoryStorage(config)
+        await self.storage.initialize()
+
+        if self.operation == 'query':
+            for i in range(self.preload):
+                await self.storage.create_record(self._build_record(i))
+            self._query = self._build_query()
+        self._next_id = self.preload
+
+    async def teardown(self):
+        if self.storage:
+            await self.storage.disconnect()
+        if self.storage_dir:
+            shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    async def run_once(self, iteration: int):
+        if self.operation == 'write':
+            record_id = self._next_id
+            self._next_id += 1
+            await self.storage.create_record(self._build_record(record_id))
+        else:
+            await self.storage.query_records(self._query)
+
+
+# ==================== 管理後台列表案例 ====================
+
+class AdminUserListCase(PerformanceCase):
+    """管理後台用戶列表深頁查詢（鍵集游標，SQLite 臨時庫）"""
+
+    def __init__(self, iterations: int = 300, users: int = 20000, page_size: int = 20):
+        super().__init__(
+            name="admin.user_list.deep_page",
+            description=f"{users} 位用戶中以游標讀取後半段頁面（每頁 {page_size}）",
+            iterations=iterations,
+            warmup=10
+        )
+        self.users = users
+        self.page_size = page_size
+        self.engine = None
+        self.session = None
+        self.service = None
+        self.storage_dir = None
+        self.deep_cursors: List[str] = []
+        self.count_queries = 0
+        self._measuring = False
+
+    async def setup(self):
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.orm import sessionmaker
+        from ..models.user import Base, User, MembershipTier
+        from ..admin.models.user_management import UserSearchRequest
+        from ..admin.services.user_management_service import UserManagementService
+
+        self.storage_dir = tempfile.mkdtemp(prefix="perf_admin_")
+        self.engine = create_engine(f"sqlite:///{self.storage_dir}/users.db")
+        Base.metadata.create_all(self.engine)
+
+        started = datetime(2024, 1, 1)
+        tiers = list(MembershipTier)
+        rows = [
+            {
+                'id': i,
+                'uuid': f"00000000-0000-0000-0000-{i:012d}",
+                'email': f"user{i:06d}@bench.local",
+                'username': f"user{i:06d}",
+                'membership_tier': tiers[i % len(tiers)],
+                'created_at': started + timedelta(minutes=i // 3),
+                'last_login': None if i % 5 == 0 else started + timedelta(hours=i % 500)
+            }
+            for i in range(1, self.users + 1)
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(User.__table__.insert(), rows)
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def _count_statements(conn, cursor, statement, parameters, context, executemany):
+            if self._measuring and "count(" in statement.lower():
+                self.count_queries += 1
+
+        self.session = sessionmaker(bind=self.engine)()
+        self.service = UserManagementService(self.session)
+
+        # 依序翻頁收集後半段的游標（首頁含 COUNT，之後沿用游標中的總數快照）
+        cursors = []
+        result = await self.service.search_users(UserSearchRequest(page_size=self.page_size))
+        while result.has_next:
+            cursors.append(result.next_cursor)
+            result = await self.service.search_users(
+                UserSearchRequest(page_size=self.page_size, cursor=result.next_cursor)
+            )
+        self.deep_cursors = cursors[len(cursors) // 2:]
+        self._measuring = True
+
+    async def teardown(self):
+        self._measuring = False
+        if self.session:
+            self.session.close()
+        if self.engine:
+            self.engine.dispose()
+        if self.storage_dir:
+            shutil.rmtree(self.storage_dir, ignore_errors=True)
+
+    async def run_once(self, iteration: int):
+        from ..admin.models.user_management import UserSearchRequest
+
+        cursor = self.deep_cursors[abs(iteration) * 7 % len(self.deep_cursors)]
+        result = await self.service.search_users(
+            UserSearchRequest(page_size=self.page_size, cursor=cursor)
+        )
+        if len(result.items) != self.page_size:
+            raise RuntimeError(f"unexpected page length {len(result.items)}")
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['counters'] = {'count_queries': self.count_queries}
+        return data
+
+
+# ==================== 完整分析工作流案例 ====================
+
+class DebateCase(PerformanceCase):
+    """辯論共識階段：分歧分析結果的並行多輪辯論（stub LLM 延遲）"""
+
+    def __init__(self, iterations: int = 50, llm_latency_ms: float = 5.0):
+        super().__init__(
+            name="trading_graph.debate_contested",
+            description="五位分析師意見分歧時的辯論（每輪並行發言、收斂即停）",
+            iterations=iterations,
+            warmup=3
+        )
+        self.llm_latency_ms = llm_latency_ms
+        self.engine = None
+        self.results = []
+        self.rounds = 0
+        self.tokens = 0
+
+    async def setup(self):
+        from ..agents.analysts.base_analyst import AnalysisResult, AnalysisType, AnalysisConfidenceLevel
+        from ..graph.debate_engine import create_debate_engine, simulated_debate_responder
+
+        latency = self.llm_latency_ms / 1000
+
+        async def responder(participant, context, config):
+            # 規則式發言加上固定的 LLM 延遲
+            await asyncio.sleep(latency)
+            return await simulated_debate_responder(participant, context, config)
+
+        self.engine = create_debate_engine({'max_debate_rounds': 5}, responder=responder)
+        positions = [
+            ('technical_analyst', 'BUY', 0.85), ('fundamentals_analyst', 'BUY', 0.8),
+            ('news_analyst', 'SELL', 0.3), ('sentiment_analyst', 'HOLD', 0.4), ('risk_analyst', 'SELL', 0.35)
+        ]
+        self.results = [
+            AnalysisResult(
+                analyst_id=analyst_id,
+                stock_id=BENCH_SYMBOLS[0],
+                analysis_date="2024-01-02",
+                analysis_type=AnalysisType.TECHNICAL,
+                recommendation=recommendation,
+                confidence=confidence,
+                confidence_level=AnalysisConfidenceLevel.MODERATE,
+                reasoning=[f"{analyst_id} 論點 {i}" for i in range(3)]
+            )
+            for analyst_id, recommendation, confidence in positions
+        ]
+
+    async def run_once(self, iteration: int):
+        outcome = await self.engine.run(BENCH_SYMBOLS[0], self.results)
+        if iteration >= 0:
+            self.rounds = max(self.rounds, len(outcome.rounds))
+            self.tokens = max(self.tokens, outcome.total_tokens)
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['llm_latency_ms'] = self.llm_latency_ms
+        data['counters'] = {'rounds': self.rounds, 'tokens': self.tokens}
+        return data
+
+
+class AnalyzeStockCase(PerformanceCase):
+    """TradingAgentsGraph.analyze_stock 端到端（stub 數據 + stub LLM）"""
+
+    def __init__(self, iterations: int = 20, llm_latency_ms: float = 5.0, concurrency: int = 2):
+        super().__init__(
+            name="trading_graph.analyze_stock",
+            description="analyze_stock 至工作流完成（stub FinMind + stub LLM）",
+            iterations=iterations,
+            warmup=2,
+            concurrency=concurrency
+        )
+        self.llm_latency_ms = llm_latency_ms
+        self.server: Optional[StubFinMindServer] = None
+        self.graph = None
+        self.user_context = None
+        self._stub = None
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self.failed_analysts = 0
+        self.data_collection_errors = 0
+        self._previous_base_url: Optional[str] = None
+
+    async def setup(self):
+        from ..graph.trading_graph import TradingAgentsGraph
+
+        self._stub = stub_llm_latency(self.llm_latency_ms)
+        self._stub.__enter__()
+
+        self.server = StubFinMindServer()
+        base_url = await self.server.start()
+        # 台股分析師直接以 TaiwanMarketAPI 取數，同樣導向 stub 伺服器
+        self._previous_base_url = os.environ.get('FINMIND_API_BASE_URL')
+        os.environ['FINMIND_API_BASE_URL'] = base_url
+        self.graph = TradingAgentsGraph({
+            'workflow': {
+                'max_concurrent_sessions': max(10, self.concurrency * 2),
+                'session_timeout': 300,
+                'enable_debate': True,
+                'min_consensus_threshold': 0.6,
+                'max_debate_rounds': 3,
+                'max_parallelism': 4,
+                'enable_conflict_resolution': True,
+                'retry_attempts': 1,
+                'enable_intelligent_routing': False
+            },
+            'enable_production_optimization': False,
+            'data_orchestrator': _orchestrator_config(base_url),
+            'analysts_config': {}
+        })
+        await self.graph.initialize()
+        self.graph.add_status_callback(self._on_status)
+        self.user_context = _bench_user_context()
+
+    def _on_status(self, state):
+        if state.end_time is None:
+            return
+        waiter = self._waiters.pop(state.session_id, None)
+        if waiter and not waiter.done():
+            waiter.set_result(state)
+
+    async def teardown(self):
+        if self.graph:
+            if hasattr(self.graph, 'shutdown'):
+                await self.graph.shutdown()
+            elif self.graph.data_orchestrator and hasattr(self.graph.data_orchestrator, 'close'):
+                await self.graph.data_orchestrator.close()
+        if self.server:
+            await self.server.stop()
+            if self._previous_base_url is None:
+                os.environ.pop('FINMIND_API_BASE_URL', None)
+            else:
+                os.environ['FINMIND_API_BASE_URL'] = self._previous_base_url
+        if self._stub:
+            self._stub.__exit__(None, None, None)
+            self._stub = None
+
+    async def run_once(self, iteration: int):
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        session_id = await self.graph.analyze_stock(
+            BENCH_SYMBOLS[iteration % len(BENCH_SYMBOLS)], self.user_context
+        )
+        state = self.graph.active_sessions.get(session_id)
+        if state is not None and state.end_time is not None:
+            waiter.set_result(state)
+        else:
+            self._waiters[session_id] = waiter
+
+        try:
+            state = await asyncio.wait_for(waiter, timeout=120)
+        finally:
+            self._waiters.pop(session_id, None)
+            self.graph.active_sessions.pop(session_id, None)
+
+        if state.overall_status.value != 'completed':
+            raise RuntimeError(f"工作流未完成: {state.overall_status.value}")
+
+        # 工作流對單一分析師或數據源失敗有容錯，另行統計以免退化被延遲改善掩蓋
+        self.failed_analysts += sum(
+            1 for execution in state.analyst_executions.values()
+            if execution.status.value != 'completed'
+        )
+        self.data_collection_errors += len(state.data_collection_errors)
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['llm_latency_ms'] = self.llm_latency_ms
+        data['counters'] = {
+            'failed_analysts': self.failed_analysts,
+            'data_collection_errors': self.data_collection_errors
+        }
+        return data
+
+
+# ==================== 應用程式啟動案例 ====================
+
+# 子進程中導入應用程式並回報導入耗時、已載入的專案模組數與子進程峰值 RSS
+_APP_IMPORT_PROBE = (
+    "import json, logging, resource, sys, time\n"
+    "logging.disable(logging.CRITICAL)\n"
+    "started = time.perf_counter()\n"
+    "from tradingagents.app import get_import_time_report\n"
+    "print(json.dumps({'seconds': time.perf_counter() - started,\n"
+    "                  'budget_seconds': get_import_time_report()['budget_seconds'],\n"
+    "                  'modules': sum(1 for name in sys.modules if name.startswith('tradingagents')),\n"
+    "                  'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))\n"
+)
+
+
+class AppStartupImportCase(PerformanceCase):
+    """應用程式冷啟動導入：每次以全新直譯器導入 tradingagents.app（路由延遲載入）"""
+
+    def __init__(self, iterations: int = 5):
+        super().__init__(
+            name="app.startup_import",
+            description="全新進程導入 tradingagents.app 的耗時與立即載入的專案模組數",
+            iterations=iterations,
+            warmup=1
+        )
+        self.project_root = str(Path(__file__).resolve().parents[2])
+        self.modules = 0
+        self.budget_seconds = 0.0
+        self.max_import_seconds = 0.0
+        self.max_rss = 0
+
+    async def run_once(self, iteration: int):
+        env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [self.project_root, os.getenv('PYTHONPATH')]))}
+        env.pop('LAZY_ROUTES_ENABLED', None)
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-c', _APP_IMPORT_PROBE,
+            cwd=self.project_root, env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"導入 tradingagents.app 失敗（exit {process.returncode}）")
+        probe = json.loads(stdout.decode().strip().splitlines()[-1])
+        if iteration >= 0:
+            self.modules = max(self.modules, probe['modules'])
+            self.budget_seconds = probe['budget_seconds']
+            self.max_import_seconds = max(self.max_import_seconds, probe['seconds'])
+            self.max_rss = max(self.max_rss, probe['max_rss'])
+
+    def peak_rss_delta_mb(self) -> Optional[float]:
+        # 導入發生在子進程，以子進程自身的峰值 RSS 為準（Linux 單位為 KB，macOS 為 bytes）
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return self.max_rss / divisor
+
+    def metadata(self) -> Dict[str, Any]:
+        data = super().metadata()
+        data['import_budget_seconds'] = self.budget_seconds
+        data['max_import_seconds'] = round(self.max_import_seconds, 4)
+        data['counters'] = {'startup_modules': self.modules}
+        return data
+
+
+# ==================== 預設套件 ====================
+
+def create_system_performance_suite(
+    llm_latency_ms: float = 5.0,
+    scale: float = 1.0,
+    seed: int = 42
+) -> PerformanceSuite:
+    """建立預設系統性能套件
+
+    Args:
+        llm_latency_ms: stub LLM 每次呼叫的固定延遲
+        scale: 迭代次數倍率（CI 可用 <1 縮短執行時間）
+        seed: 隨機種子
+    """
+    def n(count: int) -> int:
+        return max(5, int(count * scale))
+
+    suite = PerformanceSuite(seed=seed)
+    suite.add_case(OrchestratorStockDataCase(warm=False, iterations=n(200)))
+    suite.add_case(OrchestratorStockDataCase(warm=True, iterations=n(1000)))
+    suite.add_case(CacheManagerCase(iterations=n(2000)))
+    suite.add_case(CacheManagerScanCase(iterations=n(2000)))
+    suite.add_case(TechnicalIndicatorsCase(iterations=n(100)))
+    suite.add_case(RiskMetricsCase(iterations=n(200)))
+    # TrajectoryStorage 只支援 JSON 與 PostgreSQL，本機僅量測 JSON
+    for kind, backend in (('reward', 'json'), ('reward', 'sqlite'), ('trajectory', 'json')):
+        suite.add_case(ARTStorageCase(kind, backend, 'write', iterations=n(500)))
+        suite.add_case(ARTStorageCase(kind, backend, 'query', iterations=n(200)))
+    suite.add_case(ARTStorageCase('reward', 'sqlite', 'write', iterations=n(2000), concurrency=32))
+    suite.add_case(AdminUserListCase(iterations=n(300)))
+    suite.add_case(DebateCase(iterations=n(50), llm_latency_ms=llm_latency_ms))
+    suite.add_case(AnalyzeStockCase(iterations=n(20), llm_latency_ms=llm_latency_ms))
+    suite.add_case(AppStartupImportCase(iterations=n(5)))
+    return suite
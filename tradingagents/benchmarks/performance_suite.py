@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+System Performance Suite
+系統性能基準測試框架 - 與 LLM 品質基準測試並列
+
+量測系統自身熱路徑的延遲與吞吐量：
+- 每個案例回報 p50 / p99 延遲、每秒操作數（ops/sec）與量測迭代期間的峰值 RSS 增量
+- 固定隨機種子、固定迭代次數並先行暖機，確保結果可重現
+- 與儲存的基準檔比較，超出容忍範圍即判定為性能回歸
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 預設基準檔位置
+DEFAULT_BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'system_performance.json'
+
+# 預設回歸容忍度（相對基準的變化比例）
+DEFAULT_TOLERANCES = {
+    'p50_ms': 0.30,         # p50 延遲增加超過 30%
+    'p99_ms': 0.50,         # p99 延遲增加超過 50%
+    'ops_per_sec': 0.25,    # 吞吐量下降超過 25%
+    'peak_rss_delta_mb': 0.25   # 峰值 RSS 增量增加超過 25%
+}
+
+# 延遲低於此值（毫秒）時只做絕對比較，避免計時雜訊造成誤報
+MIN_COMPARABLE_LATENCY_MS = 0.05
+
+# RSS 增量低於此值（MB）時以此值比較，避免配置器與 GC 時機的小幅波動造成誤報
+MIN_COMPARABLE_RSS_DELTA_MB = 8.0
+
+
+def _process_peak_rss_mb() -> float:
+    """進程歷史峰值 RSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 單位為 KB，macOS 為 bytes
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _reset_peak_rss() -> bool:
+    """重設核心記錄的峰值 RSS（Linux clear_refs），之後 VmHWM 只反映重設後的用量"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _read_peak_rss_mb(resettable: bool) -> float:
+    if resettable:
+        try:
+            with open('/proc/self/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    return _process_peak_rss_mb()
+
+
+class _PeakRssWindow:
+    """量測區間內的峰值 RSS 增量（MB）
+
+    ru_maxrss 是整個進程的歷史峰值，先執行的案例會墊高後續案例的數值。Linux 上開始量測時
+    重設 VmHWM，結束時以峰值減去起點 RSS；其他平台退回 ru_maxrss 差值（只反映超過既有峰值的部分）。
+    """
+
+    def __init__(self):
+        self.resettable = _reset_peak_rss()
+        self.start_mb = _read_peak_rss_mb(self.resettable)
+
+    def delta_mb(self) -> float:
+        return max(0.0, _read_peak_rss_mb(self.resettable) - self.start_mb)
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    """最近秩百分位數"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(percentile / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+@dataclass
+class PerformanceResult:
+    """性能案例結果"""
+    name: str
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    ops_per_sec: float
+    peak_rss_delta_mb: float
+    errors: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class PerformanceCase(ABC):
+    """性能案例抽象基類
+
+    子類實作 run_once；需要外部資源（stub 伺服器、臨時目錄）時覆寫 setup / teardown。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        iterations: int = 200,
+        warmup: int = 10,
+        concurrency: int = 1
+    ):
+        self.name = name
+        self.description = description
+        self.iterations = iterations
+        self.warmup = warmup
+        self.concurrency = concurrency
+        self.logger = logger.getChild(self.__class__.__name__)
+
+    async def setup(self):
+        """準備案例所需資源"""
+
+    async def teardown(self):
+        """釋放案例資源"""
+
+    @abstractmethod
+    async def run_once(self, iteration: int):
+        """執行一次被量測的操作"""
+
+    def peak_rss_delta_mb(self) -> Optional[float]:
+        """案例自行量測的峰值 RSS（例如在子進程中執行的案例）；返回 None 時使用進程內量測"""
+        return None
+
+    def metadata(self) -> Dict[str, Any]:
+        """附加到結果中的案例資訊（'counters' 內的計數增加視為回歸）"""
+        return {'description': self.description, 'concurrency': self.concurrency}
+
+
+class PerformanceSuite:
+    """性能基準測試套件"""
+
+    def __init__(self, seed: int = 42):
+        self.seed = seed
+        self.cases: List[PerformanceCase] = []
+
+    def add_case(self, case: PerformanceCase) -> 'PerformanceSuite':
+        self.cases.append(case)
+        return self
+
+    async def run_case(self, case: PerformanceCase) -> PerformanceResult:
+        """執行單一案例：暖機後以固定迭代次數量測每次操作延遲"""
+        random.seed(self.seed)
+        try:
+            import numpy as np
+            np.random.seed(self.seed)
+        except ImportError:
+            pass
+
+        rss_window: Optional[_PeakRssWindow] = None
+        await case.setup()
+        try:
+            for i in range(case.warmup):
+                await case.run_once(-1 - i)
+
+            # setup 與暖機期間的延遲導入、快取建立屬一次性成本，不計入 RSS 增量，
+            # 否則第一個導入共用模組的案例會承擔全部成本（結果隨執行順序改變）
+            gc.collect()
+            rss_window = _PeakRssWindow()
+            latencies: List[float] = []
+            errors = 0
+            next_iteration = 0
+
+            async def worker():
+                nonlocal next_iteration, errors
+                while next_iteration < case.iterations:
+                    iteration = next_iteration
+                    next_iteration += 1
+                    started = time.perf_counter()
+                    try:
+                        await case.run_once(iteration)
+                    except Exception as e:
+                        errors += 1
+                        if errors == 1:
+                            case.logger.warning(f"⚠️ {case.name} 執行失敗: {e}")
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            wall_started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(max(1, case.concurrency))))
+            wall_seconds = time.perf_counter() - wall_started
+        finally:
+            # 在釋放資源前取峰值
+            peak_rss_delta_mb = rss_window.delta_mb() if rss_window else 0.0
+            await case.teardown()
+
+        case_rss = case.peak_rss_delta_mb()
+        if case_rss is not None:
+            peak_rss_delta_mb = case_rss
+
+        latencies.sort()
+        return PerformanceResult(
+            name=case.name,
+            iterations=len(latencies),
+            p50_ms=round(_percentile(latencies, 50), 4),
+            p99_ms=round(_percentile(latencies, 99), 4),
+            mean_ms=round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+            ops_per_sec=round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            peak_rss_delta_mb=round(peak_rss_delta_mb, 1),
+            errors=errors,
+            metadata=case.metadata()
+        )
+
+    async def run(self, only: Optional[List[str]] = None) -> List[PerformanceResult]:
+        """依序執行所有案例（only 為名稱前綴過濾）"""
+        results = []
+        for case in self.cases:
+            if only and not any(case.name.startswith(prefix) for prefix in only):
+                continue
+            logger.info(f"▶️ 執行性能案例: {case.name}")
+            result = await self.run_case(case)
+            logger.info(
+                f"✅ {case.name}: p50={result.p50_ms:.3f}ms p99={result.p99_ms:.3f}ms "
+                f"ops/sec={result.ops_per_sec:.1f} Δrss={result.peak_rss_delta_mb:.1f}MB"
+            )
+            results.append(result)
+        return results
+
+    # ==================== 基準比較 ====================
+
+    @staticmethod
+    def load_baseline(path: Path = DEFAULT_BASELINE_PATH) -> Dict[str, Dict[str, Any]]:
+        path = Path(path)
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('results', {})
+
+    @staticmethod
+    def save_baseline(results: List[PerformanceResult], path: Path = DEFAULT_BASELINE_PATH, merge: bool = True):
+        """寫入基準檔；merge 時保留本次未執行案例的既有基準"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stored = PerformanceSuite.load_baseline(path) if merge else {}
+        stored.update({result.name: result.to_dict() for result in results})
+        data = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': stored
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+
+    @staticmethod
+    def compare_with_baseline(
+        results: List[PerformanceResult],
+        baseline: Dict[str, Dict[str, Any]],
+        tolerances: Optional[Dict[str, float]] = None
+    ) -> List[str]:
+        """返回回歸描述列表（空列表代表沒有回歸）"""
+        tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+        regressions = []
+
+        for result in results:
+            expected = baseline.get(result.name)
+            if not expected:
+                continue
+
+            if result.errors > expected.get('errors', 0):
+                regressions.append(f"{result.name}: 錯誤數 {expected.get('errors', 0)} -> {result.errors}")
+
+            expected_counters = expected.get('metadata', {}).get('counters', {})
+            for counter, value in result.metadata.get('counters', {}).items():
+                if counter in expected_counters and value > expected_counters[counter]:
+                    regressions.append(f"{result.name}: {counter} {expected_counters[counter]} -> {value}")
+
+            for metric in ('p50_ms', 'p99_ms', 'peak_rss_delta_mb'):
+                if metric not in expected:
+                    continue
+                base_value = expected[metric]
+                value = getattr(result, metric)
+                floor = MIN_COMPARABLE_RSS_DELTA_MB if metric == 'peak_rss_delta_mb' else MIN_COMPARABLE_LATENCY_MS
+                base_value = max(base_value, floor)
+                if base_value > 0 and value > base_value * (1 + tolerances[metric]):
+                    regressions.append(
+                        f"{result.name}: {metric} {base_value:.3f} -> {value:.3f} "
+                        f"(+{(value / base_value - 1) * 100:.1f}%, 容忍 {tolerances[metric] * 100:.0f}%)"
+                    )
+
+            base_ops = expected.get('ops_per_sec', 0.0)
+            if base_ops > 0 and result.ops_per_sec < base_ops * (1 - tolerances['ops_per_sec']):
+                regressions.append(
+                    f"{result.name}: ops_per_sec {base_ops:.1f} -> {result.ops_per_sec:.1f} "
+                    f"({(result.ops_per_sec / base_ops - 1) * 100:.1f}%, 容忍 -{tolerances['ops_per_sec'] * 100:.0f}%)"
+                )
+
+        return regressions
+
+    @staticmethod
+    def format_report(results: List[PerformanceResult], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """輸出對齊的文字報表（含相對基準的 p50 變化）"""
+        baseline = baseline or {}
+        header = f"{'case':<40} {'p50 ms':>10} {'p99 ms':>10} {'ops/sec':>12} {'Δrss MB':>9} {'err':>5} {'Δp50':>8}"
+        lines = [header, '-' * len(header)]
+        for result in results:
+            delta = ''
+            expected = baseline.get(result.name)
+            if expected and expected.get('p50_ms'):
+                delta = f"{(result.p50_ms / expected['p50_ms'] - 1) * 100:+.1f}%"
+            lines.append(
+                f"{result.name:<40} {result.p50_ms:>10.3f} {result.p99_ms:>10.3f} "
+                f"{result.ops_per_sec:>12.1f} {result.peak_rss_delta_mb:>9.1f} {result.errors:>5} {delta:>8}"
+            )
+        return '\n'.join(lines)
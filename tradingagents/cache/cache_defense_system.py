@@ -26,6 +26,8 @@ import threading
 import inspect
 import asyncio
 
+from .cache_engine import ARCCache, CacheEntry
+
 logger = logging.getLogger(__name__)
 
 class CircuitBreakerState(Enum):
@@ -140,95 +142,47 @@ class InMemoryCache:
     """
     In-memory secondary cache for high availability
     GOOGLE's secondary cache recommendation
+
+    Backed by the shared ARC engine, so scan-heavy traffic cannot flush hot entries.
     """
     
-    def __init__(self, max_size: int = 1000, default_ttl: int = 300):
+    def __init__(self, max_size: int = 1000, default_ttl: int = 300, max_bytes: Optional[int] = None):
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self.cache: Dict[str, Dict] = {}
-        self.access_times: Dict[str, float] = {}
-        self._lock = threading.Lock()
+        self.cache = ARCCache(max_size=max_size, max_bytes=max_bytes)
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from in-memory cache"""
-        
-        with self._lock:
-            if key not in self.cache:
-                return None
-            
-            cache_entry = self.cache[key]
-            
-            # Check expiration
-            if time.time() > cache_entry["expires_at"]:
-                del self.cache[key]
-                if key in self.access_times:
-                    del self.access_times[key]
-                return None
-            
-            # Update access time for LRU
-            self.access_times[key] = time.time()
-            
+        value = self.cache.get(key)
+        if value is not None:
             logger.debug(f"📱 In-memory cache HIT: {key}")
-            return cache_entry["value"]
+        return value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in in-memory cache with LRU eviction"""
-        
-        with self._lock:
-            # Evict expired entries first
-            self._evict_expired()
-            
-            # If at capacity, evict LRU
-            if len(self.cache) >= self.max_size and key not in self.cache:
-                self._evict_lru()
-            
-            ttl = ttl or self.default_ttl
-            expires_at = time.time() + ttl
-            
-            self.cache[key] = {
-                "value": value,
-                "expires_at": expires_at,
-                "created_at": time.time()
-            }
-            
-            self.access_times[key] = time.time()
-            
-            logger.debug(f"📱 In-memory cache SET: {key} (TTL: {ttl}s)")
-            return True
-    
-    def _evict_expired(self):
-        """Evict expired entries"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, cache_entry in self.cache.items():
-            if current_time > cache_entry["expires_at"]:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self.cache[key]
-            if key in self.access_times:
-                del self.access_times[key]
-    
-    def _evict_lru(self):
-        """Evict least recently used entry"""
-        if not self.access_times:
-            return
-        
-        lru_key = min(self.access_times.keys(), key=lambda k: self.access_times[k])
-        del self.cache[lru_key]
-        del self.access_times[lru_key]
+        """Set value in in-memory cache with ARC eviction"""
+        ttl = ttl or self.default_ttl
+        now = time.time()
+        
+        self.cache.put(key, CacheEntry(
+            key=key,
+            value=value,
+            size=len(json.dumps(value, default=str)),
+            created_at=now,
+            last_accessed=now,
+            access_count=0,
+            hit_count=0,
+            ttl=ttl
+        ))
+        
+        logger.debug(f"📱 In-memory cache SET: {key} (TTL: {ttl}s)")
+        return True
     
     def delete(self, key: str) -> bool:
         """Delete specific cache entry"""
-        with self._lock:
-            if key in self.cache:
-                del self.cache[key]
-                if key in self.access_times:
-                    del self.access_times[key]
-                logger.debug(f"📱 In-memory cache DELETE: {key}")
-                return True
-            return False
+        if self.cache.pop(key) is not None:
+            logger.debug(f"📱 In-memory cache DELETE: {key}")
+            return True
+        return False
     
     def size(self) -> int:
         """Get current cache size"""
@@ -236,9 +190,7 @@ class InMemoryCache:
     
     def clear(self):
         """Clear all cache entries"""
-        with self._lock:
-            self.cache.clear()
-            self.access_times.clear()
+        self.cache.clear()
 
 class CacheDefenseSystem:
     """
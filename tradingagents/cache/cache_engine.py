@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Cache Engine - 共用本地快取引擎
+天工 (TianGong) - CacheManager、快取防禦系統與ART多級緩存共用的L1實作
+
+此模組提供：
+1. ARCCache - 自適應替換緩存（抗掃描、條目數與位元組雙上限、TTL）
+2. IntelligentPrefetcher - 依觀察到的存取序列預測下一個查詢
+3. CacheEntry - 快取條目
+
+ARC 同時維護「最近」(T1) 與「頻繁」(T2) 兩個列表及其幽靈列表 (B1/B2)，
+依幽靈命中自動調整兩者的目標比例：一次性的大範圍掃描只會流經 T1，
+不會把反覆使用的熱門條目擠出快取。
+"""
+
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class PrefetchStrategy(Enum):
+    """預取策略"""
+    SEQUENTIAL = "sequential"     # 順序預取
+    PATTERN_BASED = "pattern"     # 基於模式預取
+    ML_PREDICTION = "ml"          # 機器學習預測
+    HYBRID = "hybrid"             # 混合策略
+
+
+@dataclass
+class CacheEntry:
+    """緩存條目"""
+    key: str
+    value: Any
+    size: int
+    created_at: float
+    last_accessed: float
+    access_count: int
+    hit_count: int
+    cost: float = 1.0  # 計算成本
+    priority: float = 1.0
+    ttl: Optional[float] = None
+    tags: Set[str] = field(default_factory=set)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def age(self) -> float:
+        """條目年齡（秒）"""
+        return time.time() - self.created_at
+
+    @property
+    def idle_time(self) -> float:
+        """閒置時間（秒）"""
+        return time.time() - self.last_accessed
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率"""
+        return self.hit_count / max(self.access_count, 1)
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """過期時間戳（無TTL時為None）"""
+        if self.ttl is None:
+            return None
+        return self.created_at + self.ttl
+
+    def is_expired(self) -> bool:
+        """檢查是否過期"""
+        if self.ttl is None:
+            return False
+        return time.time() - self.created_at > self.ttl
+
+    def remaining_ttl(self) -> Optional[float]:
+        """剩餘存活秒數"""
+        if self.ttl is None:
+            return None
+        return max(0.0, self.created_at + self.ttl - time.time())
+
+
+# 淘汰回調：(鍵, 條目, 原因)，原因為 "evicted" / "expired"
+EvictionCallback = Callable[[str, CacheEntry, str], None]
+
+
+class ARCCache:
+    """自適應替換緩存（Adaptive Replacement Cache）
+
+    max_size 限制常駐條目數，max_bytes（可選）限制常駐條目的總大小；
+    幽靈列表只保存鍵。所有操作為 O(1)（位元組上限觸發的連續淘汰除外），
+    並以鎖保護，可在執行緒間共用。
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        max_bytes: Optional[int] = None,
+        on_evict: Optional[EvictionCallback] = None
+    ):
+        self.max_size = max(1, max_size)
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.p = 0  # 目標T1大小
+
+        # 四個列表：T1, T2 保存條目；B1, B2 為幽靈列表，只保存鍵
+        self.t1: "OrderedDict[str, CacheEntry]" = OrderedDict()  # 最近訪問一次的條目
+        self.t2: "OrderedDict[str, CacheEntry]" = OrderedDict()  # 訪問兩次以上的條目
+        self.b1: "OrderedDict[str, None]" = OrderedDict()  # T1的幽靈鍵
+        self.b2: "OrderedDict[str, None]" = OrderedDict()  # T2的幽靈鍵
+
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    # ==================== 讀取 ====================
+
+    def get(self, key: str) -> Optional[Any]:
+        """獲取緩存值（未命中或已過期返回None）"""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """獲取緩存條目並記錄一次訪問"""
+        expired = None
+        with self._lock:
+            entry = self.t1.get(key)
+            if entry is None:
+                entry = self.t2.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.is_expired():
+                # 過期條目直接移除，不進入幽靈列表
+                self._remove_resident(key)
+                self.expirations += 1
+                self.misses += 1
+                expired = entry
+            else:
+                # 命中：移動到T2的MRU端
+                if key in self.t1:
+                    del self.t1[key]
+                    self.t2[key] = entry
+                else:
+                    self.t2.move_to_end(key)
+
+                entry.last_accessed = time.time()
+                entry.access_count += 1
+                entry.hit_count += 1
+                self.hits += 1
+                return entry
+
+        self._notify([(key, expired, "expired")])
+        return None
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """查看常駐條目，不影響淘汰順序與統計（可能已過期）"""
+        with self._lock:
+            entry = self.t1.get(key)
+            return entry if entry is not None else self.t2.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.t1 or key in self.t2
+
+    def __len__(self) -> int:
+        return len(self.t1) + len(self.t2)
+
+    def keys(self) -> List[str]:
+        """常駐鍵快照"""
+        with self._lock:
+            return list(self.t1.keys()) + list(self.t2.keys())
+
+    def entries(self) -> List[Tuple[str, CacheEntry]]:
+        """常駐條目快照"""
+        with self._lock:
+            return list(self.t1.items()) + list(self.t2.items())
+
+    # ==================== 寫入 ====================
+
+    def put(self, key: str, entry: CacheEntry) -> Optional[CacheEntry]:
+        """放入緩存項，返回被覆蓋的舊條目"""
+        evicted: List[Tuple[str, CacheEntry, str]] = []
+
+        with self._lock:
+            replaced = None
+            if key in self.t1 or key in self.t2:
+                # 更新既有條目：視為一次訪問，移動到T2
+                replaced = self.t1.pop(key, None) or self.t2.pop(key)
+                self.total_bytes -= replaced.size
+                self.t2[key] = entry
+            elif key in self.b1:
+                # 在B1中找到：最近列表太小，增加p
+                self.p = min(self.p + max(1, len(self.b2) // len(self.b1)), self.max_size)
+                self._replace(key, evicted)
+                del self.b1[key]
+                self.t2[key] = entry
+            elif key in self.b2:
+                # 在B2中找到：頻繁列表太小，減少p
+                self.p = max(self.p - max(1, len(self.b1) // len(self.b2)), 0)
+                self._replace(key, evicted)
+                del self.b2[key]
+                self.t2[key] = entry
+            else:
+                # 新條目
+                l1_size = len(self.t1) + len(self.b1)
+                if l1_size >= self.max_size:
+                    if len(self.t1) < self.max_size:
+                        self.b1.popitem(last=False)
+                        self._replace(key, evicted)
+                    else:
+                        old_key, old_entry = self.t1.popitem(last=False)
+                        self.total_bytes -= old_entry.size
+                        self.evictions += 1
+                        evicted.append((old_key, old_entry, "evicted"))
+                else:
+                    total_size = l1_size + len(self.t2) + len(self.b2)
+                    if total_size >= self.max_size:
+                        if total_size >= 2 * self.max_size:
+                            self.b2.popitem(last=False)
+                        self._replace(key, evicted)
+
+                self.t1[key] = entry
+
+            self.total_bytes += entry.size
+
+            # 位元組上限：依ARC順序繼續淘汰，直到低於上限（至少保留新條目）
+            if self.max_bytes is not None:
+                while self.total_bytes > self.max_bytes and len(self.t1) + len(self.t2) > 1:
+                    self._replace(key, evicted, protect=key)
+                self._trim_ghosts()
+
+        self._notify(evicted)
+        return replaced
+
+    def pop(self, key: str) -> Optional[CacheEntry]:
+        """移除緩存項（含幽靈鍵），返回被移除的常駐條目"""
+        with self._lock:
+            self.b1.pop(key, None)
+            self.b2.pop(key, None)
+            if key in self.t1 or key in self.t2:
+                return self._remove_resident(key)
+            return None
+
+    def purge_expired(self) -> int:
+        """移除所有已過期條目，返回移除數量"""
+        expired: List[Tuple[str, CacheEntry, str]] = []
+        with self._lock:
+            for resident in (self.t1, self.t2):
+                for key in [k for k, entry in resident.items() if entry.is_expired()]:
+                    expired.append((key, self._remove_resident(key), "expired"))
+            self.expirations += len(expired)
+
+        self._notify(expired)
+        return len(expired)
+
+    def clear(self):
+        """清空緩存與幽靈列表"""
+        with self._lock:
+            self.t1.clear()
+            self.t2.clear()
+            self.b1.clear()
+            self.b2.clear()
+            self.p = 0
+            self.total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取緩存統計"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'max_size': self.max_size,
+            'total_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'target_t1': self.p,
+            't1': len(self.t1),
+            't2': len(self.t2),
+            'b1': len(self.b1),
+            'b2': len(self.b2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    # ==================== 內部方法 ====================
+
+    def _replace(self, key: str, evicted: List[Tuple[str, CacheEntry, str]], protect: Optional[str] = None):
+        """淘汰一個常駐條目到對應的幽靈列表"""
+        take_t1 = len(self.t1) >= 1 and (
+            (key in self.b2 and len(self.t1) == self.p) or
+            len(self.t1) > self.p or
+            not self.t2
+        )
+        source, ghosts = (self.t1, self.b1) if take_t1 else (self.t2, self.b2)
+
+        old_key = next(iter(source), None)
+        if old_key is not None and old_key == protect:
+            # 位元組上限淘汰時不移除剛寫入的條目，改淘汰另一列表
+            source, ghosts = (self.t2, self.b2) if take_t1 else (self.t1, self.b1)
+            old_key = next(iter(source), None)
+        if old_key is None:
+            return
+
+        old_entry = source.pop(old_key)
+        ghosts[old_key] = None
+        self.total_bytes -= old_entry.size
+        self.evictions += 1
+        evicted.append((old_key, old_entry, "evicted"))
+
+    def _remove_resident(self, key: str) -> CacheEntry:
+        entry = self.t1.pop(key, None)
+        if entry is None:
+            entry = self.t2.pop(key)
+        self.total_bytes -= entry.size
+        return entry
+
+    def _trim_ghosts(self):
+        """維持 |T1|+|B1| <= c 與總長度 <= 2c"""
+        while self.b1 and len(self.t1) + len(self.b1) > self.max_size:
+            self.b1.popitem(last=False)
+        while self.b2 and len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) > 2 * self.max_size:
+            self.b2.popitem(last=False)
+
+    def _notify(self, removed: List[Tuple[str, Optional[CacheEntry], str]]):
+        """在鎖外調用淘汰回調"""
+        if not self.on_evict:
+            return
+        for key, entry, reason in removed:
+            if entry is not None:
+                self.on_evict(key, entry, reason)
+
+
+class IntelligentPrefetcher:
+    """智能預取引擎"""
+
+    def __init__(self, strategy: PrefetchStrategy = PrefetchStrategy.HYBRID, max_streams: int = 10000):
+        self.strategy = strategy
+        self.access_patterns: Dict[str, deque] = defaultdict(lambda: deque(maxlen=100))
+        self.query_sequences: Dict[str, List[str]] = {}
+        self.temporal_patterns: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self.correlation_matrix: Dict[Tuple[str, str], float] = {}
+        self.prefetch_success_rate: Dict[str, float] = {}
+        self.ml_model_weights: Dict[str, float] = {}
+
+        # 串流內（如同一股票）相鄰存取的轉移統計，跨串流共用：前一鍵 → {下一鍵: 次數}
+        self.max_streams = max_streams
+        self.transition_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.transition_totals: Dict[str, int] = defaultdict(int)
+        self._last_in_stream: "OrderedDict[str, str]" = OrderedDict()
+
+    def record_access(self, user_id: str, query_key: str, timestamp: Optional[float] = None):
+        """記錄訪問模式"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        # 記錄訪問序列
+        self.access_patterns[user_id].append((timestamp, query_key))
+
+        # 記錄時間模式
+        self.temporal_patterns[user_id].append((timestamp, query_key))
+
+        # 更新查詢序列
+        if user_id not in self.query_sequences:
+            self.query_sequences[user_id] = []
+        self.query_sequences[user_id].append(query_key)
+
+        # 保持序列長度
+        if len(self.query_sequences[user_id]) > 50:
+            self.query_sequences[user_id] = self.query_sequences[user_id][-50:]
+
+    def record_transition(self, stream_id: str, pattern_key: str) -> Optional[str]:
+        """記錄串流內的存取順序，返回同一串流的前一個鍵
+
+        pattern_key 應為與具體標的無關的模板（如數據類型），
+        使「公司資料 → 價格歷史」這類順序能跨股票累積並用於預測。
+        """
+        previous = self._last_in_stream.pop(stream_id, None)
+        self._last_in_stream[stream_id] = pattern_key
+        if len(self._last_in_stream) > self.max_streams:
+            self._last_in_stream.popitem(last=False)
+
+        if previous is not None and previous != pattern_key:
+            self.transition_counts[previous][pattern_key] += 1
+            self.transition_totals[previous] += 1
+            total = self.transition_totals[previous]
+            for next_key, count in self.transition_counts[previous].items():
+                self.correlation_matrix[(previous, next_key)] = count / total
+
+        return previous
+
+    def predict_transitions(
+        self,
+        pattern_key: str,
+        min_probability: float = 0.3,
+        min_observations: int = 3,
+        limit: int = 3
+    ) -> List[Tuple[str, float]]:
+        """依轉移統計預測緊接在 pattern_key 之後的鍵"""
+        total = self.transition_totals.get(pattern_key, 0)
+        if total < min_observations:
+            return []
+
+        predictions = [
+            (next_key, count / total)
+            for next_key, count in self.transition_counts[pattern_key].items()
+            if count / total >= min_probability
+        ]
+        predictions.sort(key=lambda item: item[1], reverse=True)
+        return predictions[:limit]
+
+    def predict_next_queries(self, user_id: str, current_query: str,
+                           limit: int = 5) -> List[Tuple[str, float]]:
+        """預測下一個查詢"""
+        predictions = []
+
+        if self.strategy in [PrefetchStrategy.SEQUENTIAL, PrefetchStrategy.HYBRID]:
+            seq_predictions = self._sequential_prediction(user_id, current_query)
+            predictions.extend(seq_predictions)
+
+        if self.strategy in [PrefetchStrategy.PATTERN_BASED, PrefetchStrategy.HYBRID]:
+            pattern_predictions = self._pattern_based_prediction(user_id, current_query)
+            predictions.extend(pattern_predictions)
+
+        if self.strategy in [PrefetchStrategy.ML_PREDICTION, PrefetchStrategy.HYBRID]:
+            ml_predictions = self._ml_prediction(user_id, current_query)
+            predictions.extend(ml_predictions)
+
+        # 合併和排序預測結果
+        prediction_scores = defaultdict(float)
+        for query, score in predictions:
+            prediction_scores[query] += score
+
+        # 排序並返回top-k
+        sorted_predictions = sorted(
+            prediction_scores.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )
+
+        return sorted_predictions[:limit]
+
+    def _sequential_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
+        """基於順序模式的預測"""
+        if user_id not in self.query_sequences:
+            return []
+
+        sequences = self.query_sequences[user_id]
+        predictions = []
+
+        # 查找當前查詢的出現位置
+        for i, query in enumerate(sequences[:-1]):
+            if query == current_query:
+                next_query = sequences[i + 1]
+                predictions.append((next_query, 0.6))  # 基礎權重
+
+        return predictions
+
+    def _pattern_based_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
+        """基於模式的預測"""
+        if user_id not in self.temporal_patterns:
+            return []
+
+        patterns = self.temporal_patterns[user_id]
+        current_time = time.time()
+        predictions = []
+
+        # 分析時間模式
+        time_based_patterns = defaultdict(list)
+        for timestamp, query in patterns:
+            hour_of_day = datetime.fromtimestamp(timestamp).hour
+            day_of_week = datetime.fromtimestamp(timestamp).weekday()
+
+            time_based_patterns[(hour_of_day, day_of_week)].append(query)
+
+        # 基於當前時間預測
+        current_hour = datetime.fromtimestamp(current_time).hour
+        current_day = datetime.fromtimestamp(current_time).weekday()
+
+        if (current_hour, current_day) in time_based_patterns:
+            common_queries = time_based_patterns[(current_hour, current_day)]
+            query_counts = defaultdict(int)
+            for query in common_queries:
+                query_counts[query] += 1
+
+            total_count = sum(query_counts.values())
+            for query, count in query_counts.items():
+                if query != current_query:
+                    probability = count / total_count
+                    predictions.append((query, probability * 0.4))  # 時間模式權重
+
+        return predictions
+
+    def _ml_prediction(self, user_id: str, current_query: str) -> List[Tuple[str, float]]:
+        """基於機器學習的預測（簡化版本）"""
+        # 這是一個簡化的ML預測，實際應該使用更複雜的模型
+        if user_id not in self.access_patterns:
+            return []
+
+        # 特徵提取
+        recent_queries = list(self.access_patterns[user_id])[-10:]
+        if not recent_queries:
+            return []
+
+        # 計算查詢相關性
+        correlations = {}
+        for timestamp, query in recent_queries:
+            if query != current_query:
+                # 簡單的相關性計算（基於共現頻率）
+                correlation_key = (current_query, query)
+                if correlation_key in self.correlation_matrix:
+                    correlations[query] = self.correlation_matrix[correlation_key]
+
+        predictions = [(query, score * 0.3) for query, score in correlations.items()]
+        return predictions
+
+    def update_success_rate(self, user_id: str, predicted_query: str, was_accessed: bool):
+        """更新預測成功率"""
+        key = f"{user_id}:{predicted_query}"
+        if key not in self.prefetch_success_rate:
+            self.prefetch_success_rate[key] = 0.5  # 初始值
+
+        # 簡單的移動平均更新
+        current_rate = self.prefetch_success_rate[key]
+        if was_accessed:
+            self.prefetch_success_rate[key] = current_rate * 0.9 + 0.1
+        else:
+            self.prefetch_success_rate[key] = current_rate * 0.9
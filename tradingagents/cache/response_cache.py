@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Response Cache - 公開內容端點的 HTTP 響應快取
+
+以路由與查詢參數為鍵，保存已序列化的響應本體：
+- 每個本體只序列化與壓縮一次（gzip，安裝 brotli 時另存 br），命中時直接回傳位元組
+- 強 ETag（本體 sha256），支援 If-None-Match 條件請求回傳 304
+- 以標籤失效：管理後台修改內容時使相關路由的快取失效；
+  計算期間發生失效的結果不會寫入快取，避免寫回舊內容
+- 同一鍵的並發未命中只計算一次（流量尖峰時只有一個請求查詢數據庫）
+"""
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Set
+from urllib.parse import urlencode
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+try:
+    from fastapi import Request, Response
+    FASTAPI_AVAILABLE = True
+except ImportError:
+    FASTAPI_AVAILABLE = False
+    Request = Response = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """已序列化（並預先壓縮）的響應"""
+    body: bytes
+    etag: str
+    status_code: int = 200
+    media_type: str = "application/json"
+    tags: FrozenSet[str] = frozenset()
+    created_at: float = field(default_factory=time.time)
+    expires_at: float = 0.0
+    cacheable: bool = True
+    encoded_bodies: Dict[str, bytes] = field(default_factory=dict)
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """各編碼表示的 ETag（壓縮表示在引號內加上編碼後綴）"""
+        if not encoding:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """If-None-Match 是否符合任一表示（弱比較）"""
+        if not if_none_match:
+            return False
+        candidates = {tag.strip() for tag in if_none_match.split(',')}
+        if '*' in candidates:
+            return True
+        candidates = {tag[2:] if tag.startswith('W/') else tag for tag in candidates}
+        return any(
+            self.etag_for(encoding) in candidates
+            for encoding in [None, *self.encoded_bodies.keys()]
+        )
+
+
+class ResponseCache:
+    """
+    響應快取
+
+    Args:
+        max_entries: 最多保存的響應數（LRU 淘汰）
+        ttl_seconds: 預設存活時間
+        compress_min_bytes: 小於此大小的本體不預先壓縮
+        max_age_seconds: 回傳給客戶端的 Cache-Control max-age
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: int = 300,
+                 compress_min_bytes: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 5, max_age_seconds: int = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.compress_min_bytes = compress_min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_age_seconds = max_age_seconds
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = defaultdict(set)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'not_modified': 0,
+            'invalidations': 0,
+            'evictions': 0,
+            'stale_discards': 0
+        }
+
+    # ==================== 鍵與序列化 ====================
+
+    @staticmethod
+    def make_key(route: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """路由 + 排序後的查詢參數（忽略 None）"""
+        if not params:
+            return route
+        items = sorted((name, str(value)) for name, value in params.items() if value is not None)
+        return f"{route}?{urlencode(items)}" if items else route
+
+    def build_entry(self, data: Any, tags: Iterable[str] = (), cacheable: bool = True,
+                    ttl_seconds: Optional[int] = None,
+                    meta: Optional[Dict[str, Any]] = None) -> CachedResponse:
+        """序列化並預先壓縮響應本體"""
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+        entry = CachedResponse(
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            tags=frozenset(tags),
+            expires_at=time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds),
+            cacheable=cacheable,
+            meta=meta or {}
+        )
+        if cacheable and len(body) >= self.compress_min_bytes:
+            entry.encoded_bodies['gzip'] = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            if BROTLI_AVAILABLE:
+                entry.encoded_bodies['br'] = brotli.compress(body, quality=self.brotli_quality)
+        return entry
+
+    # ==================== 讀寫 ====================
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """讀取未過期的響應"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expired:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        """寫入響應（超過上限時淘汰最久未使用者）"""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._tag_index[tag].add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             tags: Iterable[str] = (),
+                             cacheable: Callable[[Any], bool] = lambda data: True,
+                             ttl_seconds: Optional[int] = None,
+                             meta: Callable[[Any], Dict[str, Any]] = lambda data: {}) -> CachedResponse:
+        """
+        讀取快取，未命中時計算並寫入
+
+        同一鍵的並發未命中共用同一次計算；計算期間若發生失效，結果只回傳不寫入。
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            data = await compute()
+            should_cache = cacheable(data)
+            entry = self.build_entry(data, tags, should_cache, ttl_seconds, meta(data) if should_cache else {})
+            if should_cache:
+                if generation == self._generation:
+                    self.put(key, entry)
+                else:
+                    self.stats['stale_discards'] += 1
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # 沒有其他等待者時避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # ==================== 失效 ====================
+
+    def invalidate(self, *tags: str) -> int:
+        """使帶有任一標籤的響應失效"""
+        self._generation += 1
+        self.stats['invalidations'] += 1
+        keys = set()
+        for tag in tags:
+            keys.update(self._tag_index.pop(tag, set()))
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def invalidate_all(self) -> int:
+        """清空快取"""
+        self._generation += 1
+        self.stats['invalidations'] += 1
+        count = len(self._entries)
+        self._entries.clear()
+        self._tag_index.clear()
+        return count
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    # ==================== HTTP 響應 ====================
+
+    def build_response(self, entry: CachedResponse, request: "Request") -> "Response":
+        """依 If-None-Match 與 Accept-Encoding 建立響應"""
+        headers = {'Vary': 'Accept-Encoding'}
+        if not entry.cacheable:
+            headers['Cache-Control'] = 'no-store'
+            return Response(content=entry.body, status_code=entry.status_code,
+                            media_type=entry.media_type, headers=headers)
+
+        encoding = self._negotiate_encoding(entry, request.headers.get('accept-encoding', ''))
+        headers['ETag'] = entry.etag_for(encoding)
+        headers['Cache-Control'] = f'public, max-age={self.max_age_seconds}, must-revalidate'
+
+        if entry.matches(request.headers.get('if-none-match')):
+            self.stats['not_modified'] += 1
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        if encoding:
+            body = entry.encoded_bodies[encoding]
+            headers['Content-Encoding'] = encoding
+        return Response(content=body, status_code=entry.status_code,
+                        media_type=entry.media_type, headers=headers)
+
+    @staticmethod
+    def _negotiate_encoding(entry: CachedResponse, accept_encoding: str) -> Optional[str]:
+        """選擇客戶端接受且已預先壓縮的編碼（br 優先）"""
+        accepted = {}
+        for part in accept_encoding.lower().split(','):
+            pieces = part.strip().split(';')
+            name = pieces[0].strip()
+            if not name:
+                continue
+            quality = 1.0
+            for param in pieces[1:]:
+                param = param.strip()
+                if param.startswith('q='):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            accepted[name] = quality
+
+        for encoding in ('br', 'gzip'):
+            if encoding in entry.encoded_bodies and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+                return encoding
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """快取統計"""
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'bytes': sum(len(entry.body) + sum(len(body) for body in entry.encoded_bodies.values())
+                         for entry in self._entries.values()),
+            'hit_rate': round((self.stats['hits'] + self.stats['coalesced']) / lookups, 4) if lookups else 0.0,
+            'brotli_available': BROTLI_AVAILABLE,
+            **self.stats
+        }
+
+
+def invalidates(cache: ResponseCache, *tags: str):
+    """
+    裝飾器：處理函數執行後使快取失效（未指定標籤時清空整個快取）
+
+    放在路由裝飾器之內，例如：
+
+        @app.put("/admin/content/{content_id}")
+        @invalidates(response_cache, "articles")
+        async def update_content(...): ...
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                if tags:
+                    cache.invalidate(*tags)
+                else:
+                    cache.invalidate_all()
+        return wrapper
+    return decorator
@@ -57,6 +57,17 @@ from .realtime_cost_monitor import (
     AlertConfigurationFactory
 )
 
+from .metrics_store import (
+    TimeBucketedMetricsStore,
+    MetricBucket,
+    MetricAggregate
+)
+
+from .websocket_broadcaster import (
+    WebSocketBroadcaster,
+    ClientChannel
+)
+
 from .cost_calculation_service import (
     CostCalculationService,
     CostCalculationRequest,
@@ -127,6 +138,11 @@ __all__ = [
     "MonitoringScope",
     "MonitoringMetricType",
     "AlertConfigurationFactory",
+    "TimeBucketedMetricsStore",
+    "MetricBucket",
+    "MetricAggregate",
+    "WebSocketBroadcaster",
+    "ClientChannel",
     
     # 成本計算服務
     "CostCalculationService", 
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Metrics Store - 時間分桶監控指標存儲
+GPT-OSS整合任務2.1.2 - 成本追蹤系統實現
+
+為實時成本監控提供以 (target_id, metric_type) 為索引、按分鐘分桶的指標存儲：
+- 每個分桶預先聚合 count / sum / min / max，規則評估只需讀取窗口內的少數分桶
+- 每個目標保留有界的原始指標序列，用於觸發告警時列出違規數據點與異常檢測
+- 以全域序列（target_id=None）支援組織層級的規則與趨勢分析
+"""
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# 組織層級（所有目標）聚合序列所使用的目標 ID
+ALL_TARGETS = None
+
+
+@dataclass
+class MetricBucket:
+    """單一時間分桶的預聚合值"""
+    bucket_id: int
+    count: int = 0
+    total: float = 0.0
+    min_value: float = math.inf
+    max_value: float = -math.inf
+
+    def add(self, value: float):
+        """加入一個觀測值"""
+        self.count += 1
+        self.total += value
+        if value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+
+@dataclass
+class MetricAggregate:
+    """多個分桶合併後的聚合結果"""
+    count: int = 0
+    total: float = 0.0
+    min_value: float = math.inf
+    max_value: float = -math.inf
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge_bucket(self, bucket: MetricBucket):
+        """合併一個分桶"""
+        self.count += bucket.count
+        self.total += bucket.total
+        self.min_value = min(self.min_value, bucket.min_value)
+        self.max_value = max(self.max_value, bucket.max_value)
+
+
+class TimeBucketedMetricsStore:
+    """
+    時間分桶指標存儲
+
+    Args:
+        value_getter: 從指標物件取出指定指標類型數值的函數
+        metric_types: 需要建立分桶索引的指標類型
+        bucket_seconds: 分桶寬度（預設一分鐘）
+        retention: 分桶與原始指標保留時間（寫入時淘汰超出保留時間的舊資料）
+        max_points_per_target: 每個目標保留的原始指標數上限
+    """
+
+    def __init__(
+        self,
+        value_getter: Callable[[Any, Hashable], Any],
+        metric_types: Iterable[Hashable],
+        bucket_seconds: int = 60,
+        retention: timedelta = timedelta(days=30),
+        max_points_per_target: int = 2000
+    ):
+        self.value_getter = value_getter
+        self.metric_types = list(metric_types)
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.max_points_per_target = max_points_per_target
+        self._retention_buckets = max(1, int(retention.total_seconds() // bucket_seconds))
+
+        # (target_id, metric_type) -> 依時間排序的分桶
+        self._series: Dict[Tuple[Optional[str], Hashable], Deque[MetricBucket]] = {}
+        # target_id -> 依時間排序的原始指標
+        self._points: Dict[str, Deque[Any]] = {}
+        # 自上次 drain_updated_targets 以來有新指標的目標
+        self._updated_targets: Set[str] = set()
+
+    # ==================== 寫入 ====================
+
+    def add(self, metrics: Any):
+        """加入一筆監控指標（需具備 target_id 與 timestamp 屬性）"""
+        bucket_id = self.bucket_id(metrics.timestamp)
+        target_id = metrics.target_id
+
+        for metric_type in self.metric_types:
+            value = float(self.value_getter(metrics, metric_type))
+            self._bucket_for(target_id, metric_type, bucket_id).add(value)
+            self._bucket_for(ALL_TARGETS, metric_type, bucket_id).add(value)
+
+        points = self._points.get(target_id)
+        if points is None:
+            points = deque(maxlen=self.max_points_per_target)
+            self._points[target_id] = points
+        points.append(metrics)
+        cutoff = metrics.timestamp - self.retention
+        while points[0].timestamp < cutoff:
+            points.popleft()
+        self._updated_targets.add(target_id)
+
+    def _bucket_for(self, target_id: Optional[str], metric_type: Hashable, bucket_id: int) -> MetricBucket:
+        key = (target_id, metric_type)
+        buckets = self._series.get(key)
+        if buckets is None:
+            buckets = deque()
+            self._series[key] = buckets
+
+        # 常見情況：指標依時間順序到達，只需檢查最後一個分桶
+        if buckets and buckets[-1].bucket_id == bucket_id:
+            return buckets[-1]
+        if not buckets or buckets[-1].bucket_id < bucket_id:
+            bucket = MetricBucket(bucket_id)
+            buckets.append(bucket)
+            # 新分桶開啟時淘汰超出保留時間的舊分桶
+            first_bucket = bucket_id - self._retention_buckets
+            while buckets[0].bucket_id < first_bucket:
+                buckets.popleft()
+            return bucket
+
+        # 亂序到達：從尾端往前尋找插入位置
+        for index in range(len(buckets) - 1, -1, -1):
+            if buckets[index].bucket_id == bucket_id:
+                return buckets[index]
+            if buckets[index].bucket_id < bucket_id:
+                bucket = MetricBucket(bucket_id)
+                buckets.insert(index + 1, bucket)
+                return bucket
+        bucket = MetricBucket(bucket_id)
+        buckets.appendleft(bucket)
+        return bucket
+
+    # ==================== 查詢 ====================
+
+    def bucket_id(self, timestamp: datetime) -> int:
+        """時間點所屬的分桶編號"""
+        return int(timestamp.timestamp() // self.bucket_seconds)
+
+    def window_start(self, cutoff: datetime) -> datetime:
+        """將窗口起點向下取整至分桶邊界（規則評估的實際窗口起點）"""
+        bucket_start = self.bucket_id(cutoff) * self.bucket_seconds
+        return datetime.fromtimestamp(bucket_start, tz=cutoff.tzinfo)
+
+    def buckets(self, target_id: Optional[str], metric_type: Hashable,
+                since: datetime) -> List[MetricBucket]:
+        """讀取 since 所在分桶（含）之後的分桶，依時間排序"""
+        series = self._series.get((target_id, metric_type))
+        if not series:
+            return []
+
+        first_bucket = self.bucket_id(since)
+        selected = []
+        for bucket in reversed(series):
+            if bucket.bucket_id < first_bucket:
+                break
+            selected.append(bucket)
+        selected.reverse()
+        return selected
+
+    def aggregate(self, target_id: Optional[str], metric_type: Hashable,
+                  since: datetime) -> Optional[MetricAggregate]:
+        """合併窗口內分桶；窗口內沒有指標時返回 None"""
+        aggregate = MetricAggregate()
+        series = self._series.get((target_id, metric_type))
+        if not series:
+            return None
+
+        first_bucket = self.bucket_id(since)
+        for bucket in reversed(series):
+            if bucket.bucket_id < first_bucket:
+                break
+            aggregate.merge_bucket(bucket)
+
+        return aggregate if aggregate.count else None
+
+    def points(self, target_id: str, since: datetime) -> List[Any]:
+        """讀取目標在 since 之後（含）的原始指標，依時間排序"""
+        series = self._points.get(target_id)
+        if not series:
+            return []
+
+        selected = []
+        for metrics in reversed(series):
+            if metrics.timestamp < since:
+                break
+            selected.append(metrics)
+        selected.reverse()
+        return selected
+
+    def recent_points(self, target_id: str, limit: int) -> List[Any]:
+        """讀取目標最近 limit 筆原始指標，依時間排序"""
+        series = self._points.get(target_id)
+        if not series:
+            return []
+        selected = list(islice(reversed(series), limit))
+        selected.reverse()
+        return selected
+
+    def target_ids(self) -> List[str]:
+        """所有有原始指標的目標"""
+        return list(self._points.keys())
+
+    def drain_updated_targets(self) -> Set[str]:
+        """取出並清空自上次呼叫以來有新指標的目標"""
+        updated = self._updated_targets
+        self._updated_targets = set()
+        return updated
+
+    def requeue_updated_targets(self, target_ids: Iterable[str]):
+        """把未檢查完的目標放回待檢測集合（已被清理的目標略過）"""
+        self._updated_targets.update(
+            target_id for target_id in target_ids if target_id in self._points
+        )
+
+    # ==================== 清理 ====================
+
+    def prune(self, cutoff: datetime):
+        """移除早於 cutoff 的分桶與原始指標"""
+        first_bucket = self.bucket_id(cutoff)
+
+        for key in list(self._series.keys()):
+            buckets = self._series[key]
+            while buckets and buckets[0].bucket_id < first_bucket:
+                buckets.popleft()
+            if not buckets:
+                del self._series[key]
+
+        for target_id in list(self._points.keys()):
+            points = self._points[target_id]
+            while points and points[0].timestamp < cutoff:
+                points.popleft()
+            if not points:
+                del self._points[target_id]
+                self._updated_targets.discard(target_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取存儲統計"""
+        return {
+            'series': len(self._series),
+            'buckets': sum(len(buckets) for buckets in self._series.values()),
+            'targets': len(self._points),
+            'raw_points': sum(len(points) for points in self._points.values()),
+            'bucket_seconds': self.bucket_seconds
+        }
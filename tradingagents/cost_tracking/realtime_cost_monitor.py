@@ -15,7 +15,6 @@ GPT-OSS整合任務2.1.2 - 成本追蹤系統實現
 import uuid
 import logging
 import asyncio
-import json
 import websockets
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Any, List, Optional, Tuple, Union, Callable, Set
@@ -31,6 +30,8 @@ from contextlib import asynccontextmanager
 from .hardware_cost_calculator import HardwareCostCalculator, HardwareCostCalculationResult
 from .power_maintenance_tracker import PowerMaintenanceTracker, CostCalculationResult
 from .labor_cost_allocator import LaborCostAllocator, CostAllocationResult
+from .metrics_store import TimeBucketedMetricsStore, MetricAggregate, ALL_TARGETS
+from .websocket_broadcaster import WebSocketBroadcaster
 
 logger = logging.getLogger(__name__)
 
@@ -262,8 +263,7 @@ class RealtimeCostMonitor:
         self.alert_history: List[Alert] = []
         self.metrics_history: List[MonitoringMetrics] = []
         
-        # WebSocket連接管理
-        self.websocket_clients: Set[websockets.WebSocketServerProtocol] = set()
+        # WebSocket服務器（客戶端由廣播器管理）
         self.websocket_server = None
         
         # 監控狀態
@@ -278,6 +278,8 @@ class RealtimeCostMonitor:
             'max_metrics_history': 10000,
             'max_alert_history': 1000,
             'websocket_port': 8765,
+            'websocket_client_queue_size': 100,
+            'websocket_send_timeout_seconds': 5.0,
             'anomaly_detection_enabled': True,
             'trend_analysis_enabled': True,
             'auto_optimization_enabled': False,
@@ -293,6 +295,20 @@ class RealtimeCostMonitor:
             'moving_average_window': 20
         }
         
+        # 按 (target_id, metric_type) 索引、按分鐘預聚合的指標存儲
+        self.metrics_store = TimeBucketedMetricsStore(
+            value_getter=self._get_metric_value,
+            metric_types=list(MetricType),
+            bucket_seconds=60,
+            retention=timedelta(days=self.config['data_retention_days'])
+        )
+        
+        # WebSocket扇出廣播器：每客戶端有界佇列，慢客戶端不阻塞監控迴圈
+        self.broadcaster = WebSocketBroadcaster(
+            max_queue_size=self.config['websocket_client_queue_size'],
+            send_timeout_seconds=self.config['websocket_send_timeout_seconds']
+        )
+        
         self.logger.info("✅ Real-time Cost Monitor initialized")
     
     # ==================== 監控控制 ====================
@@ -332,7 +348,8 @@ class RealtimeCostMonitor:
                 except asyncio.CancelledError:
                     pass
             
-            # 停止WebSocket服務器
+            # 停止WebSocket廣播與服務器
+            await self.broadcaster.close()
             if self.websocket_server:
                 self.websocket_server.close()
                 await self.websocket_server.wait_closed()
@@ -429,7 +446,7 @@ class RealtimeCostMonitor:
                     cost_per_unit=cost_result.cost_per_token
                 )
                 
-                self.metrics_history.append(metrics)
+                self._record_metrics(metrics)
             
         except Exception as e:
             self.logger.error(f"❌ Error collecting hardware metrics: {e}")
@@ -459,7 +476,7 @@ class RealtimeCostMonitor:
                     power_usage_effectiveness=cost_result.power_usage_effectiveness or 1.0
                 )
                 
-                self.metrics_history.append(metrics)
+                self._record_metrics(metrics)
                 
         except Exception as e:
             self.logger.error(f"❌ Error collecting power/maintenance metrics: {e}")
@@ -490,11 +507,16 @@ class RealtimeCostMonitor:
                         quality_score=cost_result.average_quality_score or 1.0
                     )
                     
-                    self.metrics_history.append(metrics)
+                    self._record_metrics(metrics)
                     
         except Exception as e:
             self.logger.error(f"❌ Error collecting labor metrics: {e}")
     
+    def _record_metrics(self, metrics: MonitoringMetrics):
+        """記錄指標到歷史與分桶存儲"""
+        self.metrics_history.append(metrics)
+        self.metrics_store.add(metrics)
+    
     # ==================== 告警管理 ====================
     
     def create_alert_rule(self, rule: AlertRule) -> bool:
@@ -533,22 +555,24 @@ class RealtimeCostMonitor:
     
     async def _evaluate_single_rule(self, rule: AlertRule, current_time: datetime):
         """評估單個告警規則"""
-        # 獲取相關指標
-        relevant_metrics = self._get_relevant_metrics(rule, current_time)
-        
-        if not relevant_metrics:
-            return
+        window_start = self.metrics_store.window_start(
+            current_time - timedelta(minutes=rule.evaluation_period_minutes)
+        )
         
-        # 評估閾值
+        # 以預聚合分桶判斷是否違規，不掃描原始指標
+        has_metrics = False
         is_breach = False
-        breach_metrics = []
-        
-        for metrics in relevant_metrics:
-            current_value = self._get_metric_value(metrics, rule.metric_type)
-            
-            if self._evaluate_threshold(current_value, rule):
+        for target_id in self._get_rule_targets(rule):
+            aggregate = self.metrics_store.aggregate(target_id, rule.metric_type, window_start)
+            if aggregate is None:
+                continue
+            has_metrics = True
+            if self._aggregate_breaches(aggregate, rule, target_id, window_start):
                 is_breach = True
-                breach_metrics.append((metrics, current_value))
+                break
+        
+        if not has_metrics:
+            return
         
         # 更新連續違規計數
         if is_breach:
@@ -558,24 +582,85 @@ class RealtimeCostMonitor:
         
         rule.last_evaluated_at = current_time
         
-        # 檢查是否需要觸發告警
+        # 檢查是否需要觸發告警（僅此時才讀取原始違規指標）
         if (rule.consecutive_breaches >= rule.consecutive_breaches_required and
             is_breach):
+            breach_metrics = []
+            for metrics in self._get_relevant_metrics(rule, current_time):
+                current_value = self._get_metric_value(metrics, rule.metric_type)
+                if self._evaluate_threshold(current_value, rule):
+                    breach_metrics.append((metrics, current_value))
             await self._trigger_alert(rule, breach_metrics, current_time)
     
+    def _get_rule_targets(self, rule: AlertRule) -> List[Optional[str]]:
+        """規則對應的指標序列目標"""
+        if rule.scope == MonitoringScope.ASSET:
+            return list(dict.fromkeys(rule.target_ids))
+        elif rule.scope == MonitoringScope.ORGANIZATION:  # 全局監控
+            return [ALL_TARGETS]
+        return []
+    
+    def _aggregate_breaches(
+        self,
+        aggregate: MetricAggregate,
+        rule: AlertRule,
+        target_id: Optional[str],
+        window_start: datetime
+    ) -> bool:
+        """以分桶聚合值判斷窗口內是否有指標違反閾值"""
+        if rule.threshold_value is None:
+            return False
+        
+        threshold = float(rule.threshold_value)
+        
+        if rule.comparison_operator == "greater_than":
+            return aggregate.max_value > threshold
+        elif rule.comparison_operator == "less_than":
+            return aggregate.min_value < threshold
+        elif rule.comparison_operator == "not_equal":
+            return (abs(aggregate.min_value - threshold) >= 0.01 or
+                    abs(aggregate.max_value - threshold) >= 0.01)
+        elif rule.comparison_operator == "equal":
+            # 閾值遠離 [min, max] 時不可能相等；否則回到原始指標確認
+            if aggregate.min_value > threshold + 0.01 or aggregate.max_value < threshold - 0.01:
+                return False
+            if target_id is ALL_TARGETS:
+                candidates = self._get_recent_history(window_start)
+            else:
+                candidates = self.metrics_store.points(target_id, window_start)
+            return any(
+                self._evaluate_threshold(self._get_metric_value(metrics, rule.metric_type), rule)
+                for metrics in candidates
+            )
+        
+        return False
+    
+    def _get_recent_history(self, since: datetime) -> List[MonitoringMetrics]:
+        """從歷史尾端讀取 since 之後的指標（歷史依時間順序追加）"""
+        recent = []
+        for metrics in reversed(self.metrics_history):
+            if metrics.timestamp < since:
+                break
+            recent.append(metrics)
+        recent.reverse()
+        return recent
+    
     def _get_relevant_metrics(self, rule: AlertRule, current_time: datetime) -> List[MonitoringMetrics]:
         """獲取相關指標"""
-        cutoff_time = current_time - timedelta(minutes=rule.evaluation_period_minutes)
+        window_start = self.metrics_store.window_start(
+            current_time - timedelta(minutes=rule.evaluation_period_minutes)
+        )
         
-        relevant_metrics = []
-        for metrics in self.metrics_history:
-            if metrics.timestamp >= cutoff_time:
-                if rule.scope == MonitoringScope.ASSET and metrics.target_id in rule.target_ids:
-                    relevant_metrics.append(metrics)
-                elif rule.scope == MonitoringScope.ORGANIZATION:  # 全局監控
-                    relevant_metrics.append(metrics)
+        if rule.scope == MonitoringScope.ASSET:
+            relevant_metrics = []
+            for target_id in self._get_rule_targets(rule):
+                relevant_metrics.extend(self.metrics_store.points(target_id, window_start))
+            relevant_metrics.sort(key=lambda m: m.timestamp)
+            return relevant_metrics
+        elif rule.scope == MonitoringScope.ORGANIZATION:  # 全局監控
+            return self._get_recent_history(window_start)
         
-        return relevant_metrics
+        return []
     
     def _get_metric_value(self, metrics: MonitoringMetrics, metric_type: MetricType) -> Union[Decimal, float]:
         """獲取指標值"""
@@ -587,6 +672,8 @@ class RealtimeCostMonitor:
             return metrics.utilization_rate
         elif metric_type == MetricType.EFFICIENCY:
             return metrics.power_usage_effectiveness
+        elif metric_type == MetricType.THROUGHPUT:
+            return metrics.throughput
         elif metric_type == MetricType.QUALITY:
             return metrics.quality_score
         else:
@@ -717,32 +804,31 @@ class RealtimeCostMonitor:
     
     async def _detect_anomalies(self):
         """檢測異常"""
+        # 只檢查上次檢測後有新指標的目標
+        updated_targets = self.metrics_store.drain_updated_targets()
         try:
             # 檢測成本異常激增
-            await self._detect_cost_spikes()
+            await self._detect_cost_spikes(updated_targets)
             
             # 檢測效率異常下降
-            await self._detect_efficiency_drops()
+            await self._detect_efficiency_drops(updated_targets)
             
             # 檢測利用率異常
-            await self._detect_utilization_anomalies()
+            await self._detect_utilization_anomalies(updated_targets)
             
         except Exception as e:
+            # 失敗時放回本輪目標，下一輪重新檢測，避免漏報
+            self.metrics_store.requeue_updated_targets(updated_targets)
             self.logger.error(f"❌ Error detecting anomalies: {e}")
     
-    async def _detect_cost_spikes(self):
+    async def _detect_cost_spikes(self, target_ids: Optional[Set[str]] = None):
         """檢測成本激增"""
         if len(self.metrics_history) < self.anomaly_config['moving_average_window']:
             return
         
-        # 按資產分組
-        asset_metrics = {}
-        for metrics in self.metrics_history[-50:]:  # 最近50個數據點
-            if metrics.target_id not in asset_metrics:
-                asset_metrics[metrics.target_id] = []
-            asset_metrics[metrics.target_id].append(metrics)
-        
-        for asset_id, metrics_list in asset_metrics.items():
+        # 直接讀取各資產索引中的最近數據點，無需重新分組
+        for asset_id in self._anomaly_targets(target_ids):
+            metrics_list = self.metrics_store.recent_points(asset_id, 50)  # 最近50個數據點
             if len(metrics_list) < self.anomaly_config['moving_average_window']:
                 continue
             
@@ -768,20 +854,17 @@ class RealtimeCostMonitor:
                     spike_threshold
                 )
     
-    async def _detect_efficiency_drops(self):
+    async def _detect_efficiency_drops(self, target_ids: Optional[Set[str]] = None):
         """檢測效率下降"""
         if len(self.metrics_history) < self.anomaly_config['moving_average_window']:
             return
         
-        # 按資產分組檢測PUE異常
-        asset_metrics = {}
-        for metrics in self.metrics_history[-50:]:
-            if metrics.power_usage_effectiveness > 0:  # 過濾有效PUE數據
-                if metrics.target_id not in asset_metrics:
-                    asset_metrics[metrics.target_id] = []
-                asset_metrics[metrics.target_id].append(metrics)
-        
-        for asset_id, metrics_list in asset_metrics.items():
+        # 按資產檢測PUE異常
+        for asset_id in self._anomaly_targets(target_ids):
+            metrics_list = [
+                m for m in self.metrics_store.recent_points(asset_id, 50)
+                if m.power_usage_effectiveness > 0  # 過濾有效PUE數據
+            ]
             if len(metrics_list) < 10:
                 continue
             
@@ -806,19 +889,14 @@ class RealtimeCostMonitor:
                     avg_historical
                 )
     
-    async def _detect_utilization_anomalies(self):
+    async def _detect_utilization_anomalies(self, target_ids: Optional[Set[str]] = None):
         """檢測利用率異常"""
         if len(self.metrics_history) < 20:
             return
         
         # 按資產檢測利用率過低
-        asset_metrics = {}
-        for metrics in self.metrics_history[-30:]:
-            if metrics.target_id not in asset_metrics:
-                asset_metrics[metrics.target_id] = []
-            asset_metrics[metrics.target_id].append(metrics)
-        
-        for asset_id, metrics_list in asset_metrics.items():
+        for asset_id in self._anomaly_targets(target_ids):
+            metrics_list = self.metrics_store.recent_points(asset_id, 30)
             if len(metrics_list) < 10:
                 continue
             
@@ -834,6 +912,12 @@ class RealtimeCostMonitor:
                     self.anomaly_config['utilization_low_threshold']
                 )
     
+    def _anomaly_targets(self, target_ids: Optional[Set[str]]) -> List[str]:
+        """異常檢測的目標清單（未指定時檢查所有目標）"""
+        if target_ids is None:
+            return self.metrics_store.target_ids()
+        return sorted(target_ids)
+    
     async def _create_anomaly_alert(
         self,
         alert_type: AlertType,
@@ -911,26 +995,27 @@ class RealtimeCostMonitor:
         if len(self.metrics_history) < 50:
             return
         
-        # 計算24小時成本趨勢
-        recent_24h = [m for m in self.metrics_history 
-                     if m.timestamp > datetime.now(timezone.utc) - timedelta(hours=24)]
+        # 計算24小時成本趨勢（讀取全域分鐘分桶，不掃描原始指標）
+        buckets = self.metrics_store.buckets(
+            ALL_TARGETS, MetricType.COST, datetime.now(timezone.utc) - timedelta(hours=24)
+        )
         
-        if len(recent_24h) < 10:
+        if sum(bucket.count for bucket in buckets) < 10:
             return
         
-        # 按小時分組
-        hourly_costs = {}
-        for metrics in recent_24h:
-            hour_key = metrics.timestamp.replace(minute=0, second=0, microsecond=0)
-            if hour_key not in hourly_costs:
-                hourly_costs[hour_key] = []
-            hourly_costs[hour_key].append(float(metrics.total_cost))
+        # 按小時合併分桶
+        buckets_per_hour = max(1, 3600 // self.metrics_store.bucket_seconds)
+        hourly_totals: Dict[int, List[float]] = {}
+        for bucket in buckets:
+            totals = hourly_totals.setdefault(bucket.bucket_id // buckets_per_hour, [0.0, 0])
+            totals[0] += bucket.total
+            totals[1] += bucket.count
         
         # 計算每小時平均成本
         hourly_averages = []
-        for hour, costs in sorted(hourly_costs.items()):
-            if costs:
-                hourly_averages.append(statistics.mean(costs))
+        for hour, (total, count) in sorted(hourly_totals.items()):
+            if count:
+                hourly_averages.append(total / count)
         
         if len(hourly_averages) < 6:
             return
@@ -1004,22 +1089,22 @@ class RealtimeCostMonitor:
         """啟動WebSocket服務器"""
         try:
             async def handle_client(websocket, path):
-                self.websocket_clients.add(websocket)
+                self.broadcaster.register(websocket)
                 try:
-                    # 發送初始數據
+                    # 發送初始數據（經由客戶端佇列，不直接阻塞在 send）
                     initial_data = {
                         'type': 'initial',
                         'active_alerts': [alert.to_dict() for alert in self.active_alerts.values()],
                         'recent_metrics': [m.to_dict() for m in self.metrics_history[-100:]]
                     }
-                    await websocket.send(json.dumps(initial_data))
+                    self.broadcaster.send_to(websocket, initial_data)
                     
                     # 保持連接
                     await websocket.wait_closed()
                 except websockets.exceptions.ConnectionClosed:
                     pass
                 finally:
-                    self.websocket_clients.discard(websocket)
+                    await self.broadcaster.unregister(websocket)
             
             self.websocket_server = await websockets.serve(
                 handle_client,
@@ -1032,29 +1117,22 @@ class RealtimeCostMonitor:
         except Exception as e:
             self.logger.error(f"❌ Error starting WebSocket server: {e}")
     
-    async def _broadcast_to_websockets(self, data: Dict[str, Any]):
-        """廣播到WebSocket客戶端"""
-        if not self.websocket_clients:
-            return
-        
-        message = json.dumps(data)
-        
-        # 創建弱引用副本以避免在迭代過程中修改集合
-        clients_copy = self.websocket_clients.copy()
-        
-        for client in clients_copy:
-            try:
-                await client.send(message)
-            except websockets.exceptions.ConnectionClosed:
-                self.websocket_clients.discard(client)
-            except Exception as e:
-                self.logger.error(f"❌ Error broadcasting to client: {e}")
-                self.websocket_clients.discard(client)
+    @property
+    def websocket_clients(self) -> Set[Any]:
+        """目前連接的WebSocket客戶端"""
+        return self.broadcaster.clients
+    
+    async def _broadcast_to_websockets(self, data: Dict[str, Any], coalesce_key: Optional[str] = None):
+        """廣播到WebSocket客戶端（只序列化一次並放入各客戶端佇列，不等待發送）"""
+        try:
+            self.broadcaster.broadcast(data, coalesce_key=coalesce_key)
+        except Exception as e:
+            self.logger.error(f"❌ Error broadcasting to clients: {e}")
     
     async def _broadcast_updates(self):
         """廣播更新"""
         try:
-            if not self.websocket_clients:
+            if not len(self.broadcaster):
                 return
             
             # 準備更新數據
@@ -1065,7 +1143,8 @@ class RealtimeCostMonitor:
                 'recent_metrics': [m.to_dict() for m in self.metrics_history[-10:]]
             }
             
-            await self._broadcast_to_websockets(update_data)
+            # 週期更新可合併：慢客戶端只會收到最新一筆
+            await self._broadcast_to_websockets(update_data, coalesce_key='update')
             
         except Exception as e:
             self.logger.error(f"❌ Error broadcasting updates: {e}")
@@ -1139,6 +1218,7 @@ class RealtimeCostMonitor:
             self.metrics_history = [
                 m for m in self.metrics_history if m.timestamp >= cutoff_time
             ]
+            self.metrics_store.prune(cutoff_time)
             
             # 清理舊告警歷史
             if len(self.alert_history) > self.config['max_alert_history']:
@@ -1268,11 +1348,14 @@ class RealtimeCostMonitor:
             }
             
             # 檢查WebSocket連接
+            broadcast_stats = self.broadcaster.get_stats()
             health_status['components']['websocket'] = {
                 'server_running': self.websocket_server is not None,
-                'clients_connected': len(self.websocket_clients),
-                'port': self.config['websocket_port']
+                'port': self.config['websocket_port'],
+                **broadcast_stats
             }
+            if broadcast_stats['backlogged_clients'] > 0:
+                health_status['status'] = 'degraded'
             
             # 檢查組件健康
             hardware_health = await self.hardware_calculator.health_check()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+WebSocket Broadcaster - 非阻塞 WebSocket 扇出廣播器
+GPT-OSS整合任務2.1.2 - 成本追蹤系統實現
+
+為實時成本監控看板提供非阻塞廣播：
+- 每個客戶端一個有界發送佇列與獨立發送任務，慢客戶端不會拖慢其他客戶端或監控迴圈
+- 同一 coalesce_key 的更新消息在佇列中合併為最新一筆；佇列滿時優先丟棄最舊的可合併消息
+- 每個負載只序列化一次，所有客戶端共用同一字串
+- 斷線、丟棄與積壓統計可供 health_check 使用
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Set
+
+try:
+    from websockets.exceptions import ConnectionClosed
+    WEBSOCKETS_AVAILABLE = True
+    _CONNECTION_CLOSED = (ConnectionClosed,)
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+    ConnectionClosed = None
+    _CONNECTION_CLOSED = ()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage:
+    """待發送消息（payload 為已序列化字串，由所有客戶端共用）"""
+    payload: str
+    coalesce_key: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ClientChannel:
+    """單一客戶端的有界發送佇列"""
+
+    def __init__(self, websocket: Any, max_queue_size: int):
+        self.websocket = websocket
+        self.max_queue_size = max_queue_size
+        self.queue: Deque[OutboundMessage] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.messages_sent = 0
+        self.messages_dropped = 0
+        self.messages_coalesced = 0
+        self.max_backlog = 0
+        self.closed = False
+
+    def enqueue(self, message: OutboundMessage) -> str:
+        """
+        加入佇列（不阻塞）
+
+        Returns:
+            'queued' / 'coalesced' / 'dropped_oldest'
+        """
+        result = 'queued'
+
+        # 合併：以新的同鍵消息取代佇列中尚未發送的舊消息
+        if message.coalesce_key is not None:
+            for index, queued in enumerate(self.queue):
+                if queued.coalesce_key == message.coalesce_key:
+                    del self.queue[index]
+                    self.messages_coalesced += 1
+                    result = 'coalesced'
+                    break
+
+        if len(self.queue) >= self.max_queue_size:
+            self._drop_oldest()
+            result = 'dropped_oldest'
+
+        self.queue.append(message)
+        self.max_backlog = max(self.max_backlog, len(self.queue))
+        self.wakeup.set()
+        return result
+
+    def _drop_oldest(self):
+        """丟棄最舊的可合併消息；若全部不可合併則丟棄最舊消息"""
+        for index, queued in enumerate(self.queue):
+            if queued.coalesce_key is not None:
+                del self.queue[index]
+                break
+        else:
+            self.queue.popleft()
+        self.messages_dropped += 1
+
+    @property
+    def backlog(self) -> int:
+        return len(self.queue)
+
+    def oldest_age_seconds(self) -> float:
+        """最舊待發送消息的等待時間"""
+        if not self.queue:
+            return 0.0
+        return time.monotonic() - self.queue[0].enqueued_at
+
+
+class WebSocketBroadcaster:
+    """
+    WebSocket 扇出廣播器
+
+    Args:
+        max_queue_size: 每個客戶端的發送佇列上限
+        send_timeout_seconds: 單次 send 超時，超時視為慢客戶端並斷開連接
+    """
+
+    def __init__(self, max_queue_size: int = 100, send_timeout_seconds: float = 5.0):
+        self.max_queue_size = max_queue_size
+        self.send_timeout_seconds = send_timeout_seconds
+        self.logger = logger
+
+        self._channels: Dict[Any, ClientChannel] = {}
+        self._closing = False
+        self.stats = {
+            'messages_broadcast': 0,
+            'bytes_serialized': 0,
+            'messages_dropped': 0,
+            'messages_coalesced': 0,
+            'clients_registered': 0,
+            'disconnects': {'closed': 0, 'slow': 0, 'error': 0}
+        }
+
+    # ==================== 客戶端管理 ====================
+
+    def register(self, websocket: Any) -> ClientChannel:
+        """註冊客戶端並啟動其發送任務"""
+        channel = self._channels.get(websocket)
+        if channel is not None:
+            return channel
+
+        channel = ClientChannel(websocket, self.max_queue_size)
+        channel.task = asyncio.create_task(self._sender_loop(channel))
+        self._channels[websocket] = channel
+        self.stats['clients_registered'] += 1
+        return channel
+
+    async def unregister(self, websocket: Any, reason: str = 'closed'):
+        """移除客戶端並停止其發送任務"""
+        channel = self._channels.pop(websocket, None)
+        if channel is None:
+            return
+
+        channel.closed = True
+        channel.wakeup.set()
+        self.stats['disconnects'][reason] = self.stats['disconnects'].get(reason, 0) + 1
+        if channel.task and channel.task is not asyncio.current_task():
+            await asyncio.gather(channel.task, return_exceptions=True)
+
+    @property
+    def clients(self) -> Set[Any]:
+        """目前連接的客戶端"""
+        return set(self._channels.keys())
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    # ==================== 發送 ====================
+
+    def serialize(self, data: Dict[str, Any]) -> str:
+        """序列化負載（每個負載只做一次）"""
+        payload = json.dumps(data, default=str)
+        self.stats['bytes_serialized'] += len(payload)
+        return payload
+
+    def broadcast(self, data: Dict[str, Any], coalesce_key: Optional[str] = None) -> int:
+        """
+        廣播到所有客戶端（不阻塞，只入佇列）
+
+        Args:
+            data: 消息內容
+            coalesce_key: 可合併消息的鍵；None 表示不可合併（例如告警）
+
+        Returns:
+            入佇列的客戶端數
+        """
+        if not self._channels or self._closing:
+            return 0
+
+        message = OutboundMessage(self.serialize(data), coalesce_key)
+        self.stats['messages_broadcast'] += 1
+
+        for channel in list(self._channels.values()):
+            self._enqueue(channel, message)
+        return len(self._channels)
+
+    def send_to(self, websocket: Any, data: Dict[str, Any],
+                coalesce_key: Optional[str] = None) -> bool:
+        """發送給單一客戶端（不阻塞，只入佇列）"""
+        channel = self._channels.get(websocket)
+        if channel is None or self._closing:
+            return False
+        self._enqueue(channel, OutboundMessage(self.serialize(data), coalesce_key))
+        return True
+
+    def _enqueue(self, channel: ClientChannel, message: OutboundMessage):
+        result = channel.enqueue(message)
+        if result == 'coalesced':
+            self.stats['messages_coalesced'] += 1
+        elif result == 'dropped_oldest':
+            self.stats['messages_dropped'] += 1
+
+    async def _sender_loop(self, channel: ClientChannel):
+        """客戶端發送迴圈"""
+        reason = None
+        while not channel.closed:
+            if not channel.queue:
+                channel.wakeup.clear()
+                await channel.wakeup.wait()
+                continue
+
+            message = channel.queue.popleft()
+            try:
+                await asyncio.wait_for(
+                    channel.websocket.send(message.payload),
+                    timeout=self.send_timeout_seconds
+                )
+                channel.messages_sent += 1
+            except asyncio.TimeoutError:
+                reason = 'slow'
+                self.logger.warning(
+                    f"WebSocket client send exceeded {self.send_timeout_seconds}s, disconnecting "
+                    f"(backlog={channel.backlog})"
+                )
+                break
+            except _CONNECTION_CLOSED:
+                reason = 'closed'
+                break
+            except Exception as e:
+                reason = 'error'
+                self.logger.error(f"❌ Error sending to WebSocket client: {e}")
+                break
+
+        if reason is not None:
+            await self.unregister(channel.websocket, reason)
+            close = getattr(channel.websocket, 'close', None)
+            if reason == 'slow' and close is not None:
+                try:
+                    await asyncio.wait_for(close(), timeout=self.send_timeout_seconds)
+                except Exception:
+                    pass
+
+    async def close(self):
+        """停止所有發送任務"""
+        self._closing = True
+        for websocket in list(self._channels.keys()):
+            await self.unregister(websocket, 'closed')
+        self._closing = False
+
+    # ==================== 統計 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """獲取廣播統計（供 health_check 使用）"""
+        channels = list(self._channels.values())
+        backlogs = [channel.backlog for channel in channels]
+        return {
+            'clients_connected': len(channels),
+            'total_backlog': sum(backlogs),
+            'max_backlog': max(backlogs) if backlogs else 0,
+            'backlogged_clients': sum(1 for backlog in backlogs if backlog >= self.max_queue_size),
+            'oldest_pending_seconds': round(
+                max((channel.oldest_age_seconds() for channel in channels), default=0.0), 3
+            ),
+            'max_queue_size': self.max_queue_size,
+            'messages_broadcast': self.stats['messages_broadcast'],
+            'bytes_serialized': self.stats['bytes_serialized'],
+            'messages_dropped': self.stats['messages_dropped'],
+            'messages_coalesced': self.stats['messages_coalesced'],
+            'clients_registered': self.stats['clients_registered'],
+            'disconnects': dict(self.stats['disconnects'])
+        }
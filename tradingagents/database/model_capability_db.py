@@ -22,6 +22,12 @@ from .task_metadata_models import (
 
 logger = logging.getLogger(__name__)
 
+def _notify_routing_config_changed():
+    """路由索引與決策快取依賴此處的配置，寫入後遞增路由配置版本（延遲導入避免與 routing 循環依賴）"""
+    from ..routing.routing_index import notify_routing_config_changed
+    notify_routing_config_changed()
+
+
 class ModelCapabilityDBError(Exception):
     """模型能力数据库错误"""
     pass
@@ -149,6 +155,7 @@ class ModelCapabilityDB:
                     session.add(db_model)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 session.refresh(db_model)
                 
                 self.logger.info(f"✅ Created/updated model capability: {provider}/{model_id}")
@@ -287,6 +294,7 @@ class ModelCapabilityDB:
                 db_model.updated_at = datetime.now(timezone.utc)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 session.refresh(db_model)
                 
                 self.logger.info(f"✅ Updated model capability: {provider}/{model_id}")
@@ -332,6 +340,7 @@ class ModelCapabilityDB:
                     session.delete(db_model)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 
                 action = "soft-deleted" if soft_delete else "deleted"
                 self.logger.info(f"✅ {action.capitalize()} model capability: {provider}/{model_id}")
@@ -398,6 +407,7 @@ class ModelCapabilityDB:
                 db_model.updated_at = datetime.now(timezone.utc)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 
                 self.logger.info(f"✅ Updated benchmark scores for {provider}/{model_id}")
                 return True
@@ -0,0 +1,377 @@
+"""
+PostgreSQL 連接池 - 共享的異步/同步連接池與連接池指標
+
+- AsyncPGPool: asyncpg 連接池，供熱點公開端點使用；固定 SQL 文字透過每個連接的
+  prepared statement 快取只解析/規劃一次，查詢不阻塞事件循環
+- SyncPGPool: psycopg2 執行緒安全連接池，供其餘同步端點重用連接，
+  close() 將連接歸還連接池而非斷開
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+    asyncpg = None
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    import psycopg2.pool
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+    psycopg2 = None
+
+
+class QueryStats:
+    """單一查詢名稱的延遲統計"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, duration_ms: float, error: bool = False):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if error:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 3)
+        }
+
+
+class AsyncPGPool:
+    """
+    asyncpg 共享連接池
+
+    由應用 lifespan 呼叫 start()/close()；若啟動時數據庫不可用，
+    第一次 acquire() 會再嘗試建立連接池。
+    """
+
+    def __init__(self, host: str, port: int, database: str, user: str, password: str,
+                 min_size: int = 2, max_size: int = 10,
+                 command_timeout: float = 30.0,
+                 statement_cache_size: int = 256,
+                 connect_timeout: float = 10.0,
+                 connect_retries: int = 3,
+                 retry_delay: float = 2.0,
+                 application_name: str = 'tradingagents_simple_app'):
+        self.logger = logging.getLogger(__name__)
+        self.connect_kwargs = {
+            'host': host,
+            'port': port,
+            'database': database,
+            'user': user,
+            'password': password,
+            'timeout': connect_timeout,
+            'command_timeout': command_timeout,
+            'statement_cache_size': statement_cache_size,
+            'server_settings': {'application_name': application_name}
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+
+        self._pool = None
+        self._start_lock = asyncio.Lock()
+        self._query_stats: Dict[str, QueryStats] = defaultdict(QueryStats)
+        self._acquire_stats = {
+            'acquisitions': 0,
+            'waiting': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'start_failures': 0
+        }
+
+    @property
+    def is_ready(self) -> bool:
+        return self._pool is not None
+
+    async def start(self) -> bool:
+        """建立連接池（重試時使用 asyncio.sleep，不阻塞事件循環）"""
+        if not ASYNCPG_AVAILABLE:
+            self.logger.error("❌ asyncpg 未安裝，無法建立異步連接池")
+            return False
+
+        async with self._start_lock:
+            if self._pool is not None:
+                return True
+
+            for attempt in range(self.connect_retries):
+                try:
+                    self._pool = await asyncpg.create_pool(
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        **self.connect_kwargs
+                    )
+                    self.logger.info(
+                        f"✅ PostgreSQL 連接池已建立 (min={self.min_size}, max={self.max_size})"
+                    )
+                    return True
+                except Exception as e:
+                    self._acquire_stats['start_failures'] += 1
+                    if attempt < self.connect_retries - 1:
+                        self.logger.warning(
+                            f"資料庫連接池建立嘗試 {attempt + 1}/{self.connect_retries} 失敗: {e}"
+                        )
+                        await asyncio.sleep(self.retry_delay)
+                    else:
+                        self.logger.error(f"❌ 資料庫連接池建立失敗: {e}")
+            return False
+
+    async def close(self):
+        """關閉連接池"""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+            self.logger.info("✅ PostgreSQL 連接池已關閉")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncGenerator[Any, None]:
+        """取得連接（記錄等待時間）"""
+        if self._pool is None and not await self.start():
+            raise ConnectionError("數據庫連接池不可用")
+
+        started = time.perf_counter()
+        self._acquire_stats['waiting'] += 1
+        try:
+            connection = await self._pool.acquire()
+        finally:
+            self._acquire_stats['waiting'] -= 1
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._acquire_stats['acquisitions'] += 1
+        self._acquire_stats['total_wait_ms'] += wait_ms
+        self._acquire_stats['max_wait_ms'] = max(self._acquire_stats['max_wait_ms'], wait_ms)
+
+        try:
+            yield connection
+        finally:
+            await self._pool.release(connection)
+
+    async def fetch(self, name: str, query: str, *args, connection: Any = None) -> List[Any]:
+        """執行查詢並返回所有行"""
+        return await self._run(name, 'fetch', query, args, connection)
+
+    async def fetchrow(self, name: str, query: str, *args, connection: Any = None) -> Optional[Any]:
+        """執行查詢並返回第一行"""
+        return await self._run(name, 'fetchrow', query, args, connection)
+
+    async def fetchval(self, name: str, query: str, *args, connection: Any = None) -> Any:
+        """執行查詢並返回第一行第一欄"""
+        return await self._run(name, 'fetchval', query, args, connection)
+
+    async def execute(self, name: str, query: str, *args, connection: Any = None) -> str:
+        """執行不返回結果的語句"""
+        return await self._run(name, 'execute', query, args, connection)
+
+    async def _run(self, name: str, method: str, query: str, args: tuple, connection: Any) -> Any:
+        if connection is None:
+            async with self.acquire() as acquired:
+                return await self._run(name, method, query, args, acquired)
+
+        started = time.perf_counter()
+        error = False
+        try:
+            return await getattr(connection, method)(query, *args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._query_stats[name].record((time.perf_counter() - started) * 1000, error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """連接池指標"""
+        acquisitions = self._acquire_stats['acquisitions']
+        stats = {
+            'ready': self.is_ready,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'size': 0,
+            'idle': 0,
+            'in_use': 0,
+            'waiting': self._acquire_stats['waiting'],
+            'acquisitions': acquisitions,
+            'avg_wait_ms': round(self._acquire_stats['total_wait_ms'] / acquisitions, 3) if acquisitions else 0.0,
+            'max_wait_ms': round(self._acquire_stats['max_wait_ms'], 3),
+            'start_failures': self._acquire_stats['start_failures'],
+            'queries': {name: query.to_dict() for name, query in self._query_stats.items()}
+        }
+        if self._pool is not None:
+            stats['size'] = self._pool.get_size()
+            stats['idle'] = self._pool.get_idle_size()
+            stats['in_use'] = stats['size'] - stats['idle']
+        return stats
+
+
+class PooledConnection:
+    """psycopg2 連接代理：close() 將連接歸還連接池"""
+
+    def __init__(self, pool: 'SyncPGPool', connection: Any):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __del__(self):
+        # 處理函數在例外路徑未呼叫 close() 時，避免連接永久佔用連接池
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._connection.commit()
+        else:
+            self._connection.rollback()
+        self.close()
+
+
+class SyncPGPool:
+    """
+    psycopg2 執行緒安全連接池
+
+    所有方法都會阻塞（建立連接、等待空位），異步程式碼請透過 asyncio.to_thread 呼叫。
+    由應用 lifespan 呼叫 start()；啟動時數據庫不可用則在第一次取連接時再嘗試建立。
+    連接池已滿時最多等待 acquire_timeout 秒。
+    """
+
+    def __init__(self, host: str, port: int, database: str, user: str, password: str,
+                 min_size: int = 1, max_size: int = 10, connect_timeout: int = 10,
+                 acquire_timeout: float = 5.0):
+        self.logger = logging.getLogger(__name__)
+        self.connect_kwargs = {
+            'host': host,
+            'port': port,
+            'database': database,
+            'user': user,
+            'password': password,
+            'connect_timeout': connect_timeout
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self._pool = None
+        self._start_lock = threading.Lock()
+        # ThreadedConnectionPool 已滿時立即拋錯，以號誌讓取用者排隊等待
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.stats = {'checkouts': 0, 'discarded': 0, 'exhausted': 0, 'waits': 0}
+
+    @property
+    def is_ready(self) -> bool:
+        return self._pool is not None
+
+    def start(self) -> bool:
+        """建立連接池（會阻塞，請在工作執行緒中呼叫）"""
+        if not PSYCOPG2_AVAILABLE:
+            self.logger.error("❌ psycopg2 未安裝，無法建立同步連接池")
+            return False
+
+        with self._start_lock:
+            if self._pool is not None:
+                return True
+            try:
+                self._pool = psycopg2.pool.ThreadedConnectionPool(
+                    self.min_size, self.max_size, **self.connect_kwargs
+                )
+                self.logger.info(
+                    f"✅ PostgreSQL 同步連接池已建立 (min={self.min_size}, max={self.max_size})"
+                )
+                return True
+            except Exception as e:
+                self.logger.error(f"❌ 同步連接池建立失敗: {e}")
+                return False
+
+    def _ensure_pool(self):
+        if self._pool is None and not self.start():
+            raise ConnectionError("同步連接池不可用")
+
+    def connection(self) -> PooledConnection:
+        """取出連接；連接池已滿時等待至多 acquire_timeout 秒，逾時拋出 psycopg2.pool.PoolError"""
+        self._ensure_pool()
+        if not self._slots.acquire(blocking=False):
+            self.stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                self.stats['exhausted'] += 1
+                raise psycopg2.pool.PoolError(
+                    f"連接池已滿，等待 {self.acquire_timeout}s 後仍無可用連接"
+                )
+        try:
+            connection = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats['checkouts'] += 1
+        return PooledConnection(self, connection)
+
+    def release(self, connection: Any):
+        """歸還連接；未結束的交易先回滾，已損壞的連接直接丟棄"""
+        try:
+            self._return(connection)
+        finally:
+            self._slots.release()
+
+    def _return(self, connection: Any):
+        if self._pool is None:
+            connection.close()
+            return
+
+        discard = bool(connection.closed)
+        if not discard:
+            try:
+                if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self.stats['discarded'] += 1
+        self._pool.putconn(connection, close=discard)
+
+    def close(self):
+        """關閉所有連接"""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.closeall()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """連接池指標"""
+        stats = {
+            'ready': self.is_ready,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'open': 0,
+            'in_use': 0,
+            **self.stats
+        }
+        if self._pool is not None:
+            stats['in_use'] = len(self._pool._used)
+            stats['open'] = stats['in_use'] + len(self._pool._pool)
+        return stats
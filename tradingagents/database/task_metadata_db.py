@@ -23,6 +23,12 @@ from .task_metadata_models import (
 
 logger = logging.getLogger(__name__)
 
+def _notify_routing_config_changed():
+    """路由索引與決策快取依賴此處的配置，寫入後遞增路由配置版本（延遲導入避免與 routing 循環依賴）"""
+    from ..routing.routing_index import notify_routing_config_changed
+    notify_routing_config_changed()
+
+
 class TaskMetadataDBError(Exception):
     """任务元数据数据库错误"""
     pass
@@ -132,6 +138,7 @@ class TaskMetadataDB:
                 
                 session.add(db_task)
                 session.commit()
+                _notify_routing_config_changed()
                 session.refresh(db_task)
                 
                 self.logger.info(f"✅ Created task metadata: {task_data.task_type}")
@@ -206,6 +213,7 @@ class TaskMetadataDB:
                 db_task.updated_at = datetime.now(timezone.utc)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 session.refresh(db_task)
                 
                 self.logger.info(f"✅ Updated task metadata: {task_type}")
@@ -283,6 +291,7 @@ class TaskMetadataDB:
                 db_task.updated_at = datetime.now(timezone.utc)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 
                 self.logger.info(f"✅ Deleted task metadata: {task_type}")
                 return True
@@ -340,6 +349,7 @@ class TaskMetadataDB:
                     session.add(db_model)
                 
                 session.commit()
+                _notify_routing_config_changed()
                 session.refresh(db_model)
                 
                 self.logger.info(f"✅ Registered model capability: {provider}/{model_id}")
@@ -12,6 +12,7 @@ GPT-OSS虛擬損益表數據庫服務 - 任務2.1.1
 - ROI和成本效益分析
 """
 
+import os
 import uuid
 import logging
 import asyncio
@@ -20,14 +21,14 @@ from typing import Dict, Any, List, Optional, Tuple, Union
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy import and_, or_, desc, func, text, extract, case
+from sqlalchemy import and_, or_, desc, func, text, extract, case, tuple_, literal
 from contextlib import contextmanager
 import calendar
 
 from .database import SessionLocal, engine
 from .virtual_pnl_models import (
     CostCenter, CostTracking, RevenueAttribution, BudgetAllocation,
-    InternalBilling, VirtualPnLSummary,
+    InternalBilling, VirtualPnLSummary, CostDailyRollup,
     CostTrackingCreate, RevenueAttributionCreate, BudgetAllocationCreate,
     VirtualPnLSummaryResponse, CostAnalysisRequest, ROIAnalysisRequest,
     CostCategory, CostType, RevenueSource, BudgetPeriodType, AllocationMethod
@@ -35,6 +36,17 @@ from .virtual_pnl_models import (
 
 logger = logging.getLogger(__name__)
 
+# 並發刷新同一 (成本中心, 日期) 匯總行撞到唯一約束時的重試次數
+ROLLUP_REFRESH_RETRIES = 3
+
+def _to_decimal(value: Any) -> Decimal:
+    """將聚合結果轉換為 Decimal（部分方言對 SUM 返回 float/int 或 NULL）"""
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
 class VirtualPnLDBError(Exception):
     """虛擬損益表數據庫錯誤"""
     pass
@@ -52,9 +64,17 @@ class VirtualPnLDB:
     6. ROI和成本效益分析
     """
     
-    def __init__(self):
-        """初始化虛擬損益表數據庫服務"""
+    def __init__(self, use_daily_rollup: Optional[bool] = None):
+        """初始化虛擬損益表數據庫服務
+        
+        Args:
+            use_daily_rollup: 是否維護並讀取成本日匯總表（cost_daily_rollup），
+                默認讀取環境變量 VIRTUAL_PNL_DAILY_ROLLUP
+        """
         self.logger = logger
+        if use_daily_rollup is None:
+            use_daily_rollup = os.getenv('VIRTUAL_PNL_DAILY_ROLLUP', 'false').lower() in ('1', 'true', 'yes')
+        self.use_daily_rollup = use_daily_rollup
         self._ensure_tables()
         
         # 初始化標準成本中心
@@ -269,6 +289,11 @@ class VirtualPnLDB:
                 session.commit()
                 session.refresh(cost_tracking)
                 
+                # 增量刷新成本日匯總
+                if self.use_daily_rollup:
+                    self._refresh_rollup_for_records(session, [cost_tracking])
+                    session.commit()
+                
                 # 觸發P&L匯總更新
                 await self._update_pnl_summary_for_period(
                     cost_tracking.cost_center_id,
@@ -330,6 +355,11 @@ class VirtualPnLDB:
                 for record in created_records:
                     session.refresh(record)
                 
+                # 增量刷新成本日匯總
+                if self.use_daily_rollup and created_records:
+                    self._refresh_rollup_for_records(session, created_records)
+                    session.commit()
+                
                 # 觸發相關P&L匯總更新
                 affected_cost_centers = set()
                 affected_dates = set()
@@ -352,35 +382,18 @@ class VirtualPnLDB:
     
     async def get_cost_analysis(
         self,
-        request: CostAnalysisRequest
+        request: CostAnalysisRequest,
+        use_rollup: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """獲取成本分析報告"""
+        """獲取成本分析報告（數據庫端分組聚合，僅匯總行返回應用層）"""
         try:
             with self.get_session() as session:
-                query = session.query(CostTracking)
-                
-                # 時間過濾
-                query = query.filter(
-                    CostTracking.record_date >= request.start_date,
-                    CostTracking.record_date <= request.end_date
-                )
+                if use_rollup is None:
+                    use_rollup = self.use_daily_rollup
                 
-                # 成本中心過濾
-                if request.cost_center_ids:
-                    query = query.filter(CostTracking.cost_center_id.in_(request.cost_center_ids))
+                breakdown = self._aggregate_cost_breakdown(session, request, use_rollup)
                 
-                # 成本類別過濾
-                if request.cost_categories:
-                    categories = [cat.value for cat in request.cost_categories]
-                    query = query.filter(CostTracking.cost_category.in_(categories))
-                
-                # 貨幣過濾
-                query = query.filter(CostTracking.currency == request.currency)
-                
-                # 獲取基礎數據
-                cost_records = query.all()
-                
-                if not cost_records:
+                if breakdown['count'] == 0:
                     return {
                         'period': f"{request.start_date} to {request.end_date}",
                         'total_records': 0,
@@ -391,62 +404,25 @@ class VirtualPnLDB:
                         'trends': {}
                     }
                 
-                # 計算匯總統計
-                total_cost = sum(record.amount for record in cost_records)
-                
-                # 按類別分組
-                cost_by_category = {}
-                for record in cost_records:
-                    category = record.cost_category
-                    if category not in cost_by_category:
-                        cost_by_category[category] = {
-                            'total': Decimal('0'),
-                            'count': 0,
-                            'percentage': 0
-                        }
-                    cost_by_category[category]['total'] += record.amount
-                    cost_by_category[category]['count'] += 1
+                total_cost = breakdown['total']
                 
-                # 計算百分比
+                # 計算類別百分比
+                cost_by_category = breakdown['by_category']
                 for category in cost_by_category:
+                    cost_by_category[category]['percentage'] = 0
                     if total_cost > 0:
                         cost_by_category[category]['percentage'] = float(
                             (cost_by_category[category]['total'] / total_cost) * 100
                         )
                 
-                # 按成本類型分組
-                cost_by_type = {}
-                for record in cost_records:
-                    cost_type = record.cost_type
-                    if cost_type not in cost_by_type:
-                        cost_by_type[cost_type] = {
-                            'total': Decimal('0'),
-                            'count': 0
-                        }
-                    cost_by_type[cost_type]['total'] += record.amount
-                    cost_by_type[cost_type]['count'] += 1
-                
-                # 按週期分組
-                cost_by_period = {}
-                if request.period_type == "monthly":
-                    for record in cost_records:
-                        period_key = f"{record.period_year}-{record.period_month:02d}"
-                        if period_key not in cost_by_period:
-                            cost_by_period[period_key] = Decimal('0')
-                        cost_by_period[period_key] += record.amount
-                elif request.period_type == "quarterly":
-                    for record in cost_records:
-                        period_key = f"{record.period_year}-Q{record.period_quarter}"
-                        if period_key not in cost_by_period:
-                            cost_by_period[period_key] = Decimal('0')
-                        cost_by_period[period_key] += record.amount
+                cost_by_period = breakdown['by_period']
                 
                 # 計算趨勢
                 trends = self._calculate_cost_trends(cost_by_period)
                 
                 analysis_result = {
                     'period': f"{request.start_date} to {request.end_date}",
-                    'total_records': len(cost_records),
+                    'total_records': breakdown['count'],
                     'total_cost': float(total_cost),
                     'currency': request.currency,
                     'cost_by_category': {
@@ -462,12 +438,13 @@ class VirtualPnLDB:
                             'total': float(v['total']),
                             'count': v['count']
                         }
-                        for k, v in cost_by_type.items()
+                        for k, v in breakdown['by_type'].items()
                     },
                     'cost_by_period': {
                         k: float(v) for k, v in cost_by_period.items()
                     },
                     'trends': trends,
+                    'data_source': 'daily_rollup' if use_rollup else 'cost_tracking',
                     'generated_at': datetime.now(timezone.utc).isoformat()
                 }
                 
@@ -477,6 +454,275 @@ class VirtualPnLDB:
             self.logger.error(f"❌ Error generating cost analysis: {e}")
             raise VirtualPnLDBError(f"Failed to generate cost analysis: {e}")
     
+    def _cost_source(self, use_rollup: bool) -> Tuple[Any, Any, Any, Any]:
+        """返回成本數據源 (模型, 日期列, 金額合計, 記錄數合計)"""
+        if use_rollup:
+            return (
+                CostDailyRollup,
+                CostDailyRollup.rollup_date,
+                func.sum(CostDailyRollup.total_amount),
+                func.sum(CostDailyRollup.record_count)
+            )
+        return (
+            CostTracking,
+            CostTracking.record_date,
+            func.sum(CostTracking.amount),
+            func.count(CostTracking.id)
+        )
+    
+    def _aggregate_cost_breakdown(
+        self,
+        session: Session,
+        request: CostAnalysisRequest,
+        use_rollup: bool
+    ) -> Dict[str, Any]:
+        """按類別、類型、週期分組聚合成本
+        
+        PostgreSQL 使用 GROUPING SETS 一次返回各維度小計和總計；
+        其他方言按最細粒度分組後在應用層合併（行數只與維度基數相關）。
+        """
+        model, date_column, amount_sum, record_count = self._cost_source(use_rollup)
+        
+        if request.period_type == "monthly":
+            period_columns = [model.period_year, model.period_month]
+        elif request.period_type == "quarterly":
+            period_columns = [model.period_year, model.period_quarter]
+        else:
+            period_columns = []
+        
+        filters = [
+            date_column >= request.start_date,
+            date_column <= request.end_date,
+            model.currency == request.currency
+        ]
+        if request.cost_center_ids:
+            filters.append(model.cost_center_id.in_(request.cost_center_ids))
+        if request.cost_categories:
+            filters.append(model.cost_category.in_([cat.value for cat in request.cost_categories]))
+        
+        def _period_key(values) -> str:
+            if request.period_type == "monthly":
+                return f"{values[0]}-{values[1]:02d}"
+            return f"{values[0]}-Q{values[1]}"
+        
+        breakdown = {
+            'total': Decimal('0'),
+            'count': 0,
+            'by_category': {},
+            'by_type': {},
+            'by_period': {}
+        }
+        
+        if session.get_bind().dialect.name == 'postgresql':
+            grouping_sets = [
+                tuple_(model.cost_category),
+                tuple_(model.cost_type),
+                tuple_()
+            ]
+            if period_columns:
+                grouping_sets.insert(2, tuple_(*period_columns))
+            period_flag = func.grouping(period_columns[0]) if period_columns else literal(1)
+            
+            rows = session.query(
+                model.cost_category,
+                model.cost_type,
+                *period_columns,
+                func.grouping(model.cost_category).label('g_category'),
+                func.grouping(model.cost_type).label('g_type'),
+                period_flag.label('g_period'),
+                amount_sum.label('total'),
+                record_count.label('count')
+            ).filter(*filters).group_by(func.grouping_sets(*grouping_sets)).all()
+            
+            for row in rows:
+                total = _to_decimal(row.total)
+                count = int(row.count or 0)
+                if row.g_category == 0:
+                    breakdown['by_category'][row.cost_category] = {'total': total, 'count': count}
+                elif row.g_type == 0:
+                    breakdown['by_type'][row.cost_type] = {'total': total, 'count': count}
+                elif row.g_period == 0:
+                    breakdown['by_period'][_period_key(row[2:2 + len(period_columns)])] = total
+                else:
+                    breakdown['total'] = total
+                    breakdown['count'] = count
+            return breakdown
+        
+        rows = session.query(
+            model.cost_category,
+            model.cost_type,
+            *period_columns,
+            amount_sum.label('total'),
+            record_count.label('count')
+        ).filter(*filters).group_by(
+            model.cost_category, model.cost_type, *period_columns
+        ).all()
+        
+        for row in rows:
+            total = _to_decimal(row.total)
+            count = int(row.count or 0)
+            breakdown['total'] += total
+            breakdown['count'] += count
+            
+            category = breakdown['by_category'].setdefault(
+                row.cost_category, {'total': Decimal('0'), 'count': 0}
+            )
+            category['total'] += total
+            category['count'] += count
+            
+            cost_type = breakdown['by_type'].setdefault(
+                row.cost_type, {'total': Decimal('0'), 'count': 0}
+            )
+            cost_type['total'] += total
+            cost_type['count'] += count
+            
+            if period_columns:
+                period_key = _period_key(row[2:2 + len(period_columns)])
+                breakdown['by_period'][period_key] = (
+                    breakdown['by_period'].get(period_key, Decimal('0')) + total
+                )
+        
+        return breakdown
+    
+    # ==================== 成本日匯總物化表 ====================
+    
+    async def refresh_cost_daily_rollup(
+        self,
+        start_date: date,
+        end_date: Optional[date] = None,
+        cost_center_ids: Optional[List[uuid.UUID]] = None
+    ) -> int:
+        """重建指定日期範圍的成本日匯總（用於初始回填或修復）"""
+        end_date = end_date or start_date
+        try:
+            with self.get_session() as session:
+                filters = [
+                    CostTracking.record_date >= start_date,
+                    CostTracking.record_date <= end_date
+                ]
+                rollup_filters = [
+                    CostDailyRollup.rollup_date >= start_date,
+                    CostDailyRollup.rollup_date <= end_date
+                ]
+                if cost_center_ids:
+                    filters.append(CostTracking.cost_center_id.in_(cost_center_ids))
+                    rollup_filters.append(CostDailyRollup.cost_center_id.in_(cost_center_ids))
+                
+                refreshed = self._refresh_cost_daily_rollup(session, filters, rollup_filters)
+                session.commit()
+                
+                self.logger.info(
+                    f"✅ Refreshed {refreshed} cost rollup rows for {start_date} to {end_date}"
+                )
+                return refreshed
+                
+        except Exception as e:
+            self.logger.error(f"❌ Error refreshing cost daily rollup: {e}")
+            raise VirtualPnLDBError(f"Failed to refresh cost daily rollup: {e}")
+    
+    def _refresh_rollup_for_records(self, session: Session, records: List[CostTracking]):
+        """
+        增量刷新受新增記錄影響的 (成本中心, 日期) 匯總行
+        
+        成本記錄此時已提交，匯總刷新失敗不應讓呼叫端以為寫入失敗而重送，
+        因此重試用盡後只記錄錯誤，匯總可由 refresh_cost_daily_rollup 修復。
+        """
+        affected_dates = {record.record_date for record in records}
+        affected_centers = {record.cost_center_id for record in records}
+        
+        try:
+            self._refresh_cost_daily_rollup(
+                session,
+                [
+                    CostTracking.record_date.in_(affected_dates),
+                    CostTracking.cost_center_id.in_(affected_centers)
+                ],
+                [
+                    CostDailyRollup.rollup_date.in_(affected_dates),
+                    CostDailyRollup.cost_center_id.in_(affected_centers)
+                ]
+            )
+        except IntegrityError as e:
+            self.logger.error(
+                f"❌ Cost daily rollup refresh kept conflicting for {sorted(affected_dates)}; "
+                f"run refresh_cost_daily_rollup to repair: {e}"
+            )
+    
+    def _refresh_cost_daily_rollup(
+        self,
+        session: Session,
+        source_filters: List[Any],
+        rollup_filters: List[Any]
+    ) -> int:
+        """
+        以分組聚合結果替換匯總表中對應範圍的行
+        
+        兩個交易同時首次寫入同一匯總行時，後到者的 INSERT 會撞到 uq_cost_daily_rollup；
+        在 savepoint 內替換，衝突時回滾到 savepoint 並重新聚合（此時對方已提交，刪除與重算都會包含它）。
+        """
+        for attempt in range(1, ROLLUP_REFRESH_RETRIES + 1):
+            try:
+                with session.begin_nested():
+                    return self._replace_cost_daily_rollup(session, source_filters, rollup_filters)
+            except IntegrityError:
+                if attempt == ROLLUP_REFRESH_RETRIES:
+                    raise
+                self.logger.warning(
+                    f"⚠️ Concurrent cost rollup refresh conflict, retrying ({attempt}/{ROLLUP_REFRESH_RETRIES})"
+                )
+    
+    def _replace_cost_daily_rollup(
+        self,
+        session: Session,
+        source_filters: List[Any],
+        rollup_filters: List[Any]
+    ) -> int:
+        """刪除範圍內的匯總行並寫入重新聚合的結果"""
+        rows = session.query(
+            CostTracking.record_date,
+            CostTracking.cost_center_id,
+            CostTracking.cost_category,
+            CostTracking.cost_type,
+            CostTracking.currency,
+            CostTracking.period_year,
+            CostTracking.period_quarter,
+            CostTracking.period_month,
+            func.sum(CostTracking.amount).label('total_amount'),
+            func.count(CostTracking.id).label('record_count')
+        ).filter(*source_filters).group_by(
+            CostTracking.record_date,
+            CostTracking.cost_center_id,
+            CostTracking.cost_category,
+            CostTracking.cost_type,
+            CostTracking.currency,
+            CostTracking.period_year,
+            CostTracking.period_quarter,
+            CostTracking.period_month
+        ).all()
+        
+        session.query(CostDailyRollup).filter(*rollup_filters).delete(synchronize_session=False)
+        
+        refreshed_at = datetime.now(timezone.utc)
+        session.bulk_insert_mappings(CostDailyRollup, [
+            {
+                'id': uuid.uuid4(),
+                'rollup_date': row.record_date,
+                'cost_center_id': row.cost_center_id,
+                'cost_category': row.cost_category,
+                'cost_type': row.cost_type,
+                'currency': row.currency,
+                'period_year': row.period_year,
+                'period_quarter': row.period_quarter,
+                'period_month': row.period_month,
+                'total_amount': row.total_amount,
+                'record_count': row.record_count,
+                'refreshed_at': refreshed_at
+            }
+            for row in rows
+        ])
+        
+        return len(rows)
+    
     # ==================== 收益歸因管理 ====================
     
     async def create_revenue_attribution(
@@ -817,11 +1063,14 @@ class VirtualPnLDB:
         else:
             month_end = date(period_year, period_month + 1, 1) - timedelta(days=1)
         
-        cost_query = session.query(CostTracking).filter(
+        cost_rows = session.query(
+            CostTracking.cost_category,
+            func.sum(CostTracking.amount)
+        ).filter(
             CostTracking.cost_center_id == cost_center_id,
             CostTracking.record_date >= month_start,
             CostTracking.record_date <= month_end
-        )
+        ).group_by(CostTracking.cost_category).all()
         
         # 按類別統計成本
         cost_totals = {
@@ -836,14 +1085,15 @@ class VirtualPnLDB:
             'other': Decimal('0')
         }
         
-        for cost in cost_query.all():
-            cost_totals['total'] += cost.amount
+        for cost_category, amount in cost_rows:
+            amount = _to_decimal(amount)
+            cost_totals['total'] += amount
             
-            category = cost.cost_category.lower()
+            category = cost_category.lower()
             if category in cost_totals:
-                cost_totals[category] += cost.amount
+                cost_totals[category] += amount
             else:
-                cost_totals['other'] += cost.amount
+                cost_totals['other'] += amount
         
         # 更新成本字段
         pnl_summary.total_costs = cost_totals['total']
@@ -857,10 +1107,13 @@ class VirtualPnLDB:
         pnl_summary.other_costs = cost_totals['other']
         
         # 計算月度收益
-        revenue_query = session.query(RevenueAttribution).filter(
+        revenue_rows = session.query(
+            RevenueAttribution.revenue_source,
+            func.sum(RevenueAttribution.amount)
+        ).filter(
             RevenueAttribution.record_date >= month_start,
             RevenueAttribution.record_date <= month_end
-        )
+        ).group_by(RevenueAttribution.revenue_source).all()
         
         revenue_totals = {
             'total': Decimal('0'),
@@ -871,14 +1124,15 @@ class VirtualPnLDB:
             'other': Decimal('0')
         }
         
-        for revenue in revenue_query.all():
-            revenue_totals['total'] += revenue.amount
+        for revenue_source, amount in revenue_rows:
+            amount = _to_decimal(amount)
+            revenue_totals['total'] += amount
             
-            source = revenue.revenue_source.lower()
+            source = revenue_source.lower()
             if source in revenue_totals:
-                revenue_totals[source] += revenue.amount
+                revenue_totals[source] += amount
             else:
-                revenue_totals['other'] += revenue.amount
+                revenue_totals['other'] += amount
         
         # 更新收益字段
         pnl_summary.total_revenues = revenue_totals['total']
@@ -1032,28 +1286,25 @@ class VirtualPnLDB:
         """計算ROI分析"""
         try:
             with self.get_session() as session:
-                # 獲取分析期間的成本和收益
-                analysis_costs = await self._get_period_costs(
-                    session, request.cost_center_ids, 
-                    request.analysis_period_start, request.analysis_period_end
-                )
+                # 單次條件聚合獲取分析期間與基準期間的成本和收益
+                analysis_window = (request.analysis_period_start, request.analysis_period_end)
+                baseline_window = None
+                if request.baseline_period_start and request.baseline_period_end:
+                    baseline_window = (request.baseline_period_start, request.baseline_period_end)
                 
-                analysis_revenues = await self._get_period_revenues(
-                    session, request.analysis_period_start, request.analysis_period_end
+                cost_totals = self._get_windowed_cost_totals(
+                    session, request.cost_center_ids, analysis_window, baseline_window
+                )
+                revenue_totals = self._get_windowed_revenue_totals(
+                    session, analysis_window, baseline_window
                 )
                 
-                # 獲取基準期間數據（如果提供）
-                baseline_costs = Decimal('0')
-                baseline_revenues = Decimal('0')
+                analysis_costs = cost_totals['analysis']
+                analysis_revenues = revenue_totals['analysis']
                 
-                if request.baseline_period_start and request.baseline_period_end:
-                    baseline_costs = await self._get_period_costs(
-                        session, request.cost_center_ids,
-                        request.baseline_period_start, request.baseline_period_end
-                    )
-                    baseline_revenues = await self._get_period_revenues(
-                        session, request.baseline_period_start, request.baseline_period_end
-                    )
+                # 基準期間數據（如果提供）
+                baseline_costs = cost_totals.get('baseline', Decimal('0'))
+                baseline_revenues = revenue_totals.get('baseline', Decimal('0'))
                 
                 # 計算ROI指標
                 total_investment = analysis_costs
@@ -1090,8 +1341,8 @@ class VirtualPnLDB:
                         payback_months = float(analysis_costs / monthly_net_cash_flow)
                 
                 # 成本節省分析
-                cost_savings_analysis = await self._calculate_cost_savings_analysis(
-                    session, request.analysis_period_start, request.analysis_period_end
+                cost_savings_analysis = self._build_cost_savings_analysis(
+                    revenue_totals['cost_savings'], cost_totals['cloud_fallback']
                 )
                 
                 roi_analysis = {
@@ -1131,60 +1382,83 @@ class VirtualPnLDB:
     
     # ==================== 輔助方法 ====================
     
-    async def _get_period_costs(
+    def _conditional_sums(
+        self,
+        session: Session,
+        amount_column: Any,
+        buckets: Dict[str, Any],
+        *filters: Any
+    ) -> Dict[str, Decimal]:
+        """單次掃描計算多個條件下的金額合計（SUM(CASE WHEN ...)）"""
+        columns = [
+            func.sum(case((condition, amount_column), else_=0)).label(name)
+            for name, condition in buckets.items()
+        ]
+        row = session.query(*columns).filter(*filters).one()
+        return {name: _to_decimal(row[index]) for index, name in enumerate(buckets)}
+    
+    def _get_windowed_cost_totals(
         self,
         session: Session,
         cost_center_ids: Optional[List[uuid.UUID]],
-        start_date: date,
-        end_date: date
-    ) -> Decimal:
-        """獲取指定期間的總成本"""
-        query = session.query(func.sum(CostTracking.amount)).filter(
-            CostTracking.record_date >= start_date,
-            CostTracking.record_date <= end_date
-        )
+        analysis_window: Tuple[date, date],
+        baseline_window: Optional[Tuple[date, date]] = None
+    ) -> Dict[str, Decimal]:
+        """獲取分析/基準期間總成本及分析期間雲端後備成本"""
+        model, date_column, _, _ = self._cost_source(self.use_daily_rollup)
+        amount_column = model.total_amount if self.use_daily_rollup else model.amount
+        
+        in_analysis = date_column.between(*analysis_window)
+        buckets = {
+            'analysis': in_analysis,
+            'cloud_fallback': and_(in_analysis, model.cost_category == CostCategory.CLOUD_FALLBACK.value)
+        }
+        windows = [analysis_window]
+        if baseline_window:
+            buckets['baseline'] = date_column.between(*baseline_window)
+            windows.append(baseline_window)
         
+        filters = [or_(*[date_column.between(*window) for window in windows])]
         if cost_center_ids:
-            query = query.filter(CostTracking.cost_center_id.in_(cost_center_ids))
+            filters.append(model.cost_center_id.in_(cost_center_ids))
         
-        result = query.scalar()
-        return result or Decimal('0')
+        return self._conditional_sums(session, amount_column, buckets, *filters)
     
-    async def _get_period_revenues(
+    def _get_windowed_revenue_totals(
         self,
         session: Session,
-        start_date: date,
-        end_date: date
-    ) -> Decimal:
-        """獲取指定期間的總收益"""
-        result = session.query(func.sum(RevenueAttribution.amount)).filter(
-            RevenueAttribution.record_date >= start_date,
-            RevenueAttribution.record_date <= end_date
-        ).scalar()
+        analysis_window: Tuple[date, date],
+        baseline_window: Optional[Tuple[date, date]] = None
+    ) -> Dict[str, Decimal]:
+        """獲取分析/基準期間總收益及分析期間成本節省收益"""
+        date_column = RevenueAttribution.record_date
+        
+        in_analysis = date_column.between(*analysis_window)
+        buckets = {
+            'analysis': in_analysis,
+            'cost_savings': and_(
+                in_analysis,
+                RevenueAttribution.revenue_source == RevenueSource.COST_SAVINGS.value
+            )
+        }
+        windows = [analysis_window]
+        if baseline_window:
+            buckets['baseline'] = date_column.between(*baseline_window)
+            windows.append(baseline_window)
         
-        return result or Decimal('0')
+        return self._conditional_sums(
+            session,
+            RevenueAttribution.amount,
+            buckets,
+            or_(*[date_column.between(*window) for window in windows])
+        )
     
-    async def _calculate_cost_savings_analysis(
+    def _build_cost_savings_analysis(
         self,
-        session: Session,
-        start_date: date,
-        end_date: date
+        cost_savings: Decimal,
+        cloud_costs: Decimal
     ) -> Dict[str, Any]:
         """計算成本節省分析"""
-        # 獲取成本節省類型的收益
-        cost_savings = session.query(func.sum(RevenueAttribution.amount)).filter(
-            RevenueAttribution.record_date >= start_date,
-            RevenueAttribution.record_date <= end_date,
-            RevenueAttribution.revenue_source == RevenueSource.COST_SAVINGS.value
-        ).scalar() or Decimal('0')
-        
-        # 獲取雲端後備成本
-        cloud_costs = session.query(func.sum(CostTracking.amount)).filter(
-            CostTracking.record_date >= start_date,
-            CostTracking.record_date <= end_date,
-            CostTracking.cost_category == CostCategory.CLOUD_FALLBACK.value
-        ).scalar() or Decimal('0')
-        
         return {
             'total_cost_savings': float(cost_savings),
             'cloud_fallback_costs': float(cloud_costs),
@@ -445,6 +445,40 @@ class VirtualPnLSummary(Base):
         CheckConstraint('roi IS NULL OR roi BETWEEN -100 AND 1000', name='check_valid_roi'),
     )
 
+class CostDailyRollup(Base):
+    """成本日匯總物化表 - 按日/成本中心/類別/類型預聚合，供長區間報表查詢"""
+    __tablename__ = "cost_daily_rollup"
+
+    # 主鍵
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # 匯總維度
+    rollup_date = Column(Date, nullable=False, index=True)
+    cost_center_id = Column(UUID(as_uuid=True), ForeignKey('cost_centers.id'), nullable=False)
+    cost_category = Column(String(30), nullable=False)
+    cost_type = Column(String(20), nullable=False)
+    currency = Column(String(3), nullable=False, default='USD')
+
+    # 期間信息（冗餘存儲以支持按週期分組）
+    period_year = Column(Integer, nullable=False)
+    period_quarter = Column(Integer, nullable=False)
+    period_month = Column(Integer, nullable=False)
+
+    # 聚合值
+    total_amount = Column(Numeric(15, 2), nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+
+    # 刷新時間
+    refreshed_at = Column(DateTime(timezone=True), nullable=False, default=datetime.now(timezone.utc))
+
+    # 約束和索引
+    __table_args__ = (
+        UniqueConstraint('rollup_date', 'cost_center_id', 'cost_category', 'cost_type', 'currency',
+                        name='uq_cost_daily_rollup'),
+        Index('idx_cost_rollup_date_center', 'rollup_date', 'cost_center_id'),
+        Index('idx_cost_rollup_period', 'period_year', 'period_quarter', 'period_month'),
+    )
+
 # ==================== Pydantic 請求/響應模型 ====================
 
 class CostTrackingCreate(BaseModel):
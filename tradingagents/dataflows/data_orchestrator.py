@@ -20,6 +20,7 @@ from decimal import Decimal, InvalidOperation
 from ..default_config import DEFAULT_CONFIG
 from ..utils.user_context import UserContext
 from ..utils.cache_manager import CacheManager, CacheKey, CacheSource, CacheStatus
+from ..utils.tracing import traced
 from ..services.upgrade_conversion_service import UpgradeConversionService, UpgradePrompt
 from ..services.international_market_service import InternationalMarketService
 from .finmind_api import FinMindAPI, create_finmind_client
@@ -379,7 +380,7 @@ class DataOrchestrator:
         
         # 智能路由系統
         self.routing_rules = self._initialize_routing_rules()
-        self.routing_metrics = defaultdict(lambda: defaultdict(lambda: defaultdict(RoutingMetrics)))
+        self.routing_metrics = defaultdict(lambda: defaultdict(dict))
         self.symbol_cache = {}  # 符號信息緩存
         
         # 數據源健康監控
@@ -431,6 +432,14 @@ class DataOrchestrator:
         # 初始化緩存管理器
         self.cache_manager = CacheManager(config=self.config)
         
+        # 預取：以各數據類型最近一次請求的參數（日期區間等）為目標股票提前載入
+        self._recent_request_shapes: Dict[DataType, Tuple[Optional[str], Optional[str], Dict[str, Any]]] = {}
+        for data_type in DataType:
+            self.cache_manager.register_prefetch_loader(
+                data_type.value,
+                lambda symbol, data_type=data_type: self._prefetch_data(symbol, data_type)
+            )
+        
         # 初始化升級轉換服務
         self.upgrade_service = UpgradeConversionService(config=self.config)
         
@@ -556,6 +565,32 @@ class DataOrchestrator:
     
     # ==================== 統一數據請求接口 ====================
     
+    async def get_data(self, request: DataRequest) -> DataResponse:
+        """
+        執行已構建的數據請求
+        
+        Args:
+            request: 統一數據請求
+            
+        Returns:
+            統一數據響應
+        """
+        return await self._execute_request(request)
+    
+    async def _prefetch_data(self, symbol: str, data_type: DataType):
+        """預取載入器：沿用該數據類型最近一次請求的參數，使預取結果與後續請求共用緩存鍵"""
+        shape = self._recent_request_shapes.get(data_type)
+        if shape is None:
+            return
+        start_date, end_date, params = shape
+        await self._execute_request(DataRequest(
+            symbol=symbol,
+            data_type=data_type,
+            start_date=start_date,
+            end_date=end_date,
+            params=dict(params or {})
+        ))
+    
     async def get_stock_data(
         self,
         symbol: str,
@@ -761,6 +796,15 @@ class DataOrchestrator:
     
     # ==================== 核心請求執行邏輯 ====================
     
+    @traced(
+        'data_orchestrator.execute_request',
+        attributes=lambda self, request: {'symbol': request.symbol, 'data.type': request.data_type.value},
+        result_attributes=lambda response: {
+            'success': response.success,
+            'cached': response.cached,
+            'data.source': response.source.value if response.source else ''
+        }
+    )
     async def _execute_request(self, request: DataRequest) -> DataResponse:
         """
         執行統一數據請求
@@ -794,6 +838,9 @@ class DataOrchestrator:
                     )
             
             # 2. 符號分析和數據源路由
+            self._recent_request_shapes[request.data_type] = (
+                request.start_date, request.end_date, request.params
+            )
             symbol_info = self._analyze_symbol(request.symbol)
             data_source = self._route_data_source(request, symbol_info)
             
@@ -805,8 +852,9 @@ class DataOrchestrator:
             
             if cached_response:
                 logger.debug(f"緩存命中: {request.symbol} ({data_source.value})")
+                cached_response.symbol = request.symbol
+                cached_response.data_type = request.data_type
                 cached_response.response_time = (datetime.now() - start_time).total_seconds()
-                cached_response.from_cache = True
                 return cached_response
             
             # 4. 執行數據請求
@@ -1128,21 +1176,48 @@ class DataOrchestrator:
         
         try:
             if request.data_type == DataType.STOCK_PRICE:
-                # 獲取股價數據
-                return await self.finmind_client.get_stock_price(
+                # 獲取股價數據（未指定日期時預設最近30天）
+                end_date = request.end_date or datetime.now().strftime('%Y-%m-%d')
+                start_date = request.start_date or (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+                return await self.finmind_client.get_stock_price_history(
+                    user_context=request.user_context,
                     stock_id=request.symbol,
-                    start_date=request.start_date,
-                    end_date=request.end_date,
-                    user_context=request.user_context
+                    start_date=start_date,
+                    end_date=end_date
                 )
             
             elif request.data_type == DataType.FINANCIAL_DATA:
-                # 獲取財務數據
+                # 獲取財務數據（FinMind 以季為單位，取最近一個已結束的季度）
+                statement_type = request.params.get('statement_type')
+                if statement_type not in ('income', 'balance_sheet', 'cash_flow'):
+                    statement_type = 'income'
+                now = datetime.now()
+                year, quarter = now.year, (now.month - 1) // 3
+                if quarter == 0:
+                    year, quarter = year - 1, 4
                 return await self.finmind_client.get_financial_statement(
+                    user_context=request.user_context,
                     stock_id=request.symbol,
-                    start_date=request.start_date,
-                    end_date=request.end_date,
-                    user_context=request.user_context
+                    statement_type=statement_type,
+                    year=year,
+                    quarter=quarter
+                )
+            
+            elif request.data_type == DataType.COMPANY_PROFILE:
+                # 獲取公司資料
+                return await self.finmind_client.get_stock_info(
+                    user_context=request.user_context,
+                    stock_id=request.symbol
+                )
+            
+            elif request.data_type == DataType.COMPANY_NEWS:
+                # 獲取公司新聞（未指定日期時預設最近7天）
+                start_date = request.start_date or (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
+                return await self.finmind_client.get_stock_news(
+                    user_context=request.user_context,
+                    stock_id=request.symbol,
+                    start_date=start_date,
+                    end_date=request.end_date
                 )
             
             else:
@@ -1303,7 +1378,7 @@ class DataOrchestrator:
         completeness = self._calculate_completeness(raw_data, data_type)
         
         # 評估數據新鮮度
-        freshness_score = self._calculate_freshness(raw_data, data_type)
+        freshness_score = self._calculate_timeliness(raw_data, data_type)
         
         # 計算整體質量分數
         quality_score = (completeness + freshness_score) / 2
@@ -2232,13 +2307,13 @@ class DataOrchestrator:
             success: 是否成功
             response_time: 響應時間
         """
-        metrics = self.routing_metrics[source][symbol_type][data_type]
+        by_data_type = self.routing_metrics[source][symbol_type]
+        metrics = by_data_type.get(data_type)
         
-        if not hasattr(metrics, 'source'):
+        if metrics is None:
             # 初始化指標
-            metrics.source = source
-            metrics.symbol_type = symbol_type
-            metrics.data_type = data_type
+            metrics = RoutingMetrics(source=source, symbol_type=symbol_type, data_type=data_type)
+            by_data_type[data_type] = metrics
         
         if success:
             metrics.update_success(response_time)
@@ -2600,14 +2675,12 @@ class DataOrchestrator:
                         error=cached_data.get('error'),
                         source=DataSource(cached_data.get('source', 'unknown')),
                         metadata=cached_data.get('metadata', {}),
-                        from_cache=True
+                        cached=True
                     )
         except Exception as e:
             logger.error(f"緩存獲取失敗: {e}")
         
         return None
-        
-        return None
     
     async def _cache_response(self, cache_key: CacheKey, response: DataResponse):
         """
@@ -2653,13 +2726,13 @@ class DataOrchestrator:
             return 0
         
         try:
-            # 構建緩存鍵模式
+            # 構建緩存鍵模式（數據源:數據類型:股票代號:參數哈希）
             if symbol and data_type:
-                pattern = f"*:{symbol.upper()}:{data_type.value}:*"
+                pattern = f"*:{data_type.value}:{symbol.upper()}:*"
             elif symbol:
-                pattern = f"*:{symbol.upper()}:*"
+                pattern = f"*:*:{symbol.upper()}:*"
             elif data_type:
-                pattern = f"*:*:{data_type.value}:*"
+                pattern = f"*:{data_type.value}:*"
             else:
                 pattern = "*"
             
@@ -28,6 +28,8 @@ class DataType(Enum):
     CASH_FLOW = "TaiwanStockCashFlowsStatement"
     MARKET_INDEX = "TaiwanStockPrice"  # 修復：基於GOOGLE診斷，FinMind API不支援TaiwanStockIndex
     INSTITUTIONAL_INVESTORS = "InstitutionalInvestors"
+    STOCK_INFO = "TaiwanStockInfo"
+    STOCK_NEWS = "TaiwanStockNews"
 
 class StatementType(Enum):
     """財報類型枚舉"""
@@ -150,16 +152,16 @@ class FinMindAPI:
             return False
         
         # 基本股價數據所有會員都可以使用
-        if data_type in ['daily_price', 'market_index']:
+        if data_type in ['daily_price', 'market_index', 'stock_info', 'stock_news']:
             return True
         
         # 財報數據需要黃金會員以上
         if data_type in ['financial', 'balance_sheet', 'cash_flow']:
-            return user_context.membership_tier.value in ['GOLD', 'DIAMOND']
+            return user_context.membership_tier.value.upper() in ['GOLD', 'DIAMOND']
         
         # 法人數據需要鑽石會員
         if data_type == 'institutional':
-            return user_context.membership_tier.value == 'DIAMOND'
+            return user_context.membership_tier.value.upper() == 'DIAMOND'
         
         return False
     
@@ -444,6 +446,69 @@ class FinMindAPI:
         
         return await self._make_request(request)
     
+    async def get_stock_info(
+        self,
+        user_context: UserContext,
+        stock_id: str
+    ) -> FinMindResponse:
+        """
+        獲取股票基本資訊（公司名稱、產業類別、上市櫃別）
+        
+        Args:
+            user_context: 用戶上下文
+            stock_id: 股票代號
+            
+        Returns:
+            FinMind 回應
+        """
+        # 檢查權限
+        if not self._check_permission(user_context, 'stock_info'):
+            raise FinMindPermissionError("獲取股票資訊需要會員權限")
+        
+        # 構建請求（此數據集不依日期篩選，以當日為起始日）
+        request = FinMindRequest(
+            dataset=DataType.STOCK_INFO.value,
+            data_id=self._normalize_stock_id(stock_id),
+            start_date=datetime.now().strftime('%Y-%m-%d'),
+            user_context=user_context
+        )
+        
+        return await self._make_request(request)
+    
+    async def get_stock_news(
+        self,
+        user_context: UserContext,
+        stock_id: str,
+        start_date: str,
+        end_date: Optional[str] = None
+    ) -> FinMindResponse:
+        """
+        獲取個股相關新聞
+        
+        Args:
+            user_context: 用戶上下文
+            stock_id: 股票代號
+            start_date: 開始日期 (YYYY-MM-DD)
+            end_date: 結束日期 (YYYY-MM-DD)
+            
+        Returns:
+            FinMind 回應
+        """
+        # 檢查權限
+        if not self._check_permission(user_context, 'stock_news'):
+            raise FinMindPermissionError("獲取新聞數據需要會員權限")
+        
+        # 構建請求
+        request = FinMindRequest(
+            dataset=DataType.STOCK_NEWS.value,
+            data_id=self._normalize_stock_id(stock_id),
+            start_date=start_date,
+            end_date=end_date,
+            user_context=user_context
+        )
+        
+        return await self._make_request(request)
+    
     async def get_market_index(
         self,
         user_context: UserContext,
@@ -93,7 +93,7 @@ class TaiwanMarketAPI:
     
     def __init__(self, api_token: str = None):
         self.api_token = api_token or os.getenv('FINMIND_API_TOKEN')
-        self.base_url = "https://api.finmindtrade.com/api/v4"
+        self.base_url = os.getenv('FINMIND_API_BASE_URL', "https://api.finmindtrade.com/api/v4")
         self.logger = logging.getLogger(__name__)
         
         # HTTP客戶端設置
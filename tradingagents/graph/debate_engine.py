@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Debate Engine - 多空辯論子系統
+天工 (TianGong) - TradingAgentsGraph 辯論共識階段
+
+此模組提供：
+1. DebateEngine - 每輪所有參與者（多方、空方、中立）並行發言
+2. DebateTranscript - 增量構建每位參與者的輪次上下文，不重送完整紀錄
+3. 早停機制 - 達成共識、立場變化低於閾值、token / 延遲預算耗盡時停止
+4. DebateOutcome - 辯論紀錄、停止原因與 token 用量
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..agents.analysts.base_analyst import AnalysisResult
+from ..utils.logging_config import get_analysis_logger
+
+logger = get_analysis_logger("debate_engine")
+
+# 建議 → 立場方向
+RECOMMENDATION_DIRECTION = {'BUY': 1.0, 'HOLD': 0.0, 'SELL': -1.0}
+
+# 立場分數超過此值才視為明確的多 / 空建議
+STANCE_DECISION_THRESHOLD = 0.2
+
+
+def estimate_tokens(payload: Any) -> int:
+    """粗略估算 token 數（約 4 字元 / token）"""
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    return max(1, len(text) // 4)
+
+
+def stance_to_recommendation(stance: float) -> str:
+    """立場分數 → 建議"""
+    if stance > STANCE_DECISION_THRESHOLD:
+        return 'BUY'
+    if stance < -STANCE_DECISION_THRESHOLD:
+        return 'SELL'
+    return 'HOLD'
+
+
+# ==================== 數據結構 ====================
+
+@dataclass
+class DebateConfig:
+    """辯論配置"""
+    max_rounds: int = 3
+    min_consensus_threshold: float = 0.6
+    convergence_threshold: float = 0.05            # 所有參與者立場變化皆低於此值即視為收斂
+    max_tokens: Optional[int] = 8000               # 單次分析的辯論 token 預算
+    max_latency_seconds: Optional[float] = 30.0    # 單次分析的辯論延遲預算
+    round_timeout_seconds: float = 60.0            # 單一參與者單輪發言上限
+    max_arguments_per_turn: int = 2
+
+    @classmethod
+    def from_workflow_config(cls, workflow_config: Dict[str, Any]) -> 'DebateConfig':
+        """從 TradingAgentsGraph 的 workflow 配置建立"""
+        return cls(
+            max_rounds=workflow_config.get('max_debate_rounds', 3),
+            min_consensus_threshold=workflow_config.get('min_consensus_threshold', 0.6),
+            convergence_threshold=workflow_config.get('debate_convergence_threshold', 0.05),
+            max_tokens=workflow_config.get('debate_max_tokens', 8000),
+            max_latency_seconds=workflow_config.get('debate_max_latency', 30.0),
+            round_timeout_seconds=workflow_config.get('debate_timeout', 60.0)
+        )
+
+
+@dataclass
+class DebateStance:
+    """參與者在某一輪的立場"""
+    participant_id: str
+    recommendation: str
+    confidence: float
+    stance: float                                   # -1（強烈看空）~ 1（強烈看多）
+    arguments: List[str] = field(default_factory=list)
+    tokens_used: int = 0
+    timed_out: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'participant_id': self.participant_id,
+            'recommendation': self.recommendation,
+            'confidence': round(self.confidence, 4),
+            'stance': round(self.stance, 4),
+            'arguments': self.arguments,
+            'tokens_used': self.tokens_used,
+            'timed_out': self.timed_out
+        }
+
+
+@dataclass
+class DebateParticipant:
+    """辯論參與者（由分析師結果建立）"""
+    participant_id: str
+    initial_result: AnalysisResult
+    current: DebateStance = None
+
+    def __post_init__(self):
+        if self.current is None:
+            direction = RECOMMENDATION_DIRECTION.get(self.initial_result.recommendation, 0.0)
+            self.current = DebateStance(
+                participant_id=self.participant_id,
+                recommendation=self.initial_result.recommendation,
+                confidence=self.initial_result.confidence,
+                stance=direction * self.initial_result.confidence,
+                arguments=list(self.initial_result.reasoning or [])
+            )
+
+    @property
+    def side(self) -> str:
+        """bull / bear / neutral"""
+        if self.current.stance > STANCE_DECISION_THRESHOLD:
+            return 'bull'
+        if self.current.stance < -STANCE_DECISION_THRESHOLD:
+            return 'bear'
+        return 'neutral'
+
+
+@dataclass
+class DebateOutcome:
+    """辯論結果"""
+    rounds: List[Dict[str, Any]] = field(default_factory=list)
+    consensus_achieved: bool = False
+    consensus_score: float = 0.0
+    final_recommendation: str = 'HOLD'
+    stop_reason: str = 'max_rounds'
+    total_tokens: int = 0
+    full_transcript_tokens: int = 0                 # 每輪重送完整紀錄時的 token 估算
+    duration_seconds: float = 0.0
+
+    def to_consensus_result(self) -> Dict[str, Any]:
+        """WorkflowState.consensus_result 格式"""
+        return {
+            'consensus_achieved': self.consensus_achieved,
+            'consensus_score': self.consensus_score,
+            'debate_rounds': len(self.rounds),
+            'final_recommendation': self.final_recommendation,
+            'stop_reason': self.stop_reason,
+            'debate_tokens': self.total_tokens,
+            'debate_tokens_saved': max(0, self.full_transcript_tokens - self.total_tokens),
+            'debate_duration_seconds': round(self.duration_seconds, 4)
+        }
+
+
+# ==================== 增量上下文 ====================
+
+class DebateTranscript:
+    """辯論紀錄：每位參與者只收到上一輪後其他人的新論點與精簡立場表"""
+
+    def __init__(self, stock_id: str, participants: List[DebateParticipant]):
+        self.stock_id = stock_id
+        self._participants = participants
+        self._turns: List[Dict[str, DebateStance]] = []
+        self._full_tokens = 0
+
+    def context_for(self, participant: DebateParticipant, round_num: int) -> Dict[str, Any]:
+        """構建參與者本輪的增量上下文"""
+        context = {
+            'stock_id': self.stock_id,
+            'round': round_num,
+            'own_position': {
+                'recommendation': participant.current.recommendation,
+                'confidence': round(participant.current.confidence, 3)
+            },
+            # 精簡立場表取代完整發言紀錄
+            'positions': {
+                other.participant_id: [
+                    other.current.recommendation,
+                    round(other.current.confidence, 3),
+                    round(other.current.stance, 3)
+                ]
+                for other in self._participants if other is not participant
+            }
+        }
+        if self._turns:
+            latest = self._turns[-1]
+            context['new_arguments'] = {
+                pid: stance.arguments for pid, stance in latest.items()
+                if pid != participant.participant_id and stance.arguments
+            }
+        else:
+            context['new_arguments'] = {
+                other.participant_id: other.current.arguments
+                for other in self._participants if other is not participant
+            }
+        return context
+
+    def full_context_tokens(self) -> int:
+        """若每輪重送完整紀錄，單一參與者本輪的 token 估算"""
+        return self._full_tokens
+
+    def record_round(self, stances: Dict[str, DebateStance]):
+        self._turns.append(stances)
+        self._full_tokens += estimate_tokens({pid: stance.to_dict() for pid, stance in stances.items()})
+
+    def start(self):
+        self._full_tokens = estimate_tokens({
+            participant.participant_id: participant.current.to_dict() for participant in self._participants
+        })
+
+
+# ==================== 發言者 ====================
+
+DebateResponder = Callable[[DebateParticipant, Dict[str, Any], 'DebateConfig'], Awaitable[Dict[str, Any]]]
+
+
+async def simulated_debate_responder(
+    participant: DebateParticipant,
+    context: Dict[str, Any],
+    config: DebateConfig
+) -> Dict[str, Any]:
+    """規則式發言（不呼叫 LLM）：立場向其他參與者的信心加權立場靠攏，自身信心越高越不易被說服"""
+    own = participant.current
+    weighted_sum = 0.0
+    weight_total = 0.0
+    for _, confidence, stance in context['positions'].values():
+        weighted_sum += stance * confidence
+        weight_total += confidence
+    if weight_total <= 0:
+        return {'recommendation': own.recommendation, 'confidence': own.confidence, 'arguments': []}
+
+    target = weighted_sum / weight_total
+    persuasion = 0.5 * (1.0 - 0.5 * own.confidence)
+    stance = own.stance + persuasion * (target - own.stance)
+
+    opponents = list(context.get('new_arguments', {}))
+    arguments = [
+        f"第{context['round']}輪回應 {', '.join(opponents[:config.max_arguments_per_turn])}："
+        f"立場由 {own.stance:+.2f} 調整為 {stance:+.2f}"
+    ] if opponents else []
+
+    # 信心度代表參與者的堅持程度，辯論中保持不變
+    return {
+        'recommendation': stance_to_recommendation(stance),
+        'confidence': own.confidence,
+        'stance': stance,
+        'arguments': arguments
+    }
+
+
+# ==================== 辯論引擎 ====================
+
+class DebateEngine:
+    """多空辯論引擎"""
+
+    def __init__(self, config: Optional[DebateConfig] = None, responder: Optional[DebateResponder] = None):
+        self.config = config or DebateConfig()
+        self.responder = responder or simulated_debate_responder
+        self.logger = logger
+
+    @staticmethod
+    def consensus_score(stances: List[DebateStance]) -> float:
+        """最多的建議數量 / 總建議數量"""
+        if not stances:
+            return 0.0
+        counts: Dict[str, int] = {}
+        for stance in stances:
+            counts[stance.recommendation] = counts.get(stance.recommendation, 0) + 1
+        return max(counts.values()) / len(stances)
+
+    @staticmethod
+    def aggregate_recommendation(stances: List[DebateStance]) -> str:
+        """信心加權的整體立場所對應的建議"""
+        weight_total = sum(stance.confidence for stance in stances)
+        if weight_total <= 0:
+            return 'HOLD'
+        return stance_to_recommendation(sum(stance.stance * stance.confidence for stance in stances) / weight_total)
+
+    @staticmethod
+    def majority_recommendation(stances: List[DebateStance]) -> str:
+        """多數派建議（票數相同時取信心總和較高者）"""
+        tally: Dict[str, List[float]] = {}
+        for stance in stances:
+            votes = tally.setdefault(stance.recommendation, [0, 0.0])
+            votes[0] += 1
+            votes[1] += stance.confidence
+        return max(tally.items(), key=lambda item: (item[1][0], item[1][1]))[0]
+
+    async def _respond(self, participant: DebateParticipant, context: Dict[str, Any],
+                       prompt_tokens: int) -> DebateStance:
+        """單一參與者發言（逾時或失敗時保留原立場）"""
+        try:
+            response = await asyncio.wait_for(
+                self.responder(participant, context, self.config),
+                timeout=self.config.round_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning(f"⚠️ 辯論參與者 {participant.participant_id} 第{context['round']}輪逾時，保留原立場")
+            return DebateStance(
+                participant_id=participant.participant_id,
+                recommendation=participant.current.recommendation,
+                confidence=participant.current.confidence,
+                stance=participant.current.stance,
+                tokens_used=prompt_tokens,
+                timed_out=True
+            )
+        except Exception as e:
+            self.logger.error(f"❌ 辯論參與者 {participant.participant_id} 發言失敗: {e}")
+            return DebateStance(
+                participant_id=participant.participant_id,
+                recommendation=participant.current.recommendation,
+                confidence=participant.current.confidence,
+                stance=participant.current.stance,
+                tokens_used=prompt_tokens
+            )
+
+        recommendation = response.get('recommendation', participant.current.recommendation)
+        confidence = float(response.get('confidence', participant.current.confidence))
+        stance = response.get('stance')
+        if stance is None:
+            stance = RECOMMENDATION_DIRECTION.get(recommendation, 0.0) * confidence
+        arguments = list(response.get('arguments') or [])[:self.config.max_arguments_per_turn]
+        return DebateStance(
+            participant_id=participant.participant_id,
+            recommendation=recommendation,
+            confidence=confidence,
+            stance=float(stance),
+            arguments=arguments,
+            tokens_used=int(response.get('tokens_used') or prompt_tokens + estimate_tokens(arguments))
+        )
+
+    def _budget_exhausted(self, outcome: DebateOutcome, elapsed: float, last_round_tokens: int,
+                          last_round_seconds: float) -> Optional[str]:
+        """以上一輪成本預估下一輪是否會超出預算"""
+        if self.config.max_tokens is not None and outcome.total_tokens + last_round_tokens > self.config.max_tokens:
+            return 'token_budget'
+        if (self.config.max_latency_seconds is not None
+                and elapsed + last_round_seconds > self.config.max_latency_seconds):
+            return 'latency_budget'
+        return None
+
+    async def run(self, stock_id: str, results: List[AnalysisResult]) -> DebateOutcome:
+        """執行辯論直到共識、收斂、預算耗盡或達到最大輪數"""
+        participants = [DebateParticipant(result.analyst_id, result) for result in results]
+        transcript = DebateTranscript(stock_id, participants)
+        transcript.start()
+        outcome = DebateOutcome()
+        started = time.perf_counter()
+
+        for round_num in range(1, self.config.max_rounds + 1):
+            round_started = time.perf_counter()
+            contexts = [transcript.context_for(participant, round_num) for participant in participants]
+            prompt_tokens = [estimate_tokens(context) for context in contexts]
+
+            # 同一輪的所有參與者並行發言
+            stances = await asyncio.gather(*(
+                self._respond(participant, context, tokens)
+                for participant, context, tokens in zip(participants, contexts, prompt_tokens)
+            ))
+
+            max_delta = max(abs(stance.stance - participant.current.stance)
+                            for participant, stance in zip(participants, stances))
+            round_tokens = sum(stance.tokens_used for stance in stances)
+            outcome.full_transcript_tokens += (
+                transcript.full_context_tokens() * len(participants) + round_tokens - sum(prompt_tokens)
+            )
+            outcome.total_tokens += round_tokens
+
+            for participant, stance in zip(participants, stances):
+                participant.current = stance
+            transcript.record_round({stance.participant_id: stance for stance in stances})
+
+            round_seconds = time.perf_counter() - round_started
+            consensus_score = self.consensus_score(stances)
+            outcome.rounds.append({
+                'round': round_num,
+                'timestamp': datetime.now().isoformat(),
+                'participants': [
+                    {'participant_id': participant.participant_id, 'side': participant.side}
+                    for participant in participants
+                ],
+                'consensus_score': consensus_score,
+                'stances': [stance.to_dict() for stance in stances],
+                'max_stance_delta': round(max_delta, 4),
+                'tokens': round_tokens,
+                'duration_seconds': round(round_seconds, 4)
+            })
+            outcome.consensus_score = consensus_score
+
+            # 多數派須與加權整體立場一致，避免立場途經中性區時的暫時性多數觸發停止
+            if (consensus_score >= self.config.min_consensus_threshold
+                    and self.majority_recommendation(stances) == self.aggregate_recommendation(stances)):
+                outcome.consensus_achieved = True
+                outcome.stop_reason = 'consensus'
+                break
+            if max_delta < self.config.convergence_threshold:
+                outcome.stop_reason = 'converged'
+                break
+            if round_num < self.config.max_rounds:
+                budget_reason = self._budget_exhausted(
+                    outcome, time.perf_counter() - started, round_tokens, round_seconds
+                )
+                if budget_reason:
+                    outcome.stop_reason = budget_reason
+                    break
+
+        final_stances = [participant.current for participant in participants]
+        if outcome.consensus_achieved:
+            outcome.final_recommendation = self.majority_recommendation(final_stances)
+        else:
+            outcome.final_recommendation = self.aggregate_recommendation(final_stances)
+        outcome.duration_seconds = time.perf_counter() - started
+
+        self.logger.info(
+            f"✅ 辯論完成 {stock_id}: {len(outcome.rounds)} 輪，停止原因 {outcome.stop_reason}，"
+            f"建議 {outcome.final_recommendation}，tokens {outcome.total_tokens}"
+        )
+        return outcome
+
+
+def create_debate_engine(
+    workflow_config: Optional[Dict[str, Any]] = None,
+    responder: Optional[DebateResponder] = None
+) -> DebateEngine:
+    """依 workflow 配置建立辯論引擎"""
+    return DebateEngine(DebateConfig.from_workflow_config(workflow_config or {}), responder)
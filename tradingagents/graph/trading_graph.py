@@ -29,8 +29,10 @@ from ..dataflows.data_orchestrator import DataOrchestrator, DataRequest, DataTyp
 from ..utils.error_handler import handle_error, get_user_friendly_message
 from ..utils.logging_config import get_analysis_logger
 from ..utils.performance_monitor import log_performance
+from ..utils.tracing import get_tracer, traced
 from ..default_config import DEFAULT_CONFIG
 from .production_optimizations import ProductionOptimizer, create_production_optimizer, optimize_for_production
+from .debate_engine import create_debate_engine
 from ..routing.ai_task_router import AITaskRouter, RoutingDecisionRequest, RoutingStrategy
 from ..database.task_metadata_db import TaskMetadataDB
 from ..database.model_capability_db import ModelCapabilityDB
@@ -178,6 +180,9 @@ class TradingAgentsGraph:
             'enable_debate': True,
             'min_consensus_threshold': 0.6,
             'max_debate_rounds': 3,
+            'debate_convergence_threshold': 0.05,
+            'debate_max_tokens': 8000,
+            'debate_max_latency': 30.0,
             'max_parallelism': 4,
             'enable_conflict_resolution': True,
             'retry_attempts': 2,
@@ -185,6 +190,7 @@ class TradingAgentsGraph:
         })
         
         # 初始化組件
+        self.debate_engine = create_debate_engine(self.workflow_config)
         self.data_orchestrator = None
         self.analysts = {}
         self.active_sessions = {}
@@ -514,19 +520,42 @@ class TradingAgentsGraph:
         enable_debate: Optional[bool] = None
     ):
         """執行完整的分析工作流"""
+        tracer = get_tracer()
+        # 工作流在背景任務中執行，每個會話為一個獨立的 trace
+        root_span = tracer.start_span(
+            'analyze_stock',
+            {'stock.id': state.stock_id, 'user.id': state.user_context.user_id if state.user_context else ''},
+            new_trace=True,
+            session_id=state.session_id
+        )
+        with root_span:
+            await self._run_traced_workflow(state, preferred_analysts, enable_debate, root_span.span)
+    
+    async def _run_traced_workflow(
+        self,
+        state: WorkflowState,
+        preferred_analysts: Optional[List[str]],
+        enable_debate: Optional[bool],
+        root_span
+    ):
+        tracer = get_tracer()
         try:
             # 階段 1: 數據收集
-            await self._phase_data_collection(state)
+            with tracer.start_span('phase.data_collection'):
+                await self._phase_data_collection(state)
             
             # 階段 2: 並行分析
-            await self._phase_parallel_analysis(state, preferred_analysts)
+            with tracer.start_span('phase.parallel_analysis'):
+                await self._phase_parallel_analysis(state, preferred_analysts)
             
             # 階段 3: 辯論和共識（如果啟用）
             if enable_debate or (enable_debate is None and self.workflow_config.get('enable_debate', True)):
-                await self._phase_debate_consensus(state)
+                with tracer.start_span('phase.debate_consensus'):
+                    await self._phase_debate_consensus(state)
             
             # 階段 4: 最終整合
-            await self._phase_final_integration(state)
+            with tracer.start_span('phase.final_integration'):
+                await self._phase_final_integration(state)
             
             # 標記完成
             state.current_phase = AnalysisPhase.COMPLETED
@@ -548,6 +577,7 @@ class TradingAgentsGraph:
             state.overall_status = AnalysisStatus.FAILED
             state.end_time = datetime.now()
             state.add_error(f"工作流執行失敗: {str(e)}")
+            root_span.record_exception(e)
             
             await self._notify_status_change(state)
             
@@ -596,6 +626,9 @@ class TradingAgentsGraph:
         
         self.logger.info(f"數據收集階段完成: {state.stock_id}")
     
+    @traced('data.collect', attributes=lambda self, state, data_type, description: {
+        'stock.id': state.stock_id, 'data.type': data_type.value
+    })
     async def _collect_data(self, state: WorkflowState, data_type: DataType, description: str):
         """收集特定類型的數據"""
         try:
@@ -644,7 +677,7 @@ class TradingAgentsGraph:
         analysis_state = AnalysisState(
             stock_id=state.stock_id,
             analysis_date=datetime.now().strftime('%Y-%m-%d'),
-            user_context=asdict(state.user_context) if state.user_context else None,
+            user_context=state.user_context.to_dict() if state.user_context else None,
             stock_data=state.collected_data.get('stock_price'),
             financial_data=state.collected_data.get('financial_data'),
             news_data=state.collected_data.get('company_news'),
@@ -759,7 +792,7 @@ class TradingAgentsGraph:
             analysis_state = AnalysisState(
                 stock_id=state.stock_id,
                 analysis_date=datetime.now().strftime('%Y-%m-%d'),
-                user_context=asdict(state.user_context) if state.user_context else None,
+                user_context=state.user_context.to_dict() if state.user_context else None,
                 stock_data=state.collected_data.get('stock_price'),
                 financial_data=state.collected_data.get('financial_data'),
                 news_data=state.collected_data.get('company_news'),
@@ -852,45 +885,17 @@ class TradingAgentsGraph:
         return max(recommendation_counts.items(), key=lambda x: x[1])[0]
     
     async def _conduct_debate(self, state: WorkflowState, results: List[AnalysisResult]):
-        """進行辯論過程"""
-        max_rounds = self.workflow_config.get('max_debate_rounds', 3)
-        
-        for round_num in range(1, max_rounds + 1):
-            debate_round = {
-                'round': round_num,
-                'timestamp': datetime.now().isoformat(),
-                'participants': [],
-                'consensus_score': 0.0
-            }
-            
-            # 模擬辯論過程
-            # 在實際實現中，這裡會讓分析師互相辯論
-            await asyncio.sleep(0.5)  # 模擬辯論時間
-            
-            # 重新計算共識
-            consensus_score = self._calculate_consensus_score(results)
-            debate_round['consensus_score'] = consensus_score
-            
-            state.debate_rounds.append(debate_round)
-            
-            if consensus_score >= self.workflow_config.get('min_consensus_threshold', 0.6):
-                # 達成共識
-                state.consensus_result = {
-                    'consensus_achieved': True,
-                    'consensus_score': consensus_score,
-                    'debate_rounds': round_num,
-                    'final_recommendation': self._get_majority_recommendation(results)
-                }
-                break
-        
-        # 如果經過所有輪次仍未達成共識
-        if not state.consensus_result:
-            state.consensus_result = {
-                'consensus_achieved': False,
-                'consensus_score': consensus_score,
-                'debate_rounds': max_rounds,
-                'final_recommendation': self._get_majority_recommendation(results)
-            }
+        """進行辯論過程（參與者每輪並行發言，收斂或預算耗盡時提前停止）"""
+        outcome = await self.debate_engine.run(state.stock_id, results)
+        
+        state.debate_rounds.extend(outcome.rounds)
+        state.consensus_result = outcome.to_consensus_result()
+        state.performance_metrics['debate'] = {
+            'rounds': len(outcome.rounds),
+            'stop_reason': outcome.stop_reason,
+            'tokens': outcome.total_tokens,
+            'duration_seconds': round(outcome.duration_seconds, 4)
+        }
     
     async def _phase_final_integration(self, state: WorkflowState):
         """階段 4: 最終整合"""
@@ -952,13 +957,12 @@ class TradingAgentsGraph:
                 risk_factors=['系統分析失敗風險']
             )
         
-        # 簡單的投票機制
-        recommendations = [r.recommendation for r in successful_results]
-        recommendation_counts = {}
-        for rec in recommendations:
-            recommendation_counts[rec] = recommendation_counts.get(rec, 0) + 1
-        
-        final_recommendation = max(recommendation_counts.items(), key=lambda x: x[1])[0]
+        # 有共識結果（辯論或多數共識）時以其建議為準，否則簡單投票
+        consensus_recommendation = (state.consensus_result or {}).get('final_recommendation')
+        if consensus_recommendation:
+            final_recommendation = consensus_recommendation
+        else:
+            final_recommendation = self._get_majority_recommendation(successful_results)
         
         # 計算平均信心度
         avg_confidence = sum(r.confidence for r in successful_results) / len(successful_results)
@@ -35,6 +35,7 @@ from .project_admission_evaluator import ProjectAdmissionEvaluator
 from .budget_roi_manager import BudgetROIManager
 from .anomaly_detector import InnovationAnomalyDetector
 from .innovation_zone_db import InnovationZoneDB
+from .analytics_engine import InnovationAnalyticsEngine, get_innovation_analytics_engine
 from .project_performance_monitor import (
     ProjectPerformanceMonitor,
     ProjectPerformanceMetrics,
@@ -109,6 +110,8 @@ __all__ = [
     "BudgetROIManager",
     "InnovationAnomalyDetector",
     "InnovationZoneDB",
+    "InnovationAnalyticsEngine",
+    "get_innovation_analytics_engine",
     "ProjectPerformanceMonitor",
     "ProjectPerformanceMetrics",
     "ProjectPerformanceAlert",
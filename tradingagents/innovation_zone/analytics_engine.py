@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Innovation Analytics Engine
+創新分析聚合查詢引擎
+
+為 InnovationZoneDB.get_innovation_analytics 提供數據庫端聚合：
+- 每個分析區塊只發出 COUNT/SUM/GROUP BY 查詢，不加載 ORM 實體
+- 互不依賴的區塊在線程池中並行執行，各自使用獨立的連接池會話
+- 按 (zone_ids, 日期範圍) 緩存區塊結果，底層表寫入時按表失效
+"""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Dict, Any, List, Optional, Tuple, Callable
+import uuid
+
+from sqlalchemy import event, select, and_, func, case, not_
+from sqlalchemy.orm import Session
+
+from .models import (
+    InnovationZone, InnovationProject, InnovationBudgetTracking,
+    TechnicalMilestone, UserBehaviorMetrics, AnomalyDetection,
+    ROIExemptionStatus
+)
+from ..database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 每個分析區塊依賴的數據表，任一表寫入即令該區塊緩存失效
+SECTION_TABLES: Dict[str, Tuple[str, ...]] = {
+    'zones_overview': (InnovationZone.__tablename__,),
+    'projects_summary': (InnovationProject.__tablename__,),
+    'budget_analysis': (InnovationProject.__tablename__, InnovationBudgetTracking.__tablename__),
+    'milestones_progress': (InnovationProject.__tablename__, TechnicalMilestone.__tablename__),
+    'user_engagement': (InnovationProject.__tablename__, UserBehaviorMetrics.__tablename__),
+    'anomalies_summary': (InnovationProject.__tablename__, AnomalyDetection.__tablename__),
+}
+
+AnalyticsKey = Tuple[Optional[Tuple[str, ...]], Optional[date], Optional[date]]
+
+
+def _to_float(value: Any) -> float:
+    """聚合結果轉 float（NULL 視為 0）"""
+    return float(value) if value is not None else 0.0
+
+
+class InnovationAnalyticsEngine:
+    """
+    創新分析聚合查詢引擎
+
+    功能：
+    1. 按區塊生成聚合查詢（特區、項目、預算、里程碑、用戶參與、異常）
+    2. 區塊並行執行，每個區塊獨立會話/連接
+    3. 區塊級結果緩存，TTL 過期或相關表寫入時失效
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        cache_ttl_seconds: float = 300.0,
+        max_cache_entries: int = 256,
+        max_workers: int = len(SECTION_TABLES)
+    ):
+        self.session_factory = session_factory
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_cache_entries = max_cache_entries
+        self.logger = logger
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="innovation-analytics"
+        )
+        self._section_builders: Dict[str, Callable[[Session, AnalyticsKey], Dict[str, Any]]] = {
+            'zones_overview': self._build_zones_overview,
+            'projects_summary': self._build_projects_summary,
+            'budget_analysis': self._build_budget_analysis,
+            'milestones_progress': self._build_milestones_progress,
+            'user_engagement': self._build_user_engagement,
+            'anomalies_summary': self._build_anomalies_summary,
+        }
+
+        # 緩存：(section, key) -> (結果, 寫入時間, 表版本快照)
+        self._cache: Dict[Tuple[str, AnalyticsKey], Tuple[Dict[str, Any], float, Tuple[int, ...]]] = {}
+        self._table_versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+        # 寫入在 flush 時記錄，commit 後才使緩存失效（rollback 則丟棄），
+        # 避免其他讀取者在寫入提交前以新版本號緩存舊數據
+        self._dirty_key = f'innovation_analytics_dirty_{id(self)}'
+        self._session_listeners = (
+            ('after_flush', self._on_after_flush),
+            ('after_commit', self._on_after_commit),
+            ('after_rollback', self._on_after_rollback),
+        )
+        for name, listener in self._session_listeners:
+            event.listen(self.session_factory, name, listener)
+
+    # ==================== 公共接口 ====================
+
+    async def get_analytics(
+        self,
+        zone_ids: Optional[List[uuid.UUID]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """組合各區塊分析結果（命中緩存的區塊不再查詢）"""
+        key = self._make_key(zone_ids, start_date, end_date)
+
+        analytics = {
+            'analysis_period': {
+                'start_date': start_date.isoformat() if start_date else None,
+                'end_date': end_date.isoformat() if end_date else None
+            }
+        }
+
+        pending = []
+        for section in self._section_builders:
+            cached = self._get_cached(section, key)
+            if cached is not None:
+                analytics[section] = cached
+            else:
+                pending.append(section)
+
+        if pending:
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(*[
+                loop.run_in_executor(self._executor, self._run_section, section, key)
+                for section in pending
+            ])
+            for section, (result, versions) in zip(pending, results):
+                analytics[section] = result
+                self._store_cached(section, key, result, versions)
+
+        # 保持區塊順序穩定；返回副本以免調用方修改緩存內容
+        return copy.deepcopy({
+            name: analytics[name]
+            for name in ['analysis_period', *self._section_builders]
+        })
+
+    def invalidate(self, *table_names: str):
+        """標記數據表已寫入，依賴這些表的區塊緩存隨之失效"""
+        if not table_names:
+            return
+        with self._lock:
+            for table_name in table_names:
+                self._table_versions[table_name] = self._table_versions.get(table_name, 0) + 1
+            self.stats['invalidations'] += 1
+
+    def clear_cache(self):
+        """清空全部緩存"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """獲取緩存統計"""
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._cache),
+                'hit_rate': self.stats['hits'] / total if total > 0 else 0.0
+            }
+
+    def shutdown(self):
+        """釋放線程池並移除事件監聽"""
+        for name, listener in self._session_listeners:
+            if event.contains(self.session_factory, name, listener):
+                event.remove(self.session_factory, name, listener)
+        self._executor.shutdown(wait=False)
+
+    # ==================== 緩存管理 ====================
+
+    @staticmethod
+    def _make_key(
+        zone_ids: Optional[List[uuid.UUID]],
+        start_date: Optional[date],
+        end_date: Optional[date]
+    ) -> AnalyticsKey:
+        zone_key = tuple(sorted(str(zone_id) for zone_id in zone_ids)) if zone_ids else None
+        return (zone_key, start_date, end_date)
+
+    def _versions_for(self, section: str) -> Tuple[int, ...]:
+        return tuple(self._table_versions.get(table, 0) for table in SECTION_TABLES[section])
+
+    def _get_cached(self, section: str, key: AnalyticsKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cache.get((section, key))
+            if entry is not None:
+                result, stored_at, versions = entry
+                if (time.monotonic() - stored_at <= self.cache_ttl_seconds
+                        and versions == self._versions_for(section)):
+                    self.stats['hits'] += 1
+                    return result
+                del self._cache[(section, key)]
+            self.stats['misses'] += 1
+            return None
+
+    def _store_cached(
+        self,
+        section: str,
+        key: AnalyticsKey,
+        result: Dict[str, Any],
+        versions: Tuple[int, ...]
+    ):
+        with self._lock:
+            # 查詢期間有寫入則不緩存，避免把舊數據掛在新版本下
+            if versions != self._versions_for(section):
+                return
+            if len(self._cache) >= self.max_cache_entries:
+                oldest = min(self._cache, key=lambda k: self._cache[k][1])
+                del self._cache[oldest]
+            self._cache[(section, key)] = (result, time.monotonic(), versions)
+
+    def _on_after_flush(self, session: Session, flush_context: Any):
+        """ORM 寫入後記錄受影響的表，等待交易提交"""
+        touched = {
+            instance.__table__.name
+            for instance in (*session.new, *session.dirty, *session.deleted)
+            if hasattr(instance, '__table__')
+        }
+        touched &= {table for tables in SECTION_TABLES.values() for table in tables}
+        if touched:
+            session.info.setdefault(self._dirty_key, set()).update(touched)
+
+    def _on_after_commit(self, session: Session):
+        """交易提交後按表失效緩存"""
+        touched = session.info.pop(self._dirty_key, None)
+        if touched:
+            self.invalidate(*touched)
+
+    def _on_after_rollback(self, session: Session):
+        """交易回滾，未提交的寫入不影響緩存"""
+        session.info.pop(self._dirty_key, None)
+
+    # ==================== 區塊執行 ====================
+
+    def _run_section(self, section: str, key: AnalyticsKey) -> Tuple[Dict[str, Any], Tuple[int, ...]]:
+        """在獨立會話中執行單個區塊（運行於線程池）"""
+        with self._lock:
+            versions = self._versions_for(section)
+
+        session = self.session_factory()
+        try:
+            return self._section_builders[section](session, key), versions
+        finally:
+            session.close()
+
+    @staticmethod
+    def _zone_ids(key: AnalyticsKey) -> Optional[List[uuid.UUID]]:
+        return [uuid.UUID(zone_id) for zone_id in key[0]] if key[0] else None
+
+    def _project_ids_subquery(self, key: AnalyticsKey):
+        """符合特區與日期條件的項目 ID 子查詢"""
+        zone_ids = self._zone_ids(key)
+        _, start_date, end_date = key
+
+        conditions = []
+        if zone_ids:
+            conditions.append(InnovationProject.innovation_zone_id.in_(zone_ids))
+        if start_date and end_date:
+            conditions.append(InnovationProject.start_date.between(start_date, end_date))
+
+        return select(InnovationProject.id).where(*conditions)
+
+    @staticmethod
+    def _date_range(column: Any, key: AnalyticsKey) -> List[Any]:
+        _, start_date, end_date = key
+        if start_date and end_date:
+            return [column >= start_date, column <= end_date]
+        return []
+
+    @staticmethod
+    def _grouped_counts(session: Session, column: Any, *conditions: Any) -> Dict[str, int]:
+        rows = session.execute(
+            select(column, func.count()).where(*conditions).group_by(column)
+        ).all()
+        return {value: count for value, count in rows}
+
+    # ==================== 分析區塊 ====================
+
+    def _build_zones_overview(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        zone_ids = self._zone_ids(key)
+        conditions = [InnovationZone.id.in_(zone_ids)] if zone_ids else []
+
+        total_zones, active_zones, total_budget = session.execute(
+            select(
+                func.count(InnovationZone.id),
+                func.count(case((InnovationZone.is_active == True, 1))),
+                func.sum(InnovationZone.total_budget_allocation)
+            ).where(*conditions)
+        ).one()
+
+        return {
+            'total_zones': total_zones or 0,
+            'active_zones': active_zones or 0,
+            'total_budget_allocated': _to_float(total_budget),
+            'zones_by_focus': self._grouped_counts(session, InnovationZone.innovation_focus, *conditions)
+        }
+
+    def _build_projects_summary(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        conditions = [InnovationProject.id.in_(self._project_ids_subquery(key))]
+
+        total_projects, active_projects, roi_exempt_projects = session.execute(
+            select(
+                func.count(InnovationProject.id),
+                func.count(case((InnovationProject.is_active == True, 1))),
+                func.count(case((
+                    InnovationProject.roi_exemption_status == ROIExemptionStatus.EXEMPT.value, 1
+                )))
+            ).where(*conditions)
+        ).one()
+
+        return {
+            'total_projects': total_projects or 0,
+            'active_projects': active_projects or 0,
+            'projects_by_stage': self._grouped_counts(session, InnovationProject.current_stage, *conditions),
+            'projects_by_type': self._grouped_counts(session, InnovationProject.innovation_type, *conditions),
+            'roi_exempt_projects': roi_exempt_projects or 0
+        }
+
+    def _build_budget_analysis(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        rows = session.execute(
+            select(
+                InnovationBudgetTracking.expense_category,
+                func.sum(InnovationBudgetTracking.amount),
+                func.sum(case(
+                    (InnovationBudgetTracking.is_roi_exempt_period == True, InnovationBudgetTracking.amount),
+                    else_=0
+                ))
+            ).where(
+                InnovationBudgetTracking.innovation_project_id.in_(self._project_ids_subquery(key)),
+                InnovationBudgetTracking.transaction_type == 'expense',
+                *self._date_range(InnovationBudgetTracking.transaction_date, key)
+            ).group_by(InnovationBudgetTracking.expense_category)
+        ).all()
+
+        expenses_by_category = {category: _to_float(total) for category, total, _ in rows}
+
+        return {
+            'total_expenses': sum(expenses_by_category.values()),
+            'expenses_by_category': expenses_by_category,
+            'roi_exempt_expenses': sum(_to_float(exempt) for _, _, exempt in rows)
+        }
+
+    def _build_milestones_progress(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        conditions = [
+            TechnicalMilestone.innovation_project_id.in_(self._project_ids_subquery(key)),
+            *self._date_range(TechnicalMilestone.planned_date, key)
+        ]
+
+        total, completed, overdue, average_completion = session.execute(
+            select(
+                func.count(TechnicalMilestone.id),
+                func.count(case((TechnicalMilestone.is_completed == True, 1))),
+                func.count(case((
+                    and_(
+                        TechnicalMilestone.is_completed == False,
+                        TechnicalMilestone.planned_date < date.today()
+                    ), 1
+                ))),
+                func.avg(TechnicalMilestone.completion_rate)
+            ).where(*conditions)
+        ).one()
+
+        return {
+            'total_milestones': total or 0,
+            'completed_milestones': completed or 0,
+            'overdue_milestones': overdue or 0,
+            'completion_rate': (completed / total * 100) if total else 0.0,
+            'average_progress': _to_float(average_completion),
+            'milestones_by_status': self._grouped_counts(session, TechnicalMilestone.status, *conditions),
+            'milestones_by_type': self._grouped_counts(session, TechnicalMilestone.milestone_type, *conditions)
+        }
+
+    def _build_user_engagement(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        row = session.execute(
+            select(
+                func.count(UserBehaviorMetrics.id),
+                func.sum(UserBehaviorMetrics.new_users),
+                func.sum(UserBehaviorMetrics.total_sessions),
+                func.max(UserBehaviorMetrics.active_users),
+                func.avg(UserBehaviorMetrics.engagement_score),
+                func.avg(UserBehaviorMetrics.retention_rate),
+                func.avg(UserBehaviorMetrics.conversion_rate),
+                func.avg(UserBehaviorMetrics.user_satisfaction_score),
+                func.avg(UserBehaviorMetrics.feature_adoption_rate)
+            ).where(
+                UserBehaviorMetrics.innovation_project_id.in_(self._project_ids_subquery(key)),
+                *self._date_range(UserBehaviorMetrics.measurement_date, key)
+            )
+        ).one()
+
+        return {
+            'measurement_records': row[0] or 0,
+            'total_new_users': int(row[1] or 0),
+            'total_sessions': int(row[2] or 0),
+            'peak_active_users': int(row[3] or 0),
+            'average_engagement_score': _to_float(row[4]),
+            'average_retention_rate': _to_float(row[5]),
+            'average_conversion_rate': _to_float(row[6]),
+            'average_satisfaction_score': _to_float(row[7]),
+            'average_feature_adoption_rate': _to_float(row[8])
+        }
+
+    def _build_anomalies_summary(self, session: Session, key: AnalyticsKey) -> Dict[str, Any]:
+        conditions = [
+            AnomalyDetection.innovation_project_id.in_(self._project_ids_subquery(key)),
+            *self._date_range(func.date(AnomalyDetection.detected_at), key)
+        ]
+
+        total, unresolved = session.execute(
+            select(
+                func.count(AnomalyDetection.id),
+                func.count(case((
+                    not_(AnomalyDetection.status.in_(['resolved', 'false_positive'])), 1
+                )))
+            ).where(*conditions)
+        ).one()
+
+        return {
+            'total_anomalies': total or 0,
+            'unresolved_anomalies': unresolved or 0,
+            'anomalies_by_severity': self._grouped_counts(session, AnomalyDetection.anomaly_severity, *conditions),
+            'anomalies_by_type': self._grouped_counts(session, AnomalyDetection.anomaly_type, *conditions),
+            'anomalies_by_status': self._grouped_counts(session, AnomalyDetection.status, *conditions)
+        }
+
+
+# 進程內共享引擎，使各 InnovationZoneDB 實例共用同一份緩存
+_analytics_engine: Optional[InnovationAnalyticsEngine] = None
+_analytics_engine_lock = threading.Lock()
+
+
+def get_innovation_analytics_engine() -> InnovationAnalyticsEngine:
+    """獲取共享的創新分析聚合查詢引擎"""
+    global _analytics_engine
+    if _analytics_engine is None:
+        with _analytics_engine_lock:
+            if _analytics_engine is None:
+                _analytics_engine = InnovationAnalyticsEngine()
+    return _analytics_engine
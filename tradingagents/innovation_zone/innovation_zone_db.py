@@ -33,6 +33,7 @@ from .models import (
     AnomalyDetection, InnovationType, ProjectStage, ROIExemptionStatus,
     MilestoneType, AnomalyType
 )
+from .analytics_engine import InnovationAnalyticsEngine, get_innovation_analytics_engine
 from ..database.database import SessionLocal
 
 logger = logging.getLogger(__name__)
@@ -67,9 +68,10 @@ class InnovationZoneDB:
     6. 複雜的分析查詢和報告生成
     """
     
-    def __init__(self):
+    def __init__(self, analytics_engine: Optional[InnovationAnalyticsEngine] = None):
         """初始化創新特區數據庫管理器"""
         self.logger = logger
+        self.analytics_engine = analytics_engine or get_innovation_analytics_engine()
         self.logger.info("✅ Innovation Zone Database Manager initialized")
     
     # ==================== 創新特區管理 ====================
@@ -172,12 +174,8 @@ class InnovationZoneDB:
         """列出創新特區"""
         try:
             async with get_database_session() as session:
-                query = select(InnovationZone)
-                
-                if active_only:
-                    query = query.where(InnovationZone.is_active == True)
-                
-                query = query.order_by(InnovationZone.established_date.desc())
+                query = self._innovation_zones_query(active_only)
+                query = query.order_by(InnovationZone.established_date.desc(), InnovationZone.id.desc())
                 
                 result = await session.execute(query)
                 zones = result.scalars().all()
@@ -199,6 +197,38 @@ class InnovationZoneDB:
             self.logger.error(f"❌ Error listing innovation zones: {e}")
             raise InnovationZoneDBError(f"Failed to list innovation zones: {e}")
     
+    async def list_innovation_zones_page(
+        self,
+        active_only: bool = True,
+        include_stats: bool = False,
+        page_size: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """以鍵集游標分頁列出創新特區（established_date DESC, id DESC）"""
+        try:
+            async with get_database_session() as session:
+                return await self._keyset_page(
+                    session,
+                    self._innovation_zones_query(active_only),
+                    InnovationZone.established_date,
+                    InnovationZone.id,
+                    (active_only,),
+                    page_size,
+                    cursor,
+                    self._innovation_zone_to_dict,
+                    self._get_zone_statistics if include_stats else None
+                )
+                
+        except Exception as e:
+            self.logger.error(f"❌ Error paginating innovation zones: {e}")
+            raise InnovationZoneDBError(f"Failed to list innovation zones: {e}")
+    
+    def _innovation_zones_query(self, active_only: bool):
+        query = select(InnovationZone)
+        if active_only:
+            query = query.where(InnovationZone.is_active == True)
+        return query
+    
     async def update_innovation_zone(
         self,
         zone_id: uuid.UUID,
@@ -377,18 +407,8 @@ class InnovationZoneDB:
         """列出創新項目"""
         try:
             async with get_database_session() as session:
-                query = select(InnovationProject)
-                
-                if zone_id:
-                    query = query.where(InnovationProject.innovation_zone_id == zone_id)
-                
-                if stage:
-                    query = query.where(InnovationProject.current_stage == stage.value)
-                
-                if active_only:
-                    query = query.where(InnovationProject.is_active == True)
-                
-                query = query.order_by(InnovationProject.created_at.desc())
+                query = self._innovation_projects_query(zone_id, stage, active_only)
+                query = query.order_by(InnovationProject.created_at.desc(), InnovationProject.id.desc())
                 
                 result = await session.execute(query)
                 projects = result.scalars().all()
@@ -410,6 +430,98 @@ class InnovationZoneDB:
             self.logger.error(f"❌ Error listing innovation projects: {e}")
             raise InnovationZoneDBError(f"Failed to list innovation projects: {e}")
     
+    async def list_innovation_projects_page(
+        self,
+        zone_id: Optional[uuid.UUID] = None,
+        stage: Optional[ProjectStage] = None,
+        active_only: bool = True,
+        include_stats: bool = False,
+        page_size: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """以鍵集游標分頁列出創新項目（created_at DESC, id DESC）"""
+        try:
+            async with get_database_session() as session:
+                return await self._keyset_page(
+                    session,
+                    self._innovation_projects_query(zone_id, stage, active_only),
+                    InnovationProject.created_at,
+                    InnovationProject.id,
+                    (zone_id, stage.value if stage else None, active_only),
+                    page_size,
+                    cursor,
+                    self._innovation_project_to_dict,
+                    self._get_project_statistics if include_stats else None
+                )
+                
+        except Exception as e:
+            self.logger.error(f"❌ Error paginating innovation projects: {e}")
+            raise InnovationZoneDBError(f"Failed to list innovation projects: {e}")
+    
+    def _innovation_projects_query(
+        self,
+        zone_id: Optional[uuid.UUID],
+        stage: Optional[ProjectStage],
+        active_only: bool
+    ):
+        query = select(InnovationProject)
+        if zone_id:
+            query = query.where(InnovationProject.innovation_zone_id == zone_id)
+        if stage:
+            query = query.where(InnovationProject.current_stage == stage.value)
+        if active_only:
+            query = query.where(InnovationProject.is_active == True)
+        return query
+    
+    async def _keyset_page(
+        self,
+        session: AsyncSession,
+        query,
+        sort_column,
+        id_column,
+        filters: Tuple[Any, ...],
+        page_size: int,
+        cursor: Optional[str],
+        to_dict,
+        stats_loader=None
+    ) -> Dict[str, Any]:
+        """鍵集分頁：以 (排序鍵, id) 游標定位，深頁與首頁成本相同"""
+        from ..art.storage.pagination_optimizations import (
+            KeysetPagination, keyset_fingerprint, keyset_segments
+        )
+        
+        keyset = KeysetPagination(
+            sort_field=sort_column.key,
+            id_field=id_column.key,
+            order_desc=True,
+            fingerprint=keyset_fingerprint(*filters)
+        )
+        keyset_cursor = keyset.decode(cursor)
+        rows = []
+        for condition, order_by in keyset_segments(keyset, sort_column, id_column, keyset_cursor):
+            segment = query.where(condition) if condition is not None else query
+            result = await session.execute(segment.order_by(*order_by).limit(page_size + 1 - len(rows)))
+            rows.extend(result.scalars().all())
+            if len(rows) > page_size:
+                break
+        page = keyset.build_page(rows, page_size, keyset_cursor)
+        
+        items = []
+        for record in page.items:
+            record_dict = to_dict(record)
+            if stats_loader:
+                record_dict.update(await stats_loader(session, record.id))
+            items.append(record_dict)
+        
+        return {
+            'items': items,
+            'page_size': page_size,
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            'has_next': page.has_next,
+            'has_previous': page.has_previous
+        }
+    
     async def update_project_stage(
         self,
         project_id: uuid.UUID,
@@ -796,99 +908,13 @@ class InnovationZoneDB:
         start_date: Optional[date] = None,
         end_date: Optional[date] = None
     ) -> Dict[str, Any]:
-        """獲取創新分析數據"""
+        """獲取創新分析數據（數據庫端聚合，區塊並行查詢並緩存）"""
         try:
-            async with get_database_session() as session:
-                analytics = {
-                    'analysis_period': {
-                        'start_date': start_date.isoformat() if start_date else None,
-                        'end_date': end_date.isoformat() if end_date else None
-                    },
-                    'zones_overview': {},
-                    'projects_summary': {},
-                    'budget_analysis': {},
-                    'milestones_progress': {},
-                    'user_engagement': {},
-                    'anomalies_summary': {}
-                }
-                
-                # 特區概覽
-                zones_query = select(InnovationZone)
-                if zone_ids:
-                    zones_query = zones_query.where(InnovationZone.id.in_(zone_ids))
-                
-                zones_result = await session.execute(zones_query)
-                zones = zones_result.scalars().all()
-                
-                analytics['zones_overview'] = {
-                    'total_zones': len(zones),
-                    'active_zones': len([z for z in zones if z.is_active]),
-                    'total_budget_allocated': sum(z.total_budget_allocation for z in zones),
-                    'zones_by_focus': self._group_by_field(zones, 'innovation_focus')
-                }
-                
-                # 項目摘要
-                projects_query = select(InnovationProject)
-                if zone_ids:
-                    projects_query = projects_query.where(
-                        InnovationProject.innovation_zone_id.in_(zone_ids)
-                    )
-                
-                if start_date and end_date:
-                    projects_query = projects_query.where(
-                        and_(
-                            InnovationProject.start_date >= start_date,
-                            InnovationProject.start_date <= end_date
-                        )
-                    )
-                
-                projects_result = await session.execute(projects_query)
-                projects = projects_result.scalars().all()
-                
-                analytics['projects_summary'] = {
-                    'total_projects': len(projects),
-                    'active_projects': len([p for p in projects if p.is_active]),
-                    'projects_by_stage': self._group_by_field(projects, 'current_stage'),
-                    'projects_by_type': self._group_by_field(projects, 'innovation_type'),
-                    'roi_exempt_projects': len([
-                        p for p in projects 
-                        if p.roi_exemption_status == ROIExemptionStatus.EXEMPT.value
-                    ])
-                }
-                
-                # 預算分析
-                if projects:
-                    project_ids = [p.id for p in projects]
-                    budget_query = select(InnovationBudgetTracking).where(
-                        InnovationBudgetTracking.innovation_project_id.in_(project_ids)
-                    )
-                    
-                    if start_date and end_date:
-                        budget_query = budget_query.where(
-                            and_(
-                                InnovationBudgetTracking.transaction_date >= start_date,
-                                InnovationBudgetTracking.transaction_date <= end_date
-                            )
-                        )
-                    
-                    budget_result = await session.execute(budget_query)
-                    budget_tracking = budget_result.scalars().all()
-                    
-                    total_expenses = sum(
-                        float(bt.amount) for bt in budget_tracking 
-                        if bt.transaction_type == 'expense'
-                    )
-                    
-                    analytics['budget_analysis'] = {
-                        'total_expenses': total_expenses,
-                        'expenses_by_category': self._group_expenses_by_category(budget_tracking),
-                        'roi_exempt_expenses': sum(
-                            float(bt.amount) for bt in budget_tracking 
-                            if bt.is_roi_exempt_period and bt.transaction_type == 'expense'
-                        )
-                    }
-                
-                return analytics
+            return await self.analytics_engine.get_analytics(
+                zone_ids=zone_ids,
+                start_date=start_date,
+                end_date=end_date
+            )
                 
         except Exception as e:
             self.logger.error(f"❌ Error getting innovation analytics: {e}")
@@ -1111,23 +1137,6 @@ class InnovationZoneDB:
             'utilization_rate': utilization_rate
         }
     
-    def _group_by_field(self, items: List[Any], field: str) -> Dict[str, int]:
-        """按字段分組統計"""
-        groups = {}
-        for item in items:
-            value = getattr(item, field, 'unknown')
-            groups[value] = groups.get(value, 0) + 1
-        return groups
-    
-    def _group_expenses_by_category(self, budget_tracking: List[InnovationBudgetTracking]) -> Dict[str, float]:
-        """按類別分組支出"""
-        expenses = {}
-        for bt in budget_tracking:
-            if bt.transaction_type == 'expense':
-                category = bt.expense_category
-                expenses[category] = expenses.get(category, 0) + float(bt.amount)
-        return expenses
-    
     # ==================== 性能監控支持方法 ====================
     
     async def get_active_projects(self) -> List[Dict[str, Any]]:
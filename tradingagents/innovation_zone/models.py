@@ -134,6 +134,7 @@ class InnovationZone(Base):
     __table_args__ = (
         Index('idx_innovation_zone_focus', 'innovation_focus'),
         Index('idx_innovation_zone_manager', 'zone_manager'),
+        Index('idx_innovation_zone_established_id', 'established_date', 'id'),
         CheckConstraint('total_budget_allocation > 0', name='check_positive_budget'),
         CheckConstraint('budget_percentage_of_rd BETWEEN 5 AND 15', name='check_valid_rd_percentage'),
         CheckConstraint('roi_exemption_quarters BETWEEN 1 AND 8', name='check_valid_exemption_quarters'),
@@ -205,6 +206,7 @@ class InnovationProject(Base):
         Index('idx_innovation_project_lead', 'project_lead'),
         Index('idx_innovation_project_type', 'innovation_type'),
         Index('idx_innovation_project_active', 'is_active'),
+        Index('idx_innovation_project_created_id', 'created_at', 'id'),
         CheckConstraint('admission_score BETWEEN 0 AND 100', name='check_valid_admission_score'),
         CheckConstraint('team_size > 0', name='check_positive_team_size'),
     )
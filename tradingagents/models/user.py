@@ -7,7 +7,7 @@
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Optional, List
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum as SQLEnum, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from pydantic import BaseModel, Field, EmailStr
@@ -85,6 +85,13 @@ class User(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deleted_at = Column(DateTime, nullable=True)
     
+    # 鍵集分頁的 (排序鍵, id) 複合索引
+    __table_args__ = (
+        Index('idx_users_created_at_id', 'created_at', 'id'),
+        Index('idx_users_updated_at_id', 'updated_at', 'id'),
+        Index('idx_users_last_login_id', 'last_login', 'id'),
+    )
+    
     # 外鍵關係 (稍後實現)
     # subscriptions = relationship("Subscription", back_populates="user")
     # payments = relationship("Payment", back_populates="user")
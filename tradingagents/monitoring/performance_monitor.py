@@ -7,15 +7,16 @@ Performance Monitoring System
 import asyncio
 import logging
 import time
-import statistics
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Deque
 from datetime import datetime, timezone, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 from contextlib import asynccontextmanager
+from collections import deque
 
 from ..database.model_capability_db import ModelCapabilityDB
 from ..database.task_metadata_db import TaskMetadataDB
+from ..utils.streaming_stats import WindowedStats
 
 logger = logging.getLogger(__name__)
 
@@ -55,53 +56,62 @@ class PerformanceMetric:
 
 @dataclass 
 class PerformanceWindow:
-    """性能統計窗口"""
-    values: List[float] = field(default_factory=list)
-    timestamps: List[datetime] = field(default_factory=list)
+    """
+    性能統計窗口
+
+    values/timestamps 保留最近 window_size 筆原始數據；統計量由增量窗口
+    （Welford + DDSketch）維護，add_value 與 get_statistics 不再掃描整個窗口。
+    """
+    values: Deque[float] = field(default_factory=deque)
+    timestamps: Deque[datetime] = field(default_factory=deque)
     window_size: int = 100
+    _stats: WindowedStats = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        initial = list(zip(self.values, self.timestamps))[-self.window_size:]
+        self.values = deque(maxlen=self.window_size)
+        self.timestamps = deque(maxlen=self.window_size)
+        # 逐點過期以保持與 values 完全一致
+        self._stats = WindowedStats(max_count=self.window_size, bucket_capacity=1)
+        for value, timestamp in initial:
+            self.add_value(value, timestamp)
     
     def add_value(self, value: float, timestamp: Optional[datetime] = None):
         """添加新值"""
         if timestamp is None:
             timestamp = datetime.now(timezone.utc)
         
+        # deque(maxlen) 自動保持窗口大小
         self.values.append(value)
         self.timestamps.append(timestamp)
-        
-        # 保持窗口大小
-        if len(self.values) > self.window_size:
-            self.values.pop(0)
-            self.timestamps.pop(0)
+        self._stats.add(value, timestamp.timestamp())
     
     def get_statistics(self) -> Dict[str, float]:
         """獲取統計信息"""
-        if not self.values:
+        summary = self._stats.snapshot()
+        count = summary['count']
+        if count == 0:
             return {}
         
         return {
-            'mean': statistics.mean(self.values),
-            'median': statistics.median(self.values),
-            'std': statistics.stdev(self.values) if len(self.values) > 1 else 0.0,
-            'min': min(self.values),
-            'max': max(self.values),
-            'count': len(self.values),
-            'p95': statistics.quantiles(self.values, n=20)[18] if len(self.values) >= 20 else max(self.values),
-            'p99': statistics.quantiles(self.values, n=100)[98] if len(self.values) >= 100 else max(self.values)
+            'mean': summary['mean'],
+            'median': summary['median'],
+            'std': summary['std'] if count > 1 else 0.0,
+            'min': summary['min'],
+            'max': summary['max'],
+            'count': count,
+            'p95': summary['p95'] if count >= 20 else summary['max'],
+            'p99': summary['p99'] if count >= 100 else summary['max']
         }
     
     def clear_old_values(self, max_age_hours: int = 24):
         """清理舊值"""
         cutoff_time = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
         
-        # 找到要保留的值
-        keep_indices = []
-        for i, timestamp in enumerate(self.timestamps):
-            if timestamp >= cutoff_time:
-                keep_indices.append(i)
-        
-        # 更新列表
-        self.values = [self.values[i] for i in keep_indices]
-        self.timestamps = [self.timestamps[i] for i in keep_indices]
+        while self.timestamps and self.timestamps[0] < cutoff_time:
+            self.values.popleft()
+            self.timestamps.popleft()
+        self._stats.expire_before(cutoff_time.timestamp())
 
 class PerformanceCollector:
     """性能數據收集器"""
@@ -8,6 +8,7 @@ GPT-OSS整合任務2.1.3 - 收益預測模型和分析引擎
 """
 
 import asyncio
+import hashlib
 import numpy as np
 from datetime import datetime, date, timezone, timedelta
 from decimal import Decimal, ROUND_HALF_UP
@@ -17,6 +18,8 @@ from enum import Enum
 import logging
 import json
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 from .models import (
     RevenueForecast, RevenueForecastSchema,
@@ -27,6 +30,94 @@ from .models import (
 logger = logging.getLogger(__name__)
 
 
+# ==================== 預測核心工具 ====================
+
+def build_lag_matrix(series: Any, p: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    構建自回歸滯後設計矩陣（stride tricks 視圖，無 Python 迴圈）
+    
+    Returns:
+        (X, y)：X[t] = [y[t-1], y[t-2], ..., y[t-p]]，y 為對應目標值
+    """
+    values = np.asarray(series, dtype=float)
+    if p <= 0 or len(values) <= p:
+        return np.empty((0, max(p, 0))), np.empty(0)
+    
+    windows = np.lib.stride_tricks.sliding_window_view(values[:-1], p)
+    return windows[:, ::-1], values[p:]
+
+
+def training_series_fingerprint(model_type: ModelType, historical_data: List[Dict[str, Any]]) -> str:
+    """計算訓練序列指紋，相同模型類型與相同序列得到相同鍵"""
+    rows = sorted(
+        (
+            str(item['date']),
+            str(item['revenue_amount']),
+            str(item.get('gpt_oss_impact_factor', ''))
+        )
+        for item in historical_data
+    )
+    payload = json.dumps([model_type.value, rows], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BoundedCache:
+    """有界 LRU 快取（可選 TTL）"""
+    
+    def __init__(self, max_entries: int = 128, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Any, datetime]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        value, stored_at = entry
+        if self.ttl_seconds is not None and (
+            datetime.now(timezone.utc) - stored_at
+        ).total_seconds() > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def put(self, key: str, value: Any):
+        self._entries[key] = (value, datetime.now(timezone.utc))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def __setitem__(self, key: str, value: Any):
+        self.put(key, value)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.0
+        }
+
+
 # ==================== 預測模型基類和實現 ====================
 
 class ForecastModel(ABC):
@@ -103,27 +194,33 @@ class LinearRegressionForecastModel(ForecastModel):
     
     def _prepare_training_data(self, historical_data: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
         """準備訓練數據"""
-        features = []
-        targets = []
-        
-        # 計算基準日期
-        base_date = min(datetime.fromisoformat(item['date']).date() for item in historical_data)
-        
-        for item in historical_data:
-            record_date = datetime.fromisoformat(item['date']).date()
-            days_from_base = (record_date - base_date).days
-            
-            # 特徵工程
-            feature_vector = [
-                days_from_base / 365.0,  # 時間趨勢（年）
-                np.sin(2 * np.pi * days_from_base / 365),  # 年度季節性
-                item.get('gpt_oss_impact_factor', 0.5)  # GPT-OSS影響因子
-            ]
-            
-            features.append(feature_vector)
-            targets.append(float(item['revenue_amount']))
+        ordinals = np.fromiter(
+            (datetime.fromisoformat(item['date']).date().toordinal() for item in historical_data),
+            dtype=float,
+            count=len(historical_data)
+        )
+        impact_factors = np.fromiter(
+            (float(item.get('gpt_oss_impact_factor', 0.5)) for item in historical_data),
+            dtype=float,
+            count=len(historical_data)
+        )
+        targets = np.fromiter(
+            (float(item['revenue_amount']) for item in historical_data),
+            dtype=float,
+            count=len(historical_data)
+        )
+        
+        # 相對基準日期的天數
+        days_from_base = ordinals - ordinals.min()
+        
+        # 特徵工程：時間趨勢（年）、年度季節性、GPT-OSS影響因子
+        features = np.column_stack([
+            days_from_base / 365.0,
+            np.sin(2 * np.pi * days_from_base / 365),
+            impact_factors
+        ])
         
-        return np.array(features), np.array(targets)
+        return features, targets
     
     def _fit_linear_regression(self, X: np.ndarray, y: np.ndarray) -> Tuple[Dict[str, float], float, float]:
         """執行線性回歸擬合"""
@@ -261,7 +358,10 @@ class ARIMAForecastModel(ForecastModel):
             raise ValueError(f"ARIMA模型需要至少 {max(self.p + self.d, self.q) + 5} 個歷史數據點")
         
         # 提取時間序列數據
-        series_data = [float(item['revenue_amount']) for item in sorted(historical_data, key=lambda x: x['date'])]
+        series_data = np.array(
+            [float(item['revenue_amount']) for item in sorted(historical_data, key=lambda x: x['date'])],
+            dtype=float
+        )
         
         # 差分處理
         if self.d > 0:
@@ -300,73 +400,49 @@ class ARIMAForecastModel(ForecastModel):
             'training_samples': self.training_data_size
         }
     
-    def _difference_series(self, data: List[float], d: int) -> List[float]:
+    def _difference_series(self, data: Any, d: int) -> np.ndarray:
         """時間序列差分"""
-        result = data.copy()
-        for _ in range(d):
-            result = [result[i] - result[i-1] for i in range(1, len(result))]
-        return result
+        return np.diff(np.asarray(data, dtype=float), n=d)
     
-    def _fit_ar_parameters(self, data: List[float], p: int) -> List[float]:
+    def _fit_ar_parameters(self, data: Any, p: int) -> List[float]:
         """擬合自回歸參數（簡化實現）"""
-        if len(data) <= p:
-            return [0.1] * p
-        
         # 使用最小二乘法擬合AR參數
-        X = []
-        y = []
+        X, y = build_lag_matrix(data, p)
         
-        for i in range(p, len(data)):
-            X.append([data[i-j-1] for j in range(p)])
-            y.append(data[i])
-        
-        if not X:
+        if len(y) == 0:
             return [0.1] * p
         
-        X = np.array(X)
-        y = np.array(y)
-        
         try:
             params = np.linalg.lstsq(X, y, rcond=None)[0]
             return params.tolist()
         except np.linalg.LinAlgError:
             return [0.1] * p
     
-    def _fit_seasonal_parameters(self, data: List[float]) -> List[float]:
+    def _fit_seasonal_parameters(self, data: Any) -> List[float]:
         """擬合季節性參數"""
-        if len(data) < 12:
+        values = np.asarray(data, dtype=float)
+        if len(values) < 12:
             return [0.0] * 4  # 季度季節性
         
-        # 計算季度平均值
-        seasonal_means = []
-        for quarter in range(4):
-            quarter_data = [data[i] for i in range(quarter, len(data), 4)]
-            if quarter_data:
-                seasonal_means.append(np.mean(quarter_data))
-            else:
-                seasonal_means.append(0.0)
+        # 計算季度平均值（步長切片）
+        seasonal_means = np.array([values[quarter::4].mean() for quarter in range(4)])
         
         # 正規化季節性參數
-        overall_mean = np.mean(data)
+        overall_mean = values.mean()
         if overall_mean != 0:
-            seasonal_params = [(mean - overall_mean) / overall_mean for mean in seasonal_means]
-        else:
-            seasonal_params = [0.0] * 4
-        
-        return seasonal_params
+            return ((seasonal_means - overall_mean) / overall_mean).tolist()
+        return [0.0] * 4
     
-    def _calculate_residual_variance(self, data: List[float], ar_params: List[float]) -> float:
+    def _calculate_residual_variance(self, data: Any, ar_params: List[float]) -> float:
         """計算殘差方差"""
         if len(data) <= len(ar_params) or not ar_params:
             return 1.0
         
         # 計算AR模型殘差
-        residuals = []
-        for i in range(len(ar_params), len(data)):
-            predicted = sum(ar_params[j] * data[i-j-1] for j in range(len(ar_params)))
-            residuals.append(data[i] - predicted)
+        X, y = build_lag_matrix(data, len(ar_params))
+        residuals = y - X @ np.asarray(ar_params, dtype=float)
         
-        return float(np.var(residuals)) if residuals else 1.0
+        return float(np.var(residuals)) if len(residuals) else 1.0
     
     async def predict(self, forecast_periods: int) -> Dict[str, Any]:
         """執行ARIMA預測"""
@@ -660,18 +736,44 @@ class EnsembleForecastModel(ForecastModel):
 
 # ==================== 預測引擎主類 ====================
 
+FORECAST_MODEL_REGISTRY = {
+    ModelType.LINEAR_REGRESSION: LinearRegressionForecastModel,
+    ModelType.ARIMA: ARIMAForecastModel,
+    ModelType.ENSEMBLE: EnsembleForecastModel
+}
+
+
+def _train_forecast_model(model_type_value: str, historical_data: List[Dict[str, Any]]) -> ForecastModel:
+    """在子進程中訓練模型（模塊級函數以便進程池序列化）"""
+    model_class = FORECAST_MODEL_REGISTRY.get(ModelType(model_type_value))
+    if not model_class:
+        raise ValueError(f"不支援的模型類型: {model_type_value}")
+    
+    model = model_class()
+    asyncio.run(model.train(historical_data))
+    return model
+
+
 class RevenueForecastEngine:
     """收益預測引擎"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_cached_models: int = 128,
+        max_cached_forecasts: int = 256,
+        forecast_cache_ttl_seconds: float = 3600.0,
+        max_training_workers: Optional[int] = None
+    ):
         """初始化預測引擎"""
-        self.model_registry = {
-            ModelType.LINEAR_REGRESSION: LinearRegressionForecastModel,
-            ModelType.ARIMA: ARIMAForecastModel, 
-            ModelType.ENSEMBLE: EnsembleForecastModel
-        }
-        self.trained_models = {}
-        self.forecast_cache = {}
+        self.model_registry = FORECAST_MODEL_REGISTRY
+        # 已訓練模型快取：鍵為 (模型類型, 訓練序列) 指紋
+        self.trained_models = BoundedCache(max_entries=max_cached_models)
+        self.forecast_cache = BoundedCache(
+            max_entries=max_cached_forecasts,
+            ttl_seconds=forecast_cache_ttl_seconds
+        )
+        self.max_training_workers = max_training_workers
+        self._training_pool: Optional[ProcessPoolExecutor] = None
     
     async def generate_revenue_forecast(
         self,
@@ -689,105 +791,230 @@ class RevenueForecastEngine:
             收益預測記錄
         """
         try:
-            # 驗證輸入數據
-            if not historical_data:
-                raise ValueError("缺少歷史數據")
-            
-            if len(historical_data) < 5:
-                raise ValueError("歷史數據不足，至少需要5個數據點")
+            self._validate_historical_data(historical_data)
             
             # 選擇和訓練模型
             model = await self._get_or_train_model(request.model_type, historical_data)
             
-            # 計算預測期間數
-            forecast_periods = self._calculate_forecast_periods(request.prediction_horizon)
+            return await self._build_forecast(request, historical_data, model)
+            
+        except Exception as e:
+            logger.error(f"收益預測生成失敗: {e}")
+            raise
+    
+    async def generate_revenue_forecast_many(
+        self,
+        forecast_jobs: List[Tuple[RevenueForecastRequest, List[Dict[str, Any]]]]
+    ) -> List[Union[RevenueForecastSchema, Exception]]:
+        """
+        批量生成收益預測
+        
+        未命中快取的訓練序列去重後在進程池中並行訓練，預測與情境計算在當前進程完成。
+        
+        Args:
+            forecast_jobs: (預測請求, 歷史數據) 列表
             
-            # 執行預測
-            prediction_result = await model.predict(forecast_periods)
+        Returns:
+            與輸入順序一致的預測記錄列表；失敗項為對應異常
+        """
+        results: List[Union[RevenueForecastSchema, Exception, None]] = [None] * len(forecast_jobs)
+        fingerprints: Dict[int, str] = {}
+        pending_training: Dict[str, Tuple[ModelType, List[Dict[str, Any]]]] = {}
+        
+        for index, (request, historical_data) in enumerate(forecast_jobs):
+            try:
+                self._validate_historical_data(historical_data)
+                if request.model_type not in self.model_registry:
+                    raise ValueError(f"不支援的模型類型: {request.model_type}")
+            except Exception as e:
+                results[index] = e
+                continue
             
-            # 計算預測期間
-            forecast_start = date.today() + timedelta(days=1)
-            forecast_end = self._calculate_forecast_end_date(forecast_start, request.prediction_horizon)
+            fingerprint = training_series_fingerprint(request.model_type, historical_data)
+            fingerprints[index] = fingerprint
+            if fingerprint not in self.trained_models and fingerprint not in pending_training:
+                pending_training[fingerprint] = (request.model_type, historical_data)
+        
+        training_errors = await self._train_models_in_pool(pending_training)
+        
+        for index, fingerprint in fingerprints.items():
+            request, historical_data = forecast_jobs[index]
+            if fingerprint in training_errors:
+                results[index] = training_errors[fingerprint]
+                continue
             
-            # 計算情境預測
-            scenarios = await self._calculate_scenarios(
-                prediction_result, request.include_scenarios
+            model = self.trained_models.get(fingerprint)
+            try:
+                if model is None:
+                    # 已被 LRU 淘汰時回退為當前進程訓練
+                    model = await self._get_or_train_model(request.model_type, historical_data)
+                results[index] = await self._build_forecast(request, historical_data, model)
+            except Exception as e:
+                logger.error(f"收益預測生成失敗 ({request.forecast_name}): {e}")
+                results[index] = e
+        
+        logger.info(
+            f"批量收益預測完成: {len(forecast_jobs)} 個請求, "
+            f"{len(pending_training)} 個模型新訓練"
+        )
+        return results
+    
+    async def _train_models_in_pool(
+        self,
+        pending_training: Dict[str, Tuple[ModelType, List[Dict[str, Any]]]]
+    ) -> Dict[str, Exception]:
+        """並行訓練未快取的模型，返回訓練失敗的指紋及異常"""
+        if not pending_training:
+            return {}
+        
+        loop = asyncio.get_running_loop()
+        fingerprints = list(pending_training)
+        
+        if len(fingerprints) == 1:
+            # 單個模型無需承擔進程間序列化開銷
+            model_type, historical_data = pending_training[fingerprints[0]]
+            outcomes = await asyncio.gather(
+                self._train_model(model_type, historical_data), return_exceptions=True
             )
+        else:
+            pool = self._get_training_pool()
+            outcomes = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool, _train_forecast_model,
+                    pending_training[fingerprint][0].value,
+                    pending_training[fingerprint][1]
+                )
+                for fingerprint in fingerprints
+            ], return_exceptions=True)
+        
+        errors = {}
+        for fingerprint, outcome in zip(fingerprints, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"模型訓練失敗 ({fingerprint[:12]}): {outcome}")
+                errors[fingerprint] = outcome
+            else:
+                self.trained_models.put(fingerprint, outcome)
+        return errors
+    
+    def _get_training_pool(self) -> ProcessPoolExecutor:
+        """延遲創建訓練進程池"""
+        if self._training_pool is None:
+            self._training_pool = ProcessPoolExecutor(max_workers=self.max_training_workers)
+        return self._training_pool
+    
+    def shutdown(self):
+        """關閉訓練進程池"""
+        if self._training_pool is not None:
+            self._training_pool.shutdown(wait=False, cancel_futures=True)
+            self._training_pool = None
+    
+    def _validate_historical_data(self, historical_data: List[Dict[str, Any]]):
+        """驗證輸入數據"""
+        if not historical_data:
+            raise ValueError("缺少歷史數據")
+        
+        if len(historical_data) < 5:
+            raise ValueError("歷史數據不足，至少需要5個數據點")
+    
+    async def _build_forecast(
+        self,
+        request: RevenueForecastRequest,
+        historical_data: List[Dict[str, Any]],
+        model: ForecastModel
+    ) -> RevenueForecastSchema:
+        """以已訓練模型生成預測記錄"""
+        # 計算預測期間數
+        forecast_periods = self._calculate_forecast_periods(request.prediction_horizon)
+        
+        # 執行預測
+        prediction_result = await model.predict(forecast_periods)
+        
+        # 計算預測期間
+        forecast_start = date.today() + timedelta(days=1)
+        forecast_end = self._calculate_forecast_end_date(forecast_start, request.prediction_horizon)
+        
+        # 計算情境預測
+        scenarios = await self._calculate_scenarios(
+            prediction_result, request.include_scenarios
+        )
+        
+        # 創建預測記錄
+        forecast = RevenueForecastSchema(
+            forecast_name=request.forecast_name,
+            revenue_type=request.revenue_type,
+            prediction_horizon=request.prediction_horizon,
+            model_type=request.model_type,
             
-            # 創建預測記錄
-            forecast = RevenueForecastSchema(
-                forecast_name=request.forecast_name,
-                revenue_type=request.revenue_type,
-                prediction_horizon=request.prediction_horizon,
-                model_type=request.model_type,
-                
-                # 主要預測結果
-                predicted_amount=prediction_result['predictions'][0]['predicted_value'] if prediction_result['predictions'] else Decimal('0'),
-                confidence_interval_lower=prediction_result['predictions'][0]['lower_bound'] if prediction_result['predictions'] else Decimal('0'),
-                confidence_interval_upper=prediction_result['predictions'][0]['upper_bound'] if prediction_result['predictions'] else Decimal('0'),
-                
-                # 預測期間
-                forecast_period_start=forecast_start,
-                forecast_period_end=forecast_end,
-                forecast_generated_date=datetime.now(timezone.utc),
-                
-                # 模型信息
-                model_version=f"{request.model_type.value}_v1.0",
-                training_data_size=len(historical_data),
-                feature_importance=model.feature_importance,
-                model_parameters=model.model_parameters,
-                
-                # GPT-OSS特定預測
-                gpt_oss_impact_factor=Decimal('60.0'),  # 預設60%影響
-                baseline_scenario=scenarios.get('baseline', Decimal('0')),
-                optimistic_scenario=scenarios.get('optimistic', Decimal('0')),
-                pessimistic_scenario=scenarios.get('pessimistic', Decimal('0')),
-                
-                # 元數據
-                created_by="revenue_forecast_engine",
-                validation_status="active",
-                notes=f"基於{len(historical_data)}個歷史數據點的{request.model_type.value}預測"
-            )
+            # 主要預測結果
+            predicted_amount=prediction_result['predictions'][0]['predicted_value'] if prediction_result['predictions'] else Decimal('0'),
+            confidence_interval_lower=prediction_result['predictions'][0]['lower_bound'] if prediction_result['predictions'] else Decimal('0'),
+            confidence_interval_upper=prediction_result['predictions'][0]['upper_bound'] if prediction_result['predictions'] else Decimal('0'),
             
-            # 快取預測結果
-            cache_key = self._generate_cache_key(request)
-            self.forecast_cache[cache_key] = {
-                'forecast': forecast,
-                'timestamp': datetime.now(timezone.utc),
-                'full_prediction': prediction_result
-            }
+            # 預測期間
+            forecast_period_start=forecast_start,
+            forecast_period_end=forecast_end,
+            forecast_generated_date=datetime.now(timezone.utc),
             
-            logger.info(f"收益預測生成完成: {request.forecast_name}")
-            return forecast
+            # 模型信息
+            model_version=f"{request.model_type.value}_v1.0",
+            training_data_size=len(historical_data),
+            feature_importance=model.feature_importance,
+            model_parameters=model.model_parameters,
             
-        except Exception as e:
-            logger.error(f"收益預測生成失敗: {e}")
-            raise
+            # GPT-OSS特定預測
+            gpt_oss_impact_factor=Decimal('60.0'),  # 預設60%影響
+            baseline_scenario=scenarios.get('baseline', Decimal('0')),
+            optimistic_scenario=scenarios.get('optimistic', Decimal('0')),
+            pessimistic_scenario=scenarios.get('pessimistic', Decimal('0')),
+            
+            # 元數據
+            created_by="revenue_forecast_engine",
+            validation_status="active",
+            notes=f"基於{len(historical_data)}個歷史數據點的{request.model_type.value}預測"
+        )
+        
+        # 快取預測結果
+        cache_key = self._generate_cache_key(request)
+        self.forecast_cache.put(cache_key, {
+            'forecast': forecast,
+            'timestamp': datetime.now(timezone.utc),
+            'full_prediction': prediction_result
+        })
+        
+        logger.info(f"收益預測生成完成: {request.forecast_name}")
+        return forecast
     
     async def _get_or_train_model(
         self, 
         model_type: ModelType, 
         historical_data: List[Dict[str, Any]]
     ) -> ForecastModel:
-        """獲取或訓練模型"""
-        model_key = f"{model_type.value}_{len(historical_data)}"
+        """獲取或訓練模型（以訓練序列指紋快取）"""
+        model_key = training_series_fingerprint(model_type, historical_data)
+        
+        model = self.trained_models.get(model_key)
+        if model is not None:
+            return model
         
-        if model_key in self.trained_models:
-            return self.trained_models[model_key]
+        model = await self._train_model(model_type, historical_data)
         
-        # 創建新模型
+        # 快取模型
+        self.trained_models.put(model_key, model)
+        
+        return model
+    
+    async def _train_model(
+        self,
+        model_type: ModelType,
+        historical_data: List[Dict[str, Any]]
+    ) -> ForecastModel:
+        """創建並訓練新模型"""
         model_class = self.model_registry.get(model_type)
         if not model_class:
             raise ValueError(f"不支援的模型類型: {model_type}")
         
         model = model_class()
-        
-        # 訓練模型
         await model.train(historical_data)
-        
-        # 快取模型
-        self.trained_models[model_key] = model
-        
         return model
     
     def _calculate_forecast_periods(self, horizon: PredictionHorizon) -> int:
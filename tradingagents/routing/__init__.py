@@ -29,6 +29,15 @@ from .ai_task_router import (
     ModelEvaluationError
 )
 
+# 路由索引與決策快取
+from .routing_index import (
+    RoutingIndex,
+    DecisionCache,
+    DecayingLoadCounter,
+    notify_routing_config_changed,
+    get_routing_config_version
+)
+
 # 企業級增強LLM服務
 from .enhanced_llm_service import (
     EnhancedLLMService,
@@ -65,6 +74,13 @@ __all__ = [
     'RoutingContext',
     'DecisionAudit',
     
+    # 路由索引與決策快取
+    'RoutingIndex',
+    'DecisionCache',
+    'DecayingLoadCounter',
+    'notify_routing_config_changed',
+    'get_routing_config_version',
+    
     # 企業級增強LLM服務
     'EnhancedLLMService',
     'CompatibleLLMClient',
@@ -119,7 +135,10 @@ DEFAULT_ROUTER_CONFIG = {
     'performance_cache_ttl': 3600,
     'max_decision_history': 1000,
     'enable_audit_logging': True,
-    'audit_detail_level': 'full'
+    'audit_detail_level': 'full',
+    'routing_index_ttl': 300,
+    'decision_cache_ttl': 5,
+    'load_half_life_seconds': 60
 }
 
 def create_router(config: dict = None, **kwargs):
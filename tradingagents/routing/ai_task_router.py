@@ -29,6 +29,10 @@ from ..database.task_metadata_models import (
 )
 from ..utils.llm_client import LLMProvider
 from ..monitoring.performance_monitor import PerformanceMonitor
+from .routing_index import (
+    RoutingIndex, TaskIndexEntry, DecisionCache, DecayingLoadCounter,
+    constraint_fingerprint, model_key as get_model_key
+)
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +102,8 @@ class RoutingContext:
     weights: RoutingWeights
     timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     user_context: Dict[str, Any] = field(default_factory=dict)
+    # 路由索引中預先計算的靜態評分（provider/model_id → 因子評分）
+    precomputed_scores: Dict[str, Dict[DecisionFactor, float]] = field(default_factory=dict)
 
 @dataclass
 class DecisionAudit:
@@ -219,9 +225,18 @@ class AITaskRouter:
             'strategy_usage': {strategy.value: 0 for strategy in RoutingStrategy},
             'model_selection_frequency': {},
             'cost_savings': 0.0,
+            'decision_cache_hits': 0,
+            'routing_index_refreshes': 0,
             'last_reset': datetime.now(timezone.utc)
         }
         
+        # 路由索引、決策快取與負載計數（熱路徑不查詢數據庫、不掃描決策歷史）
+        self.routing_index = RoutingIndex(ttl_seconds=self.config.get('routing_index_ttl', 300))
+        self.decision_cache = DecisionCache(ttl_seconds=self.config.get('decision_cache_ttl', 5))
+        self.load_counter = DecayingLoadCounter(
+            half_life_seconds=self.config.get('load_half_life_seconds', 60)
+        )
+        
         # 模型性能緩存
         self.model_performance_cache = {}
         self.cache_ttl_seconds = self.config.get('performance_cache_ttl', 3600)
@@ -244,7 +259,10 @@ class AITaskRouter:
             'max_decision_history': 1000,
             'default_strategy': 'balanced',
             'enable_audit_logging': True,
-            'audit_detail_level': 'full'
+            'audit_detail_level': 'full',
+            'routing_index_ttl': 300,
+            'decision_cache_ttl': 5,
+            'load_half_life_seconds': 60
         }
         
         for key, value in defaults.items():
@@ -356,13 +374,20 @@ class AITaskRouter:
             # 更新統計
             self.stats['total_decisions'] += 1
             
-            # 獲取任務元數據
-            task_metadata = await self.task_db.get_task_metadata(request.task_type)
-            if not task_metadata:
-                raise RoutingDecisionError(f"Task type '{request.task_type}' not found")
+            # 從路由索引獲取任務元數據與預評分候選模型
+            index_entry = await self._get_task_index_entry(request.task_type)
+            task_metadata = index_entry.task_metadata
+            
+            # 短期決策快取：相同任務、等級、約束與候選模型負載分級直接返回
+            cache_key = self._decision_cache_key(request, strategy, custom_weights, index_entry)
+            cached_response = self.decision_cache.get(cache_key, self.routing_index.version)
+            if cached_response is not None:
+                return self._serve_cached_decision(cached_response, request_id, decision_start_time)
             
             # 獲取可用模型
-            available_models = await self._get_available_models_for_task(task_metadata, request)
+            available_models = index_entry.candidates_for(
+                request.max_acceptable_cost or task_metadata.max_acceptable_cost_per_1k
+            )
             if not available_models:
                 raise RoutingDecisionError("No suitable models available")
             
@@ -378,7 +403,8 @@ class AITaskRouter:
                 routing_request=request,
                 strategy=selected_strategy,
                 weights=weights,
-                user_context=self._extract_user_context(request)
+                user_context=self._extract_user_context(request),
+                precomputed_scores=index_entry.static_scores
             )
             
             # 評估所有候選模型
@@ -401,10 +427,12 @@ class AITaskRouter:
                 decision_response, model_scores, routing_context, execution_time
             )
             
-            # 更新統計
+            # 更新統計與負載計數
             self.stats['successful_decisions'] += 1
             self.stats['strategy_usage'][selected_strategy.value] += 1
             self._update_performance_stats(execution_time)
+            self.load_counter.hit(get_model_key(best_model_score.model))
+            self.decision_cache.put(cache_key, self.routing_index.version, decision_response)
             
             self.logger.info(
                 f"✅ Routing decision completed: {decision_response.selected_provider}/"
@@ -418,18 +446,115 @@ class AITaskRouter:
             self.logger.error(f"❌ Routing decision failed: {e}")
             raise RoutingDecisionError(f"Failed to make routing decision: {e}")
     
+    def _decision_cache_key(
+        self,
+        request: RoutingDecisionRequest,
+        strategy: Optional[RoutingStrategy],
+        custom_weights: Optional[RoutingWeights],
+        index_entry: TaskIndexEntry
+    ) -> Tuple[str, str, str]:
+        """決策快取鍵：(任務類型, 用戶等級, 約束指紋)
+
+        啟用負載平衡時，可用性評分隨模型負載變化，指紋包含各候選模型的負載因子分級；
+        負載跨越分級後快取不再命中，改為重新評估。
+        """
+        load_signature = None
+        if self.config.get('enable_load_balancing'):
+            load_signature = [
+                self._load_factor(self.load_counter.get(get_model_key(model)))
+                for model in index_entry.candidates
+            ]
+        fingerprint = constraint_fingerprint(
+            load_signature,
+            request.estimated_tokens,
+            request.priority,
+            request.requires_high_quality,
+            request.max_acceptable_latency,
+            request.max_acceptable_cost,
+            request.user_preferences or {},
+            strategy.value if strategy else None,
+            asdict(custom_weights) if custom_weights else None
+        )
+        return (request.task_type, request.user_tier or '', fingerprint)
+    
+    def _serve_cached_decision(
+        self,
+        cached_response: RoutingDecisionResponse,
+        request_id: str,
+        decision_start_time: datetime
+    ) -> RoutingDecisionResponse:
+        """返回快取決策的副本（更新請求ID並計入統計與負載）"""
+        response = cached_response.model_copy(deep=True)
+        response.decision_metadata['request_id'] = request_id
+        response.decision_metadata['decision_cache_hit'] = True
+        
+        execution_time = (datetime.now() - decision_start_time).total_seconds() * 1000
+        self.stats['successful_decisions'] += 1
+        self.stats['decision_cache_hits'] += 1
+        strategy_name = response.decision_metadata.get('routing_strategy')
+        if strategy_name in self.stats['strategy_usage']:
+            self.stats['strategy_usage'][strategy_name] += 1
+        self._update_performance_stats(execution_time)
+        self.load_counter.hit(f"{response.selected_provider}/{response.selected_model}")
+        
+        return response
+    
+    async def _get_task_index_entry(self, task_type: str) -> TaskIndexEntry:
+        """從路由索引獲取任務項，缺失或過期時才查詢數據庫重建"""
+        entry = self.routing_index.get(task_type)
+        if entry is not None:
+            return entry
+        
+        task_metadata = await self.task_db.get_task_metadata(task_type)
+        if not task_metadata:
+            raise RoutingDecisionError(f"Task type '{task_type}' not found")
+        
+        # 成本上限可被請求覆蓋，因此索引不按成本過濾，改在查詢時於記憶體中過濾
+        candidates = await self._get_available_models_for_task(task_metadata, None)
+        
+        index_context = RoutingContext(
+            request_id='routing-index',
+            task_metadata=task_metadata,
+            available_models=candidates,
+            routing_request=None,
+            strategy=self.default_strategy,
+            weights=self.routing_strategies[RoutingStrategy.BALANCED]
+        )
+        static_scores = {
+            get_model_key(model): {
+                DecisionFactor.QUALITY: self._calculate_quality_score(model, index_context),
+                DecisionFactor.PRIVACY: self._calculate_privacy_score(model, index_context)
+            }
+            for model in candidates
+        }
+        
+        self.stats['routing_index_refreshes'] += 1
+        return self.routing_index.put(task_metadata, candidates, static_scores)
+    
+    def invalidate_routing_index(self):
+        """使路由索引與決策快取失效（任務元數據或模型能力變更後調用）"""
+        self.routing_index.invalidate()
+        self.decision_cache.clear()
+        self.logger.info("✅ Routing index invalidated")
+    
     async def _get_available_models_for_task(
         self,
         task_metadata: TaskMetadataResponse,
-        request: RoutingDecisionRequest
+        request: Optional[RoutingDecisionRequest]
     ) -> List[ModelCapabilityResponse]:
-        """獲取任務的可用模型"""
+        """獲取任務的可用模型（request 為 None 時不按成本過濾，供路由索引使用）"""
         try:
             # 構建任務需求
             task_requirements = {
                 'min_capability_score': task_metadata.min_model_capability_score,
-                'max_cost_per_1k': request.max_acceptable_cost or task_metadata.max_acceptable_cost_per_1k,
-                'max_latency_ms': request.max_acceptable_latency or task_metadata.max_acceptable_latency_ms,
+                'max_cost_per_1k': (
+                    (request.max_acceptable_cost or task_metadata.max_acceptable_cost_per_1k)
+                    if request else None
+                ),
+                'max_latency_ms': (
+                    (request.max_acceptable_latency if request else None)
+                    or task_metadata.max_acceptable_latency_ms
+                ),
                 'required_features': task_metadata.required_features,
                 'max_tokens': max(task_metadata.max_tokens_input, task_metadata.max_tokens_output),
             }
@@ -535,8 +660,13 @@ class AITaskRouter:
         factor_scores[DecisionFactor.LATENCY] = latency_score
         reasoning.append(f"延遲評分: {latency_score:.3f}")
         
+        # 預先計算的靜態評分（來自路由索引）
+        static_scores = context.precomputed_scores.get(get_model_key(model), {})
+        
         # 3. 品質評估
-        quality_score = self._calculate_quality_score(model, context)
+        quality_score = static_scores.get(DecisionFactor.QUALITY)
+        if quality_score is None:
+            quality_score = self._calculate_quality_score(model, context)
         factor_scores[DecisionFactor.QUALITY] = quality_score
         reasoning.append(f"品質評分: {quality_score:.3f}")
         
@@ -546,7 +676,9 @@ class AITaskRouter:
         reasoning.append(f"可用性評分: {availability_score:.3f}")
         
         # 5. 隱私評估
-        privacy_score = self._calculate_privacy_score(model, context)
+        privacy_score = static_scores.get(DecisionFactor.PRIVACY)
+        if privacy_score is None:
+            privacy_score = self._calculate_privacy_score(model, context)
         factor_scores[DecisionFactor.PRIVACY] = privacy_score
         
         # 6. 用戶偏好評估
@@ -1131,29 +1263,26 @@ class AITaskRouter:
     async def _calculate_load_factor(self, model: ModelCapabilityResponse) -> float:
         """計算模型負載因子"""
         try:
-            # 簡化的負載計算 - 可以基於實際請求計數、隊列長度等
-            model_key = f"{model.provider}/{model.model_id}"
-            
-            # 檢查最近的使用頻率
-            recent_selections = sum(
-                1 for audit in self.decision_history[-50:]  # 最近50個決策
-                if f"{audit.selected_model.provider}/{audit.selected_model.model_id}" == model_key
-            )
-            
-            # 負載因子：使用頻率越高，因子越低
-            if recent_selections == 0:
-                return 1.0  # 未使用，最高優先
-            elif recent_selections <= 5:
-                return 0.9
-            elif recent_selections <= 15:
-                return 0.8
-            else:
-                return 0.6  # 高負載，降低優先級
+            # 近期選擇次數（指數衰減計數，O(1) 查詢）
+            recent_selections = self.load_counter.get(get_model_key(model))
+            return self._load_factor(recent_selections)
                 
         except Exception as e:
             self.logger.debug(f"Load factor calculation error: {e}")
             return 0.8  # 預設中等負載因子
     
+    @staticmethod
+    def _load_factor(recent_selections: float) -> float:
+        """負載因子：使用頻率越高，因子越低"""
+        if recent_selections < 0.5:
+            return 1.0  # 未使用，最高優先
+        elif recent_selections <= 5:
+            return 0.9
+        elif recent_selections <= 15:
+            return 0.8
+        else:
+            return 0.6  # 高負載，降低優先級
+    
     def _update_performance_stats(self, execution_time_ms: float):
         """更新性能統計"""
         # 更新平均決策時間
@@ -1178,6 +1307,7 @@ class AITaskRouter:
         try:
             weights.normalize()
             self.routing_strategies[strategy] = weights
+            self.decision_cache.clear()
             self.logger.info(f"✅ Updated weights for strategy {strategy.value}")
             return True
         except Exception as e:
@@ -1195,6 +1325,7 @@ class AITaskRouter:
             custom_strategy = RoutingStrategy(name)  # 這會創建動態枚舉值
             self.routing_strategies[custom_strategy] = weights
             self.stats['strategy_usage'][name] = 0
+            self.decision_cache.clear()
             self.logger.info(f"✅ Added custom strategy: {name}")
             return True
         except Exception as e:
@@ -1255,6 +1386,9 @@ class AITaskRouter:
                     if count > 0
                 },
                 'performance_cache_size': len(self.model_performance_cache),
+                'routing_index_size': len(self.routing_index),
+                'decision_cache_size': len(self.decision_cache),
+                'model_load': self.load_counter.snapshot(),
                 'uptime_seconds': (datetime.now(timezone.utc) - self.stats['last_reset']).total_seconds()
             })
             
@@ -1274,9 +1408,12 @@ class AITaskRouter:
             'strategy_usage': {strategy.value: 0 for strategy in RoutingStrategy},
             'model_selection_frequency': {},
             'cost_savings': 0.0,
+            'decision_cache_hits': 0,
+            'routing_index_refreshes': 0,
             'last_reset': datetime.now(timezone.utc)
         }
         self.decision_history.clear()
+        self.load_counter.clear()
         self.logger.info("✅ Routing statistics reset")
     
     async def health_check(self) -> Dict[str, Any]:
@@ -20,6 +20,7 @@ from dataclasses import dataclass, field, asdict
 from enum import Enum
 
 from .ai_task_router import RoutingStrategy, RoutingWeights, DecisionFactor
+from .routing_index import notify_routing_config_changed
 
 logger = logging.getLogger(__name__)
 
@@ -581,6 +582,9 @@ class RoutingConfigManager:
             self.active_strategies = profile.strategy_templates.copy()
             self.active_policies = profile.routing_policies.copy()
             
+            # 通知路由器刷新索引與決策快取
+            notify_routing_config_changed()
+            
             self.logger.info(f"✅ Applied configuration profile: {profile.name} v{profile.version}")
             return True
             
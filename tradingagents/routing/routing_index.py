@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Routing Index - 路由索引與決策快取
+GPT-OSS整合任務1.3.1 - 路由熱路徑的記憶體結構
+
+提供AITaskRouter使用的記憶體結構：
+- RoutingIndex: 任務類型 → 任務元數據與預評分候選模型，按版本號/TTL刷新
+- DecisionCache: 以 (任務類型, 用戶等級, 約束指紋) 為鍵的短期決策快取
+- DecayingLoadCounter: O(1) 更新的指數衰減負載計數器
+
+路由配置變更時調用 notify_routing_config_changed() 遞增全局版本號，
+所有路由器的索引與決策快取會在下一次查詢時失效。
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..database.task_metadata_models import (
+    RoutingDecisionResponse, TaskMetadataResponse, ModelCapabilityResponse
+)
+
+# ==================== 全局配置版本 ====================
+
+_config_version = 0
+_config_version_lock = threading.Lock()
+
+
+def notify_routing_config_changed() -> int:
+    """通知路由配置（任務元數據、模型能力、策略）已變更，返回新版本號"""
+    global _config_version
+    with _config_version_lock:
+        _config_version += 1
+        return _config_version
+
+
+def get_routing_config_version() -> int:
+    """獲取目前的全局路由配置版本號"""
+    return _config_version
+
+
+def model_key(model: ModelCapabilityResponse) -> str:
+    """模型唯一鍵（provider/model_id）"""
+    return f"{model.provider}/{model.model_id}"
+
+
+# ==================== 路由索引 ====================
+
+@dataclass
+class TaskIndexEntry:
+    """單一任務類型的索引項"""
+    task_metadata: TaskMetadataResponse
+    # 已按隱私與最低能力要求篩選、按靜態評分排序的候選模型
+    candidates: List[ModelCapabilityResponse]
+    # 與請求無關的靜態評分（品質、隱私），鍵為 provider/model_id
+    static_scores: Dict[str, Dict[Any, float]]
+    version: int
+    built_at: float = field(default_factory=time.monotonic)
+
+    def candidates_for(self, max_cost_per_1k: Optional[float]) -> List[ModelCapabilityResponse]:
+        """套用請求的成本上限（與資料庫查詢的過濾條件一致）"""
+        if max_cost_per_1k is None:
+            return list(self.candidates)
+        return [model for model in self.candidates if model.cost_per_1k_input_tokens <= max_cost_per_1k]
+
+
+class RoutingIndex:
+    """任務類型 → 預評分候選模型的記憶體索引"""
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, TaskIndexEntry] = {}
+        self._local_version = 0
+
+    @property
+    def version(self) -> int:
+        """索引版本：全局配置版本與本地失效次數的組合"""
+        return get_routing_config_version() * 1_000_000 + self._local_version
+
+    def get(self, task_type: str) -> Optional[TaskIndexEntry]:
+        entry = self._entries.get(task_type)
+        if entry is None:
+            return None
+        if entry.version != self.version or time.monotonic() - entry.built_at > self.ttl_seconds:
+            del self._entries[task_type]
+            return None
+        return entry
+
+    def put(
+        self,
+        task_metadata: TaskMetadataResponse,
+        candidates: Iterable[ModelCapabilityResponse],
+        static_scores: Dict[str, Dict[Any, float]]
+    ) -> TaskIndexEntry:
+        ordered = sorted(
+            candidates,
+            key=lambda model: sum(static_scores.get(model_key(model), {}).values()),
+            reverse=True
+        )
+        entry = TaskIndexEntry(
+            task_metadata=task_metadata,
+            candidates=ordered,
+            static_scores=static_scores,
+            version=self.version
+        )
+        self._entries[task_metadata.task_type] = entry
+        return entry
+
+    def invalidate(self):
+        """使本路由器的索引全部失效"""
+        self._local_version += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ==================== 決策快取 ====================
+
+def constraint_fingerprint(*parts: Any) -> str:
+    """約束指紋：對請求約束、策略與權重做穩定雜湊"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class DecisionCache:
+    """短期決策快取（LRU + TTL，條目綁定索引版本）"""
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, int, RoutingDecisionResponse]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str, str], version: int) -> Optional[RoutingDecisionResponse]:
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        stored_at, stored_version, response = cached
+        if stored_version != version or time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: Tuple[str, str, str], version: int, response: RoutingDecisionResponse):
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic(), version, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ==================== 衰減負載計數 ====================
+
+class DecayingLoadCounter:
+    """指數衰減的選擇計數器，hit/get 皆為 O(1)"""
+
+    def __init__(self, half_life_seconds: float = 60.0):
+        self.half_life_seconds = half_life_seconds
+        self._decay_rate = math.log(2) / half_life_seconds
+        self._counters: Dict[str, Tuple[float, float]] = {}
+
+    def _decayed(self, key: str, now: float) -> float:
+        value, updated_at = self._counters.get(key, (0.0, now))
+        return value * math.exp(-self._decay_rate * (now - updated_at))
+
+    def hit(self, key: str, amount: float = 1.0) -> float:
+        now = time.monotonic()
+        value = self._decayed(key, now) + amount
+        self._counters[key] = (value, now)
+        return value
+
+    def get(self, key: str) -> float:
+        return self._decayed(key, time.monotonic())
+
+    def snapshot(self) -> Dict[str, float]:
+        now = time.monotonic()
+        return {key: round(self._decayed(key, now), 3) for key in self._counters}
+
+    def clear(self):
+        self._counters.clear()
@@ -4,11 +4,81 @@
 """
 
 import os
-from fastapi import FastAPI
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-app = FastAPI(title="不老傳說 Simple")
+from tradingagents.cache.response_cache import ResponseCache, invalidates
+from tradingagents.database.pg_pool import AsyncPGPool, SyncPGPool
+
+# 數據庫配置
+DB_CONFIG = {
+    'host': '35.194.205.200',
+    'port': 5432,
+    'database': 'tradingagents',
+    'user': 'postgres',
+    'password': 'secure_postgres_password_2024'
+}
+
+# 共享連接池：熱點公開端點使用異步連接池，其餘端點經 get_db_connection 重用同步連接
+db_pool = AsyncPGPool(
+    min_size=int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    max_size=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+    **DB_CONFIG
+)
+sync_db_pool = SyncPGPool(max_size=int(os.getenv("DB_SYNC_POOL_MAX_SIZE", 10)), **DB_CONFIG)
+
+# 公開內容響應快取：內容只在管理後台發布/修改時變動，由管理端點使其失效
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("PUBLIC_CACHE_MAX_ENTRIES", 2000)),
+    ttl_seconds=int(os.getenv("PUBLIC_CACHE_TTL_SECONDS", 300))
+)
+PUBLIC_CACHE_TAGS = ("articles", "categories", "tags")
+
+# 快取命中的文章瀏覽量先累積在記憶體，定期批次寫回
+pending_article_views = defaultdict(int)
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", 5))
+
+async def flush_article_views():
+    """批次寫回累積的文章瀏覽量"""
+    if not pending_article_views:
+        return
+    views = dict(pending_article_views)
+    pending_article_views.clear()
+    try:
+        await db_pool.execute(
+            "article_views_batch", PUBLIC_ARTICLE_VIEWS_BATCH_SQL,
+            list(views.keys()), list(views.values())
+        )
+    except Exception as e:
+        # 寫回失敗時保留計數，下次再試
+        for article_id, count in views.items():
+            pending_article_views[article_id] += count
+        print(f"瀏覽量寫回失敗: {str(e)}")
+
+async def _view_flush_loop():
+    while True:
+        await asyncio.sleep(VIEW_FLUSH_INTERVAL_SECONDS)
+        await flush_article_views()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """啟動時建立連接池，關閉時寫回瀏覽量並釋放連接池"""
+    await db_pool.start()
+    # 同步連接池建立連接會阻塞，放到工作執行緒
+    await asyncio.to_thread(sync_db_pool.start)
+    view_flush_task = asyncio.create_task(_view_flush_loop())
+    yield
+    view_flush_task.cancel()
+    await asyncio.gather(view_flush_task, return_exceptions=True)
+    await flush_article_views()
+    await db_pool.close()
+    sync_db_pool.close()
+
+app = FastAPI(title="不老傳說 Simple", lifespan=lifespan)
 
 # 內容管理 Pydantic 模型
 class ContentCreateRequest(BaseModel):
@@ -60,7 +130,6 @@ class TagUpdateRequest(BaseModel):
     description: str = None
 
 # 直接添加TTS管理路由，避免複雜的依賴鏈
-import psycopg2
 from typing import Optional, List, Dict, Any
 from fastapi import HTTPException, status
 
@@ -85,8 +154,90 @@ async def health():
 # 公開內容展示 API 端點
 # ================================
 
-@app.get("/articles")
-async def get_public_articles(
+# 熱點公開查詢使用固定 SQL 文字（篩選條件以 NULL 參數關閉），
+# 每個連接只需 prepare 一次，之後由 asyncpg 的 statement cache 直接重用
+PUBLIC_ARTICLES_FILTER = """
+    FROM content_articles a
+    LEFT JOIN content_categories c ON a.category_id = c.id
+    LEFT JOIN content_article_tags at ON a.id = at.article_id
+    LEFT JOIN content_tags t ON at.tag_id = t.id
+    WHERE a.status = 'published'
+        AND ($1::text IS NULL OR c.slug = $1::text)
+        AND ($2::text IS NULL OR t.slug = $2::text)
+        AND ($3::text IS NULL OR a.title ILIKE $3::text OR a.content ILIKE $3::text OR a.excerpt ILIKE $3::text)
+"""
+
+PUBLIC_ARTICLES_SQL = f"""
+    SELECT DISTINCT
+        a.id, a.title, a.slug, a.excerpt, a.type, 
+        a.author, a.views, a.likes, a.is_featured,
+        a.published_at, a.created_at,
+        c.name as category_name, c.slug as category_slug,
+        ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
+        ARRAY_AGG(DISTINCT t.color) FILTER (WHERE t.color IS NOT NULL) as tag_colors
+    {PUBLIC_ARTICLES_FILTER}
+    GROUP BY a.id, c.name, c.slug
+    ORDER BY a.is_featured DESC, a.published_at DESC
+    LIMIT $4 OFFSET $5
+"""
+
+PUBLIC_ARTICLES_COUNT_SQL = f"""
+    SELECT COUNT(DISTINCT a.id)
+    {PUBLIC_ARTICLES_FILTER}
+"""
+
+PUBLIC_ARTICLE_BY_SLUG_SQL = """
+    SELECT 
+        a.id, a.title, a.slug, a.content, a.excerpt, a.type,
+        a.author, a.views, a.likes, a.is_featured,
+        a.published_at, a.created_at, a.updated_at,
+        c.name as category_name, c.slug as category_slug,
+        ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
+        ARRAY_AGG(DISTINCT t.color) FILTER (WHERE t.color IS NOT NULL) as tag_colors
+    FROM content_articles a
+    LEFT JOIN content_categories c ON a.category_id = c.id
+    LEFT JOIN content_article_tags at ON a.id = at.article_id
+    LEFT JOIN content_tags t ON at.tag_id = t.id
+    WHERE a.slug = $1 AND a.status = 'published'
+    GROUP BY a.id, c.name, c.slug
+"""
+
+PUBLIC_ARTICLE_VIEW_SQL = "UPDATE content_articles SET views = views + 1 WHERE id = $1"
+
+PUBLIC_ARTICLE_VIEWS_BATCH_SQL = """
+    UPDATE content_articles AS a SET views = a.views + v.views
+    FROM unnest($1::int[], $2::int[]) AS v(id, views)
+    WHERE a.id = v.id
+"""
+
+PUBLIC_CATEGORIES_SQL = """
+    SELECT 
+        c.id, c.name, c.slug, c.description, c.parent_id,
+        p.name as parent_name, p.slug as parent_slug,
+        COUNT(a.id) as article_count
+    FROM content_categories c
+    LEFT JOIN content_categories p ON c.parent_id = p.id
+    LEFT JOIN content_articles a ON c.id = a.category_id AND a.status = 'published'
+    WHERE c.is_active = TRUE
+    GROUP BY c.id, p.name, p.slug
+    HAVING COUNT(a.id) > 0
+    ORDER BY c.sort_order, c.name
+"""
+
+PUBLIC_TAGS_SQL = """
+    SELECT 
+        t.id, t.name, t.slug, t.color, t.description,
+        COUNT(at.article_id) as article_count
+    FROM content_tags t
+    LEFT JOIN content_article_tags at ON t.id = at.tag_id
+    LEFT JOIN content_articles a ON at.article_id = a.id AND a.status = 'published'
+    WHERE t.is_active = TRUE
+    GROUP BY t.id
+    HAVING COUNT(at.article_id) > 0
+    ORDER BY article_count DESC, t.name
+"""
+
+async def _load_public_articles(
     page: int = 1,
     limit: int = 10,
     category: Optional[str] = None,
@@ -95,64 +246,25 @@ async def get_public_articles(
 ):
     """獲取公開文章列表"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # 構建查詢條件（只顯示已發布的文章）
-        conditions = ["a.status = 'published'"]
-        params = []
-        
-        if category:
-            conditions.append("c.slug = %s")
-            params.append(category)
-            
-        if tag:
-            conditions.append("t.slug = %s")
-            params.append(tag)
-            
-        if search:
-            conditions.append("(a.title ILIKE %s OR a.content ILIKE %s OR a.excerpt ILIKE %s)")
-            params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
-        
-        where_clause = "WHERE " + " AND ".join(conditions)
+        # 空字串參數與未提供相同（固定 SQL 以 NULL 參數關閉篩選）
+        category = category or None
+        tag = tag or None
+        search_pattern = f"%{search}%" if search else None
         
         # 計算偏移量
         offset = (page - 1) * limit
         
-        # 獲取文章數據
-        query = f"""
-            SELECT DISTINCT
-                a.id, a.title, a.slug, a.excerpt, a.type, 
-                a.author, a.views, a.likes, a.is_featured,
-                a.published_at, a.created_at,
-                c.name as category_name, c.slug as category_slug,
-                ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
-                ARRAY_AGG(DISTINCT t.color) FILTER (WHERE t.color IS NOT NULL) as tag_colors
-            FROM content_articles a
-            LEFT JOIN content_categories c ON a.category_id = c.id
-            LEFT JOIN content_article_tags at ON a.id = at.article_id
-            LEFT JOIN content_tags t ON at.tag_id = t.id
-            {where_clause}
-            GROUP BY a.id, c.name, c.slug
-            ORDER BY a.is_featured DESC, a.published_at DESC
-            LIMIT %s OFFSET %s
-        """
-        
-        params.extend([limit, offset])
-        cur.execute(query, params)
-        articles = cur.fetchall()
-        
-        # 獲取總數
-        count_query = f"""
-            SELECT COUNT(DISTINCT a.id)
-            FROM content_articles a
-            LEFT JOIN content_categories c ON a.category_id = c.id
-            LEFT JOIN content_article_tags at ON a.id = at.article_id
-            LEFT JOIN content_tags t ON at.tag_id = t.id
-            {where_clause}
-        """
-        cur.execute(count_query, params[:-2])
-        total_count = cur.fetchone()[0]
+        async with db_pool.acquire() as conn:
+            articles = await db_pool.fetch(
+                "articles", PUBLIC_ARTICLES_SQL,
+                category, tag, search_pattern, limit, offset,
+                connection=conn
+            )
+            total_count = await db_pool.fetchval(
+                "articles_count", PUBLIC_ARTICLES_COUNT_SQL,
+                category, tag, search_pattern,
+                connection=conn
+            )
         
         # 格式化數據
         articles_data = []
@@ -176,9 +288,6 @@ async def get_public_articles(
                 "tags": [{"name": name, "color": color} for name, color in zip(article[13] or [], article[14] or [])]
             })
         
-        cur.close()
-        conn.close()
-        
         return {
             "status": "success",
             "data": {
@@ -198,41 +307,23 @@ async def get_public_articles(
             "message": f"獲取文章失敗: {str(e)}"
         }
 
-@app.get("/articles/{article_slug}")
-async def get_article_by_slug(article_slug: str):
+async def _load_article_by_slug(article_slug: str):
     """根據slug獲取單篇文章詳情"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # 獲取文章詳情
-        cur.execute("""
-            SELECT 
-                a.id, a.title, a.slug, a.content, a.excerpt, a.type,
-                a.author, a.views, a.likes, a.is_featured,
-                a.published_at, a.created_at, a.updated_at,
-                c.name as category_name, c.slug as category_slug,
-                ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
-                ARRAY_AGG(DISTINCT t.color) FILTER (WHERE t.color IS NOT NULL) as tag_colors
-            FROM content_articles a
-            LEFT JOIN content_categories c ON a.category_id = c.id
-            LEFT JOIN content_article_tags at ON a.id = at.article_id
-            LEFT JOIN content_tags t ON at.tag_id = t.id
-            WHERE a.slug = %s AND a.status = 'published'
-            GROUP BY a.id, c.name, c.slug
-        """, (article_slug,))
-        
-        article = cur.fetchone()
-        
-        if not article:
-            return {
-                "status": "error",
-                "message": "找不到該文章或文章未發布"
-            }
-        
-        # 增加瀏覽量
-        cur.execute("UPDATE content_articles SET views = views + 1 WHERE id = %s", (article[0],))
-        conn.commit()
+        async with db_pool.acquire() as conn:
+            # 獲取文章詳情
+            article = await db_pool.fetchrow(
+                "article_by_slug", PUBLIC_ARTICLE_BY_SLUG_SQL, article_slug, connection=conn
+            )
+            
+            if not article:
+                return {
+                    "status": "error",
+                    "message": "找不到該文章或文章未發布"
+                }
+            
+            # 增加瀏覽量
+            await db_pool.execute("article_view", PUBLIC_ARTICLE_VIEW_SQL, article[0], connection=conn)
         
         # 格式化數據
         article_data = {
@@ -256,9 +347,6 @@ async def get_article_by_slug(article_slug: str):
             "tags": [{"name": name, "color": color} for name, color in zip(article[15] or [], article[16] or [])]
         }
         
-        cur.close()
-        conn.close()
-        
         return {
             "status": "success",
             "data": article_data
@@ -270,28 +358,10 @@ async def get_article_by_slug(article_slug: str):
             "message": f"獲取文章失敗: {str(e)}"
         }
 
-@app.get("/categories")
-async def get_public_categories():
+async def _load_public_categories():
     """獲取公開分類列表"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT 
-                c.id, c.name, c.slug, c.description, c.parent_id,
-                p.name as parent_name, p.slug as parent_slug,
-                COUNT(a.id) as article_count
-            FROM content_categories c
-            LEFT JOIN content_categories p ON c.parent_id = p.id
-            LEFT JOIN content_articles a ON c.id = a.category_id AND a.status = 'published'
-            WHERE c.is_active = TRUE
-            GROUP BY c.id, p.name, p.slug
-            HAVING COUNT(a.id) > 0
-            ORDER BY c.sort_order, c.name
-        """)
-        
-        categories = cur.fetchall()
+        categories = await db_pool.fetch("categories", PUBLIC_CATEGORIES_SQL)
         categories_data = []
         
         for category in categories:
@@ -307,9 +377,6 @@ async def get_public_categories():
                 "article_count": category[7]
             })
         
-        cur.close()
-        conn.close()
-        
         return {
             "status": "success",
             "data": categories_data
@@ -321,27 +388,10 @@ async def get_public_categories():
             "message": f"獲取分類失敗: {str(e)}"
         }
 
-@app.get("/tags")
-async def get_public_tags():
+async def _load_public_tags():
     """獲取公開標籤列表"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("""
-            SELECT 
-                t.id, t.name, t.slug, t.color, t.description,
-                COUNT(at.article_id) as article_count
-            FROM content_tags t
-            LEFT JOIN content_article_tags at ON t.id = at.tag_id
-            LEFT JOIN content_articles a ON at.article_id = a.id AND a.status = 'published'
-            WHERE t.is_active = TRUE
-            GROUP BY t.id
-            HAVING COUNT(at.article_id) > 0
-            ORDER BY article_count DESC, t.name
-        """)
-        
-        tags = cur.fetchall()
+        tags = await db_pool.fetch("tags", PUBLIC_TAGS_SQL)
         tags_data = []
         
         for tag in tags:
@@ -354,9 +404,6 @@ async def get_public_tags():
                 "article_count": tag[5]
             })
         
-        cur.close()
-        conn.close()
-        
         return {
             "status": "success",
             "data": tags_data
@@ -368,41 +415,89 @@ async def get_public_tags():
             "message": f"獲取標籤失敗: {str(e)}"
         }
 
-# 數據庫配置
-DB_CONFIG = {
-    'host': '35.194.205.200',
-    'port': 5432,
-    'database': 'tradingagents',
-    'user': 'postgres',
-    'password': 'secure_postgres_password_2024'
-}
+def _is_success(data) -> bool:
+    return isinstance(data, dict) and data.get("status") == "success"
 
-def get_db_connection():
-    """獲取數據庫連接，包含重試機制"""
-    import time
-    max_retries = 3
-    retry_delay = 2
+@app.get("/articles")
+async def get_public_articles(
+    request: Request,
+    page: int = 1,
+    limit: int = 10,
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    search: Optional[str] = None
+):
+    """獲取公開文章列表（快取 + ETag）"""
+    category, tag, search = category or None, tag or None, search or None
+    key = response_cache.make_key("/articles", {
+        "page": page, "limit": limit, "category": category, "tag": tag, "search": search
+    })
+    entry = await response_cache.get_or_compute(
+        key,
+        lambda: _load_public_articles(page, limit, category, tag, search),
+        tags=("articles",),
+        cacheable=_is_success
+    )
+    return response_cache.build_response(entry, request)
+
+@app.get("/articles/{article_slug}")
+async def get_article_by_slug(article_slug: str, request: Request):
+    """根據slug獲取單篇文章詳情（快取 + ETag；命中時瀏覽量批次寫回）"""
+    key = response_cache.make_key(f"/articles/{article_slug}")
+    cached = response_cache.get(key)
+    if cached is not None:
+        response_cache.stats['hits'] += 1
+        pending_article_views[cached.meta["article_id"]] += 1
+        return response_cache.build_response(cached, request)
     
-    for attempt in range(max_retries):
-        try:
-            conn = psycopg2.connect(
-                host=DB_CONFIG['host'],
-                port=DB_CONFIG['port'],
-                database=DB_CONFIG['database'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                connect_timeout=10
-            )
-            return conn
-        except Exception as e:
-            if attempt < max_retries - 1:
-                print(f"資料庫連接嘗試 {attempt + 1}/{max_retries} 失敗: {str(e)}")
-                print(f"等待 {retry_delay} 秒後重試...")
-                time.sleep(retry_delay)
-                continue
-            else:
-                print(f"所有資料庫連接嘗試都失敗了: {str(e)}")
-                raise HTTPException(status_code=500, detail=f"數據庫連接失敗: {str(e)}")
+    entry = await response_cache.get_or_compute(
+        key,
+        lambda: _load_article_by_slug(article_slug),
+        tags=("articles", f"article:{article_slug}"),
+        cacheable=_is_success,
+        meta=lambda data: {"article_id": data["data"]["id"]}
+    )
+    return response_cache.build_response(entry, request)
+
+@app.get("/categories")
+async def get_public_categories(request: Request):
+    """獲取公開分類列表（快取 + ETag）"""
+    entry = await response_cache.get_or_compute(
+        "/categories", _load_public_categories, tags=("categories",), cacheable=_is_success
+    )
+    return response_cache.build_response(entry, request)
+
+@app.get("/tags")
+async def get_public_tags(request: Request):
+    """獲取公開標籤列表（快取 + ETag）"""
+    entry = await response_cache.get_or_compute(
+        "/tags", _load_public_tags, tags=("tags",), cacheable=_is_success
+    )
+    return response_cache.build_response(entry, request)
+
+async def get_db_connection():
+    """從共享連接池獲取數據庫連接（conn.close() 會將連接歸還連接池）
+
+    取連接可能等待連接池空位或建立新連接，在工作執行緒中進行，不阻塞事件循環
+    """
+    try:
+        return await asyncio.to_thread(sync_db_pool.connection)
+    except Exception as e:
+        print(f"資料庫連接失敗: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"數據庫連接失敗: {str(e)}")
+
+@app.get("/admin/system/db-pool")
+async def db_pool_status():
+    """數據庫連接池指標"""
+    return {
+        "status": "success",
+        "data": {
+            "async_pool": db_pool.get_stats(),
+            "sync_pool": sync_db_pool.get_stats(),
+            "response_cache": response_cache.get_stats(),
+            "pending_article_views": sum(pending_article_views.values())
+        }
+    }
 
 @app.get("/admin/analytics/dashboard")
 async def admin_dashboard():
@@ -421,7 +516,7 @@ async def admin_dashboard():
 async def get_tts_voices(active_only: Optional[bool] = False, language: Optional[str] = None, gender: Optional[str] = None):
     """獲取TTS語音列表"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         query = "SELECT id, model_id, name, description, language, gender, voice_type, provider, sample_rate, is_active, is_premium, cost_per_character, created_at FROM tts_voice_models"
@@ -478,7 +573,7 @@ async def get_tts_voices(active_only: Optional[bool] = False, language: Optional
 async def get_tts_jobs(limit: Optional[int] = 10, status: Optional[str] = None):
     """獲取TTS任務列表"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         query = "SELECT id, job_id, text_content, status, created_at, file_url FROM tts_jobs"
@@ -517,7 +612,7 @@ async def get_tts_jobs(limit: Optional[int] = 10, status: Optional[str] = None):
 async def get_tts_stats():
     """獲取TTS統計信息"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 統計語音模型
@@ -574,7 +669,7 @@ async def get_tts_stats():
 async def get_tts_queue_status():
     """獲取TTS隊列狀態"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("SELECT COUNT(*) FROM tts_jobs WHERE status = 'pending'")
@@ -607,7 +702,7 @@ async def get_tts_queue_status():
 async def get_tts_config():
     """獲取TTS配置"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("SELECT config_key, config_value, description, category FROM tts_configs ORDER BY category, config_key")
@@ -634,7 +729,7 @@ async def get_tts_config():
 async def get_tts_models():
     """獲取TTS語音模型列表"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("SELECT model_id, name, provider, language, is_active FROM tts_voice_models ORDER BY provider, name")
@@ -668,7 +763,7 @@ async def get_tts_audio_files(limit: Optional[int] = 5):
 async def create_tts_voice(voice_data: dict):
     """創建TTS語音模型"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -709,7 +804,7 @@ async def create_tts_voice(voice_data: dict):
 async def update_tts_voice(voice_id: str, voice_data: dict):
     """更新TTS語音模型"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 構建更新查詢
@@ -757,7 +852,7 @@ async def update_tts_voice(voice_id: str, voice_data: dict):
 async def delete_tts_voice(voice_id: str):
     """刪除TTS語音模型"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("DELETE FROM tts_voice_models WHERE model_id = %s", (voice_id,))
@@ -917,7 +1012,7 @@ async def get_content(
 ):
     """獲取內容列表"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 構建查詢條件
@@ -1024,7 +1119,7 @@ async def get_content(
 async def get_content_stats():
     """獲取內容統計數據"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 獲取基本統計
@@ -1081,10 +1176,11 @@ async def get_content_stats():
         }
 
 @app.post("/admin/content")
+@invalidates(response_cache, *PUBLIC_CACHE_TAGS)
 async def create_content(content_data: dict):
     """創建新內容"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 生成 slug
@@ -1162,10 +1258,11 @@ async def create_content(content_data: dict):
         }
 
 @app.put("/admin/content/{content_id}")
+@invalidates(response_cache, *PUBLIC_CACHE_TAGS)
 async def update_content(content_id: int, content_data: dict):
     """更新內容"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 更新發布時間
@@ -1233,10 +1330,11 @@ async def update_content(content_id: int, content_data: dict):
         }
 
 @app.delete("/admin/content/{content_id}")
+@invalidates(response_cache, *PUBLIC_CACHE_TAGS)
 async def delete_content(content_id: int):
     """刪除內容"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 刪除文章（會自動刪除相關的標籤關聯）
@@ -1264,10 +1362,11 @@ async def delete_content(content_id: int):
         }
 
 @app.patch("/admin/content/{content_id}/publish")
+@invalidates(response_cache, *PUBLIC_CACHE_TAGS)
 async def publish_content(content_id: int):
     """發布內容"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -1303,7 +1402,7 @@ async def publish_content(content_id: int):
 async def get_content_categories():
     """獲取內容分類"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -1352,7 +1451,7 @@ async def get_content_categories():
 async def get_content_tags():
     """獲取內容標籤"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         cur.execute("""
@@ -1399,10 +1498,11 @@ async def get_content_tags():
 # ================================
 
 @app.post("/admin/content/categories")
+@invalidates(response_cache, "categories", "articles")
 async def create_category(category_data: CategoryCreateRequest):
     """創建新分類"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 生成 slug（如果未提供）
@@ -1449,10 +1549,11 @@ async def create_category(category_data: CategoryCreateRequest):
         }
 
 @app.put("/admin/content/categories/{category_id}")
+@invalidates(response_cache, "categories", "articles")
 async def update_category(category_id: int, category_data: CategoryUpdateRequest):
     """更新分類"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 構建更新SQL
@@ -1512,10 +1613,11 @@ async def update_category(category_id: int, category_data: CategoryUpdateRequest
         }
 
 @app.delete("/admin/content/categories/{category_id}")
+@invalidates(response_cache, "categories", "articles")
 async def delete_category(category_id: int):
     """刪除分類"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 檢查是否有文章使用此分類
@@ -1564,10 +1666,11 @@ async def delete_category(category_id: int):
 # ================================
 
 @app.post("/admin/content/tags")
+@invalidates(response_cache, "tags", "articles")
 async def create_tag(tag_data: TagCreateRequest):
     """創建新標籤"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 生成 slug（如果未提供）
@@ -1613,10 +1716,11 @@ async def create_tag(tag_data: TagCreateRequest):
         }
 
 @app.put("/admin/content/tags/{tag_id}")
+@invalidates(response_cache, "tags", "articles")
 async def update_tag(tag_id: int, tag_data: TagUpdateRequest):
     """更新標籤"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 構建更新SQL
@@ -1672,10 +1776,11 @@ async def update_tag(tag_id: int, tag_data: TagUpdateRequest):
         }
 
 @app.delete("/admin/content/tags/{tag_id}")
+@invalidates(response_cache, "tags", "articles")
 async def delete_tag(tag_id: int):
     """刪除標籤"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 檢查是否有文章使用此標籤
@@ -1775,7 +1880,7 @@ async def get_financial_transactions(limit: int = 20):
 async def get_payuni_transactions(page: int = 1, limit: int = 25):
     """獲取PayUni交易記錄 - 從真實資料庫讀取"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 計算分頁偏移
@@ -1889,7 +1994,7 @@ async def get_payuni_transactions(page: int = 1, limit: int = 25):
 async def get_payuni_stats():
     """獲取PayUni支付統計 - 從真實資料庫計算"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 基本統計查詢
@@ -2725,7 +2830,7 @@ async def get_subscription_management():
 async def get_permission_roles():
     """獲取所有角色信息"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 查詢用戶角色和權限（模擬RBAC結構）
@@ -2857,7 +2962,7 @@ async def get_permission_roles():
 async def get_user_roles():
     """獲取用戶角色信息"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 查詢用戶及其角色信息
@@ -2943,7 +3048,7 @@ async def get_user_roles():
 async def get_permission_stats():
     """獲取權限統計信息"""
     try:
-        conn = get_db_connection()
+        conn = await get_db_connection()
         cur = conn.cursor()
         
         # 獲取角色統計
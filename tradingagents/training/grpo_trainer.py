@@ -227,6 +227,31 @@ class GRPOTrainer:
             values=values
         )
     
+    def iter_exported_trajectories(
+        self,
+        export_path: str,
+        columns: Optional[List[str]] = None,
+        batch_size: Optional[int] = None
+    ):
+        """
+        逐批讀取 GRPO 列式匯出（記憶體映射，不需重新解析 JSON）
+
+        Args:
+            export_path: 匯出目錄或 manifest.json 路徑
+            columns: 只讀取指定欄位
+            batch_size: 每批筆數，預設使用訓練配置的 batch_size
+
+        Returns:
+            Iterator[pyarrow.RecordBatch]
+        """
+        from ..art.storage.grpo_export import iter_grpo_export_batches
+
+        return iter_grpo_export_batches(
+            export_path,
+            columns=columns,
+            batch_size=batch_size or self.config.batch_size
+        )
+
     def _compute_gae_advantages(
         self, 
         rewards: torch.Tensor, 
@@ -0,0 +1,679 @@
+#!/usr/bin/env python3
+"""
+Budget Accountant - 分散式預算記帳器
+天工 (TianGong) - 以租約（lease）在多個 worker 之間分配用戶預算
+
+此模組提供：
+1. 每個 worker 向共享後端租用用戶剩餘預算的一小段額度，熱路徑只扣本地額度，不需網路往返
+2. 本地額度低於水位時在背景非同步續租，結算（已花費轉為已提交、歸還未用額度）同樣在背景進行
+3. 可插拔後端：Redis Lua 腳本（生產環境）、SQLite（多進程測試）、進程內記憶體（單元測試）
+
+後端以「用戶 + 日期」與「用戶 + 月份」為鍵，換日/換月自然產生新鍵，不需另外的重置邏輯。
+每筆租約帶有到期時間，worker 崩潰後其未用額度會在到期後自動回收；
+全域超支上限為「每個 worker 一段租約」。
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import redis.asyncio as redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 浮點誤差容忍值，低於此值的租約視為已歸還
+_EPSILON = 1e-9
+
+
+def budget_period_keys(user_id: str, now: Optional[datetime] = None, prefix: str = 'budget') -> Tuple[str, str]:
+    """返回用戶當日與當月的預算鍵"""
+    now = now or datetime.now()
+    return (
+        f"{prefix}:{user_id}:d:{now.strftime('%Y-%m-%d')}",
+        f"{prefix}:{user_id}:m:{now.strftime('%Y-%m')}",
+    )
+
+
+@dataclass
+class LeaseGrant:
+    """後端租用結果"""
+    granted_usd: float
+    # 每個鍵授予後仍可被租用的額度（與 keys 順序一致）
+    remaining_usd: List[float]
+    # 每個鍵已提交 + 所有有效租約的總額
+    used_usd: List[float]
+
+
+# ==================== 後端 ====================
+
+class BudgetBackend:
+    """預算後端介面，所有操作必須對同一組鍵原子化執行"""
+
+    async def acquire(
+        self,
+        keys: Sequence[str],
+        limits: Sequence[float],
+        worker_id: str,
+        amount: float,
+        lease_ttl: float
+    ) -> LeaseGrant:
+        """租用額度：授予 min(amount, 各鍵剩餘)，並累加到該 worker 的租約上"""
+        raise NotImplementedError
+
+    async def settle(
+        self,
+        keys: Sequence[str],
+        worker_id: str,
+        spent: float,
+        release: float,
+        lease_ttl: float
+    ) -> List[float]:
+        """結算：已提交 += spent，該 worker 的租約 -= release，返回各鍵已提交總額"""
+        raise NotImplementedError
+
+    async def snapshot(self, keys: Sequence[str]) -> List[Dict[str, float]]:
+        """讀取各鍵狀態（limit、committed、leased）"""
+        raise NotImplementedError
+
+    async def close(self):
+        """釋放後端資源"""
+
+
+def _period_ttl(key: str) -> int:
+    """鍵的保存期限：日鍵保留 2 天、月鍵保留 35 天"""
+    return 2 * 86400 if ':d:' in key else 35 * 86400
+
+
+def _apply_acquire(
+    states: List[Dict[str, Any]],
+    limits: Sequence[float],
+    worker_id: str,
+    amount: float,
+    now: float,
+    lease_ttl: float
+) -> LeaseGrant:
+    """在已鎖定的狀態上執行租用（記憶體與 SQLite 後端共用，語義與 Lua 腳本一致）"""
+    grant = max(amount, 0.0)
+    available = []
+    for state, limit in zip(states, limits):
+        state['limit'] = float(limit)
+        leases = state['leases']
+        for worker, (_, expires_at) in list(leases.items()):
+            if expires_at < now:
+                del leases[worker]
+        leased = sum(lease_amount for lease_amount, _ in leases.values())
+        remaining = state['limit'] - state['committed'] - leased
+        available.append(remaining)
+        grant = min(grant, remaining)
+    grant = max(grant, 0.0)
+
+    used = []
+    for state in states:
+        current, _ = state['leases'].get(worker_id, (0.0, 0.0))
+        state['leases'][worker_id] = (current + grant, now + lease_ttl)
+        used.append(state['committed'] + sum(lease_amount for lease_amount, _ in state['leases'].values()))
+
+    return LeaseGrant(
+        granted_usd=grant,
+        remaining_usd=[remaining - grant for remaining in available],
+        used_usd=used
+    )
+
+
+def _apply_settle(
+    states: List[Dict[str, Any]],
+    worker_id: str,
+    spent: float,
+    release: float,
+    now: float,
+    lease_ttl: float
+) -> List[float]:
+    """在已鎖定的狀態上執行結算"""
+    committed = []
+    for state in states:
+        state['committed'] += spent
+        current, _ = state['leases'].get(worker_id, (0.0, 0.0))
+        current -= release
+        if current > _EPSILON:
+            state['leases'][worker_id] = (current, now + lease_ttl)
+        else:
+            state['leases'].pop(worker_id, None)
+        committed.append(state['committed'])
+    return committed
+
+
+def _state_summary(state: Optional[Dict[str, Any]], now: float) -> Dict[str, float]:
+    if not state:
+        return {'limit': 0.0, 'committed': 0.0, 'leased': 0.0}
+    leased = sum(amount for amount, expires_at in state['leases'].values() if expires_at >= now)
+    return {'limit': state['limit'], 'committed': state['committed'], 'leased': leased}
+
+
+class InMemoryBudgetBackend(BudgetBackend):
+    """進程內後端（測試用，多個 BudgetAccountant 共用同一實例即可模擬多 worker）"""
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> Dict[str, Any]:
+        return self._states.setdefault(key, {'limit': 0.0, 'committed': 0.0, 'leases': {}})
+
+    async def acquire(self, keys, limits, worker_id, amount, lease_ttl) -> LeaseGrant:
+        with self._lock:
+            states = [self._state(key) for key in keys]
+            return _apply_acquire(states, limits, worker_id, amount, time.time(), lease_ttl)
+
+    async def settle(self, keys, worker_id, spent, release, lease_ttl) -> List[float]:
+        with self._lock:
+            states = [self._state(key) for key in keys]
+            return _apply_settle(states, worker_id, spent, release, time.time(), lease_ttl)
+
+    async def snapshot(self, keys) -> List[Dict[str, float]]:
+        now = time.time()
+        with self._lock:
+            return [_state_summary(self._states.get(key), now) for key in keys]
+
+
+class SQLiteBudgetBackend(BudgetBackend):
+    """SQLite 後端（多進程測試用），以 BEGIN IMMEDIATE 取得寫鎖保證原子性"""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS budget_periods ("
+                "key TEXT PRIMARY KEY, budget_limit REAL NOT NULL DEFAULT 0, "
+                "committed REAL NOT NULL DEFAULT 0, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS budget_leases ("
+                "key TEXT NOT NULL, worker_id TEXT NOT NULL, amount REAL NOT NULL, "
+                "expires_at REAL NOT NULL, PRIMARY KEY (key, worker_id))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, keys: Sequence[str]) -> List[Dict[str, Any]]:
+        states = []
+        for key in keys:
+            row = conn.execute(
+                "SELECT budget_limit, committed FROM budget_periods WHERE key = ?", (key,)
+            ).fetchone()
+            leases = {
+                worker: (amount, expires_at)
+                for worker, amount, expires_at in conn.execute(
+                    "SELECT worker_id, amount, expires_at FROM budget_leases WHERE key = ?", (key,)
+                )
+            }
+            states.append({
+                'limit': row[0] if row else 0.0,
+                'committed': row[1] if row else 0.0,
+                'leases': leases
+            })
+        return states
+
+    def _store(self, conn: sqlite3.Connection, keys: Sequence[str], states: List[Dict[str, Any]], now: float):
+        for key, state in zip(keys, states):
+            conn.execute(
+                "INSERT INTO budget_periods (key, budget_limit, committed, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET budget_limit = excluded.budget_limit, "
+                "committed = excluded.committed, expires_at = excluded.expires_at",
+                (key, state['limit'], state['committed'], now + _period_ttl(key))
+            )
+            conn.execute("DELETE FROM budget_leases WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO budget_leases (key, worker_id, amount, expires_at) VALUES (?, ?, ?, ?)",
+                [(key, worker, amount, expires_at) for worker, (amount, expires_at) in state['leases'].items()]
+            )
+
+    def _transaction(self, keys: Sequence[str], apply):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                states = self._load(conn, keys)
+                result = apply(states, now)
+                self._store(conn, keys, states, now)
+                conn.execute("DELETE FROM budget_periods WHERE expires_at < ?", (now,))
+                conn.execute("DELETE FROM budget_leases WHERE key NOT IN (SELECT key FROM budget_periods)")
+                conn.execute("COMMIT")
+                return result
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    async def acquire(self, keys, limits, worker_id, amount, lease_ttl) -> LeaseGrant:
+        return await asyncio.to_thread(
+            self._transaction, keys,
+            lambda states, now: _apply_acquire(states, limits, worker_id, amount, now, lease_ttl)
+        )
+
+    async def settle(self, keys, worker_id, spent, release, lease_ttl) -> List[float]:
+        return await asyncio.to_thread(
+            self._transaction, keys,
+            lambda states, now: _apply_settle(states, worker_id, spent, release, now, lease_ttl)
+        )
+
+    async def snapshot(self, keys) -> List[Dict[str, float]]:
+        def read():
+            conn = self._connect()
+            try:
+                now = time.time()
+                states = self._load(conn, keys)
+                return [_state_summary(state, now) for state in states]
+            finally:
+                conn.close()
+        return await asyncio.to_thread(read)
+
+
+# 租約欄位格式："lease:<worker_id>" -> "<amount>|<expires_at>"
+# Redis 會把 Lua 數字截斷為整數，因此金額一律以字串返回
+_LUA_ACQUIRE = """
+local worker = 'lease:' .. ARGV[1]
+local amount = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local lease_ttl = tonumber(ARGV[4])
+local grant = math.max(amount, 0)
+local available = {}
+for i, key in ipairs(KEYS) do
+  local limit = tonumber(ARGV[4 + i])
+  redis.call('HSET', key, 'limit', limit)
+  local committed = tonumber(redis.call('HGET', key, 'committed') or '0')
+  local leased = 0
+  local fields = redis.call('HGETALL', key)
+  for j = 1, #fields, 2 do
+    if string.sub(fields[j], 1, 6) == 'lease:' then
+      local lease_amount, expires_at = string.match(fields[j + 1], '([^|]+)|([^|]+)')
+      if tonumber(expires_at) < now then
+        redis.call('HDEL', key, fields[j])
+      else
+        leased = leased + tonumber(lease_amount)
+      end
+    end
+  end
+  available[i] = limit - committed - leased
+  grant = math.min(grant, available[i])
+end
+grant = math.max(grant, 0)
+local result = {tostring(grant)}
+for i, key in ipairs(KEYS) do
+  local current = redis.call('HGET', key, worker)
+  local current_amount = 0
+  if current then current_amount = tonumber(string.match(current, '([^|]+)|')) end
+  redis.call('HSET', key, worker, tostring(current_amount + grant) .. '|' .. tostring(now + lease_ttl))
+  redis.call('EXPIRE', key, tonumber(ARGV[4 + #KEYS + i]))
+  local limit = tonumber(ARGV[4 + i])
+  table.insert(result, tostring(available[i] - grant))
+  table.insert(result, tostring(limit - available[i] + grant))
+end
+return result
+"""
+
+_LUA_SETTLE = """
+local worker = 'lease:' .. ARGV[1]
+local spent = tonumber(ARGV[2])
+local release = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local lease_ttl = tonumber(ARGV[5])
+local result = {}
+for i, key in ipairs(KEYS) do
+  local committed = redis.call('HINCRBYFLOAT', key, 'committed', spent)
+  local current = redis.call('HGET', key, worker)
+  local current_amount = 0
+  if current then current_amount = tonumber(string.match(current, '([^|]+)|')) end
+  current_amount = current_amount - release
+  if current_amount > 1e-9 then
+    redis.call('HSET', key, worker, tostring(current_amount) .. '|' .. tostring(now + lease_ttl))
+  else
+    redis.call('HDEL', key, worker)
+  end
+  redis.call('EXPIRE', key, tonumber(ARGV[5 + i]))
+  table.insert(result, tostring(committed))
+end
+return result
+"""
+
+
+class RedisBudgetBackend(BudgetBackend):
+    """Redis 後端（生產環境），租用與結算各為一段 Lua 腳本，在 Redis 內原子執行"""
+
+    def __init__(self, client=None, redis_url: Optional[str] = None):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis 套件未安裝，無法使用 RedisBudgetBackend")
+        self.client = client or redis.from_url(
+            redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            decode_responses=True
+        )
+        self._acquire_script = self.client.register_script(_LUA_ACQUIRE)
+        self._settle_script = self.client.register_script(_LUA_SETTLE)
+
+    async def acquire(self, keys, limits, worker_id, amount, lease_ttl) -> LeaseGrant:
+        args = [worker_id, amount, time.time(), lease_ttl, *limits, *[_period_ttl(key) for key in keys]]
+        result = await self._acquire_script(keys=list(keys), args=args)
+        values = [float(value) for value in result]
+        return LeaseGrant(
+            granted_usd=values[0],
+            remaining_usd=values[1::2],
+            used_usd=values[2::2]
+        )
+
+    async def settle(self, keys, worker_id, spent, release, lease_ttl) -> List[float]:
+        args = [worker_id, spent, release, time.time(), lease_ttl, *[_period_ttl(key) for key in keys]]
+        result = await self._settle_script(keys=list(keys), args=args)
+        return [float(value) for value in result]
+
+    async def snapshot(self, keys) -> List[Dict[str, float]]:
+        now = time.time()
+        summaries = []
+        for key in keys:
+            fields = await self.client.hgetall(key)
+            leased = 0.0
+            for name, value in fields.items():
+                if name.startswith('lease:'):
+                    amount, expires_at = value.split('|')
+                    if float(expires_at) >= now:
+                        leased += float(amount)
+            summaries.append({
+                'limit': float(fields.get('limit', 0.0)),
+                'committed': float(fields.get('committed', 0.0)),
+                'leased': leased
+            })
+        return summaries
+
+    async def close(self):
+        await self.client.close()
+
+
+# ==================== 記帳器 ====================
+
+@dataclass
+class _UserLease:
+    """worker 本地持有的用戶租約"""
+    user_id: str
+    keys: Tuple[str, str]
+    limits: Tuple[float, float]
+    available_usd: float = 0.0      # 本地可直接扣用的額度
+    held_usd: float = 0.0           # 向後端租用且尚未歸還的總額
+    unsettled_usd: float = 0.0      # 已花費、尚未結算到後端的金額
+    remaining_usd: Optional[float] = None  # 上次後端回報的剩餘可租額度（日/月取小）
+    used_usd: Tuple[float, float] = (0.0, 0.0)
+    last_lease_usd: float = 0.0
+    expires_at: float = 0.0
+    last_settle: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    refill_task: Optional[asyncio.Task] = None
+    settle_task: Optional[asyncio.Task] = None
+
+
+class BudgetAccountant:
+    """預算記帳器（每個 worker 一個實例）
+
+    熱路徑（reserve 命中本地額度、charge）完全在本地完成；
+    只有在本地額度不足以支付單次請求時才會同步向後端租用。
+    """
+
+    def __init__(
+        self,
+        backend: BudgetBackend,
+        worker_id: Optional[str] = None,
+        lease_fraction: float = 0.2,
+        min_lease_usd: float = 0.01,
+        refill_threshold: float = 0.3,
+        lease_ttl: float = 300.0,
+        settle_interval: float = 5.0
+    ):
+        self.backend = backend
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_fraction = lease_fraction
+        self.min_lease_usd = min_lease_usd
+        self.refill_threshold = refill_threshold
+        self.lease_ttl = lease_ttl
+        self.settle_interval = settle_interval
+        self._leases: Dict[str, _UserLease] = {}
+
+        self.stats = {
+            'local_hits': 0,
+            'sync_acquires': 0,
+            'async_refills': 0,
+            'settlements': 0,
+            'denied': 0
+        }
+
+    def _lease_size(self, lease: _UserLease) -> float:
+        remaining = lease.remaining_usd if lease.remaining_usd is not None else min(lease.limits)
+        return max(self.min_lease_usd, remaining * self.lease_fraction)
+
+    def _get_lease(self, user_id: str, limits: Tuple[float, float]) -> _UserLease:
+        keys = budget_period_keys(user_id)
+        lease = self._leases.get(user_id)
+        if lease is not None and lease.keys != keys:
+            # 換日/換月：舊租約在背景全額結算
+            self._spawn(self._close_lease(lease))
+            lease = None
+        if lease is None:
+            lease = _UserLease(user_id=user_id, keys=keys, limits=limits)
+            self._leases[user_id] = lease
+        else:
+            lease.limits = limits
+        return lease
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        task.add_done_callback(self._log_task_error)
+        return task
+
+    @staticmethod
+    def _log_task_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ 預算背景任務失敗: {task.exception()}")
+
+    async def _acquire(self, lease: _UserLease, amount: float):
+        """向後端租用（呼叫方需持有 lease.lock）"""
+        if lease.expires_at and time.time() >= lease.expires_at:
+            # 本地租約已接近後端到期時間：先結算歸還，避免與後端狀態不一致
+            await self._settle(lease, release_all=True)
+
+        grant = await self.backend.acquire(
+            lease.keys, lease.limits, self.worker_id, amount, self.lease_ttl
+        )
+        lease.available_usd += grant.granted_usd
+        lease.held_usd += grant.granted_usd
+        lease.remaining_usd = min(grant.remaining_usd)
+        lease.used_usd = tuple(grant.used_usd)
+        lease.last_lease_usd = max(grant.granted_usd, lease.last_lease_usd)
+        # 預留一成時間作為時鐘誤差緩衝
+        lease.expires_at = time.time() + self.lease_ttl * 0.9
+
+    async def _settle(self, lease: _UserLease, release_all: bool = False):
+        """結算已花費金額（呼叫方需持有 lease.lock）"""
+        spent = lease.unsettled_usd
+        if release_all:
+            release = lease.held_usd
+        else:
+            release = min(spent, lease.held_usd)
+        if spent <= 0 and release <= 0 and not release_all:
+            return
+
+        await self.backend.settle(lease.keys, self.worker_id, spent, release, self.lease_ttl)
+        lease.unsettled_usd -= spent
+        lease.held_usd -= release
+        if release_all:
+            lease.available_usd = 0.0
+            lease.held_usd = 0.0
+            lease.expires_at = 0.0
+        else:
+            lease.expires_at = time.time() + self.lease_ttl * 0.9
+        lease.last_settle = time.time()
+        self.stats['settlements'] += 1
+
+    async def _refill(self, lease: _UserLease):
+        async with lease.lock:
+            if lease.available_usd < lease.last_lease_usd * self.refill_threshold:
+                await self._acquire(lease, self._lease_size(lease))
+                self.stats['async_refills'] += 1
+
+    async def _periodic_settle(self, lease: _UserLease):
+        async with lease.lock:
+            await self._settle(lease)
+
+    async def _close_lease(self, lease: _UserLease):
+        async with lease.lock:
+            await self._settle(lease, release_all=True)
+
+    def _local_expired(self, lease: _UserLease) -> bool:
+        return lease.expires_at == 0.0 or time.time() >= lease.expires_at
+
+    async def ensure(self, user_id: str, limits: Tuple[float, float], amount: float = 0.0) -> _UserLease:
+        """確保本地租約至少有 amount 可用；本地足夠時不觸發任何網路操作"""
+        lease = self._get_lease(user_id, limits)
+        if not self._local_expired(lease) and lease.available_usd >= amount and lease.available_usd > 0:
+            self.stats['local_hits'] += 1
+            return lease
+
+        async with lease.lock:
+            if self._local_expired(lease) or lease.available_usd < amount or lease.available_usd <= 0:
+                needed = max(amount - max(lease.available_usd, 0.0), 0.0)
+                await self._acquire(lease, max(needed, self._lease_size(lease)))
+                self.stats['sync_acquires'] += 1
+        return lease
+
+    async def reserve(self, user_id: str, limits: Tuple[float, float], amount: float) -> bool:
+        """檢查本 worker 是否能支付 amount（不扣款，實際花費由 charge 記錄）"""
+        lease = await self.ensure(user_id, limits, amount)
+        if lease.available_usd + _EPSILON < amount:
+            self.stats['denied'] += 1
+            return False
+        return True
+
+    def charge(self, user_id: str, cost_usd: float):
+        """記錄實際花費：只扣本地額度，必要時在背景續租/結算"""
+        if cost_usd <= 0:
+            return
+        lease = self._leases.get(user_id)
+        if lease is None or lease.keys != budget_period_keys(user_id):
+            # 本 worker 未持有該用戶的當期租約，直接在背景提交花費
+            keys = budget_period_keys(user_id)
+            self._spawn(self.backend.settle(keys, self.worker_id, cost_usd, 0.0, self.lease_ttl))
+            return
+
+        lease.available_usd -= cost_usd
+        lease.unsettled_usd += cost_usd
+
+        if (lease.available_usd < lease.last_lease_usd * self.refill_threshold
+                and (lease.refill_task is None or lease.refill_task.done())):
+            lease.refill_task = self._spawn(self._refill(lease))
+
+        if (time.time() - lease.last_settle >= self.settle_interval
+                and (lease.settle_task is None or lease.settle_task.done())):
+            lease.settle_task = self._spawn(self._periodic_settle(lease))
+
+    def usage_view(self, user_id: str) -> Dict[str, Any]:
+        """本 worker 對用戶預算的視圖（已用 = 全域已提交與他人租約 + 本地已花費）"""
+        lease = self._leases.get(user_id)
+        if lease is None:
+            return {'daily_used_usd': 0.0, 'monthly_used_usd': 0.0, 'available_usd': 0.0}
+        unspent_local = max(lease.available_usd, 0.0)
+        return {
+            'daily_used_usd': max(lease.used_usd[0] - unspent_local, 0.0) + max(-lease.available_usd, 0.0),
+            'monthly_used_usd': max(lease.used_usd[1] - unspent_local, 0.0) + max(-lease.available_usd, 0.0),
+            'available_usd': unspent_local
+        }
+
+    async def flush(self, release: bool = False):
+        """結算所有本地租約；release=True 時同時歸還未用額度（worker 關閉時使用）"""
+        for lease in list(self._leases.values()):
+            async with lease.lock:
+                await self._settle(lease, release_all=release)
+        if release:
+            self._leases.clear()
+
+    async def close(self):
+        await self.flush(release=True)
+        await self.backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.worker_id,
+            'backend': type(self.backend).__name__,
+            # 進程內後端時每個 worker 各自計算，預算上限會隨 worker 數放大
+            'shared_across_workers': not isinstance(self.backend, InMemoryBudgetBackend),
+            'active_leases': len(self._leases),
+            'held_usd': round(sum(lease.held_usd for lease in self._leases.values()), 6),
+            'unsettled_usd': round(sum(lease.unsettled_usd for lease in self._leases.values()), 6),
+            **self.stats
+        }
+
+
+# ==================== 全局實例 ====================
+
+_budget_accountant: Optional[BudgetAccountant] = None
+
+
+def create_budget_backend(backend_type: Optional[str] = None) -> BudgetBackend:
+    """根據 BUDGET_BACKEND（redis / sqlite / memory）創建預算後端；未知類型拋出 ValueError"""
+    backend_type = (backend_type or os.getenv('BUDGET_BACKEND', 'memory')).lower()
+    if backend_type == 'redis':
+        return RedisBudgetBackend()
+    if backend_type == 'sqlite':
+        return SQLiteBudgetBackend(os.getenv('BUDGET_SQLITE_PATH', 'data/budget_ledger.sqlite3'))
+    if backend_type == 'memory':
+        return InMemoryBudgetBackend()
+    raise ValueError(f"未知的預算後端: {backend_type}")
+
+
+def get_budget_accountant() -> BudgetAccountant:
+    """
+    獲取進程共用的預算記帳器
+
+    明確設定的 BUDGET_BACKEND 初始化失敗時直接拋出（fail closed），
+    不退回進程內後端，以免多 worker 部署在不知情下各自計算預算。
+    """
+    global _budget_accountant
+    if _budget_accountant is None:
+        try:
+            backend = create_budget_backend()
+        except Exception as e:
+            logger.error(f"❌ 預算後端 {os.getenv('BUDGET_BACKEND')} 初始化失敗，拒絕改用進程內後端: {e}")
+            raise
+        if isinstance(backend, InMemoryBudgetBackend):
+            logger.warning("⚠️ 預算使用進程內後端，多 worker 部署時請設定 BUDGET_BACKEND=redis 或 sqlite")
+        _budget_accountant = BudgetAccountant(backend)
+        logger.info(f"✅ 預算記帳器已啟動: {type(backend).__name__}")
+    return _budget_accountant
+
+
+def set_budget_accountant(accountant: Optional[BudgetAccountant]):
+    """替換全局預算記帳器（測試或多後端部署時使用）"""
+    global _budget_accountant
+    _budget_accountant = accountant
+
+
+async def close_budget_accountant():
+    """結算並歸還本 worker 的所有租約（worker 關閉時調用，未創建時不做任何事）"""
+    global _budget_accountant
+    if _budget_accountant is not None:
+        try:
+            await _budget_accountant.close()
+        except Exception as e:
+            logger.error(f"❌ 預算租約結算失敗: {e}")
+        _budget_accountant = None
@@ -2,18 +2,26 @@
 """
 TradingAgents 統一緩存管理器
 支援 Redis 緩存，提供跨數據源緩存協調和統一監控
+
+兩級緩存：
+- L1: 進程內 ARCCache（抗掃描、條目數與位元組雙上限）
+- L2: Redis（可用時寫穿；L2 命中會提升到 L1）
+依各股票的讀取順序（如公司資料 → 價格歷史）學習數據類型間的轉移，
+對已註冊預取載入器的數據類型提前載入（預設關閉，以 prefetch.enabled 開啟）。
 """
 
 import asyncio
+import contextvars
+import fnmatch
 import json
 import logging
 import time
-from typing import Dict, Any, Optional, List, Union, Tuple
+from typing import Dict, Any, Optional, List, Union, Tuple, Callable, Awaitable
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 import hashlib
-from collections import defaultdict, deque
+from collections import defaultdict
 
 try:
     import redis.asyncio as redis
@@ -23,6 +31,8 @@ except ImportError:
     redis = None
 
 from ..default_config import DEFAULT_CONFIG
+from ..cache.cache_engine import ARCCache, CacheEntry, IntelligentPrefetcher
+from .tracing import traced
 
 # 設置日誌
 logger = logging.getLogger(__name__)
@@ -68,43 +78,6 @@ class CacheKey:
             params_hash=params_hash
         )
 
-@dataclass
-class CacheEntry:
-    """緩存條目"""
-    key: str
-    data: Any
-    created_at: datetime
-    expires_at: datetime
-    access_count: int = 0
-    last_accessed: Optional[datetime] = None
-    size_bytes: int = 0
-    
-    def is_expired(self) -> bool:
-        """檢查是否過期"""
-        return datetime.now() > self.expires_at
-    
-    def is_valid(self) -> bool:
-        """檢查是否有效"""
-        return not self.is_expired() and self.data is not None
-    
-    def access(self):
-        """記錄訪問"""
-        self.access_count += 1
-        self.last_accessed = datetime.now()
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """轉換為字典格式"""
-        return {
-            'key': self.key,
-            'created_at': self.created_at.isoformat(),
-            'expires_at': self.expires_at.isoformat(),
-            'access_count': self.access_count,
-            'last_accessed': self.last_accessed.isoformat() if self.last_accessed else None,
-            'size_bytes': self.size_bytes,
-            'is_expired': self.is_expired(),
-            'is_valid': self.is_valid()
-        }
-
 @dataclass
 class CacheStats:
     """緩存統計"""
@@ -114,6 +87,8 @@ class CacheStats:
     cache_errors: int = 0
     total_size_bytes: int = 0
     entry_count: int = 0
+    l2_hits: int = 0
+    evictions: int = 0
     
     @property
     def hit_rate(self) -> float:
@@ -147,9 +122,17 @@ class CacheStats:
             'miss_rate': round(self.miss_rate, 2),
             'error_rate': round(self.error_rate, 2),
             'total_size_bytes': self.total_size_bytes,
-            'entry_count': self.entry_count
+            'entry_count': self.entry_count,
+            'l2_hits': self.l2_hits,
+            'evictions': self.evictions
         }
 
+# 預取載入器：接收股票代號，經正常數據路徑載入（並寫入緩存）
+PrefetchLoader = Callable[[str], Awaitable[Any]]
+
+# 預取任務內的讀寫不記錄存取順序，也不再觸發下一輪預取
+_prefetching: contextvars.ContextVar[bool] = contextvars.ContextVar('cache_prefetching', default=False)
+
 class CacheManager:
     """統一緩存管理器"""
     
@@ -201,9 +184,25 @@ class CacheManager:
             CacheSource.ORCHESTRATOR: CacheStats()
         }
         
-        # 本地緩存（作為 Redis 的備用）
-        self.local_cache = {}
-        self.local_cache_access_times = deque(maxlen=1000)
+        # L1 本地緩存：ARC 淘汰，Redis 可用時作為其前端，不可用時獨立運作
+        # 其他工作進程的 delete / invalidate_pattern 不會通知本進程，L1 副本只保留數秒以限制陳舊時間
+        self.l1_max_ttl = self.cache_config.get('l1_max_ttl', 5)
+        self.local_cache = ARCCache(
+            max_size=self.cache_config.get('l1_max_entries', 4096),
+            max_bytes=self.cache_config.get('l1_max_bytes', 64 * 1024 * 1024),
+            on_evict=self._on_local_evict
+        )
+        
+        # 存取順序驅動的預取（載入器會以無用戶上下文向上游取數，預設關閉）
+        prefetch_config = self.cache_config.get('prefetch', {})
+        self.prefetch_enabled = prefetch_config.get('enabled', False)
+        self.prefetch_min_probability = prefetch_config.get('min_probability', 0.5)
+        self.prefetch_min_observations = prefetch_config.get('min_observations', 3)
+        self.prefetch_max_inflight = prefetch_config.get('max_inflight', 8)
+        self.prefetcher = IntelligentPrefetcher()
+        self._prefetch_loaders: Dict[str, PrefetchLoader] = {}
+        self._prefetch_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.prefetch_stats = {'issued': 0, 'completed': 0, 'failed': 0, 'hits': 0, 'skipped': 0}
         
         # 緩存協調
         self.invalidation_patterns = defaultdict(list)
@@ -256,6 +255,11 @@ class CacheManager:
             logger.error(f"Redis 連接失敗: {e}")
             self.redis_available = False
     
+    @traced(
+        'cache.get',
+        attributes=lambda self, cache_key: {'cache.source': cache_key.source.value, 'data.type': cache_key.data_type},
+        result_attributes=lambda result: {'cache.status': result[1].value}
+    )
     async def get(self, cache_key: CacheKey) -> Tuple[Any, CacheStatus]:
         """
         獲取緩存數據
@@ -272,36 +276,42 @@ class CacheManager:
         key_str = cache_key.to_string()
         source_stats = self.stats[cache_key.source]
         source_stats.total_requests += 1
+        self._observe_access(cache_key)
         
         try:
-            # 嘗試從 Redis 獲取
+            # L1：本地 ARC 緩存
+            was_resident = key_str in self.local_cache
+            entry = self.local_cache.get_entry(key_str)
+            if entry is not None:
+                if entry.metadata.pop('prefetched', False) and not _prefetching.get():
+                    self.prefetch_stats['hits'] += 1
+                source_stats.cache_hits += 1
+                return entry.value, CacheStatus.HIT
+            
+            # L2：Redis，命中時以剩餘 TTL 提升到 L1
             if self.redis_available:
-                data = await self._get_from_redis(key_str)
+                data, ttl = await self._get_from_redis(key_str)
                 if data is not None:
+                    self._put_local(cache_key, key_str, data, ttl)
                     source_stats.cache_hits += 1
+                    source_stats.l2_hits += 1
                     return data, CacheStatus.HIT
             
-            # 嘗試從本地緩存獲取
-            if key_str in self.local_cache:
-                entry = self.local_cache[key_str]
-                if entry.is_valid():
-                    entry.access()
-                    source_stats.cache_hits += 1
-                    return entry.data, CacheStatus.HIT
-                else:
-                    # 清理過期條目
-                    del self.local_cache[key_str]
-                    source_stats.cache_misses += 1
-                    return None, CacheStatus.EXPIRED
-            
             source_stats.cache_misses += 1
-            return None, CacheStatus.MISS
+            return None, CacheStatus.EXPIRED if was_resident else CacheStatus.MISS
             
         except Exception as e:
             logger.error(f"緩存獲取錯誤: {e}")
             source_stats.cache_errors += 1
             return None, CacheStatus.ERROR
     
+    @traced(
+        'cache.set',
+        attributes=lambda self, cache_key, data, ttl=None: {
+            'cache.source': cache_key.source.value, 'data.type': cache_key.data_type
+        },
+        result_attributes=lambda success: {'cache.stored': success}
+    )
     async def set(self, cache_key: CacheKey, data: Any, ttl: Optional[int] = None) -> bool:
         """
         設置緩存數據
@@ -327,29 +337,11 @@ class CacheManager:
             serialized_data = self._serialize_data(data)
             data_size = len(serialized_data.encode('utf-8'))
             
-            # 設置到 Redis
+            # 寫穿：先寫 L2（Redis），再寫 L1
             if self.redis_available:
-                success = await self._set_to_redis(key_str, serialized_data, ttl)
-                if success:
-                    self._update_cache_stats(cache_key.source, data_size, 1)
-                    return True
-            
-            # 設置到本地緩存
-            expires_at = datetime.now() + timedelta(seconds=ttl)
-            entry = CacheEntry(
-                key=key_str,
-                data=data,
-                created_at=datetime.now(),
-                expires_at=expires_at,
-                size_bytes=data_size
-            )
-            
-            self.local_cache[key_str] = entry
-            self._update_cache_stats(cache_key.source, data_size, 1)
-            
-            # 清理過期的本地緩存
-            await self._cleanup_local_cache()
+                await self._set_to_redis(key_str, serialized_data, ttl)
             
+            self._put_local(cache_key, key_str, data, ttl, data_size)
             return True
             
         except Exception as e:
@@ -381,10 +373,9 @@ class CacheManager:
                     deleted = True
             
             # 從本地緩存刪除
-            if key_str in self.local_cache:
-                entry = self.local_cache[key_str]
-                self._update_cache_stats(cache_key.source, -entry.size_bytes, -1)
-                del self.local_cache[key_str]
+            entry = self.local_cache.pop(key_str)
+            if entry is not None:
+                self._update_cache_stats(cache_key.source, -entry.size, -1)
                 deleted = True
             
             return deleted
@@ -416,30 +407,22 @@ class CacheManager:
             else:
                 full_pattern = f"tradingagents:*:{pattern}"
             
-            # 從 Redis 批量刪除
+            # 從 Redis 批量刪除（SCAN 不會阻塞 Redis）
             if self.redis_available:
-                keys = await self.redis_client.keys(full_pattern)
+                keys = [key async for key in self.redis_client.scan_iter(match=full_pattern, count=500)]
                 if keys:
                     deleted_count += await self.redis_client.delete(*keys)
             
-            # 從本地緩存批量刪除
-            import re
-            regex_pattern = pattern.replace('*', '.*')
-            keys_to_delete = []
-            
+            # 從本地緩存批量刪除（與 Redis 相同的 glob 語意）
             for key in self.local_cache.keys():
-                if re.match(regex_pattern, key):
-                    keys_to_delete.append(key)
-            
-            for key in keys_to_delete:
-                entry = self.local_cache[key]
-                # 更新統計（需要從鍵中解析數據源）
-                for src in CacheSource:
-                    if src.value in key:
-                        self._update_cache_stats(src, -entry.size_bytes, -1)
-                        break
-                del self.local_cache[key]
-                deleted_count += 1
+                if not fnmatch.fnmatchcase(key, full_pattern):
+                    continue
+                entry = self.local_cache.pop(key)
+                if entry is not None:
+                    source_of_key = self._source_of_key(key)
+                    if source_of_key:
+                        self._update_cache_stats(source_of_key, -entry.size, -1)
+                    deleted_count += 1
             
             logger.info(f"批量失效緩存: {pattern}, 刪除 {deleted_count} 個條目")
             return deleted_count
@@ -458,8 +441,7 @@ class CacheManager:
         Returns:
             清空的緩存條目數量
         """
-        pattern = f"*:{source.value}:*"
-        return await self.invalidate_pattern(pattern)
+        return await self.invalidate_pattern("*", source)
     
     async def setup_cross_source_dependencies(self, symbol: str, dependencies: Dict[CacheSource, List[str]]):
         """
@@ -506,7 +488,7 @@ class CacheManager:
             return {
                 'source': source.value,
                 'stats': self.stats[source].to_dict(),
-                'local_cache_entries': len([k for k in self.local_cache.keys() if source.value in k]),
+                'local_cache_entries': len([k for k in self.local_cache.keys() if self._source_of_key(k) == source]),
                 'redis_available': self.redis_available
             }
         
@@ -522,11 +504,19 @@ class CacheManager:
             total_stats.cache_errors += stats.cache_errors
             total_stats.total_size_bytes += stats.total_size_bytes
             total_stats.entry_count += stats.entry_count
+            total_stats.l2_hits += stats.l2_hits
+            total_stats.evictions += stats.evictions
         
         return {
             'sources': all_stats,
             'total': total_stats.to_dict(),
             'local_cache_entries': len(self.local_cache),
+            'local_cache': self.local_cache.get_stats(),
+            'prefetch': {
+                **self.prefetch_stats,
+                'inflight': len(self._prefetch_tasks),
+                'loaders': sorted(self._prefetch_loaders)
+            },
             'redis_available': self.redis_available,
             'cache_enabled': self.enabled
         }
@@ -567,16 +557,19 @@ class CacheManager:
     
     # ==================== 私有方法 ====================
     
-    async def _get_from_redis(self, key: str) -> Any:
-        """從 Redis 獲取數據"""
+    async def _get_from_redis(self, key: str) -> Tuple[Any, Optional[int]]:
+        """從 Redis 獲取數據與剩餘 TTL（單次往返）"""
         try:
-            data = await self.redis_client.get(key)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.ttl(key)
+                data, ttl = await pipe.execute()
             if data:
-                return self._deserialize_data(data)
-            return None
+                return self._deserialize_data(data), (ttl if ttl and ttl > 0 else None)
+            return None, None
         except Exception as e:
             logger.error(f"Redis 獲取錯誤: {e}")
-            return None
+            return None, None
     
     async def _set_to_redis(self, key: str, data: str, ttl: int) -> bool:
         """設置數據到 Redis"""
@@ -606,26 +599,132 @@ class CacheManager:
         stats.total_size_bytes += size_delta
         stats.entry_count += count_delta
     
-    async def _cleanup_local_cache(self):
-        """清理過期的本地緩存"""
-        current_time = datetime.now()
-        keys_to_delete = []
-        
-        for key, entry in self.local_cache.items():
-            if entry.is_expired():
-                keys_to_delete.append(key)
-        
-        for key in keys_to_delete:
-            entry = self.local_cache[key]
-            # 更新統計
-            for src in CacheSource:
-                if src.value in key:
-                    self._update_cache_stats(src, -entry.size_bytes, -1)
-                    break
-            del self.local_cache[key]
-        
-        if keys_to_delete:
-            logger.debug(f"清理過期本地緩存: {len(keys_to_delete)} 個條目")
+    def _put_local(
+        self,
+        cache_key: CacheKey,
+        key_str: str,
+        data: Any,
+        ttl: Optional[int],
+        size_bytes: Optional[int] = None
+    ):
+        """寫入 L1；Redis 可用時 L1 副本的 TTL 不超過 l1_max_ttl，限制跨進程的陳舊時間"""
+        if ttl is None:
+            ttl = self._get_default_ttl(cache_key)
+        if self.redis_available:
+            ttl = min(ttl, self.l1_max_ttl)
+        if size_bytes is None:
+            size_bytes = len(self._serialize_data(data).encode('utf-8'))
+        
+        now = time.time()
+        entry = CacheEntry(
+            key=key_str,
+            value=data,
+            size=size_bytes,
+            created_at=now,
+            last_accessed=now,
+            access_count=0,
+            hit_count=0,
+            ttl=ttl,
+            metadata={'prefetched': True} if _prefetching.get() else {}
+        )
+        replaced = self.local_cache.put(key_str, entry)
+        if replaced is not None:
+            self._update_cache_stats(cache_key.source, size_bytes - replaced.size, 0)
+        else:
+            self._update_cache_stats(cache_key.source, size_bytes, 1)
+    
+    def _on_local_evict(self, key: str, entry: CacheEntry, reason: str):
+        """L1 淘汰或過期時同步統計"""
+        source = self._source_of_key(key)
+        if source is None:
+            return
+        self._update_cache_stats(source, -entry.size, -1)
+        if reason == "evicted":
+            self.stats[source].evictions += 1
+    
+    @staticmethod
+    def _source_of_key(key: str) -> Optional[CacheSource]:
+        """從緩存鍵字符串解析數據源（tradingagents:版本:數據源:...）"""
+        parts = key.split(':', 3)
+        if len(parts) < 3:
+            return None
+        try:
+            return CacheSource(parts[2])
+        except ValueError:
+            return None
+    
+    # ==================== 預取 ====================
+    
+    def register_prefetch_loader(self, data_type: str, loader: PrefetchLoader):
+        """
+        註冊數據類型的預取載入器
+        
+        Args:
+            data_type: 數據類型（與 CacheKey.data_type 相同）
+            loader: 接收股票代號的協程函數，經正常數據路徑載入並寫入緩存
+        """
+        self._prefetch_loaders[data_type] = loader
+    
+    def _observe_access(self, cache_key: CacheKey):
+        """記錄同一股票的讀取順序，並對預測的下一個數據類型發起預取"""
+        if not self.prefetch_enabled or _prefetching.get():
+            return
+        
+        self.prefetcher.record_transition(cache_key.symbol, cache_key.data_type)
+        if not self._prefetch_loaders:
+            return
+        
+        predictions = self.prefetcher.predict_transitions(
+            cache_key.data_type,
+            min_probability=self.prefetch_min_probability,
+            min_observations=self.prefetch_min_observations
+        )
+        for data_type, _ in predictions:
+            loader = self._prefetch_loaders.get(data_type)
+            task_key = (cache_key.symbol, data_type)
+            if loader is None or task_key in self._prefetch_tasks:
+                continue
+            if len(self._prefetch_tasks) >= self.prefetch_max_inflight:
+                self.prefetch_stats['skipped'] += 1
+                continue
+            
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            
+            self.prefetch_stats['issued'] += 1
+            task = loop.create_task(self._run_prefetch(loader, cache_key.symbol))
+            self._prefetch_tasks[task_key] = task
+            task.add_done_callback(lambda _task, key=task_key: self._prefetch_tasks.pop(key, None))
+    
+    async def _run_prefetch(self, loader: PrefetchLoader, symbol: str):
+        """在預取上下文中執行載入器"""
+        token = _prefetching.set(True)
+        try:
+            await loader(symbol)
+            self.prefetch_stats['completed'] += 1
+        except Exception as e:
+            self.prefetch_stats['failed'] += 1
+            logger.debug(f"預取失敗 {symbol}: {e}")
+        finally:
+            _prefetching.reset(token)
+    
+    async def close(self):
+        """取消進行中的預取並關閉 Redis 連接"""
+        for task in list(self._prefetch_tasks.values()):
+            task.cancel()
+        if self._prefetch_tasks:
+            await asyncio.gather(*self._prefetch_tasks.values(), return_exceptions=True)
+        self._prefetch_tasks.clear()
+        
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.close()
+            except Exception as e:
+                logger.debug(f"Redis 關閉錯誤: {e}")
+            self.redis_client = None
+            self.redis_available = False
 
 # ==================== 工具函數 ====================
 
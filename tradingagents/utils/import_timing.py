@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Import Timing - 啟動導入時間預算
+天工 (TianGong) - 讓應用程式啟動期的導入成本可見
+
+此模組提供：
+1. ImportTimeRecorder - 記錄每個模組（或啟動階段）的導入耗時與觸發來源
+2. timed_import - 以 importlib 延遲導入模組/屬性，首次導入時自動計時
+3. get_import_time_report - 啟動導入時間報表（總耗時、預算、最慢的模組）
+
+環境變數：
+    STARTUP_IMPORT_BUDGET_SECONDS=3.0   tradingagents.app 模組導入的時間預算（秒）
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 預設啟動導入預算（秒）
+DEFAULT_IMPORT_BUDGET_SECONDS = 3.0
+
+PHASE_STARTUP = 'startup'    # 模組導入期（阻塞應用程式就緒）
+PHASE_WARMUP = 'warmup'      # 生命週期暖機（背景或啟動前）
+PHASE_REQUEST = 'request'    # 首次請求觸發
+
+# 代表整個應用程式模組導入耗時的記錄名稱（其餘 startup 記錄為其中的組成部分）
+APP_MODULE = 'tradingagents.app'
+
+
+@dataclass
+class ImportTiming:
+    """單次導入耗時記錄"""
+    name: str
+    seconds: float
+    phase: str
+    recorded_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ImportTimeRecorder:
+    """導入耗時記錄器（執行緒安全，延遲導入可能在工作執行緒中發生）"""
+
+    def __init__(self, budget_seconds: float = DEFAULT_IMPORT_BUDGET_SECONDS):
+        self.budget_seconds = budget_seconds
+        self._timings: List[ImportTiming] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, phase: str = PHASE_STARTUP) -> ImportTiming:
+        timing = ImportTiming(name=name, seconds=round(seconds, 4), phase=phase)
+        with self._lock:
+            self._timings.append(timing)
+        return timing
+
+    @contextmanager
+    def measure(self, name: str, phase: str = PHASE_STARTUP):
+        """量測區塊耗時並記錄"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, phase)
+
+    def timings(self, phase: Optional[str] = None) -> List[ImportTiming]:
+        with self._lock:
+            timings = list(self._timings)
+        if phase:
+            timings = [timing for timing in timings if timing.phase == phase]
+        return timings
+
+    def startup_seconds(self) -> float:
+        """模組導入期總耗時（以 APP_MODULE 記錄為準，沒有時加總 startup 階段）"""
+        startup = self.timings(PHASE_STARTUP)
+        for timing in startup:
+            if timing.name == APP_MODULE:
+                return timing.seconds
+        return round(sum(timing.seconds for timing in startup), 4)
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        timings = self.timings()
+        startup_seconds = self.startup_seconds()
+        deferred = [timing for timing in timings if timing.phase != PHASE_STARTUP]
+        components = [timing for timing in timings if timing.name != APP_MODULE]
+        slowest = sorted(components, key=lambda timing: timing.seconds, reverse=True)[:top]
+        return {
+            'budget_seconds': self.budget_seconds,
+            'startup_seconds': startup_seconds,
+            'over_budget': startup_seconds > self.budget_seconds,
+            'deferred_seconds': round(sum(timing.seconds for timing in deferred), 4),
+            'deferred_count': len(deferred),
+            'slowest': [timing.to_dict() for timing in slowest],
+            'timings': [timing.to_dict() for timing in timings]
+        }
+
+    def log_summary(self, top: int = 5):
+        """啟動時輸出摘要；超出預算時以警告列出最慢的導入"""
+        report = self.report(top=top)
+        if report['over_budget']:
+            slowest = ', '.join(
+                f"{item['name']}={item['seconds']:.2f}s" for item in report['slowest']
+            ) or '無個別記錄'
+            logger.warning(
+                f"⚠️ 啟動導入 {report['startup_seconds']:.2f}s 超出預算 {report['budget_seconds']:.2f}s"
+                f"（最慢: {slowest}）"
+            )
+        else:
+            logger.info(
+                f"⏱️ 啟動導入 {report['startup_seconds']:.2f}s（預算 {report['budget_seconds']:.2f}s）"
+            )
+
+
+def timed_import(module_path: str, attr: Optional[str] = None, phase: str = PHASE_REQUEST,
+                 package: Optional[str] = None) -> Any:
+    """導入模組（或模組屬性）；模組首次載入時記錄耗時"""
+    if module_path.startswith('.'):
+        module_path = importlib.util.resolve_name(module_path, package)
+    already_loaded = module_path in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(module_path)
+    if not already_loaded:
+        get_import_time_recorder().record(module_path, time.perf_counter() - started, phase)
+    return getattr(module, attr) if attr else module
+
+
+# ==================== 全域記錄器 ====================
+
+_recorder: Optional[ImportTimeRecorder] = None
+
+
+def get_import_time_recorder() -> ImportTimeRecorder:
+    """獲取全域導入耗時記錄器"""
+    global _recorder
+    if _recorder is None:
+        budget = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', DEFAULT_IMPORT_BUDGET_SECONDS))
+        _recorder = ImportTimeRecorder(budget_seconds=budget)
+    return _recorder
+
+
+def get_import_time_report(top: int = 10) -> Dict[str, Any]:
+    """獲取啟動導入時間報表"""
+    return get_import_time_recorder().report(top=top)
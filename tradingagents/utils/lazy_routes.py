@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Lazy Routes - 延遲路由註冊
+天工 (TianGong) - 啟動時只登記路徑前綴，路由模組於首次命中或暖機時才導入
+
+此模組提供：
+1. LazyRouterRegistry - 啟動時登記「模組路徑 + 掛載前綴 + 比對前綴」，並在路由表中
+   放置佔位項保留原本的註冊順序；載入後以實際路由原位替換
+2. LazyRouteMiddleware - 純 ASGI 中間件，請求命中尚未載入的前綴時先導入對應模組
+   （在工作執行緒中導入，不阻塞事件迴圈）；請求 OpenAPI 文件時載入全部路由
+3. load_all - 供生命週期暖機使用，依登記順序載入所有尚未載入的路由模組
+4. 掛載時檢查模組的每個路由都在 match 前綴內：立即模式下直接拋出錯誤，延遲模式下記錄錯誤
+
+注意：尚未載入的路由無法透過 url_path_for 反查，需要反查時請先 await load_all()。
+
+環境變數：
+    LAZY_ROUTES_ENABLED=false    關閉延遲註冊，登記時立即導入並掛載（與舊行為相同）
+"""
+
+import asyncio
+import importlib.util
+import inspect
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .import_timing import PHASE_REQUEST, PHASE_STARTUP, PHASE_WARMUP, timed_import
+
+logger = logging.getLogger(__name__)
+
+STATE_PENDING = 'pending'
+STATE_LOADED = 'loaded'
+STATE_FAILED = 'failed'
+
+
+class _LazyRouteSlot(BaseRoute):
+    """路由表佔位項：永不匹配，只用來記住延遲路由在路由表中的位置"""
+
+    def __init__(self, module_path: str):
+        self.module_path = module_path
+
+    def matches(self, scope: Scope):
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send):  # pragma: no cover - 不會被匹配
+        raise RuntimeError(f"延遲路由尚未載入: {self.module_path}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(module_path={self.module_path!r})"
+
+
+@dataclass
+class LazyRouterSpec:
+    """延遲路由登記資訊"""
+    module_path: str
+    attr: str = 'router'
+    prefix: str = ''
+    match_prefixes: List[str] = field(default_factory=list)
+    include_kwargs: Dict[str, Any] = field(default_factory=dict)
+    state: str = STATE_PENDING
+    trigger: Optional[str] = None
+    load_seconds: float = 0.0
+    error: Optional[str] = None
+    uncovered_paths: List[str] = field(default_factory=list)
+    slot: Optional[_LazyRouteSlot] = field(default=None, repr=False)
+    lock: Optional[asyncio.Lock] = field(default=None, repr=False)
+
+    def matches_path(self, path: str) -> bool:
+        for match_prefix in self.match_prefixes:
+            if path == match_prefix or path.startswith(match_prefix.rstrip('/') + '/'):
+                return True
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'module': self.module_path,
+            'prefix': self.prefix,
+            'match_prefixes': list(self.match_prefixes),
+            'state': self.state,
+            'trigger': self.trigger,
+            'load_seconds': round(self.load_seconds, 4),
+            'error': self.error,
+            'uncovered_paths': list(self.uncovered_paths)
+        }
+
+
+def _route_paths(routes: Sequence[BaseRoute]) -> List[str]:
+    """列出路由表項的完整路徑（新版 FastAPI 將 include_router 掛載為單一項目，需展開）"""
+    paths = []
+    for route in routes:
+        if hasattr(route, 'effective_candidates'):
+            paths.extend(_route_paths(route.effective_candidates()))
+            continue
+        # 展開後的 WebSocket 路由 path 為空，完整路徑在對應的 starlette 路由上
+        path = getattr(route, 'path', None) or getattr(getattr(route, 'starlette_route', None), 'path', None)
+        if path:
+            paths.append(path)
+    return paths
+
+
+class LazyRouterRegistry:
+    """延遲路由註冊表"""
+
+    def __init__(self, app, package: Optional[str] = None, enabled: bool = True):
+        self.app = app
+        self.package = package
+        self.enabled = enabled
+        self.specs: List[LazyRouterSpec] = []
+
+    # ==================== 登記 ====================
+
+    def register(
+        self,
+        module_path: str,
+        prefix: str = '',
+        match: Optional[Sequence[str]] = None,
+        attr: str = 'router',
+        **include_kwargs
+    ) -> LazyRouterSpec:
+        """登記路由模組
+
+        Args:
+            module_path: 模組路徑（可用相對路徑，以 package 為基準）
+            prefix: include_router 的掛載前綴
+            match: 觸發載入的請求路徑前綴；路由器自帶前綴時必須提供（預設為 prefix）
+            attr: 模組中 APIRouter 的屬性名稱
+        """
+        match_prefixes = list(match) if match else ([prefix] if prefix else [])
+        if not match_prefixes:
+            raise ValueError(f"{module_path} 未指定掛載前綴，必須提供 match 比對前綴")
+
+        if module_path.startswith('.'):
+            module_path = importlib.util.resolve_name(module_path, self.package)
+        spec = LazyRouterSpec(
+            module_path=module_path,
+            attr=attr,
+            prefix=prefix,
+            match_prefixes=match_prefixes,
+            include_kwargs=include_kwargs
+        )
+        self.specs.append(spec)
+
+        if not self.enabled:
+            started = time.perf_counter()
+            router = timed_import(spec.module_path, spec.attr, phase=PHASE_STARTUP)
+            before = len(self.app.router.routes)
+            self.app.include_router(router, prefix=spec.prefix, **spec.include_kwargs)
+            self._mark_loaded(spec, 'eager', time.perf_counter() - started)
+            # 立即模式於啟動時載入全部路由，在此讓 match 清單與實際路由的偏差直接失敗
+            if self._check_matches(spec, self.app.router.routes[before:]):
+                raise ValueError(
+                    f"{spec.module_path} 的路由未被 match 前綴涵蓋: {', '.join(spec.uncovered_paths)}"
+                )
+            return spec
+
+        spec.slot = _LazyRouteSlot(spec.module_path)
+        self.app.router.routes.append(spec.slot)
+        return spec
+
+    # ==================== 載入 ====================
+
+    @property
+    def has_pending(self) -> bool:
+        return any(spec.state == STATE_PENDING for spec in self.specs)
+
+    def pending_for(self, path: str) -> List[LazyRouterSpec]:
+        return [spec for spec in self.specs if spec.state == STATE_PENDING and spec.matches_path(path)]
+
+    async def ensure_loaded(self, path: str):
+        """載入所有比對到此路徑且尚未載入的路由模組"""
+        for spec in self.pending_for(path):
+            await self.load(spec, trigger=PHASE_REQUEST)
+
+    async def load(self, spec: LazyRouterSpec, trigger: str = PHASE_REQUEST) -> bool:
+        """導入並掛載單一路由模組（同一模組的並發請求只導入一次）"""
+        if spec.state != STATE_PENDING:
+            return spec.state == STATE_LOADED
+        if spec.lock is None:
+            spec.lock = asyncio.Lock()
+
+        async with spec.lock:
+            if spec.state != STATE_PENDING:
+                return spec.state == STATE_LOADED
+
+            started = time.perf_counter()
+            try:
+                router = await asyncio.to_thread(timed_import, spec.module_path, spec.attr, trigger)
+                self._mount(spec, router)
+                await self._run_startup_handlers(router)
+            except Exception as e:
+                spec.state = STATE_FAILED
+                spec.trigger = trigger
+                spec.error = str(e)
+                self._remove_slot(spec)
+                logger.error(f"❌ 路由模組載入失敗 {spec.module_path}: {e}")
+                return False
+
+            self._mark_loaded(spec, trigger, time.perf_counter() - started)
+            logger.info(f"✅ 路由模組已載入 {spec.module_path} ({trigger}, {spec.load_seconds:.3f}s)")
+            return True
+
+    async def load_all(self, trigger: str = PHASE_WARMUP) -> int:
+        """依登記順序載入全部尚未載入的路由模組，返回成功載入數量"""
+        loaded = 0
+        for spec in list(self.specs):
+            if spec.state == STATE_PENDING and await self.load(spec, trigger=trigger):
+                loaded += 1
+        return loaded
+
+    def _mount(self, spec: LazyRouterSpec, router):
+        """以實際路由原位替換佔位項，保持與立即註冊相同的匹配順序"""
+        routes = self.app.router.routes
+        before = len(routes)
+        self.app.include_router(router, prefix=spec.prefix, **spec.include_kwargs)
+        added = routes[before:]
+        del routes[before:]
+        index = routes.index(spec.slot)
+        routes[index:index + 1] = added
+        spec.slot = None
+        if self._check_matches(spec, added):
+            logger.error(
+                f"❌ {spec.module_path} 的路由未被 match 前綴涵蓋，載入前會回傳 404: "
+                f"{', '.join(spec.uncovered_paths)}"
+            )
+        # 路由表已變更，OpenAPI 文件需重新生成
+        self.app.openapi_schema = None
+
+    @staticmethod
+    def _check_matches(spec: LazyRouterSpec, routes: Sequence[BaseRoute]) -> List[str]:
+        """記錄並返回不在 match 前綴內的路由路徑"""
+        spec.uncovered_paths = sorted({path for path in _route_paths(routes) if not spec.matches_path(path)})
+        return spec.uncovered_paths
+
+    def _remove_slot(self, spec: LazyRouterSpec):
+        if spec.slot is not None and spec.slot in self.app.router.routes:
+            self.app.router.routes.remove(spec.slot)
+        spec.slot = None
+
+    @staticmethod
+    async def _run_startup_handlers(router):
+        """應用程式已啟動，延遲載入的路由器自帶的 startup 處理器需手動執行"""
+        for handler in getattr(router, 'on_startup', None) or []:
+            result = handler()
+            if inspect.isawaitable(result):
+                await result
+
+    @staticmethod
+    def _mark_loaded(spec: LazyRouterSpec, trigger: str, seconds: float):
+        spec.state = STATE_LOADED
+        spec.trigger = trigger
+        spec.load_seconds = seconds
+
+    def status(self) -> Dict[str, Any]:
+        counts = {STATE_PENDING: 0, STATE_LOADED: 0, STATE_FAILED: 0}
+        for spec in self.specs:
+            counts[spec.state] += 1
+        return {
+            'enabled': self.enabled,
+            'counts': counts,
+            'routers': [spec.to_dict() for spec in self.specs]
+        }
+
+
+class LazyRouteMiddleware:
+    """延遲路由中間件（純 ASGI，不包裝回應）"""
+
+    def __init__(self, app: ASGIApp, registry: LazyRouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] in ('http', 'websocket') and self.registry.has_pending:
+            path = scope.get('path', '')
+            if path == self.registry.app.openapi_url:
+                # OpenAPI 文件需要完整路由表
+                await self.registry.load_all(trigger=PHASE_REQUEST)
+            else:
+                await self.registry.ensure_loaded(path)
+        await self.app(scope, receive, send)
+
+
+def create_lazy_router_registry(app, package: Optional[str] = None, enabled: Optional[bool] = None) -> LazyRouterRegistry:
+    """依參數或環境變數建立延遲路由註冊表，並安裝對應中間件"""
+    if enabled is None:
+        enabled = os.getenv('LAZY_ROUTES_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+    registry = LazyRouterRegistry(app, package=package, enabled=enabled)
+    if enabled:
+        app.add_middleware(LazyRouteMiddleware, registry=registry)
+    return registry
@@ -19,6 +19,7 @@ import anthropic
 from anthropic import AsyncAnthropic
 
 from ..default_config import DEFAULT_CONFIG
+from .tracing import traced
 
 # 設置日誌
 logger = logging.getLogger(__name__)
@@ -589,6 +590,18 @@ class LLMClient:
         
         return await self._execute_request(request)
     
+    @traced(
+        'llm.execute_request',
+        attributes=lambda self, request: {
+            'analyst.id': request.analyst_id, 'analysis.type': request.analysis_type.value,
+            'prompt.chars': len(request.prompt)
+        },
+        result_attributes=lambda response: {
+            'llm.provider': response.provider.value, 'llm.model': response.model,
+            'llm.total_tokens': response.usage.get('total_tokens', 0), 'success': response.success
+        },
+        kind='client'
+    )
     async def _execute_request(self, request: LLMRequest) -> LLMResponse:
         """執行 LLM 請求，支援智能路由和故障轉移"""
         start_time = time.time()
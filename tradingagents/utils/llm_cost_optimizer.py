@@ -22,6 +22,9 @@ from enum import Enum
 import aiohttp
 import hashlib
 
+from .usage_ledger import RollupBucket, UsageLedger, UsageRecord, get_usage_ledger
+from .budget_accountant import BudgetAccountant, get_budget_accountant
+
 class ModelTier(Enum):
     """模型等級"""
     BASIC = "basic"           # GPT-3.5、Gemini Flash - 便宜快速
@@ -69,6 +72,10 @@ class CostBudget:
     monthly_used_usd: float = 0.0
     last_reset_daily: str = ""
     last_reset_monthly: str = ""
+    # 本 worker 租約中可直接使用的額度（由預算記帳器填入）
+    available_usd: Optional[float] = None
+    # 本次要求的預留額度是否取得（reserve_usd 為 0 時恆為 True）
+    reservation_granted: bool = True
     
     def __post_init__(self):
         today = datetime.now().strftime('%Y-%m-%d')
@@ -78,32 +85,30 @@ class CostBudget:
         if not self.last_reset_monthly:
             self.last_reset_monthly = current_month
 
-@dataclass
-class UsageRecord:
-    """使用記錄"""
-    user_id: str
-    request_id: str
-    model_name: str
-    task_type: str
-    input_tokens: int
-    output_tokens: int
-    cost_usd: float
-    response_time_ms: int
-    success: bool
-    timestamp: str
-    quality_rating: Optional[float] = None
+# 會員等級預算
+MEMBERSHIP_BUDGETS = {
+    "FREE": {"daily": 0.10, "monthly": 2.00},    # $0.10/天, $2/月
+    "GOLD": {"daily": 1.00, "monthly": 25.00},   # $1/天, $25/月
+    "DIAMOND": {"daily": 10.00, "monthly": 250.00}  # $10/天, $250/月
+}
 
 class LLMCostOptimizer:
     """LLM成本優化器"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        usage_ledger: Optional[UsageLedger] = None,
+        budget_accountant: Optional[BudgetAccountant] = None
+    ):
         self.logger = logging.getLogger(__name__)
         
         # 模型配置
         self.model_configs = self._initialize_model_configs()
         
-        # 成本追蹤
-        self.usage_records: List[UsageRecord] = []
+        # 成本追蹤（使用記錄寫入按日分區的帳本，進程內共用）
+        self.usage_ledger = usage_ledger or get_usage_ledger()
+        # 預算以租約方式跨 worker 共享，user_budgets 只保存最近一次的預算視圖
+        self.budget_accountant = budget_accountant or get_budget_accountant()
         self.user_budgets: Dict[str, CostBudget] = {}
         
         # 快取設置
@@ -256,51 +261,58 @@ class LLMCostOptimizer:
         
         return configs
     
-    async def get_user_budget(self, user_id: str, membership_tier: str) -> CostBudget:
-        """獲取用戶預算"""
-        if user_id not in self.user_budgets:
-            # 根據會員等級設定預算
-            budget_mapping = {
-                "FREE": {"daily": 0.10, "monthly": 2.00},    # $0.10/天, $2/月
-                "GOLD": {"daily": 1.00, "monthly": 25.00},   # $1/天, $25/月
-                "DIAMOND": {"daily": 10.00, "monthly": 250.00}  # $10/天, $250/月
-            }
-            
-            budget_config = budget_mapping.get(membership_tier, budget_mapping["FREE"])
-            
-            self.user_budgets[user_id] = CostBudget(
-                user_id=user_id,
-                membership_tier=membership_tier,
-                daily_budget_usd=budget_config["daily"],
-                monthly_budget_usd=budget_config["monthly"]
-            )
-        
-        budget = self.user_budgets[user_id]
-        
-        # 檢查是否需要重置每日/每月使用量
-        today = datetime.now().strftime('%Y-%m-%d')
-        current_month = datetime.now().strftime('%Y-%m')
-        
-        if budget.last_reset_daily != today:
-            budget.daily_used_usd = 0.0
-            budget.last_reset_daily = today
-            
-        if budget.last_reset_monthly != current_month:
-            budget.monthly_used_usd = 0.0
-            budget.last_reset_monthly = current_month
+    async def get_user_budget(
+        self,
+        user_id: str,
+        membership_tier: str,
+        reserve_usd: float = 0.0
+    ) -> CostBudget:
+        """獲取用戶預算
+        
+        預算由預算記帳器以租約形式從共享後端取得，reserve_usd 為本次需要的額度；
+        本地租約足夠時不會產生網路往返。日/月重置由後端按日期分鍵自然完成。
+        """
+        budget_config = MEMBERSHIP_BUDGETS.get(membership_tier, MEMBERSHIP_BUDGETS["FREE"])
+        limits = (budget_config["daily"], budget_config["monthly"])
+        
+        granted = await self.budget_accountant.reserve(user_id, limits, reserve_usd)
+        if not granted:
+            self.logger.info(f"用戶 {user_id} 預算不足以預留 ${reserve_usd:.4f}")
+        usage = self.budget_accountant.usage_view(user_id)
+        
+        budget = CostBudget(
+            user_id=user_id,
+            membership_tier=membership_tier,
+            daily_budget_usd=budget_config["daily"],
+            monthly_budget_usd=budget_config["monthly"],
+            daily_used_usd=usage["daily_used_usd"],
+            monthly_used_usd=usage["monthly_used_usd"],
+            available_usd=usage["available_usd"],
+            reservation_granted=granted
+        )
+        self.user_budgets[user_id] = budget
         
         return budget
     
-    def check_budget_availability(self, budget: CostBudget, estimated_cost: float) -> Dict[str, Any]:
-        """檢查預算可用性"""
+    def check_budget_availability(
+        self,
+        budget: CostBudget,
+        estimated_cost: float,
+        check_lease: bool = True
+    ) -> Dict[str, Any]:
+        """檢查預算可用性（check_lease=False 時只看日/月剩餘，用於預留前篩選候選模型）"""
         daily_remaining = budget.daily_budget_usd - budget.daily_used_usd
         monthly_remaining = budget.monthly_budget_usd - budget.monthly_used_usd
         
         can_afford_daily = daily_remaining >= estimated_cost
         can_afford_monthly = monthly_remaining >= estimated_cost
+        # 全域預算由租約保證：只有本 worker 持有的額度足夠時才能支付
+        can_afford_lease = (
+            not check_lease or budget.available_usd is None or budget.available_usd >= estimated_cost
+        )
         
         return {
-            "can_afford": can_afford_daily and can_afford_monthly,
+            "can_afford": can_afford_daily and can_afford_monthly and can_afford_lease,
             "daily_remaining": daily_remaining,
             "monthly_remaining": monthly_remaining,
             "estimated_cost": estimated_cost,
@@ -323,12 +335,12 @@ class LLMCostOptimizer:
         user_id = user_context.get('user_id', 'anonymous')
         membership_tier = user_context.get('membership_tier', 'FREE')
         
-        # 獲取用戶預算
-        budget = await self.get_user_budget(user_id, membership_tier)
-        
         # 設定質量要求
         min_quality = quality_requirements or self._get_min_quality_for_task(task_complexity)
         
+        # 獲取用戶預算（此時不預留，選定模型後才為該模型的一次請求預留）
+        budget = await self.get_user_budget(user_id, membership_tier)
+        
         # 篩選符合條件的模型
         candidate_models = []
         
@@ -344,8 +356,8 @@ class LLMCostOptimizer:
             # 估算成本
             estimated_cost = self._calculate_estimated_cost(config, estimated_tokens)
             
-            # 檢查預算
-            budget_check = self.check_budget_availability(budget, estimated_cost)
+            # 檢查預算（租約額度在選定後預留時檢查）
+            budget_check = self.check_budget_availability(budget, estimated_cost, check_lease=False)
             if not budget_check["can_afford"]:
                 continue
             
@@ -359,24 +371,27 @@ class LLMCostOptimizer:
                 "budget_impact": estimated_cost / budget.daily_budget_usd
             })
         
-        if not candidate_models:
-            # 沒有符合條件的模型，返回最便宜的基礎模型
-            fallback_model = self._get_fallback_model(membership_tier)
-            return fallback_model, {
-                "selection_reason": "budget_constraints",
-                "message": "已選擇最經濟的可用模型",
-                "budget_warning": True
-            }
-        
-        # 根據策略選擇最佳模型
-        selected = self._apply_selection_strategy(candidate_models, task_complexity, user_context)
-        
-        return selected["config"], {
-            "selection_reason": "optimized",
-            "estimated_cost": selected["estimated_cost"],
-            "cost_efficiency": selected["cost_efficiency"],
-            "quality_score": selected["config"].quality_score,
-            "alternatives_count": len(candidate_models) - 1
+        alternatives_count = len(candidate_models) - 1
+        while candidate_models:
+            # 根據策略選擇最佳模型，只為其一次請求預留租約；預留失敗時改選次佳模型
+            selected = self._apply_selection_strategy(candidate_models, task_complexity, user_context)
+            budget = await self.get_user_budget(user_id, membership_tier, selected["estimated_cost"])
+            if budget.reservation_granted:
+                return selected["config"], {
+                    "selection_reason": "optimized",
+                    "estimated_cost": selected["estimated_cost"],
+                    "cost_efficiency": selected["cost_efficiency"],
+                    "quality_score": selected["config"].quality_score,
+                    "alternatives_count": alternatives_count
+                }
+            candidate_models.remove(selected)
+        
+        # 沒有符合條件的模型，返回最便宜的基礎模型
+        fallback_model = self._get_fallback_model(membership_tier)
+        return fallback_model, {
+            "selection_reason": "budget_constraints",
+            "message": "已選擇最經濟的可用模型",
+            "budget_warning": True
         }
     
     def _get_min_quality_for_task(self, complexity: TaskComplexity) -> float:
@@ -508,6 +523,11 @@ class LLMCostOptimizer:
         for key in expired_keys:
             del self.response_cache[key]
     
+    @property
+    def usage_records(self) -> List[UsageRecord]:
+        """最近的使用記錄（完整歷史在使用量帳本中）"""
+        return self.usage_ledger.recent_records()
+    
     def generate_request_hash(self, prompt: str, model_name: str, parameters: Dict[str, Any]) -> str:
         """生成請求hash用於快取"""
         hash_input = f"{prompt}:{model_name}:{json.dumps(parameters, sort_keys=True)}"
@@ -549,79 +569,59 @@ class LLMCostOptimizer:
             timestamp=datetime.now().isoformat()
         )
         
-        self.usage_records.append(record)
+        self.usage_ledger.append(record)
         
-        # 更新用戶預算使用量
-        if user_id in self.user_budgets and success:
-            budget = self.user_budgets[user_id]
-            budget.daily_used_usd += cost_usd
-            budget.monthly_used_usd += cost_usd
+        # 更新用戶預算使用量（只扣本地租約，結算在背景進行）
+        if success:
+            self.budget_accountant.charge(user_id, cost_usd)
         
         self.logger.info(f"記錄使用: {user_id} - {model_name} - ${cost_usd:.4f}")
         
         return record
     
     async def get_cost_analytics(self, user_id: str = None, days: int = 30) -> Dict[str, Any]:
-        """獲取成本分析"""
+        """獲取成本分析（讀取日彙總，窗口以日為單位，包含起始日整天）"""
         
-        # 篩選記錄
-        start_date = datetime.now() - timedelta(days=days)
-        filtered_records = [
-            record for record in self.usage_records
-            if datetime.fromisoformat(record.timestamp) >= start_date and
-               (user_id is None or record.user_id == user_id)
-        ]
+        end_day = datetime.now().date()
+        start_day = (datetime.now() - timedelta(days=days)).date()
+        daily_rollups = self.usage_ledger.daily_rollups(start_day, end_day, user_id)
         
-        if not filtered_records:
+        if not daily_rollups:
             return {
                 "total_cost": 0.0,
                 "total_requests": 0,
                 "average_cost_per_request": 0.0,
                 "model_breakdown": {},
-                "daily_costs": []
+                "daily_costs": [],
+                "budget_accountant": self.budget_accountant.get_stats()
             }
         
-        # 總成本統計
-        total_cost = sum(record.cost_usd for record in filtered_records)
-        total_requests = len(filtered_records)
-        avg_cost = total_cost / total_requests if total_requests > 0 else 0.0
-        
         # 按模型分組
+        model_totals: Dict[str, RollupBucket] = {}
+        daily_costs_list = []
+        for day in sorted(daily_rollups):
+            day_cost = 0.0
+            for model_name, bucket in daily_rollups[day].items():
+                model_totals.setdefault(model_name, RollupBucket()).merge(bucket)
+                day_cost += bucket.cost_usd
+            daily_costs_list.append({"date": day, "cost": day_cost})
+        
+        totals = RollupBucket()
         model_breakdown = {}
-        for record in filtered_records:
-            if record.model_name not in model_breakdown:
-                model_breakdown[record.model_name] = {
-                    "requests": 0,
-                    "cost": 0.0,
-                    "avg_response_time": 0.0,
-                    "success_rate": 0.0
-                }
-            
-            breakdown = model_breakdown[record.model_name]
-            breakdown["requests"] += 1
-            breakdown["cost"] += record.cost_usd
-            breakdown["avg_response_time"] += record.response_time_ms
-            breakdown["success_rate"] += 1 if record.success else 0
-        
-        # 計算平均值
-        for model_name, breakdown in model_breakdown.items():
-            requests = breakdown["requests"]
-            breakdown["avg_response_time"] /= requests
-            breakdown["success_rate"] = breakdown["success_rate"] / requests * 100
-            breakdown["avg_cost_per_request"] = breakdown["cost"] / requests
-        
-        # 每日成本趨勢
-        daily_costs = {}
-        for record in filtered_records:
-            date = record.timestamp[:10]  # YYYY-MM-DD
-            if date not in daily_costs:
-                daily_costs[date] = 0.0
-            daily_costs[date] += record.cost_usd
-        
-        daily_costs_list = [
-            {"date": date, "cost": cost}
-            for date, cost in sorted(daily_costs.items())
-        ]
+        for model_name, bucket in model_totals.items():
+            totals.merge(bucket)
+            model_breakdown[model_name] = {
+                "requests": bucket.requests,
+                "cost": bucket.cost_usd,
+                "avg_response_time": bucket.response_time_ms / bucket.requests,
+                "success_rate": bucket.successes / bucket.requests * 100,
+                "avg_cost_per_request": bucket.cost_usd / bucket.requests
+            }
+        
+        # 總成本統計
+        total_cost = totals.cost_usd
+        total_requests = totals.requests
+        avg_cost = total_cost / total_requests if total_requests > 0 else 0.0
         
         return {
             "analysis_period_days": days,
@@ -630,22 +630,29 @@ class LLMCostOptimizer:
             "average_cost_per_request": avg_cost,
             "model_breakdown": model_breakdown,
             "daily_costs": daily_costs_list,
-            "cost_efficiency_score": self._calculate_efficiency_score(filtered_records),
+            "cost_efficiency_score": self._calculate_bucket_efficiency_score(totals),
+            "budget_accountant": self.budget_accountant.get_stats(),
             "timestamp": datetime.now().isoformat()
         }
     
     def _calculate_efficiency_score(self, records: List[UsageRecord]) -> float:
         """計算成本效益評分"""
-        if not records:
+        bucket = RollupBucket()
+        for record in records:
+            bucket.add(record)
+        return self._calculate_bucket_efficiency_score(bucket)
+    
+    def _calculate_bucket_efficiency_score(self, bucket: RollupBucket) -> float:
+        """由彙總計算成本效益評分"""
+        if not bucket.requests:
             return 0.0
         
         # 基於成功率、成本和響應時間的綜合評分
-        total_requests = len(records)
-        successful_requests = sum(1 for r in records if r.success)
-        success_rate = successful_requests / total_requests
+        total_requests = bucket.requests
+        success_rate = bucket.successes / total_requests
         
-        avg_cost = sum(r.cost_usd for r in records) / total_requests
-        avg_response_time = sum(r.response_time_ms for r in records) / total_requests
+        avg_cost = bucket.cost_usd / total_requests
+        avg_response_time = bucket.response_time_ms / total_requests
         
         # 正規化評分 (0-100)
         efficiency_score = (
@@ -661,7 +668,7 @@ class LLMCostOptimizer:
         recommendations = []
         
         # 分析用戶使用模式
-        user_records = [r for r in self.usage_records if r.user_id == user_id]
+        user_records = self.usage_ledger.recent_records(user_id)
         
         if not user_records:
             return [{
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Model Downloader - 分析師模型下載
+天工 (TianGong) - 啟動時檢查並下載分析師模型檔案
+
+從 analysts_service 拆出：該模組（與 services 套件）導入成本高，
+應用程式啟動只需要檢查模型標記檔，不應為此載入整個分析師服務。
+"""
+
+import os
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+def _compute_md5(path: Path) -> str:
+    import hashlib
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(8192), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def download_models_from_spaces():
+    """
+    Downloads and caches model files from a DigitalOcean Spaces bucket.
+    This function is designed to run once when the application container starts.
+    It intelligently searches for models in a few common prefixes.
+    """
+    # boto3 只在需要下載時才導入
+    import boto3
+    from botocore.exceptions import NoCredentialsError
+
+    try:
+        # --- Configuration from Environment Variables ---
+        ACCESS_KEY = os.getenv("DO_SPACES_ACCESS_KEY")
+        SECRET_KEY = os.getenv("DO_SPACES_SECRET_KEY")
+        ENDPOINT_URL = os.getenv("DO_SPACES_ENDPOINT_URL", "https://sgp1.digitaloceanspaces.com")
+        BUCKET_NAME = os.getenv("DO_SPACES_BUCKET", "aitwstock")
+        REGION_NAME = os.getenv("DO_SPACES_REGION", "sgp1")
+        LOCAL_MODEL_DIR = Path(os.getenv("APP_MODEL_DIR", "/app/models"))
+        MARKER_FILE = LOCAL_MODEL_DIR / ".download_complete"
+
+        # --- Pre-flight Checks ---
+        if not all([ACCESS_KEY, SECRET_KEY]):
+            logger.error("Missing DO_SPACES_ACCESS_KEY or DO_SPACES_SECRET_KEY.")
+            raise RuntimeError("Model download configuration is incomplete.")
+
+        if MARKER_FILE.exists():
+            logger.info("Marker file found. Assuming models are downloaded. Skipping.")
+            return
+
+        logger.info(f"Marker file not found. Starting model download from bucket '{BUCKET_NAME}'.")
+        os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
+
+        # --- Connect to Spaces ---
+        session = boto3.session.Session()
+        client = session.client('s3',
+                                region_name=REGION_NAME,
+                                endpoint_url=ENDPOINT_URL,
+                                aws_access_key_id=ACCESS_KEY,
+                                aws_secret_access_key=SECRET_KEY)
+
+        # --- Intelligent Search for Models ---
+        search_prefixes = ["models/analysts/", "analysts/", ""] # Try most specific first, then root
+        files_to_download = []
+        base_prefix = ""
+
+        for prefix in search_prefixes:
+            logger.info(f"Attempting to find models with prefix: '{prefix if prefix else 'root'}'...")
+            paginator = client.get_paginator('list_objects_v2')
+            pages = paginator.paginate(Bucket=BUCKET_NAME, Prefix=prefix)
+            
+            # Check if this prefix yields any files (ignoring "directories")
+            found_files = [obj['Key'] for page in pages for obj in page.get('Contents', []) if not obj['Key'].endswith('/')]
+
+            if found_files:
+                logger.info(f"Success! Found {len(found_files)} model files with prefix '{prefix}'. This will be our base path.")
+                files_to_download = found_files
+                base_prefix = prefix
+                break
+        
+        if not files_to_download:
+            logger.error(f"CRITICAL: Searched prefixes {search_prefixes} but could not find any model files in bucket '{BUCKET_NAME}'.")
+            raise RuntimeError("Could not find model files in the remote storage after searching common paths.")
+
+        # --- Download Files with retry and basic integrity checks ---
+        import time
+        MAX_RETRIES = int(os.getenv("MODEL_DOWNLOAD_MAX_RETRIES", "3") or 3)
+        BACKOFF = float(os.getenv("MODEL_DOWNLOAD_BACKOFF_SECONDS", "2") or 2)
+
+        for file_key in files_to_download:
+            # Construct the full local path for the file
+            # The relative path should be calculated from the successful base_prefix
+            relative_path = os.path.relpath(file_key, base_prefix)
+            # We want the final structure to be consistent, e.g., /app/models/analysts/...
+            # So we build the destination path carefully.
+            local_file_path = LOCAL_MODEL_DIR / 'analysts' / relative_path
+            
+            local_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+            # Query object metadata for size and etag
+            head = client.head_object(Bucket=BUCKET_NAME, Key=file_key)
+            expected_size = head.get('ContentLength')
+            etag = (head.get('ETag') or '').strip('"')
+
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    logger.info(f"Downloading s3://{BUCKET_NAME}/{file_key} to {local_file_path} (attempt {attempt}/{MAX_RETRIES})...")
+                    client.download_file(BUCKET_NAME, file_key, str(local_file_path))
+
+                    # Basic integrity: size match
+                    actual_size = local_file_path.stat().st_size
+                    size_ok = (expected_size is None) or (actual_size == expected_size)
+
+                    # If ETag looks like a single-part MD5 (no '-') then verify
+                    md5_ok = True
+                    if etag and '-' not in etag:
+                        md5 = _compute_md5(local_file_path)
+                        md5_ok = (md5 == etag)
+
+                    if size_ok and md5_ok:
+                        logger.info(f"Verified {local_file_path.name}: size_ok={size_ok}, md5_ok={md5_ok}")
+                        break
+                    else:
+                        logger.warning(f"Verification failed for {local_file_path.name}: size_ok={size_ok}, md5_ok={md5_ok}. Retrying...")
+                        if local_file_path.exists():
+                            try:
+                                local_file_path.unlink()
+                            except Exception:
+                                pass
+                        if attempt >= MAX_RETRIES:
+                            raise RuntimeError(f"Failed to verify {file_key} after {MAX_RETRIES} attempts")
+                        time.sleep(BACKOFF * attempt)
+                except Exception as de:
+                    if attempt >= MAX_RETRIES:
+                        logger.error(f"Download failed for {file_key}: {de}")
+                        raise
+                    time.sleep(BACKOFF * attempt)
+
+        # --- Create marker file on success ---
+        MARKER_FILE.touch()
+        logger.info("All models downloaded successfully. Created marker file.")
+
+    except NoCredentialsError:
+        logger.critical("FATAL: Credentials for object storage not found.")
+        raise
+    except Exception as e:
+        logger.critical(f"FATAL: An unrecoverable error occurred during model download: {e}")
+        raise
+
+# --- Model Readiness Helpers (do not auto-download on import) ---
+def models_ready() -> bool:
+    """Return True if the model download marker file exists."""
+    LOCAL_MODEL_DIR = Path(os.getenv("APP_MODEL_DIR", "/app/models"))
+    MARKER_FILE = LOCAL_MODEL_DIR / ".download_complete"
+    return MARKER_FILE.exists()
@@ -4,6 +4,7 @@
 天工 (TianGong) - 用於測量和記錄函數執行性能的工具
 """
 
+import asyncio
 import time
 import functools
 from .logging_config import get_api_logger, get_system_logger
@@ -45,8 +46,6 @@ def log_performance(log_level=None):
 
 # 示例用法 (僅供參考，不會實際執行)
 if __name__ == "__main__":
-    import asyncio
-
     @log_performance(log_level="info")
     async def example_async_function():
         await asyncio.sleep(0.1)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Sampling Profiler - 生產環境低開銷採樣分析器
+天工 (TianGong) - 在不重啟 worker 的情況下找出慢的原因
+
+此模組提供：
+1. 執行緒採樣 - 背景執行緒以固定頻率讀取 sys._current_frames()，彙總各執行緒的 Python 堆疊
+2. asyncio 任務採樣 - 在事件循環內定期列舉 pending 任務，沿 await 鏈記錄每個協程停在哪裡、已等待多久
+3. 事件循環延遲 - 同一個循環內協程量測 sleep 的超時量（p50/p99/max）
+4. 輸出為 collapsed stack（flamegraph.pl / speedscope 皆可讀）或 speedscope JSON
+
+未執行分析時不建立任何執行緒、不安裝任何 hook，常駐部署的成本為零；
+分析期間的採樣耗時會一併回報（sampler_overhead_percent）。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_DURATION_SECONDS = 60.0
+MAX_STACK_DEPTH = 128
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有分析正在進行"""
+
+
+def _frame_label(code) -> str:
+    """堆疊幀標籤：函數名與檔案（以函數首行聚合，不區分行號）"""
+    parts = code.co_filename.replace('\\', '/').rsplit('/', 2)
+    filename = '/'.join(parts[-2:])
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def _walk_frame(frame) -> List[str]:
+    """由最外層到最內層的堆疊標籤"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _await_chain(coro) -> Tuple[List[str], str]:
+    """
+    沿 await 鏈展開暫停中的協程
+
+    Task.get_stack() 對暫停的協程只返回最外層一幀，這裡沿 cr_await / gi_yieldfrom
+    逐層展開，返回 (由外到內的堆疊標籤, 最內層正在等待的對象類型)
+    """
+    labels = []
+    awaiting = ''
+    current = coro
+    while current is not None and len(labels) < MAX_STACK_DEPTH:
+        frame = getattr(current, 'cr_frame', None) or getattr(current, 'gi_frame', None) \
+            or getattr(current, 'ag_frame', None)
+        if frame is None:
+            awaiting = type(current).__name__
+            break
+        labels.append(_frame_label(frame.f_code))
+        next_awaitable = getattr(current, 'cr_await', None)
+        if next_awaitable is None:
+            next_awaitable = getattr(current, 'gi_yieldfrom', None)
+        if next_awaitable is None:
+            next_awaitable = getattr(current, 'ag_await', None)
+        current = next_awaitable
+    return labels, awaiting
+
+
+@dataclass
+class TaskObservation:
+    """單一 asyncio 任務在分析期間的觀察結果"""
+    name: str
+    coroutine: str
+    first_seen: float
+    last_seen: float
+    samples: int = 0
+    awaiting: str = ''
+    stack: List[str] = field(default_factory=list)
+    done: bool = False
+
+
+class SamplingProfiler:
+    """
+    單次採樣分析
+
+    Args:
+        duration_seconds: 分析時長（上限 MAX_DURATION_SECONDS）
+        interval_ms: 執行緒堆疊採樣間隔
+        task_interval_ms: asyncio 任務採樣與事件循環延遲量測間隔
+        include_idle: 是否保留閒置執行緒（停在 wait/select 等阻塞呼叫）的樣本
+    """
+
+    IDLE_FUNCTIONS = frozenset({
+        'wait', 'select', 'poll', 'epoll', 'sleep', '_worker', 'accept', 'recv', 'get'
+    })
+
+    def __init__(self, duration_seconds: float = 10.0, interval_ms: float = 10.0,
+                 task_interval_ms: float = 100.0, include_idle: bool = False):
+        self.duration_seconds = min(max(duration_seconds, 0.1), MAX_DURATION_SECONDS)
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.task_interval = max(task_interval_ms, 10.0) / 1000
+        self.include_idle = include_idle
+
+        self.thread_stacks: Dict[str, Counter] = defaultdict(Counter)
+        self.task_stacks: Counter = Counter()
+        self.tasks: Dict[int, TaskObservation] = {}
+        self.loop_lag_ms: List[float] = []
+        self.thread_samples = 0
+        self.task_samples = 0
+        self.sampling_seconds = 0.0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    # ==================== 執行緒堆疊採樣 ====================
+
+    def _is_idle(self, labels: List[str]) -> bool:
+        if not labels:
+            return True
+        leaf = labels[-1].split(' ', 1)[0].rsplit('.', 1)[-1]
+        return leaf in self.IDLE_FUNCTIONS
+
+    def _sample_threads(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = _walk_frame(frame)
+            if not self.include_idle and thread_id != self._loop_thread_id and self._is_idle(labels):
+                continue
+            thread_name = names.get(thread_id, f"thread-{thread_id}")
+            if thread_id == self._loop_thread_id:
+                thread_name = f"{thread_name} (event loop)"
+            self.thread_stacks[thread_name][tuple(labels)] += 1
+
+    def _thread_sampler(self):
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                self._sample_threads()
+                self.thread_samples += 1
+            except Exception as e:
+                logger.error(f"❌ 執行緒採樣失敗: {e}")
+            self.sampling_seconds += time.perf_counter() - started
+            next_tick += self.interval
+            self._stop.wait(max(0.0, next_tick - time.perf_counter()))
+
+    # ==================== asyncio 任務採樣 ====================
+
+    def _sample_tasks(self, now: float):
+        current = asyncio.current_task()
+        seen = set()
+        for task in asyncio.all_tasks():
+            if task is current or task.done():
+                continue
+            key = id(task)
+            seen.add(key)
+            coro = task.get_coro()
+            labels, awaiting = _await_chain(coro)
+            observation = self.tasks.get(key)
+            if observation is None:
+                observation = TaskObservation(
+                    name=task.get_name(),
+                    coroutine=getattr(coro, '__qualname__', type(coro).__name__),
+                    first_seen=now,
+                    last_seen=now
+                )
+                self.tasks[key] = observation
+            observation.last_seen = now
+            observation.samples += 1
+            observation.awaiting = awaiting
+            observation.stack = labels
+            self.task_stacks[(f"task:{observation.coroutine}",) + tuple(labels)] += 1
+
+        for key, observation in self.tasks.items():
+            if key not in seen:
+                observation.done = True
+
+    async def _task_sampler(self, deadline: float):
+        """在事件循環內採樣任務並量測循環延遲"""
+        while True:
+            expected = time.perf_counter() + self.task_interval
+            await asyncio.sleep(self.task_interval)
+            now = time.perf_counter()
+            self.loop_lag_ms.append(max(0.0, (now - expected) * 1000))
+
+            started = time.perf_counter()
+            self._sample_tasks(now)
+            self.task_samples += 1
+            self.sampling_seconds += time.perf_counter() - started
+
+            if now >= deadline:
+                return
+
+    # ==================== 執行 ====================
+
+    async def run(self) -> 'SamplingProfiler':
+        """在目前事件循環上執行分析，直到 duration_seconds 結束"""
+        self._loop_thread_id = threading.get_ident()
+        self.started_at = time.perf_counter()
+        sampler = threading.Thread(target=self._thread_sampler, name='sampling-profiler', daemon=True)
+        sampler.start()
+        try:
+            await self._task_sampler(self.started_at + self.duration_seconds)
+        finally:
+            self._stop.set()
+            await asyncio.to_thread(sampler.join)
+            self.finished_at = time.perf_counter()
+        return self
+
+    # ==================== 輸出 ====================
+
+    def _all_stacks(self) -> List[Tuple[str, Tuple[str, ...], int]]:
+        stacks = [
+            (thread_name, stack, count)
+            for thread_name, counter in self.thread_stacks.items()
+            for stack, count in counter.items()
+        ]
+        stacks.extend(('asyncio tasks', stack, count) for stack, count in self.task_stacks.items())
+        return stacks
+
+    def to_collapsed(self) -> str:
+        """collapsed stack 格式：每行「根;...;葉 次數」"""
+        lines = []
+        for thread_name, stack, count in self._all_stacks():
+            frames = [thread_name, *stack]
+            lines.append(f"{';'.join(frame.replace(';', ':') for frame in frames)} {count}")
+        lines.sort()
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """speedscope 檔案格式：每個執行緒一個 sampled profile，asyncio 任務另成一個"""
+        frame_index: Dict[str, int] = {}
+        frames: List[Dict[str, Any]] = []
+
+        def index_of(label: str) -> int:
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                name, _, location = label.partition(' (')
+                file, _, line = location.rstrip(')').rpartition(':')
+                frames.append({'name': name, 'file': file, 'line': int(line) if line.isdigit() else None})
+            return frame_index[label]
+
+        grouped: Dict[str, List[Tuple[Tuple[str, ...], int]]] = defaultdict(list)
+        for thread_name, stack, count in self._all_stacks():
+            grouped[thread_name].append((stack, count))
+
+        profiles = []
+        for thread_name, entries in grouped.items():
+            is_tasks = thread_name == 'asyncio tasks'
+            unit_seconds = self.task_interval if is_tasks else self.interval
+            samples = [[index_of(label) for label in stack] for stack, _ in entries]
+            weights = [round(count * unit_seconds * 1000, 3) for _, count in entries]
+            profiles.append({
+                'type': 'sampled',
+                'name': thread_name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 3),
+                'samples': samples,
+                'weights': weights
+            })
+
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': f"tradingagents pid {os.getpid()}",
+            'exporter': 'tradingagents.utils.sampling_profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': profiles
+        }
+
+    def loop_lag_summary(self) -> Dict[str, Any]:
+        lags = sorted(self.loop_lag_ms)
+        if not lags:
+            return {'samples': 0}
+        return {
+            'samples': len(lags),
+            'interval_ms': round(self.task_interval * 1000, 3),
+            'p50_ms': round(lags[len(lags) // 2], 3),
+            'p99_ms': round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 3),
+            'max_ms': round(lags[-1], 3),
+            'over_100ms': sum(1 for lag in lags if lag > 100)
+        }
+
+    def pending_tasks(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """仍未完成的任務，依已觀察到的等待時間排序"""
+        now = self.finished_at or time.perf_counter()
+        pending = [observation for observation in self.tasks.values() if not observation.done]
+        pending.sort(key=lambda observation: observation.first_seen)
+        return [
+            {
+                'name': observation.name,
+                'coroutine': observation.coroutine,
+                # 分析開始前已存在的任務，等待時間至少為整個分析時長
+                'pending_at_least_seconds': round(now - observation.first_seen, 3),
+                'pending_before_profile': observation.first_seen - self.started_at <= self.task_interval * 1.5,
+                'awaiting': observation.awaiting,
+                'stack': observation.stack
+            }
+            for observation in pending[:limit]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            'duration_seconds': round(elapsed, 3),
+            'interval_ms': round(self.interval * 1000, 3),
+            'thread_samples': self.thread_samples,
+            'task_samples': self.task_samples,
+            'threads': sorted(self.thread_stacks.keys()),
+            'tasks_observed': len(self.tasks),
+            'tasks_completed': sum(1 for observation in self.tasks.values() if observation.done),
+            'sampler_overhead_percent': round(self.sampling_seconds / elapsed * 100, 3) if elapsed else 0.0,
+            'event_loop_lag': self.loop_lag_summary()
+        }
+
+
+# ==================== 全域入口 ====================
+
+_profile_lock = asyncio.Lock()
+
+
+async def run_sampling_profile(duration_seconds: float = 10.0, interval_ms: float = 10.0,
+                               task_interval_ms: float = 100.0,
+                               include_idle: bool = False) -> SamplingProfiler:
+    """
+    執行一次採樣分析（同一進程同時只允許一個）
+
+    Raises:
+        ProfilerBusyError: 已有分析正在進行
+    """
+    if _profile_lock.locked():
+        raise ProfilerBusyError("已有採樣分析正在進行")
+    async with _profile_lock:
+        logger.info(f"開始採樣分析: {duration_seconds}s, 間隔 {interval_ms}ms")
+        profiler = SamplingProfiler(duration_seconds, interval_ms, task_interval_ms, include_idle)
+        await profiler.run()
+        logger.info(f"✅ 採樣分析完成: {profiler.thread_samples} 次執行緒採樣, "
+                    f"{profiler.task_samples} 次任務採樣")
+        return profiler
+
+
+def is_profiler_enabled() -> bool:
+    """採樣分析端點是否開啟（ENABLE_SAMPLING_PROFILER）"""
+    return os.getenv('ENABLE_SAMPLING_PROFILER', 'false').lower() in ('1', 'true', 'yes')
@@ -15,13 +15,13 @@ import json
 import logging
 import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
-import statistics
 import secrets  # 安全修復：使用加密安全的隨機數生成器替換random
 
-from .llm_cost_optimizer import LLMCostOptimizer, ModelConfig, TaskComplexity, UsageRecord
+from .llm_cost_optimizer import LLMCostOptimizer, ModelConfig, TaskComplexity
+from .usage_ledger import RollupBucket
 
 class SelectionStrategy(Enum):
     """選擇策略"""
@@ -540,42 +540,40 @@ class SmartModelSelector:
         
         test_config = self.active_ab_tests[test_id]
         
-        # 統計各組結果
-        group_a_results = []
-        group_b_results = []
+        # 統計各組結果（讀取測試期間的日彙總）
+        group_a_bucket = RollupBucket()
+        group_b_bucket = RollupBucket()
+        start_day = datetime.strptime(test_config.start_date, '%Y-%m-%d').date()
+        end_day = datetime.strptime(test_config.end_date, '%Y-%m-%d').date()
         
         for assignment_key, group in self.ab_test_assignments.items():
             if assignment_key.endswith(f"_{test_id}"):
                 user_id = assignment_key.replace(f"_{test_id}", "")
                 
-                # 查找該用戶在測試期間的使用記錄
-                user_records = [
-                    r for r in self.cost_optimizer.usage_records
-                    if (r.user_id == user_id and
-                        test_config.start_date <= r.timestamp[:10] <= test_config.end_date)
-                ]
-                
-                for record in user_records:
-                    if group == "A" and record.model_name == test_config.model_a:
-                        group_a_results.append(record)
-                    elif group == "B" and record.model_name == test_config.model_b:
-                        group_b_results.append(record)
+                model_name = test_config.model_a if group == "A" else test_config.model_b
+                group_bucket = group_a_bucket if group == "A" else group_b_bucket
+                daily_rollups = self.cost_optimizer.usage_ledger.daily_rollups(
+                    start_day, end_day, user_id, model_name
+                )
+                for models in daily_rollups.values():
+                    for bucket in models.values():
+                        group_bucket.merge(bucket)
         
         # 計算統計結果
-        def calculate_group_stats(records: List[UsageRecord]) -> Dict[str, Any]:
-            if not records:
+        def calculate_group_stats(bucket: RollupBucket) -> Dict[str, Any]:
+            if not bucket.requests:
                 return {"sample_size": 0}
             
             return {
-                "sample_size": len(records),
-                "avg_cost": statistics.mean(r.cost_usd for r in records),
-                "avg_response_time": statistics.mean(r.response_time_ms for r in records),
-                "success_rate": sum(1 for r in records if r.success) / len(records),
-                "total_cost": sum(r.cost_usd for r in records)
+                "sample_size": bucket.requests,
+                "avg_cost": bucket.cost_usd / bucket.requests,
+                "avg_response_time": bucket.response_time_ms / bucket.requests,
+                "success_rate": bucket.successes / bucket.requests,
+                "total_cost": bucket.cost_usd
             }
         
-        group_a_stats = calculate_group_stats(group_a_results)
-        group_b_stats = calculate_group_stats(group_b_results)
+        group_a_stats = calculate_group_stats(group_a_bucket)
+        group_b_stats = calculate_group_stats(group_b_bucket)
         
         # 計算統計顯著性（簡化版本）
         statistical_significance = self._calculate_significance(group_a_stats, group_b_stats, test_config.target_metric)
@@ -658,25 +656,29 @@ class SmartModelSelector:
         model_usage = {}
         total_requests = 0
         
-        for record in self.cost_optimizer.usage_records:
-            if user_id and record.user_id != user_id:
-                continue
-            
-            model_name = record.model_name
-            if model_name not in model_usage:
-                model_usage[model_name] = {
-                    "requests": 0,
-                    "total_cost": 0.0,
-                    "avg_response_time": 0.0,
-                    "success_rate": 0.0
-                }
-            
-            stats = model_usage[model_name]
-            stats["requests"] += 1
-            stats["total_cost"] += record.cost_usd
-            stats["avg_response_time"] += record.response_time_ms
-            stats["success_rate"] += 1 if record.success else 0
-            total_requests += 1
+        # 讀取帳本保留期間內的日彙總
+        ledger = self.cost_optimizer.usage_ledger
+        today = datetime.now().date()
+        daily_rollups = ledger.daily_rollups(
+            today - timedelta(days=ledger.retention_days), today, user_id or None
+        )
+        
+        for models in daily_rollups.values():
+            for model_name, bucket in models.items():
+                if model_name not in model_usage:
+                    model_usage[model_name] = {
+                        "requests": 0,
+                        "total_cost": 0.0,
+                        "avg_response_time": 0.0,
+                        "success_rate": 0.0
+                    }
+                
+                stats = model_usage[model_name]
+                stats["requests"] += bucket.requests
+                stats["total_cost"] += bucket.cost_usd
+                stats["avg_response_time"] += bucket.response_time_ms
+                stats["success_rate"] += bucket.successes
+                total_requests += bucket.requests
         
         # 計算平均值和使用比例
         for model_name, stats in model_usage.items():
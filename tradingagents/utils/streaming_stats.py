@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Streaming Statistics - 增量流式統計工具
+為滑動窗口指標提供 O(1) 攤銷更新的統計量，取代每次重新掃描整個窗口
+
+此模組提供：
+1. RunningMoments - Welford 均值/變異數與線上迴歸斜率（可合併、可扣除）
+2. QuantileSketch - DDSketch 相對誤差分位數草圖（可合併、可扣除）
+3. WindowedStats - 以時間/數量分桶的滑動窗口統計，支援時間衰減均值
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+
+# ==================== 增量矩統計 ====================
+
+class RunningMoments:
+    """
+    Welford 增量均值/變異數，並同時維護 (x, y) 共變矩以計算迴歸斜率
+
+    採用 Chan 等人的平行合併公式，兩組統計可在 O(1) 內合併或扣除，
+    因此可作為滑動窗口分桶的基本單位。
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'mean_x', 'm2_x', 'c_xy')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.mean_x = 0.0
+        self.m2_x = 0.0
+        self.c_xy = 0.0
+
+    def update(self, value: float, x: float = 0.0):
+        """加入一個觀測值（x 為迴歸自變量，例如序號或時間）"""
+        self.count += 1
+        n = self.count
+        dy = value - self.mean
+        self.mean += dy / n
+        dx = x - self.mean_x
+        self.mean_x += dx / n
+        self.m2 += dy * (value - self.mean)
+        self.m2_x += dx * (x - self.mean_x)
+        self.c_xy += dx * (value - self.mean)
+
+    def merge(self, other: 'RunningMoments'):
+        """就地合併另一組統計"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self._assign(other)
+            return
+
+        na, nb = self.count, other.count
+        n = na + nb
+        dy = other.mean - self.mean
+        dx = other.mean_x - self.mean_x
+        weight = na * nb / n
+
+        self.mean += dy * nb / n
+        self.mean_x += dx * nb / n
+        self.m2 += other.m2 + dy * dy * weight
+        self.m2_x += other.m2_x + dx * dx * weight
+        self.c_xy += other.c_xy + dx * dy * weight
+        self.count = n
+
+    def subtract(self, other: 'RunningMoments'):
+        """就地扣除先前合併進來的一組統計（合併公式的逆運算）"""
+        if other.count == 0:
+            return
+        n = self.count
+        nb = other.count
+        na = n - nb
+        if na <= 0:
+            self.reset()
+            return
+
+        mean_a = (n * self.mean - nb * other.mean) / na
+        mean_x_a = (n * self.mean_x - nb * other.mean_x) / na
+        dy = other.mean - mean_a
+        dx = other.mean_x - mean_x_a
+        weight = na * nb / n
+
+        self.m2 = max(0.0, self.m2 - other.m2 - dy * dy * weight)
+        self.m2_x = max(0.0, self.m2_x - other.m2_x - dx * dx * weight)
+        self.c_xy = self.c_xy - other.c_xy - dx * dy * weight
+        self.mean = mean_a
+        self.mean_x = mean_x_a
+        self.count = na
+
+    def reset(self):
+        """清空統計"""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.mean_x = 0.0
+        self.m2_x = 0.0
+        self.c_xy = 0.0
+
+    def copy(self) -> 'RunningMoments':
+        """複製統計"""
+        clone = RunningMoments()
+        clone._assign(self)
+        return clone
+
+    def _assign(self, other: 'RunningMoments'):
+        self.count = other.count
+        self.mean = other.mean
+        self.m2 = other.m2
+        self.mean_x = other.mean_x
+        self.m2_x = other.m2_x
+        self.c_xy = other.c_xy
+
+    @property
+    def variance(self) -> float:
+        """樣本變異數"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        """樣本標準差"""
+        return math.sqrt(self.variance)
+
+    @property
+    def slope(self) -> float:
+        """最小平方法迴歸斜率 dy/dx"""
+        if self.count < 2 or self.m2_x <= 0:
+            return 0.0
+        return self.c_xy / self.m2_x
+
+
+# ==================== 分位數草圖 ====================
+
+class QuantileSketch:
+    """
+    DDSketch 分位數草圖
+
+    以對數分桶保證相對誤差 relative_accuracy；桶計數為整數，
+    因此兩個草圖可精確合併與扣除。值的絕對值會被限制在
+    [min_value, max_value] 之間，使桶數有上界（預設每個符號約 2000 桶）。
+    """
+
+    __slots__ = ('relative_accuracy', 'min_value', 'max_value', '_gamma', '_log_gamma',
+                 'positive', 'negative', 'zero_count', 'count')
+
+    def __init__(self, relative_accuracy: float = 0.01,
+                 min_value: float = 1e-9, max_value: float = 1e9):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _key(self, magnitude: float) -> int:
+        magnitude = min(magnitude, self.max_value)
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self._gamma ** key / (self._gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        """加入觀測值"""
+        if value > self.min_value:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < -self.min_value:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+
+    def merge(self, other: 'QuantileSketch'):
+        """就地合併另一個草圖（需相同精度參數）"""
+        self._check_compatible(other)
+        for key, cnt in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + cnt
+        for key, cnt in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + cnt
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def subtract(self, other: 'QuantileSketch'):
+        """就地扣除先前合併進來的草圖"""
+        self._check_compatible(other)
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, cnt in other_bins.items():
+                remaining = bins.get(key, 0) - cnt
+                if remaining > 0:
+                    bins[key] = remaining
+                else:
+                    bins.pop(key, None)
+        self.zero_count = max(0, self.zero_count - other.zero_count)
+        self.count = max(0, self.count - other.count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估計分位數 q ∈ [0, 1]"""
+        if self.count == 0:
+            return None
+        q = min(max(q, 0.0), 1.0)
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def copy(self) -> 'QuantileSketch':
+        """複製草圖"""
+        clone = QuantileSketch(self.relative_accuracy, self.min_value, self.max_value)
+        clone.positive = dict(self.positive)
+        clone.negative = dict(self.negative)
+        clone.zero_count = self.zero_count
+        clone.count = self.count
+        return clone
+
+    def clear(self):
+        """清空草圖"""
+        self.positive.clear()
+        self.negative.clear()
+        self.zero_count = 0
+        self.count = 0
+
+    def _check_compatible(self, other: 'QuantileSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot combine sketches with different relative_accuracy")
+
+
+# ==================== 滑動窗口統計 ====================
+
+@dataclass
+class _StatsBucket:
+    """窗口分桶：一段時間/數量範圍內的子統計"""
+    seq: int
+    start: float
+    end: float
+    moments: RunningMoments = field(default_factory=RunningMoments)
+    sketch: Optional[QuantileSketch] = None
+
+
+class WindowedStats:
+    """
+    分桶滑動窗口統計
+
+    新觀測值只更新目前分桶與窗口總量（O(1)）；整個分桶過期時，
+    以合併公式的逆運算從總量扣除，因此每個觀測值的攤銷成本為 O(1)。
+    最小/最大值以單調佇列維護，過期精度為分桶粒度。
+
+    Args:
+        window_seconds: 時間窗口長度（秒），None 表示不依時間過期
+        max_count: 窗口最多保留的觀測數，None 表示不限
+        bucket_seconds: 每個分桶涵蓋的時間長度
+        bucket_capacity: 每個分桶最多容納的觀測數（1 表示逐點精確過期）
+        relative_accuracy: 分位數草圖相對誤差
+        decay_half_life: 時間衰減均值的半衰期（秒），None 表示停用
+    """
+
+    # 每扣除這麼多個分桶後，從剩餘分桶重建總量以抑制浮點累積誤差
+    RESYNC_EVERY_BUCKETS = 256
+
+    def __init__(self,
+                 window_seconds: Optional[float] = None,
+                 max_count: Optional[int] = None,
+                 bucket_seconds: Optional[float] = None,
+                 bucket_capacity: Optional[int] = None,
+                 relative_accuracy: float = 0.01,
+                 decay_half_life: Optional[float] = None):
+        if window_seconds is None and max_count is None:
+            raise ValueError("WindowedStats requires window_seconds or max_count")
+
+        self.window_seconds = window_seconds
+        self.max_count = max_count
+        if bucket_seconds is None and window_seconds is not None:
+            bucket_seconds = max(window_seconds / 60.0, 1e-3)
+        self.bucket_seconds = bucket_seconds
+        if bucket_capacity is None and max_count is not None:
+            bucket_capacity = max(1, max_count // 32)
+        self.bucket_capacity = bucket_capacity
+        self.relative_accuracy = relative_accuracy
+        self.decay_half_life = decay_half_life
+
+        self._buckets: Deque[_StatsBucket] = deque()
+        self._total = RunningMoments()
+        self._sketch = QuantileSketch(relative_accuracy)
+        self._min_queue: Deque[Tuple[float, int]] = deque()
+        self._max_queue: Deque[Tuple[float, int]] = deque()
+        self._next_bucket_seq = 0
+        self._sequence = 0
+        self._evictions_since_resync = 0
+        self._latest: Optional[float] = None
+        self._latest_timestamp: Optional[float] = None
+        self._ewma: Optional[float] = None
+        self._ewmvar = 0.0
+        self._lock = threading.Lock()
+
+    # ---------- 更新 ----------
+
+    def add(self, value: float, timestamp: Optional[float] = None):
+        """加入觀測值；回歸自變量為窗口內的序號"""
+        if timestamp is None:
+            timestamp = time.time()
+        value = float(value)
+
+        with self._lock:
+            bucket = self._current_bucket(timestamp)
+            x = float(self._sequence)
+            self._sequence += 1
+
+            bucket.moments.update(value, x)
+            bucket.sketch.add(value)
+            bucket.end = max(bucket.end, timestamp)
+            self._total.update(value, x)
+            self._sketch.add(value)
+
+            while self._min_queue and self._min_queue[-1][0] >= value:
+                self._min_queue.pop()
+            self._min_queue.append((value, bucket.seq))
+            while self._max_queue and self._max_queue[-1][0] <= value:
+                self._max_queue.pop()
+            self._max_queue.append((value, bucket.seq))
+
+            self._update_decay(value, timestamp)
+            self._latest = value
+            self._latest_timestamp = timestamp
+
+            self._evict(timestamp)
+
+    def expire(self, now: Optional[float] = None):
+        """依目前時間清理過期分桶"""
+        with self._lock:
+            self._evict(time.time() if now is None else now)
+
+    def expire_before(self, cutoff: float):
+        """清理最後觀測時間早於 cutoff 的分桶"""
+        with self._lock:
+            while self._buckets and self._buckets[0].end < cutoff:
+                self._drop_oldest()
+
+    def clear(self):
+        """清空窗口"""
+        with self._lock:
+            self._buckets.clear()
+            self._total.reset()
+            self._sketch.clear()
+            self._min_queue.clear()
+            self._max_queue.clear()
+            self._latest = None
+            self._latest_timestamp = None
+            self._ewma = None
+            self._ewmvar = 0.0
+
+    def _current_bucket(self, timestamp: float) -> _StatsBucket:
+        bucket = self._buckets[-1] if self._buckets else None
+        if bucket is not None:
+            full = (self.bucket_capacity is not None
+                    and bucket.moments.count >= self.bucket_capacity)
+            stale = (self.bucket_seconds is not None
+                     and timestamp - bucket.start >= self.bucket_seconds)
+            if not full and not stale:
+                return bucket
+
+        bucket = _StatsBucket(
+            seq=self._next_bucket_seq,
+            start=timestamp,
+            end=timestamp,
+            sketch=QuantileSketch(self.relative_accuracy)
+        )
+        self._next_bucket_seq += 1
+        self._buckets.append(bucket)
+        return bucket
+
+    def _evict(self, now: float):
+        if self.window_seconds is not None:
+            cutoff = now - self.window_seconds
+            while self._buckets and self._buckets[0].end < cutoff:
+                self._drop_oldest()
+
+        if self.max_count is not None:
+            while (len(self._buckets) > 1
+                   and self._total.count - self._buckets[0].moments.count >= self.max_count):
+                self._drop_oldest()
+
+    def _drop_oldest(self):
+        bucket = self._buckets.popleft()
+        self._sketch.subtract(bucket.sketch)
+
+        if not self._buckets:
+            self._total.reset()
+            self._sketch.clear()
+            self._min_queue.clear()
+            self._max_queue.clear()
+            self._evictions_since_resync = 0
+            return
+
+        self._evictions_since_resync += 1
+        if self._evictions_since_resync >= self.RESYNC_EVERY_BUCKETS:
+            self._resync()
+        else:
+            self._total.subtract(bucket.moments)
+
+        oldest_seq = self._buckets[0].seq
+        while self._min_queue and self._min_queue[0][1] < oldest_seq:
+            self._min_queue.popleft()
+        while self._max_queue and self._max_queue[0][1] < oldest_seq:
+            self._max_queue.popleft()
+
+    def _resync(self):
+        """從剩餘分桶重建總量"""
+        total = RunningMoments()
+        for bucket in self._buckets:
+            total.merge(bucket.moments)
+        self._total = total
+        self._evictions_since_resync = 0
+
+    def _update_decay(self, value: float, timestamp: float):
+        if self.decay_half_life is None:
+            return
+        if self._ewma is None:
+            self._ewma = value
+            self._ewmvar = 0.0
+            return
+        elapsed = max(0.0, timestamp - (self._latest_timestamp or timestamp))
+        alpha = 1.0 - 0.5 ** (elapsed / self.decay_half_life) if elapsed > 0 else 0.0
+        # 同一時間點的連續觀測至少給予最小權重，避免被忽略
+        alpha = max(alpha, 1.0 / max(self._total.count, 1))
+        delta = value - self._ewma
+        self._ewma += alpha * delta
+        self._ewmvar = (1 - alpha) * (self._ewmvar + alpha * delta * delta)
+
+    # ---------- 查詢 ----------
+
+    @property
+    def count(self) -> int:
+        return self._total.count
+
+    @property
+    def mean(self) -> float:
+        return self._total.mean
+
+    @property
+    def std(self) -> float:
+        return self._total.std
+
+    @property
+    def slope(self) -> float:
+        return self._total.slope
+
+    @property
+    def min(self) -> Optional[float]:
+        return self._min_queue[0][0] if self._min_queue else None
+
+    @property
+    def max(self) -> Optional[float]:
+        return self._max_queue[0][0] if self._max_queue else None
+
+    @property
+    def latest(self) -> Optional[float]:
+        return self._latest if self._total.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """估計窗口分位數"""
+        with self._lock:
+            return self._sketch.quantile(q)
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        """一次估計多個分位數"""
+        with self._lock:
+            return {q: self._sketch.quantile(q) for q in qs}
+
+    def moments(self) -> RunningMoments:
+        """取得窗口總量的副本（可與其他窗口合併）"""
+        with self._lock:
+            return self._total.copy()
+
+    def sketch(self) -> QuantileSketch:
+        """取得窗口分位數草圖的副本（可與其他窗口合併）"""
+        with self._lock:
+            return self._sketch.copy()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """取得窗口統計摘要"""
+        with self._lock:
+            total = self._total
+            if total.count == 0:
+                return {'count': 0}
+            result = {
+                'count': total.count,
+                'mean': total.mean,
+                'std': total.std,
+                'variance': total.variance,
+                'min': self._min_queue[0][0],
+                'max': self._max_queue[0][0],
+                'slope': total.slope,
+                'latest': self._latest,
+                'median': self._sketch.quantile(0.5),
+                'p95': self._sketch.quantile(0.95),
+                'p99': self._sketch.quantile(0.99)
+            }
+            if self._ewma is not None:
+                result['ewma'] = self._ewma
+                result['ewm_std'] = math.sqrt(self._ewmvar)
+            return result
+
+
+def create_windowed_stats(window_seconds: Optional[float] = None,
+                          max_count: Optional[int] = None,
+                          **kwargs) -> WindowedStats:
+    """創建滑動窗口統計"""
+    return WindowedStats(window_seconds=window_seconds, max_count=max_count, **kwargs)
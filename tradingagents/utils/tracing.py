@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Tracing - 輕量進程內追蹤
+天工 (TianGong) - 找出單次 analyze_stock 會話的時間花在哪裡
+
+此模組提供：
+1. Span - 與 OpenTelemetry 相容的 span 模型（trace_id / span_id / parent / attributes / events / status）
+2. Tracer - 以 contextvars 傳遞目前 span；asyncio.gather / create_task 會複製 context，
+   子任務自動成為目前 span 的子 span
+3. traced - 同步/異步函數裝飾器（只在會話 trace 內記錄子 span）
+4. InMemorySpanStore - 保存最近的 trace，提供每個會話的瀑布圖
+5. JsonlSpanExporter / OTLPJsonFileExporter - 由背景執行緒匯出到本地 JSONL 或 OTLP/JSON 檔案
+
+環境變數：
+    TRACING_ENABLED=false          關閉追蹤（span 變為 no-op）
+    TRACING_EXPORTER=jsonl|otlp    檔案匯出格式（預設不匯出，只保存在記憶體）
+    TRACING_EXPORT_PATH=...        匯出檔案路徑
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar(
+    'tradingagents_current_span', default=None
+)
+
+STATUS_UNSET = 'UNSET'
+STATUS_OK = 'OK'
+STATUS_ERROR = 'ERROR'
+
+# OTLP SpanKind 數值
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3, 'producer': 4, 'consumer': 5}
+
+
+# ==================== Span 模型 ====================
+
+@dataclass
+class SpanEvent:
+    """Span 內的時間點事件"""
+    name: str
+    timestamp_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Span:
+    """追蹤 span（欄位對應 OpenTelemetry 資料模型）"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    kind: str = 'internal'
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    events: List[SpanEvent] = field(default_factory=list)
+    status: str = STATUS_UNSET
+    status_message: str = ''
+
+    tracer: Optional['Tracer'] = field(default=None, repr=False, compare=False)
+
+    @property
+    def is_recording(self) -> bool:
+        return self.end_time_ns is None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_time_ns if self.end_time_ns is not None else time.time_ns()
+        return (end - self.start_time_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append(SpanEvent(name, time.time_ns(), attributes or {}))
+
+    def set_status(self, status: str, message: str = ''):
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException):
+        self.add_event('exception', {
+            'exception.type': type(exc).__name__,
+            'exception.message': str(exc)
+        })
+        self.set_status(STATUS_ERROR, str(exc))
+
+    def end(self, end_time_ns: Optional[int] = None):
+        if self.end_time_ns is not None:
+            return
+        self.end_time_ns = end_time_ns or time.time_ns()
+        if self.tracer is not None:
+            self.tracer._on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'kind': self.kind,
+            'start_time_ns': self.start_time_ns,
+            'end_time_ns': self.end_time_ns,
+            'duration_ms': round(self.duration_ms, 3),
+            'attributes': self.attributes,
+            'events': [
+                {'name': event.name, 'timestamp_ns': event.timestamp_ns, 'attributes': event.attributes}
+                for event in self.events
+            ],
+            'status': self.status,
+            'status_message': self.status_message
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span 表示"""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KINDS.get(self.kind, 1),
+            'startTimeUnixNano': str(self.start_time_ns),
+            'endTimeUnixNano': str(self.end_time_ns or self.start_time_ns),
+            'attributes': [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'events': [
+                {
+                    'timeUnixNano': str(event.timestamp_ns),
+                    'name': event.name,
+                    'attributes': [_otlp_attribute(key, value) for key, value in event.attributes.items()]
+                }
+                for event in self.events
+            ],
+            'status': {'code': {STATUS_UNSET: 0, STATUS_OK: 1, STATUS_ERROR: 2}[self.status]}
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class _NoopSpan:
+    """追蹤關閉時使用的空 span"""
+    trace_id = span_id = parent_span_id = None
+    is_recording = False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def set_status(self, status, message=''):
+        pass
+
+    def record_exception(self, exc):
+        pass
+
+    def end(self, end_time_ns=None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _SpanScope:
+    """start_span 返回的上下文管理器（同時支援 with 與 async with）"""
+
+    __slots__ = ('span', '_token')
+
+    def __init__(self, span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        if self.span is not NOOP_SPAN:
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.span.record_exception(exc)
+        elif exc is not None:
+            self.span.set_status(STATUS_ERROR, 'cancelled')
+        elif self.span is not NOOP_SPAN and self.span.status == STATUS_UNSET:
+            self.span.set_status(STATUS_OK)
+        self.span.end()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# ==================== 匯出與保存 ====================
+
+class InMemorySpanStore:
+    """保存最近 max_traces 個 trace 的已結束 span，並以會話 ID 索引"""
+
+    def __init__(self, max_traces: int = 500, max_spans_per_trace: int = 5000):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._sessions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        with self._lock:
+            for span in spans:
+                trace = self._traces.get(span.trace_id)
+                if trace is None:
+                    trace = []
+                    self._traces[span.trace_id] = trace
+                    while len(self._traces) > self.max_traces:
+                        evicted, _ = self._traces.popitem(last=False)
+                        self._sessions = {
+                            session: trace_id for session, trace_id in self._sessions.items()
+                            if trace_id != evicted
+                        }
+                if len(trace) < self.max_spans_per_trace:
+                    trace.append(span)
+                session_id = span.attributes.get('session.id')
+                if session_id and span.parent_span_id is None:
+                    self._sessions[session_id] = span.trace_id
+
+    def register_session(self, session_id: str, trace_id: str):
+        with self._lock:
+            self._sessions[session_id] = trace_id
+
+    def trace_id_for_session(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get_trace(self, trace_id: str) -> List[Span]:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+    def shutdown(self):
+        pass
+
+
+class JsonlSpanExporter:
+    """每個 span 一行 JSON（由背景執行緒批次寫入，export 不做檔案 I/O）"""
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(self, path: str, flush_every: int = 64, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._writer.start()
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            self._queue.put(span)
+
+    def _run(self):
+        batch: List[Span] = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = self._FLUSH
+            if isinstance(item, Span):
+                batch.append(item)
+                if len(batch) < self.flush_every:
+                    continue
+            self._write_safely(batch)
+            batch = []
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is self._STOP:
+                return
+
+    def _write_safely(self, batch: List[Span]):
+        if not batch:
+            return
+        try:
+            self._write(batch)
+        except Exception as e:
+            logger.error(f"❌ Span export write failed ({self.path}): {e}")
+
+    def _write(self, batch: List[Span]):
+        lines = [json.dumps(span.to_dict(), ensure_ascii=False, default=str) for span in batch]
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待已匯出的 span 寫入檔案"""
+        if not self._writer.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        if self._writer.is_alive():
+            self._queue.put(self._STOP)
+            self._writer.join(timeout)
+
+
+class OTLPJsonFileExporter(JsonlSpanExporter):
+    """OTLP/JSON 檔案匯出：每行一個 ExportTraceServiceRequest（可由 OpenTelemetry Collector 的 otlpjsonfile receiver 讀取）"""
+
+    def __init__(self, path: str, service_name: str = 'tradingagents', flush_every: int = 64,
+                 flush_interval: float = 1.0):
+        self.service_name = service_name
+        super().__init__(path, flush_every, flush_interval)
+
+    def _write(self, batch: List[Span]):
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [_otlp_attribute('service.name', self.service_name)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'tradingagents.utils.tracing'},
+                    'spans': [span.to_otlp() for span in batch]
+                }]
+            }]
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(payload, ensure_ascii=False, default=str) + '\n')
+
+
+# ==================== Tracer ====================
+
+class Tracer:
+    """
+    進程內追蹤器
+
+    Args:
+        enabled: 關閉時 start_span 返回 no-op span
+        exporters: 已結束 span 的接收者（需具備 export(spans) 方法）
+    """
+
+    def __init__(self, enabled: bool = True, exporters: Optional[List[Any]] = None,
+                 store: Optional[InMemorySpanStore] = None):
+        self.enabled = enabled
+        self.store = store or InMemorySpanStore()
+        self.exporters: List[Any] = [self.store] + list(exporters or [])
+
+    def add_exporter(self, exporter: Any):
+        self.exporters.append(exporter)
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   kind: str = 'internal', new_trace: bool = False,
+                   session_id: Optional[str] = None) -> _SpanScope:
+        """
+        建立 span 並設為目前 span
+
+        沒有目前 span 時返回 no-op span：只有會話入口（new_trace=True）才建立新的 trace，
+        避免快取讀寫、LLM 呼叫等零散操作各自成為 trace 而擠掉會話瀑布圖。
+
+        Args:
+            new_trace: 不沿用目前 span，建立新的 trace（例如背景執行的會話工作流）
+            session_id: 將此 trace 與會話關聯，供瀑布圖查詢
+        """
+        if not self.enabled:
+            return _SpanScope(NOOP_SPAN)
+
+        parent = None if new_trace else _current_span.get()
+        if parent is None and not new_trace:
+            return _SpanScope(NOOP_SPAN)
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=dict(attributes or {}),
+            tracer=self
+        )
+        if session_id:
+            span.attributes['session.id'] = session_id
+            self.store.register_session(session_id, span.trace_id)
+        return _SpanScope(span)
+
+    def record_span(self, name: str, duration_ms: float,
+                    attributes: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """記錄一個剛結束的子 span（只在已有目前 span 時記錄，用於已自行計時的操作）"""
+        parent = _current_span.get()
+        if not self.enabled or parent is None:
+            return
+        end_ns = time.time_ns()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id,
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id,
+            start_time_ns=end_ns - int(duration_ms * 1e6),
+            attributes=dict(attributes or {}),
+            status=STATUS_ERROR if error else STATUS_OK,
+            status_message=error or '',
+            tracer=self
+        )
+        span.end(end_ns)
+
+    def _on_end(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export([span])
+            except Exception as e:
+                logger.error(f"❌ Span export failed ({type(exporter).__name__}): {e}")
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                logger.error(f"❌ Span exporter shutdown failed: {e}")
+
+    # ==================== 瀑布圖 ====================
+
+    def waterfall(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """會話的瀑布圖：依開始時間排序的 span，含相對起點偏移與深度"""
+        trace_id = self.store.trace_id_for_session(session_id)
+        if trace_id is None:
+            return None
+        spans = sorted(self.store.get_trace(trace_id), key=lambda span: span.start_time_ns)
+        if not spans:
+            return {'session_id': session_id, 'trace_id': trace_id, 'spans': []}
+
+        by_id = {span.span_id: span for span in spans}
+        depths: Dict[str, int] = {}
+
+        def depth(span: Span) -> int:
+            if span.span_id not in depths:
+                parent = by_id.get(span.parent_span_id)
+                depths[span.span_id] = 0 if parent is None else depth(parent) + 1
+            return depths[span.span_id]
+
+        origin = spans[0].start_time_ns
+        end = max(span.end_time_ns or span.start_time_ns for span in spans)
+        return {
+            'session_id': session_id,
+            'trace_id': trace_id,
+            'total_ms': round((end - origin) / 1e6, 3),
+            'span_count': len(spans),
+            'spans': [
+                {
+                    'span_id': span.span_id,
+                    'parent_span_id': span.parent_span_id,
+                    'name': span.name,
+                    'depth': depth(span),
+                    'offset_ms': round((span.start_time_ns - origin) / 1e6, 3),
+                    'duration_ms': round(span.duration_ms, 3),
+                    'status': span.status,
+                    'attributes': span.attributes
+                }
+                for span in spans
+            ]
+        }
+
+
+def traced(name: Optional[str] = None, attributes: Optional[Callable[..., Dict[str, Any]]] = None,
+           result_attributes: Optional[Callable[[Any], Dict[str, Any]]] = None,
+           kind: str = 'internal'):
+    """
+    追蹤函數執行的裝飾器（同步與異步函數皆可）
+
+    只在已有目前 span 時建立子 span；在會話之外呼叫時直接執行函數，不產生 trace。
+
+    Args:
+        name: span 名稱，預設為函數限定名稱
+        attributes: 以函數參數計算 span 屬性
+        result_attributes: 以返回值計算 span 屬性
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        def _start(args, kwargs):
+            span_attributes = None
+            if attributes is not None:
+                try:
+                    span_attributes = attributes(*args, **kwargs)
+                except Exception:
+                    span_attributes = None
+            return get_tracer().start_span(span_name, span_attributes, kind=kind)
+
+        def _finish(span, result):
+            if result_attributes is not None and span is not NOOP_SPAN:
+                try:
+                    span.set_attributes(result_attributes(result))
+                except Exception:
+                    pass
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with _start(args, kwargs) as span:
+                    result = await func(*args, **kwargs)
+                    _finish(span, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with _start(args, kwargs) as span:
+                result = func(*args, **kwargs)
+                _finish(span, result)
+                return result
+        return wrapper
+    return decorator
+
+
+# ==================== 全域 Tracer ====================
+
+_tracer: Optional[Tracer] = None
+
+
+def create_tracer(enabled: Optional[bool] = None, exporter: Optional[str] = None,
+                  export_path: Optional[str] = None) -> Tracer:
+    """依參數或環境變數建立 Tracer"""
+    if enabled is None:
+        enabled = os.getenv('TRACING_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+    exporter = exporter or os.getenv('TRACING_EXPORTER', '')
+
+    exporters = []
+    if enabled and exporter == 'jsonl':
+        exporters.append(JsonlSpanExporter(export_path or os.getenv('TRACING_EXPORT_PATH', 'logs/traces.jsonl')))
+    elif enabled and exporter == 'otlp':
+        exporters.append(OTLPJsonFileExporter(export_path or os.getenv('TRACING_EXPORT_PATH', 'logs/traces.otlp.jsonl')))
+    return Tracer(enabled=enabled, exporters=exporters)
+
+
+def get_tracer() -> Tracer:
+    """獲取全域 Tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = create_tracer()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """設置全域 Tracer"""
+    global _tracer
+    _tracer = tracer
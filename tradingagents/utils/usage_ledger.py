@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger - LLM 使用量帳本
+天工 (TianGong) - 按日分區的持久化使用記錄與彙總
+
+此模組提供：
+1. 只追加的原始記錄檔，按日分區（usage-YYYY-MM-DD.jsonl）
+2. 寫入時同步維護的 日 / 分鐘 彙總（按用戶、模型）
+3. 已結束日期的日彙總落盤（usage-YYYY-MM-DD.rollup.json），重啟時只需重放當日原始記錄；
+   多個 worker 共用同一分區檔，日彙總在檔案鎖下重放整個分區產生，不依賴單一進程的記憶體彙總
+4. 分析查詢只讀彙總，耗時與查詢窗口成正比，不隨歷史總量增長
+5. 原始記錄由背景寫入執行緒批次落盤，append 只更新記憶體彙總，不在呼叫端做檔案 I/O
+
+記憶體上限：日彙總保留 retention_days 天、分鐘彙總保留 minute_retention_hours 小時，
+每個用戶只保留最近 recent_per_user 筆原始記錄供優化建議使用。
+
+環境變數：
+    LLM_USAGE_LEDGER_DIR=...    帳本目錄（預設為專案根目錄下的 data/llm_usage_ledger，與工作目錄無關；
+                                設為空字串時只保存在記憶體）
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DAY_FORMAT = '%Y-%m-%d'
+
+# 以套件位置定位專案根目錄，避免隨啟動時的工作目錄改變
+DEFAULT_LEDGER_DIR = Path(__file__).resolve().parents[2] / 'data' / 'llm_usage_ledger'
+
+_STOP_WRITER = object()
+
+
+@dataclass
+class UsageRecord:
+    """使用記錄"""
+    user_id: str
+    request_id: str
+    model_name: str
+    task_type: str
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+    response_time_ms: int
+    success: bool
+    timestamp: str
+    quality_rating: Optional[float] = None
+
+
+@dataclass
+class RollupBucket:
+    """彙總桶"""
+    requests: int = 0
+    successes: int = 0
+    cost_usd: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    response_time_ms: int = 0
+
+    def add(self, record: UsageRecord):
+        self.requests += 1
+        self.successes += 1 if record.success else 0
+        self.cost_usd += record.cost_usd
+        self.input_tokens += record.input_tokens
+        self.output_tokens += record.output_tokens
+        self.response_time_ms += record.response_time_ms
+
+    def merge(self, other: 'RollupBucket'):
+        self.requests += other.requests
+        self.successes += other.successes
+        self.cost_usd += other.cost_usd
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.response_time_ms += other.response_time_ms
+
+
+# day -> user_id -> model_name -> bucket
+RollupIndex = Dict[Any, Dict[str, Dict[str, RollupBucket]]]
+
+
+def _new_index() -> RollupIndex:
+    return defaultdict(lambda: defaultdict(lambda: defaultdict(RollupBucket)))
+
+
+class UsageLedger:
+    """
+    LLM 使用量帳本
+
+    Args:
+        ledger_dir: 分區檔案目錄；None 時只保存在記憶體
+        retention_days: 日彙總與分區檔案的保留天數
+        minute_retention_hours: 分鐘彙總保留時數
+        recent_per_user: 每個用戶保留的最近原始記錄數
+        write_batch_size: 背景寫入執行緒每批最多寫入的記錄數
+    """
+
+    def __init__(self, ledger_dir: Optional[str] = None, retention_days: int = 400,
+                 minute_retention_hours: int = 48, recent_per_user: int = 100,
+                 recent_total: int = 2000, write_batch_size: int = 256):
+        self.ledger_dir = Path(ledger_dir) if ledger_dir else None
+        self.retention_days = retention_days
+        self.minute_retention_hours = minute_retention_hours
+        self.recent_per_user = recent_per_user
+        self.write_batch_size = write_batch_size
+
+        self._day_rollups: RollupIndex = _new_index()
+        self._minute_rollups: RollupIndex = _new_index()
+        self._recent: Deque[UsageRecord] = deque(maxlen=recent_total)
+        self._recent_by_user: Dict[str, Deque[UsageRecord]] = {}
+        self._lock = threading.Lock()
+
+        self._open_day: Optional[str] = None
+        self._open_file = None
+        self._last_pruned_minute = 0
+
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+        if self.ledger_dir is not None:
+            self.ledger_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+            self._writer = threading.Thread(target=self._run_writer, name='usage-ledger-writer', daemon=True)
+            self._writer.start()
+
+    # ==================== 寫入 ====================
+
+    def append(self, record: UsageRecord):
+        """追加記錄並更新彙總（落盤交給背景寫入執行緒）"""
+        timestamp = datetime.fromisoformat(record.timestamp)
+        day = timestamp.strftime(DAY_FORMAT)
+        minute = int(timestamp.timestamp()) // 60
+
+        with self._lock:
+            self._apply(day, minute, record)
+            self._remember(record)
+            self._prune_minutes(minute)
+        if self._writer is not None:
+            self._write_queue.put((day, record))
+
+    def _apply(self, day: str, minute: Optional[int], record: UsageRecord):
+        self._day_rollups[day][record.user_id][record.model_name].add(record)
+        if minute is not None:
+            self._minute_rollups[minute][record.user_id][record.model_name].add(record)
+
+    def _remember(self, record: UsageRecord):
+        self._recent.append(record)
+        user_records = self._recent_by_user.get(record.user_id)
+        if user_records is None:
+            user_records = deque(maxlen=self.recent_per_user)
+            self._recent_by_user[record.user_id] = user_records
+        user_records.append(record)
+
+    # ==================== 背景寫入 ====================
+
+    def _run_writer(self):
+        """逐批取出待寫記錄：整批寫入後 flush 一次"""
+        while True:
+            batch = [self._write_queue.get()]
+            while len(batch) < self.write_batch_size:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            for entry in batch:
+                if entry is _STOP_WRITER:
+                    stop = True
+                elif isinstance(entry, threading.Event):
+                    waiters.append(entry)
+                else:
+                    try:
+                        self._write(*entry)
+                    except Exception as e:
+                        logger.error(f"❌ 使用量帳本寫入失敗: {e}")
+            try:
+                if self._open_file is not None:
+                    self._open_file.flush()
+            except Exception as e:
+                logger.error(f"❌ 使用量帳本寫入失敗: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+            if stop:
+                if self._open_file is not None:
+                    self._open_file.close()
+                    self._open_file = None
+                    self._open_day = None
+                return
+
+    def _write(self, day: str, record: UsageRecord):
+        if day != self._open_day:
+            self._rotate(day)
+        self._open_file.write(json.dumps(asdict(record), ensure_ascii=False) + '\n')
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待已追加的記錄落盤"""
+        if self._writer is None or not self._writer.is_alive():
+            return False
+        done = threading.Event()
+        self._write_queue.put(done)
+        return done.wait(timeout)
+
+    def _rotate(self, day: str):
+        """切換到新日期分區；前一日的彙總落盤並清理過期分區"""
+        previous = self._open_day
+        if self._open_file is not None:
+            self._open_file.close()
+        self._open_day = day
+        self._open_file = open(self._partition_path(day), 'a', encoding='utf-8')
+
+        if previous is not None and previous < day:
+            self._write_rollup(previous)
+            self._prune_days(day)
+
+    # ==================== 分區檔案 ====================
+
+    def _partition_path(self, day: str) -> Path:
+        return self.ledger_dir / f"usage-{day}.jsonl"
+
+    def _rollup_path(self, day: str) -> Path:
+        return self.ledger_dir / f"usage-{day}.rollup.json"
+
+    def _write_rollup(self, day: str):
+        """
+        重放整個分區產生日彙總
+
+        分區檔由所有 worker 共同追加，各進程的記憶體彙總只含自己的記錄，
+        因此在分區檔的排他鎖下重放全部記錄；最後完成的 worker 產生的彙總最完整。
+        """
+        partition = self._partition_path(day)
+        if not partition.exists():
+            return
+        users: Dict[str, Dict[str, RollupBucket]] = defaultdict(lambda: defaultdict(RollupBucket))
+        tmp_path = self._rollup_path(day).with_suffix(f'.{os.getpid()}.tmp')
+        with open(partition, 'r', encoding='utf-8') as lock_file:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                for record in self._read_partition(partition):
+                    users[record.user_id][record.model_name].add(record)
+                payload = {
+                    user_id: {model_name: asdict(bucket) for model_name, bucket in models.items()}
+                    for user_id, models in users.items()
+                }
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, self._rollup_path(day))
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        """載入已落盤的日彙總，沒有彙總檔的分區（通常只有當日）重放原始記錄"""
+        today = datetime.now().strftime(DAY_FORMAT)
+        oldest = (datetime.now() - timedelta(days=self.retention_days)).strftime(DAY_FORMAT)
+        minute_cutoff = int((datetime.now() - timedelta(hours=self.minute_retention_hours)).timestamp()) // 60
+
+        for partition in sorted(self.ledger_dir.glob('usage-*.jsonl')):
+            day = partition.name[len('usage-'):-len('.jsonl')]
+            if day < oldest:
+                continue
+            rollup_path = self._rollup_path(day)
+            replay_minutes = day >= (datetime.now() - timedelta(hours=self.minute_retention_hours)).strftime(DAY_FORMAT)
+
+            # 彙總產生後仍有 worker 追加過的分區視為過期，改為重放
+            rollup_fresh = rollup_path.exists() and rollup_path.stat().st_mtime >= partition.stat().st_mtime
+            if rollup_fresh and day != today and not replay_minutes:
+                self._load_rollup(day, rollup_path)
+                continue
+
+            for record in self._read_partition(partition):
+                timestamp = datetime.fromisoformat(record.timestamp)
+                minute = int(timestamp.timestamp()) // 60
+                self._apply(day, minute if minute >= minute_cutoff else None, record)
+                self._remember(record)
+
+            if day != today and not rollup_fresh:
+                self._write_rollup(day)
+
+        # 重啟後寫入會追加到當日分區
+        self._open_day = None
+        logger.info(f"✅ 使用量帳本已載入: {len(self._day_rollups)} 日彙總")
+
+    def _load_rollup(self, day: str, path: Path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ 讀取日彙總失敗 {path}: {e}，改為重放原始記錄")
+            for record in self._read_partition(self._partition_path(day)):
+                self._apply(day, None, record)
+            return
+        for user_id, models in payload.items():
+            for model_name, bucket in models.items():
+                self._day_rollups[day][user_id][model_name].merge(RollupBucket(**bucket))
+
+    @staticmethod
+    def _read_partition(path: Path) -> Iterable[UsageRecord]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield UsageRecord(**json.loads(line))
+                except (ValueError, TypeError) as e:
+                    # 崩潰時可能留下半行，跳過即可
+                    logger.warning(f"略過損壞的帳本記錄 {path.name}:{line_number}: {e}")
+
+    # ==================== 保留期限 ====================
+
+    def _prune_minutes(self, current_minute: int):
+        # 每分鐘最多清理一次
+        if current_minute <= self._last_pruned_minute:
+            return
+        self._last_pruned_minute = current_minute
+        cutoff = current_minute - self.minute_retention_hours * 60
+        for minute in [minute for minute in self._minute_rollups if minute < cutoff]:
+            del self._minute_rollups[minute]
+
+    def _prune_days(self, current_day: str):
+        oldest = (datetime.strptime(current_day, DAY_FORMAT) - timedelta(days=self.retention_days)).strftime(DAY_FORMAT)
+        with self._lock:
+            for day in [day for day in self._day_rollups if day < oldest]:
+                del self._day_rollups[day]
+        if self.ledger_dir is not None:
+            for path in self.ledger_dir.glob('usage-*'):
+                if path.name[len('usage-'):len('usage-') + 10] < oldest:
+                    path.unlink(missing_ok=True)
+
+    # ==================== 查詢 ====================
+
+    def _collect(self, index: RollupIndex, keys: Iterable[Any], user_id: Optional[str],
+                 model_name: Optional[str] = None) -> Dict[Any, Dict[str, RollupBucket]]:
+        """依序讀取各時間鍵的彙總，返回 key -> model -> bucket"""
+        result = {}
+        with self._lock:
+            for key in keys:
+                users = index.get(key)
+                if not users:
+                    continue
+                if user_id is None:
+                    selected = users.values()
+                elif user_id in users:
+                    selected = [users[user_id]]
+                else:
+                    continue
+                per_model: Dict[str, RollupBucket] = defaultdict(RollupBucket)
+                for models in selected:
+                    for name, bucket in models.items():
+                        if model_name is None or name == model_name:
+                            per_model[name].merge(bucket)
+                if per_model:
+                    result[key] = dict(per_model)
+        return result
+
+    def daily_rollups(self, start_day: date, end_day: date, user_id: Optional[str] = None,
+                      model_name: Optional[str] = None) -> Dict[str, Dict[str, RollupBucket]]:
+        """日彙總：day -> model -> bucket（含起訖日）"""
+        days = [
+            (start_day + timedelta(days=offset)).strftime(DAY_FORMAT)
+            for offset in range((end_day - start_day).days + 1)
+        ]
+        return self._collect(self._day_rollups, days, user_id, model_name)
+
+    def minute_rollups(self, start: datetime, end: datetime, user_id: Optional[str] = None,
+                       model_name: Optional[str] = None) -> Dict[datetime, Dict[str, RollupBucket]]:
+        """分鐘彙總：minute -> model -> bucket（只涵蓋 minute_retention_hours 內）"""
+        first = int(start.timestamp()) // 60
+        last = int(end.timestamp()) // 60
+        collected = self._collect(self._minute_rollups, range(first, last + 1), user_id, model_name)
+        return {datetime.fromtimestamp(minute * 60): models for minute, models in collected.items()}
+
+    def recent_records(self, user_id: Optional[str] = None, limit: Optional[int] = None) -> List[UsageRecord]:
+        """最近的原始記錄（由舊到新）"""
+        with self._lock:
+            records = self._recent if user_id is None else self._recent_by_user.get(user_id, ())
+            records = list(records)
+        return records[-limit:] if limit else records
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ledger_dir': str(self.ledger_dir) if self.ledger_dir else None,
+                'day_partitions': len(self._day_rollups),
+                'minute_buckets': len(self._minute_rollups),
+                'users_tracked': len(self._recent_by_user),
+                'recent_records': len(self._recent),
+                'pending_writes': self._write_queue.qsize()
+            }
+
+    def close(self, timeout: float = 5.0):
+        """寫完待寫記錄並停止背景寫入執行緒"""
+        if self._writer is not None and self._writer.is_alive():
+            self._write_queue.put(_STOP_WRITER)
+            self._writer.join(timeout)
+
+
+# ==================== 全域帳本 ====================
+
+_usage_ledger: Optional[UsageLedger] = None
+_usage_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger(ledger_dir: Optional[str] = None) -> UsageLedger:
+    """
+    獲取進程共用的使用量帳本
+
+    目錄依序取自 ledger_dir 參數、LLM_USAGE_LEDGER_DIR、DEFAULT_LEDGER_DIR（只在首次建立時生效）；
+    LLM_USAGE_LEDGER_DIR 設為空字串時只保存在記憶體。
+    """
+    global _usage_ledger
+    if _usage_ledger is None:
+        with _usage_ledger_lock:
+            if _usage_ledger is None:
+                if ledger_dir is None:
+                    ledger_dir = os.getenv('LLM_USAGE_LEDGER_DIR', str(DEFAULT_LEDGER_DIR))
+                _usage_ledger = UsageLedger(ledger_dir or None)
+                atexit.register(_usage_ledger.close)
+                logger.info(f"✅ 使用量帳本目錄: {_usage_ledger.ledger_dir or '僅記憶體'}")
+    return _usage_ledger
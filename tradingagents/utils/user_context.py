@@ -440,7 +440,7 @@ def create_user_context(
 ) -> UserContext:
     """創建用戶上下文的便利函數"""
     try:
-        tier = TierType(membership_tier.upper())
+        tier = TierType(membership_tier.lower())
     except ValueError:
         tier = TierType.FREE  # 預設為免費會員
     